@@ -0,0 +1,408 @@
+"""本地技术术语纠错器 - 替代 LLM 纠错调用
+
+基于题库语料（标题、关键要点、标签）+ 内置 Java/Redis/MQ 术语表构建索引：
+- 英文术语：SymSpell 删除索引 + Damerau-Levenshtein（OSA）距离校验
+- 中文术语：同音/近音字混淆表，处理语音输入常见的同音错字
+
+单次纠错为纯内存查找，耗时在微秒级；LLM 纠错仅作为可选慢路径兜底。
+"""
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+# 内置术语表：题库里不一定出现，但回答中高频出现的技术名词
+CURATED_TERMS = [
+    # Java 基础 / 并发
+    'Java', 'JDK', 'JVM', 'HashMap', 'ConcurrentHashMap', 'ArrayList', 'LinkedList',
+    'HashSet', 'TreeMap', 'LinkedHashMap', 'ThreadLocal', 'ThreadPoolExecutor',
+    'CompletableFuture', 'Future', 'Runnable', 'Callable', 'synchronized', 'volatile',
+    'ReentrantLock', 'ReadWriteLock', 'StampedLock', 'CountDownLatch', 'CyclicBarrier',
+    'Semaphore', 'AtomicInteger', 'LongAdder', 'AQS', 'CAS', 'Unsafe', 'monitor',
+    'BlockingQueue', 'ArrayBlockingQueue', 'LinkedBlockingQueue', 'SynchronousQueue',
+    'DelayQueue', 'ForkJoinPool', 'Executor', 'Executors', 'interrupt', 'deadlock',
+    'GC', 'CMS', 'G1', 'ZGC', 'Metaspace', 'ClassLoader', 'OOM', 'StackOverflowError',
+    # Spring / 微服务
+    'Spring', 'SpringBoot', 'SpringCloud', 'SpringMVC', 'MyBatis', 'Bean', 'BeanFactory',
+    'ApplicationContext', 'FactoryBean', 'AOP', 'IOC', 'Transactional', 'Autowired',
+    'Dubbo', 'Nacos', 'Sentinel', 'Hystrix', 'Feign', 'Gateway', 'Ribbon', 'Seata',
+    'ZooKeeper', 'Eureka', 'Netty', 'gRPC',
+    # Redis / 缓存
+    'Redis', 'Redisson', 'Memcached', 'Lua', 'RDB', 'AOF', 'String', 'Hash', 'List', 'Set',
+    'ZSet', 'Bitmap', 'HyperLogLog', 'Geo', 'Stream', 'skiplist', 'ziplist', 'listpack',
+    'quicklist', 'Pipeline', 'Cluster', 'BigKey', 'HotKey', 'Caffeine', 'Guava', 'expire',
+    'epoll', 'select', 'poll', 'SETNX', 'Watchdog', 'Codis', 'Twemproxy',
+    # MQ
+    'Kafka', 'RocketMQ', 'RabbitMQ', 'ActiveMQ', 'Pulsar', 'Broker', 'Producer', 'Consumer',
+    'Topic', 'Partition', 'Offset', 'Rebalance', 'NameServer', 'CommitLog', 'ConsumeQueue',
+    'Exchange', 'Queue', 'ACK', 'ISR', 'Leader', 'Follower',
+    # 数据库
+    'MySQL', 'InnoDB', 'MyISAM', 'MVCC', 'binlog', 'redolog', 'undolog', 'ReadView',
+    'Sharding', 'ShardingSphere', 'Mycat', 'Elasticsearch', 'MongoDB', 'PostgreSQL',
+    'explain', 'index', 'Snowflake',
+]
+
+# 中文技术术语（仅对 >= 3 字的术语做同音纠错，2 字词误报率太高）
+CURATED_CJK_TERMS = [
+    '线程池', '线程安全', '缓存穿透', '缓存击穿', '缓存雪崩', '缓存一致性', '布隆过滤器',
+    '乐观锁', '悲观锁', '分布式锁', '自旋锁', '可重入锁', '公平锁', '读写锁', '不可重复读',
+    '隔离级别', '聚簇索引', '覆盖索引', '联合索引', '最左前缀', '索引下推', '持久化',
+    '主从复制', '哨兵模式', '消息队列', '消息丢失', '重复消费', '顺序消息', '死信队列',
+    '延迟队列', '事务消息', '垃圾回收', '新生代', '老年代', '双亲委派', '类加载器',
+    '内存泄漏', '令牌桶', '漏桶算法', '压缩列表', '零拷贝', '多路复用', '一致性哈希',
+    '分库分表', '读写分离', '幂等性', '服务降级', '服务熔断', '注册中心', '配置中心',
+    '负载均衡', '依赖注入', '控制反转', '自动装配', '循环依赖', '三级缓存',
+]
+
+# 同音/近音字混淆表：同一组内的字互相视为可混淆（各组互不相交）
+CJK_CONFUSION_GROUPS = [
+    '池持迟吃驰', '程成城乘承诚', '线现限先', '锁所索琐', '缓换唤', '存村寸', '穿川传串',
+    '透头投', '击机基鸡', '雪血', '崩蹦', '布不步部', '隆龙笼', '滤虑律绿', '悲杯背',
+    '观关官管', '乐勒', '读独毒', '脏赃', '幂密蜜', '性姓幸', '隔格革', '离立力理',
+    '聚据巨句', '簇族足', '希稀吸西', '压鸭押', '久九旧就', '化话画华', '哨少烧',
+    '兵冰', '集及级即极', '复付副负富', '制治质置致', '消销', '息惜熄', '异易意义',
+    '旋选悬', '令另零', '桶统筒捅', '流留刘', '熔融容荣', '断段短', '降将讲',
+    '回会汇惠', '务物误', '垃拉啦', '代带待戴', '漏陋', '拷烤考', '载栽再在', '反返饭',
+    '赖耐', '注柱助', '册测侧策', '衡横恒', '均军君', '列烈裂', '递第弟', '委尾伪',
+    '派排牌', '泄谢械', '嵌潜', '装庄状', '配佩陪', '左佐', '推退', '叉差插', '跳条调',
+    '表标彪', '剪减简', '循寻询', '环还', '依医衣',
+]
+
+# 常见英文单词：视为合法词，不参与纠错
+COMMON_WORDS = [
+    'the', 'this', 'that', 'with', 'from', 'when', 'then', 'they', 'have', 'more', 'data',
+    'code', 'time', 'user', 'node', 'file', 'read', 'write', 'lock', 'block', 'value', 'null',
+    'true', 'false', 'thread', 'class', 'method', 'object', 'cache', 'server', 'client',
+    'request', 'response', 'delete', 'update', 'insert', 'query', 'table', 'page', 'memory',
+    'disk', 'size', 'type', 'name', 'version', 'level', 'state', 'event', 'task', 'main',
+    'master', 'slave', 'copy', 'load', 'save', 'send', 'sync', 'async', 'batch', 'retry',
+    'pool', 'loop', 'tool', 'port', 'host', 'path', 'link', 'line', 'word', 'work', 'worker',
+    'reader', 'writer', 'order', 'store', 'share', 'single', 'local', 'global', 'remote', 'result',
+    'error', 'check', 'start', 'stop', 'close', 'open', 'count', 'call', 'wait', 'notify', 'sleep',
+    'first', 'last', 'next', 'head', 'tail', 'left', 'right', 'high', 'fast', 'slow', 'good',
+    'some', 'many', 'each', 'every', 'other', 'only', 'also', 'just', 'like', 'need', 'used',
+    'using', 'will', 'would', 'should', 'could', 'what', 'which', 'where', 'there', 'their',
+    # 与术语只差一两个字母的普通单词（sprint/Spring、seat/Seata、consume/Consumer、produce/Producer）
+    'sprint', 'spring', 'string', 'strong', 'seat', 'consume', 'produce', 'product',
+    'broke', 'broken', 'lead', 'leading', 'follow', 'topic', 'part', 'party', 'offset',
+    'balance', 'exchange', 'change', 'charge', 'queue', 'cluster', 'pipe', 'stream',
+    'steam', 'dream', 'list', 'lost', 'lust', 'hash', 'hush', 'cash', 'crash', 'setting',
+    'bean', 'been', 'mean', 'meant', 'gate', 'gateway', 'ribbon', 'feign', 'reign',
+    'sign', 'design', 'future', 'feature', 'nature', 'monitor', 'mentor', 'expire',
+    'desire', 'require', 'inspire', 'select', 'elect', 'reflect', 'respect', 'expect',
+    'index', 'indices', 'interrupt', 'interpret', 'executor', 'execute', 'semaphore',
+    'latch', 'barrier', 'carrier', 'atomic', 'volatile', 'versatile', 'unsafe', 'explain',
+    'plain', 'complain', 'stack', 'track', 'stuck', 'heap', 'cheap', 'leap', 'leak',
+    'peak', 'speak', 'weak', 'week', 'shard', 'shared', 'sharing', 'hard', 'card', 'guard', 'keys',
+    'hotel', 'bigger', 'biggest', 'flake', 'snow', 'show', 'shown', 'view', 'review', 'preview',
+    'commit', 'comment', 'common', 'command', 'demand', 'expand', 'expend', 'extend', 'append',
+    'depend', 'spend', 'spent', 'pending', 'process', 'progress', 'access', 'success', 'address',
+    'express', 'compress', 'impress', 'record', 'report', 'support', 'import', 'export',
+    'transport', 'session', 'person', 'lesson', 'reason', 'season', 'simple', 'sample', 'example',
+    'signal', 'final', 'finally', 'total', 'normal', 'format', 'former', 'farmer', 'number',
+    'member', 'remember', 'manager', 'danger', 'message', 'massage', 'passage', 'package',
+    'storage', 'usage', 'stage', 'range', 'strange', 'around', 'round', 'sound', 'found', 'bound',
+    'limit', 'submit', 'permit', 'admit', 'return', 'retain', 'remain', 'domain',
+    'contain', 'certain', 'captain', 'obtain', 'maintain', 'before', 'after', 'about', 'above',
+    'below', 'between', 'because', 'while', 'until', 'into', 'than', 'them', 'these', 'those',
+    'were', 'your', 'very', 'much', 'most', 'make', 'made', 'take', 'taken', 'give', 'given',
+    'keep', 'kept', 'know', 'known', 'same', 'different', 'both', 'such', 'even', 'ever', 'never',
+    'over', 'under', 'again', 'still', 'always', 'often',
+]
+
+# 词形变化后缀：去掉后缀（或去掉后补回词尾 e）后是已知词 / 术语，就视为合法的词形变化
+INFLECTION_SUFFIXES = ('ing', 'ies', 'es', 'ed', 'er', 's', 'd')
+
+ASCII_TOKEN_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9_]*')
+CJK_RUN_PATTERN = re.compile(r'[一-龥]+')
+MAX_EDIT_DISTANCE = 2
+# 题库签名（Count + Max 聚合）的复查间隔；目录缓存标签版本变化时立即复查
+SIGNATURE_CHECK_INTERVAL = 30
+
+
+@dataclass(frozen=True)
+class Correction:
+    start: int
+    end: int
+    original: str
+    replacement: str
+    kind: str  # 'term' | 'pinyin'
+
+    def as_dict(self):
+        return {
+            'start': self.start,
+            'end': self.end,
+            'original': self.original,
+            'replacement': self.replacement,
+            'kind': self.kind,
+        }
+
+
+@dataclass
+class CorrectionResult:
+    original: str
+    text: str
+    corrections: list = field(default_factory=list)
+
+    @property
+    def changed(self):
+        return self.text != self.original
+
+    def diff(self):
+        return [item.as_dict() for item in self.corrections]
+
+
+def allowed_distance(length):
+    """按词长限制编辑距离：短词只做精确匹配，避免把普通单词改成术语。"""
+    if length < 4:
+        return 0
+    if length < 7:
+        return 1
+    return MAX_EDIT_DISTANCE
+
+
+def osa_distance(a, b, limit=MAX_EDIT_DISTANCE):
+    """Damerau-Levenshtein（Optimal String Alignment）距离，超过 limit 提前返回。"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (
+                prev_prev is not None and i > 1 and j > 1
+                and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+            ):
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return limit + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+
+def inflection_bases(word):
+    """去掉一个词形变化后缀得到的可能原形：consumers -> consumer、expired -> expire、queries -> query。"""
+    bases = []
+    for suffix in INFLECTION_SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        base = word[:-len(suffix)]
+        if suffix == 'ies':
+            bases.append(base + 'y')
+            continue
+        bases.extend((base, base + 'e'))
+        # stopped -> stop：双写辅音
+        if suffix in ('ing', 'ed', 'er') and len(base) > 3 and base[-1] == base[-2]:
+            bases.append(base[:-1])
+    return bases
+
+
+def _deletes(word, distance):
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for idx in range(len(item)):
+                next_frontier.add(item[:idx] + item[idx + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+class TermCorrector:
+    """SymSpell 风格的术语纠错器。构建后只读，可在线程间共享。"""
+
+    def __init__(self, terms, known_words=(), cjk_terms=()):
+        # 英文术语：小写 -> 规范写法（出现频次最高的写法）
+        casing = {}
+        for term, count in Counter(terms).items():
+            lower = term.lower()
+            best = casing.get(lower)
+            if best is None or count > best[1]:
+                casing[lower] = (term, count)
+        self.canonical = {lower: value[0] for lower, value in casing.items()}
+        self.frequency = {lower: value[1] for lower, value in casing.items()}
+        self.known = {word.lower() for word in (*COMMON_WORDS, *known_words)} | set(self.canonical)
+
+        self.delete_index = {}
+        for lower in self.canonical:
+            for item in _deletes(lower, allowed_distance(len(lower))):
+                self.delete_index.setdefault(item, set()).add(lower)
+
+        # 中文术语：按混淆组归一后的 key 建索引
+        self.confusion = {}
+        for group in CJK_CONFUSION_GROUPS:
+            for char in group:
+                self.confusion.setdefault(char, group[0])
+        self.cjk_terms = {term for term in cjk_terms if len(term) >= 3}
+        self.cjk_index = {}
+        for term in self.cjk_terms:
+            self.cjk_index.setdefault(self._phonetic_key(term), term)
+        self.cjk_lengths = sorted({len(term) for term in self.cjk_terms}, reverse=True)
+
+    def correct(self, text):
+        """返回 CorrectionResult，包含纠正后文本与逐处 diff。"""
+        text = text or ''
+        corrections = self._ascii_corrections(text) + self._cjk_corrections(text)
+        if not corrections:
+            return CorrectionResult(original=text, text=text)
+
+        corrections.sort(key=lambda item: item.start)
+        parts = []
+        cursor = 0
+        for item in corrections:
+            parts.append(text[cursor:item.start])
+            parts.append(item.replacement)
+            cursor = item.end
+        parts.append(text[cursor:])
+        return CorrectionResult(original=text, text=''.join(parts), corrections=corrections)
+
+    def is_known(self, lower):
+        if lower in self.known:
+            return True
+        return any(base in self.known for base in inflection_bases(lower))
+
+    def lookup(self, word):
+        """查找最接近的术语，找不到返回 None。"""
+        lower = word.lower()
+        # 已知词及其词形变化（复数、-ed / -ing / -er）都不算拼写错误
+        if self.is_known(lower):
+            return None
+        limit = allowed_distance(len(lower))
+        if limit == 0:
+            return None
+
+        candidates = set()
+        for item in _deletes(lower, limit):
+            candidates |= self.delete_index.get(item, set())
+
+        best = None
+        for candidate in candidates:
+            distance = osa_distance(lower, candidate, limit)
+            if distance > limit:
+                continue
+            rank = (distance, -self.frequency[candidate], candidate)
+            if best is None or rank < best[0]:
+                best = (rank, candidate)
+        if best is None:
+            return None
+        return self.canonical[best[1]]
+
+    def _ascii_corrections(self, text):
+        corrections = []
+        for match in ASCII_TOKEN_PATTERN.finditer(text):
+            word = match.group(0)
+            # 带数字的多是版本号 / 型号（JDK8、G1GC），不做纠错
+            if any(char.isdigit() for char in word):
+                continue
+            replacement = self.lookup(word)
+            if replacement and replacement != word:
+                corrections.append(Correction(match.start(), match.end(), word, replacement, 'term'))
+        return corrections
+
+    def _cjk_corrections(self, text):
+        if not self.cjk_index:
+            return []
+        corrections = []
+        for run in CJK_RUN_PATTERN.finditer(text):
+            segment = run.group(0)
+            idx = 0
+            while idx < len(segment):
+                matched = None
+                for length in self.cjk_lengths:
+                    window = segment[idx:idx + length]
+                    if len(window) < length:
+                        continue
+                    if window in self.cjk_terms:
+                        matched = (length, None)
+                        break
+                    term = self.cjk_index.get(self._phonetic_key(window))
+                    if term:
+                        matched = (length, term)
+                        break
+                if matched is None:
+                    idx += 1
+                    continue
+                length, term = matched
+                if term:
+                    start = run.start() + idx
+                    corrections.append(Correction(start, start + length, segment[idx:idx + length], term, 'pinyin'))
+                idx += length
+        return corrections
+
+    def _phonetic_key(self, text):
+        return ''.join(self.confusion.get(char, char) for char in text)
+
+
+def build_corrector_from_questions(questions):
+    """从题库构建纠错器：标题/关键要点/标签中的英文词作为术语，标签中的中文词作为中文术语。"""
+    terms = list(CURATED_TERMS)
+    known_words = []
+    cjk_terms = list(CURATED_CJK_TERMS)
+
+    for title, key_points, tags, brief_answer in questions:
+        for text in [title, *(key_points or [])]:
+            terms.extend(ASCII_TOKEN_PATTERN.findall(str(text or '')))
+        for tag in tags or []:
+            tag = str(tag).strip()
+            terms.extend(ASCII_TOKEN_PATTERN.findall(tag))
+            if CJK_RUN_PATTERN.fullmatch(tag):
+                cjk_terms.append(tag)
+        # 回答话术里的英文词只视为合法词，不作为纠正目标
+        known_words.extend(ASCII_TOKEN_PATTERN.findall(brief_answer or ''))
+
+    terms = [term for term in terms if len(term) >= 2]
+    return TermCorrector(terms, known_words=known_words, cjk_terms=cjk_terms)
+
+
+_corrector_lock = threading.Lock()
+_corrector_cache = {'signature': None, 'corrector': None, 'tag_version': None, 'checked_at': 0.0}
+
+
+def get_local_corrector():
+    """获取按题库版本缓存的纠错器（题目增删改后自动重建）。
+
+    目录缓存标签版本不变时，最多每 SIGNATURE_CHECK_INTERVAL 秒才查一次题库签名；
+    导入会递增标签版本，立即触发复查，后台单题修改最迟在复查间隔后生效。
+    """
+    from django.db.models import Count, Max
+    from questions.catalog_cache import CATALOG_TAG, tag_versions
+    from questions.models import Question
+
+    tag_version = tag_versions([CATALOG_TAG])
+    now = time.monotonic()
+    cached = _corrector_cache['corrector']
+    if (
+        cached is not None and _corrector_cache['tag_version'] == tag_version
+        and now - _corrector_cache['checked_at'] < SIGNATURE_CHECK_INTERVAL
+    ):
+        return cached
+
+    signature = tuple(Question.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+    with _corrector_lock:
+        cached = _corrector_cache['corrector']
+        if cached is None or _corrector_cache['signature'] != signature:
+            rows = Question.objects.values_list('title', 'key_points', 'tags', 'brief_answer')
+            cached = build_corrector_from_questions(rows.iterator())
+            _corrector_cache['signature'] = signature
+            _corrector_cache['corrector'] = cached
+        _corrector_cache['tag_version'] = tag_version
+        _corrector_cache['checked_at'] = now
+        return cached
+
+
+def reset_local_corrector():
+    """清空进程内缓存的纠错器（测试用）。"""
+    with _corrector_lock:
+        _corrector_cache.update(signature=None, corrector=None, tag_version=None, checked_at=0.0)
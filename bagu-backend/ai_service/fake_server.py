@@ -0,0 +1,287 @@
+"""本地假 OpenAI 兼容服务 - 压测与离线联调用，不访问真实模型
+
+支持：
+- POST /v1/chat/completions：流式（SSE，含 <think> 思考块与 usage chunk）与非流式
+- POST /v1/audio/speech：返回固定长度的伪音频字节
+- GET  /v1/models
+
+可配置首 token 延迟（TTFT）、生成速度（tokens/s）、请求失败率与流中途断开率。
+按提示词识别任务类型（评分/追问/对战/画像/纠错），返回能被 AiProvider 正常解析的内容。
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+@dataclass
+class FakeServerConfig:
+    ttft: float = 0.5
+    tokens_per_second: float = 60.0
+    error_rate: float = 0.0
+    drop_rate: float = 0.0
+    think_tokens: int = 40
+    seed: Optional[int] = None
+
+
+THINK_FRAGMENTS = ['先', '看', '用户', '回答', '是否', '覆盖', '核心', '要点', '，', '再', '判断', '表述', '准确性', '。']
+ANSWER_FRAGMENTS = ['这个', '问题', '的', '关键', '在于', '理解', '底层', '实现', '，', '并', '结合', '实际', '场景', '说明', '。']
+
+
+def detect_task(prompt):
+    """按提示词特征判断任务类型（与 ai_service.prompts 中的模板对应）"""
+    if '两位候选人' in prompt:
+        return 'battle'
+    if '正在向你追问' in prompt:
+        return 'follow_up'
+    if '知识画像' in prompt:
+        return 'profile'
+    if '纠正以下文本' in prompt:
+        return 'correction'
+    return 'scoring'
+
+
+def build_answer(task, prompt, rng):
+    """生成对应任务的最终回答文本（不含思考块）"""
+    if task == 'scoring':
+        score = rng.randint(40, 95)
+        return '```json\n' + json.dumps({
+            'score': score,
+            'highlights': ['回答覆盖了核心概念'],
+            'missing_points': ['缺少实际场景举例'],
+            'suggestion': '补充底层原理与使用场景。',
+            'improved_answer': '参考答案：先说明核心概念，再展开底层实现与常见场景。',
+            'role_scores': [
+                {'role_key': f'role_{idx + 1}', 'role_name': f'角色{idx + 1}', 'score': score, 'comment': '整体不错'}
+                for idx in range(3)
+            ],
+        }, ensure_ascii=False) + '\n```'
+    if task == 'battle':
+        return '```json\n' + json.dumps({
+            'winner': rng.choice(['a', 'b', 'tie']),
+            'summary': '双方都答到了核心概念，A 更注重原理，B 更注重场景。',
+            'a_advantages': ['原理清晰'],
+            'b_advantages': ['场景丰富'],
+            'a_can_learn_from_b': ['多结合实际场景'],
+            'b_can_learn_from_a': ['补充底层原理'],
+            'common_missing': ['性能对比'],
+        }, ensure_ascii=False) + '\n```'
+    if task == 'profile':
+        return '```json\n' + json.dumps({
+            'category_scores': {},
+            'strengths': ['基础扎实'],
+            'weaknesses': ['场景经验不足'],
+            'suggestions': ['多做综合题'],
+            'overall_level': 'intermediate',
+        }, ensure_ascii=False) + '\n```'
+    if task == 'correction':
+        marker = '---\n\n'
+        return prompt.split(marker, 1)[-1].strip() if marker in prompt else prompt
+    return ''.join(rng.choice(ANSWER_FRAGMENTS) for _ in range(60))
+
+
+def split_tokens(text):
+    """粗略切成 token：ASCII 连续片段按 4 字符，中文按单字"""
+    tokens, buffer = [], ''
+    for char in text:
+        if char.isascii():
+            buffer += char
+            if len(buffer) >= 4:
+                tokens.append(buffer)
+                buffer = ''
+        else:
+            if buffer:
+                tokens.append(buffer)
+                buffer = ''
+            tokens.append(char)
+    if buffer:
+        tokens.append(buffer)
+    return tokens
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeOpenAI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            return {}
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+            return
+        self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        payload = self._read_json()
+        path = self.path.rstrip('/')
+        config = self.server.config
+        rng = self.server.rng()
+
+        if rng.random() < config.error_rate:
+            self._send_json(500, {'error': {'message': 'fake upstream error', 'type': 'server_error'}})
+            return
+
+        if path.endswith('/chat/completions'):
+            self._chat_completions(payload, rng)
+        elif path.endswith('/audio/speech'):
+            self._speech(payload)
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def _chat_completions(self, payload, rng):
+        config = self.server.config
+        messages = payload.get('messages') or []
+        prompt = messages[0].get('content', '') if messages else ''
+        task = detect_task(prompt)
+        # 同一提示词输出固定，续写请求才能与已输出部分对齐
+        content_rng = random.Random(f'{config.seed}:{prompt}')
+        answer = build_answer(task, prompt, content_rng)
+        think = ''
+        if task != 'correction' and config.think_tokens:
+            think = '<think>' + ''.join(content_rng.choice(THINK_FRAGMENTS) for _ in range(config.think_tokens)) + '</think>'
+        # 续写请求：已输出部分作为 assistant 消息，从截断处继续
+        partial = messages[1].get('content', '') if len(messages) >= 3 else ''
+        full_text = think + answer
+        text = full_text[len(partial):] if partial and full_text.startswith(partial) else full_text
+        tokens = split_tokens(text)
+        prompt_tokens = sum(len(item.get('content', '')) for item in messages) // 2
+        model = payload.get('model') or 'fake-model'
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        max_tokens = payload.get('max_tokens')
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+
+        time.sleep(config.ttft)
+
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(tokens),
+            'total_tokens': prompt_tokens + len(tokens),
+        }
+        if not payload.get('stream'):
+            time.sleep(len(tokens) / config.tokens_per_second if config.tokens_per_second else 0)
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                    'finish_reason': 'stop',
+                }],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # 分块传输：中途断开时缺少结束块，客户端能识别为传输错误（而不是正常读到 EOF）
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        drop_at = rng.randrange(1, len(tokens)) if len(tokens) > 1 and rng.random() < config.drop_rate else None
+        interval = 1 / config.tokens_per_second if config.tokens_per_second else 0
+        try:
+            for idx, token in enumerate(tokens):
+                if idx == drop_at:
+                    # 模拟上游中途断开：不发送结束块直接关闭连接
+                    return
+                self._write_event(self._chunk(completion_id, model, {'content': token}))
+                if interval:
+                    time.sleep(interval)
+            self._write_event(self._chunk(completion_id, model, {}, finish_reason='stop'))
+            if (payload.get('stream_options') or {}).get('include_usage'):
+                chunk = self._chunk(completion_id, model, None)
+                chunk['usage'] = usage
+                self._write_event(chunk)
+            self._write_chunk(b'data: [DONE]\n\n')
+            self._write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前关闭（取消生成）
+            self.server.cancelled += 1
+
+    @staticmethod
+    def _chunk(completion_id, model, delta, finish_reason=None):
+        return {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [] if delta is None else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def _write_event(self, payload):
+        self._write_chunk(f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode('utf-8'))
+
+    def _write_chunk(self, data):
+        """写一个 HTTP 分块；空数据即结束块"""
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _speech(self, payload):
+        config = self.server.config
+        text = payload.get('input') or ''
+        time.sleep(config.ttft)
+        # 约 1 KB / 字，内容无意义，仅用于测量传输与编码开销
+        body = bytes(1024 * max(len(text), 1))
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config=None, verbose=False):
+        super().__init__(address, FakeOpenAIHandler)
+        self.config = config or FakeServerConfig()
+        self.verbose = verbose
+        self.cancelled = 0
+        self._seed_lock = threading.Lock()
+        self._seed_rng = random.Random(self.config.seed)
+
+    def rng(self):
+        """每个请求独立的随机源，用于失败/断开注入（固定 seed 时可复现）"""
+        with self._seed_lock:
+            return random.Random(self._seed_rng.random())
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1/'
+
+
+def start_fake_server(host='127.0.0.1', port=0, config=None, verbose=False):
+    """在后台线程启动假服务，返回 server（server.base_url 可直接填入 AiModelConfig）"""
+    server = FakeOpenAIServer((host, port), config=config, verbose=verbose)
+    thread = threading.Thread(target=server.serve_forever, name='fake-openai-server', daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,69 @@
+"""模型延迟历史（进程内），用于按任务路由时挑选最快的健康模型"""
+import threading
+import time
+
+# 指数滑动平均系数：越大越偏向最近一次测量
+EWMA_ALPHA = 0.3
+# 连续失败达到该次数视为不健康，冷却期后重新允许探测
+UNHEALTHY_FAILURES = 3
+FAILURE_COOLDOWN_SECONDS = 60
+
+
+class LatencyTracker:
+    """记录每个模型配置的首 token 延迟 EWMA 与连续失败次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record_success(self, config_id, latency_seconds):
+        if config_id is None:
+            return
+        with self._lock:
+            stat = self._stats.setdefault(config_id, {'ewma': None, 'failures': 0, 'failed_at': 0.0, 'samples': 0})
+            if stat['ewma'] is None:
+                stat['ewma'] = latency_seconds
+            else:
+                stat['ewma'] = EWMA_ALPHA * latency_seconds + (1 - EWMA_ALPHA) * stat['ewma']
+            stat['failures'] = 0
+            stat['samples'] += 1
+
+    def record_failure(self, config_id):
+        if config_id is None:
+            return
+        with self._lock:
+            stat = self._stats.setdefault(config_id, {'ewma': None, 'failures': 0, 'failed_at': 0.0, 'samples': 0})
+            stat['failures'] += 1
+            stat['failed_at'] = time.monotonic()
+
+    def is_healthy(self, config_id):
+        with self._lock:
+            return self._is_healthy(self._stats.get(config_id), time.monotonic())
+
+    @staticmethod
+    def _is_healthy(stat, now):
+        if not stat or stat['failures'] < UNHEALTHY_FAILURES:
+            return True
+        return now - stat['failed_at'] > FAILURE_COOLDOWN_SECONDS
+
+    def choose_fastest(self, config_ids):
+        """健康且有测量数据的模型按 EWMA 延迟取最小；都没有数据时按传入顺序取第一个健康模型；全部不健康时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            stats = {config_id: self._stats.get(config_id) for config_id in config_ids}
+            healthy = [config_id for config_id in config_ids if self._is_healthy(stats[config_id], now)]
+            measured = [config_id for config_id in healthy if stats[config_id] and stats[config_id]['ewma'] is not None]
+            if measured:
+                return min(measured, key=lambda config_id: stats[config_id]['ewma'])
+            return healthy[0] if healthy else None
+
+    def snapshot(self):
+        with self._lock:
+            return {config_id: dict(stat) for config_id, stat in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+latency_tracker = LatencyTracker()
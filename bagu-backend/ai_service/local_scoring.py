@@ -0,0 +1,137 @@
+"""本地关键要点覆盖度评分 - LLM 返回前的即时预估分 / 无可用模型时的离线兜底
+
+把参考要点与用户回答切成特征（英文技术术语 + 中文字符二元组），
+用 NumPy 一次性计算每个要点的 IDF 加权覆盖率与整体余弦相似度，毫秒级完成。
+"""
+import math
+import re
+import time
+
+import numpy as np
+
+from .corrector import ASCII_TOKEN_PATTERN, CJK_RUN_PATTERN
+
+POINT_SPLIT_PATTERN = re.compile(r'[。！？；;!?\n]+')
+POINT_PREFIX_PATTERN = re.compile(r'^\s*(?:[-*•]|\d+[.、)）])\s*')
+STOP_BIGRAMS = {
+    '可以', '这个', '就是', '因为', '所以', '如果', '我们', '一个', '进行', '通过', '需要',
+    '没有', '什么', '时候', '以及', '还是', '然后', '的话', '比如', '主要', '其实',
+}
+MATCH_THRESHOLD = 0.5
+MAX_DERIVED_POINTS = 12
+LOCAL_MODEL_NAME = '本地评分'
+
+
+def extract_features(text):
+    """英文术语（小写）+ 中文二元组；单字中文片段保留原字。"""
+    text = text or ''
+    features = [token.lower() for token in ASCII_TOKEN_PATTERN.findall(text)]
+    for run in CJK_RUN_PATTERN.findall(text):
+        if len(run) == 1:
+            features.append(run)
+            continue
+        for idx in range(len(run) - 1):
+            bigram = run[idx:idx + 2]
+            if bigram not in STOP_BIGRAMS:
+                features.append(bigram)
+    return features
+
+
+def reference_points(key_points, brief_answer):
+    """优先用结构化关键要点；题库未整理要点时从回答话术切句作为要点。"""
+    points = [str(item).strip() for item in (key_points or []) if str(item).strip()]
+    if points:
+        return points
+
+    derived = []
+    for sentence in POINT_SPLIT_PATTERN.split(brief_answer or ''):
+        sentence = POINT_PREFIX_PATTERN.sub('', sentence).strip(' ，,：:')
+        if len(sentence) >= 6 and sentence not in derived:
+            derived.append(sentence)
+        if len(derived) >= MAX_DERIVED_POINTS:
+            break
+    return derived
+
+
+def score_answer_locally(key_points, brief_answer, user_answer):
+    """计算覆盖率预估分，返回 dict（score/coverage/similarity/matched_points/missing_points/elapsed_ms）"""
+    started = time.perf_counter()
+    points = reference_points(key_points, brief_answer)
+    point_features = [extract_features(point) for point in points]
+    answer_features = extract_features(user_answer)
+
+    empty = {
+        'score': 0,
+        'coverage': 0.0,
+        'similarity': 0.0,
+        'matched_points': [],
+        'missing_points': points,
+    }
+    if not points or not answer_features or not any(point_features):
+        empty['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return empty
+
+    vocab = {}
+    for features in [*point_features, answer_features]:
+        for feature in features:
+            vocab.setdefault(feature, len(vocab))
+
+    point_matrix = np.zeros((len(points), len(vocab)), dtype=np.float32)
+    for row, features in enumerate(point_features):
+        for feature in features:
+            point_matrix[row, vocab[feature]] += 1
+    answer_vector = np.zeros(len(vocab), dtype=np.float32)
+    for feature in answer_features:
+        answer_vector[vocab[feature]] += 1
+
+    # 跨要点出现越少的特征越有区分度
+    point_presence = point_matrix > 0
+    doc_freq = point_presence.sum(axis=0)
+    idf = np.log((1 + len(points)) / (1 + doc_freq)) + 1.0
+
+    weighted_presence = point_presence * idf
+    point_weight = weighted_presence.sum(axis=1)
+    covered = weighted_presence @ (answer_vector > 0).astype(np.float32)
+    coverage = np.divide(covered, point_weight, out=np.zeros_like(covered), where=point_weight > 0)
+
+    reference_vector = point_matrix.sum(axis=0) * idf
+    answer_weighted = answer_vector * idf
+    denominator = float(np.linalg.norm(reference_vector) * np.linalg.norm(answer_weighted))
+    similarity = float(reference_vector @ answer_weighted) / denominator if denominator else 0.0
+
+    mean_coverage = float(coverage.mean())
+    score = round(100 * (0.75 * mean_coverage + 0.25 * similarity))
+    matched = coverage >= MATCH_THRESHOLD
+
+    return {
+        'score': max(0, min(100, score)),
+        'coverage': round(mean_coverage, 3),
+        'similarity': round(similarity if math.isfinite(similarity) else 0.0, 3),
+        'matched_points': [point for point, hit in zip(points, matched) if hit],
+        'missing_points': [point for point, hit in zip(points, matched) if not hit],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def build_offline_result(estimate, roles, reference_answer=''):
+    """把本地预估结果转成与 AiProvider._parse_response 一致的结构（无可用模型时兜底）"""
+    score = estimate['score']
+    comment = f'本地估算：覆盖 {len(estimate["matched_points"])} 个要点'
+    role_scores = [
+        {'role_key': role.role_key, 'role_name': role.name, 'score': score, 'comment': comment}
+        for role in roles
+    ]
+    return {
+        'score': score,
+        'highlights': estimate['matched_points'],
+        'missing_points': estimate['missing_points'],
+        'suggestion': '当前没有可用的 AI 模型，本次为本地关键要点覆盖度估算，请补充遗漏要点后再试。',
+        'improved_answer': reference_answer,
+        'role_scores': role_scores,
+        'junior_score': score,
+        'junior_comment': comment,
+        'mid_score': score,
+        'mid_comment': comment,
+        'senior_score': score,
+        'senior_comment': comment,
+    }
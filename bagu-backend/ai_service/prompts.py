@@ -217,6 +217,10 @@ TEXT_CORRECTION_PROMPT = """请在 Java 后端技术语境下，纠正以下文
 """
 
 
+CONTINUATION_PROMPT = """你上一条回复因网络中断被截断。请从截断处直接继续输出剩余内容：
+不要重复已经输出的内容，不要添加任何说明，保持原有格式（包括未闭合的 <think> 或 JSON）。"""
+
+
 BATTLE_ANALYSIS_PROMPT = """你是一位资深 Java 技术面试官。两位候选人回答了同一道面试题，请对比分析他们的回答。
 
 ## 面试题
@@ -2,8 +2,16 @@
 import base64
 import json
 import re
-from openai import OpenAI
-from .prompts import build_answer_analysis_prompt, FOLLOW_UP_PROMPT, USER_PROFILE_PROMPT, TEXT_CORRECTION_PROMPT, BATTLE_ANALYSIS_PROMPT
+import time
+from dataclasses import dataclass
+from typing import Optional
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+from bagu.metrics import record_llm_call, record_llm_retry, record_llm_stream, record_llm_ttft
+from .latency import latency_tracker
+from .prompts import (
+    build_answer_analysis_prompt, FOLLOW_UP_PROMPT, USER_PROFILE_PROMPT, TEXT_CORRECTION_PROMPT, BATTLE_ANALYSIS_PROMPT,
+    CONTINUATION_PROMPT,
+)
 
 # 模型定价表（每百万 token 的价格，单位：元）
 # 格式：model_keyword -> (input_price, output_price)
@@ -30,12 +38,281 @@ def get_model_price(model_name, prompt_tokens, completion_tokens):
     return round(cost, 6)
 
 
+# 任务类型（与 AiTaskProfile.TASK_CHOICES 保持一致）
+TASK_CORRECTION = 'correction'
+TASK_SCORING = 'scoring'
+TASK_FOLLOW_UP = 'follow_up'
+TASK_PROFILE = 'profile'
+TASK_BATTLE = 'battle'
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """单个任务的生成参数"""
+    temperature: float = 0.7
+    max_tokens: int = 2000
+    timeout: Optional[float] = None
+
+
+try:
+    import httpx
+except ImportError:  # 新版 SDK 不再依赖 httpx，迭代时的传输错误已包装成 APIConnectionError
+    TRANSPORT_ERRORS = ()
+else:
+    # openai 1.x 迭代流时不包装 httpx 的传输错误（如分块响应没读完连接就被关闭）
+    TRANSPORT_ERRORS = (httpx.TransportError,)
+
+# 流式生成中途失败时可续写的上游错误（连接中断/超时、5xx、限流）。
+# 只看传输层是否真的出错：不少 OpenAI 兼容接口不返回 finish_reason，不能据此判断流被截断
+TRANSIENT_STREAM_ERRORS = (APIConnectionError, InternalServerError, RateLimitError, *TRANSPORT_ERRORS)
+# 同一模型上的续写重试次数；之后若有备用模型再换模型续写一次
+STREAM_CONTINUATION_RETRIES = 1
+
+
+# 未在后台配置任务路由时的默认参数（与历史行为一致）
+DEFAULT_TASK_PROFILES = {
+    TASK_CORRECTION: GenerationProfile(temperature=0.3),
+    TASK_SCORING: GenerationProfile(),
+    TASK_FOLLOW_UP: GenerationProfile(),
+    TASK_PROFILE: GenerationProfile(),
+    TASK_BATTLE: GenerationProfile(),
+}
+
+
+def _close_upstream(stream):
+    """关闭 OpenAI SDK 的流式响应（释放 HTTP 连接，服务端随之停止生成）"""
+    close = getattr(stream, 'close', None)
+    if close:
+        close()
+
+
+def build_continuation_messages(prompt, partial_output):
+    """以已生成的部分输出作为 assistant 消息，要求模型从截断处继续"""
+    messages = [{'role': 'user', 'content': prompt}]
+    if partial_output:
+        messages.append({'role': 'assistant', 'content': partial_output})
+        messages.append({'role': 'user', 'content': CONTINUATION_PROMPT})
+    return messages
+
+
+class StreamProgress:
+    """一次流式生成的进度，供调用方在客户端断开时读取已生成的部分输出"""
+
+    def __init__(self):
+        self.accumulated = ''
+        self.chunks = 0
+        self.usage = None
+        self.max_tokens = 0
+        self.started_at = time.monotonic()
+        self.finished = False
+        self.retries = 0
+        self.model_name = None
+        # 实际完成生成的模型标识（换备用模型续写后为备用模型），用于计价
+        self.model = None
+        # 各阶段首次发生的时间（time.time_ns），供调用方补记追踪 span
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks.setdefault(name, time.time_ns())
+
+    @property
+    def started(self):
+        return self.max_tokens > 0
+
+    @property
+    def generated_tokens(self):
+        """已生成 token 数：优先取上游 usage，否则按 chunk 数估算（兼容接口每个 chunk 约一个 token）"""
+        if self.usage:
+            return self.usage['completion_tokens']
+        return self.chunks
+
+    def add_usage(self, usage):
+        """续写时每次上游调用各自返回 usage，累加得到整次生成的消耗"""
+        if self.usage is None:
+            self.usage = dict(usage)
+            return
+        for key, value in usage.items():
+            self.usage[key] = self.usage.get(key, 0) + value
+
+    @property
+    def saved_tokens(self):
+        """提前取消后预计节省的 token 数（按生成上限估算）"""
+        return max(self.max_tokens - self.generated_tokens, 0)
+
+
 class AiProvider:
     """通过优云智算 OpenAI 兼容 API 调用 AI 模型"""
 
-    def __init__(self, api_key, base_url='https://api.modelverse.cn/v1/', model_name='deepseek-ai/DeepSeek-R1'):
+    def __init__(self, api_key, base_url='https://api.modelverse.cn/v1/', model_name='deepseek-ai/DeepSeek-R1',
+                 config_id=None, profiles=None):
         self.client = OpenAI(api_key=api_key, base_url=base_url)
         self.model = model_name
+        self.config_id = config_id
+        self.profiles = profiles or {}
+        self.display_name = model_name
+        # 返回备用 AiProvider（或 None）的回调，仅在续写需要换模型时才调用
+        self.fallback_factory = None
+
+    def get_profile(self, task):
+        return self.profiles.get(task) or DEFAULT_TASK_PROFILES.get(task) or GenerationProfile()
+
+    def _chat(self, task, prompt, stream=False, **extra):
+        """按任务的生成参数调用 chat.completions，并记录延迟供路由使用"""
+        profile = self.get_profile(task)
+        kwargs = {
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'temperature': profile.temperature,
+            'max_tokens': profile.max_tokens,
+        }
+        if profile.timeout:
+            kwargs['timeout'] = profile.timeout
+        if stream:
+            kwargs['stream'] = True
+        kwargs.update(extra)
+
+        started = time.monotonic()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception:
+            latency_tracker.record_failure(self.config_id)
+            record_llm_call(task, self.display_name, 'error')
+            raise
+        if not stream:
+            elapsed = time.monotonic() - started
+            latency_tracker.record_success(self.config_id, elapsed)
+            record_llm_call(task, self.display_name, 'ok', elapsed)
+            return response
+        return self._track_first_chunk(response, started, task)
+
+    def _track_first_chunk(self, stream, started, task):
+        """流式调用以首个 chunk 到达时间作为延迟样本，结束时记录生成速度；生成器被关闭时同时关闭上游连接"""
+        first_at = None
+        chunks = 0
+        completion_tokens = None
+        outcome = 'cancelled'
+        try:
+            for chunk in stream:
+                if first_at is None:
+                    first_at = time.monotonic()
+                    latency_tracker.record_success(self.config_id, first_at - started)
+                    record_llm_ttft(task, self.display_name, first_at - started)
+                if getattr(chunk, 'usage', None):
+                    completion_tokens = chunk.usage.completion_tokens
+                if getattr(chunk, 'choices', None):
+                    chunks += 1
+                yield chunk
+            outcome = 'ok'
+            if first_at is not None:
+                record_llm_stream(
+                    task, self.display_name,
+                    chunks if completion_tokens is None else completion_tokens,
+                    time.monotonic() - first_at,
+                )
+        except Exception:
+            latency_tracker.record_failure(self.config_id)
+            outcome = 'error'
+            raise
+        finally:
+            record_llm_call(task, self.display_name, outcome)
+            _close_upstream(stream)
+
+    def _stream_chat(self, task, prompt, progress, **extra):
+        """流式调用并拆分 <think> 思考过程，yield (event_type, content)，已生成内容实时写入 progress。
+
+        progress.accumulated 即检查点：上游在中途出现临时故障时，以检查点作为 assistant 消息
+        续写（先在当前模型重试，再换备用模型），并 yield ('retry', 信息) 通知调用方，输出不会重复。
+        调用方（SSE 客户端断开）关闭生成器时，finally 会立即关闭上游 HTTP 流，模型停止继续生成。
+        """
+        progress.max_tokens = self.get_profile(task).max_tokens
+        progress.model_name = progress.model_name or self.display_name
+        provider = self
+        retries_left = STREAM_CONTINUATION_RETRIES
+        in_thinking = False
+
+        while True:
+            stream = None
+            progress.model = provider.model
+            try:
+                progress.mark('request')
+                stream = provider._chat(
+                    task, prompt, stream=True,
+                    messages=build_continuation_messages(prompt, progress.accumulated), **extra,
+                )
+                progress.mark('response')
+                for chunk in stream:
+                    # 捕获 usage 信息（通常在最后一个 chunk）
+                    if hasattr(chunk, 'usage') and chunk.usage:
+                        progress.add_usage({
+                            'prompt_tokens': chunk.usage.prompt_tokens or 0,
+                            'completion_tokens': chunk.usage.completion_tokens or 0,
+                            'total_tokens': chunk.usage.total_tokens or 0,
+                        })
+
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content is None:
+                        continue
+                    token = delta.content
+                    progress.mark('first_token')
+                    progress.accumulated += token
+                    progress.chunks += 1
+                    accumulated = progress.accumulated
+
+                    # 判断 <think> 状态：用累积文本的标签位置判断
+                    think_open = accumulated.rfind('<think>')
+                    think_close = accumulated.rfind('</think>')
+
+                    if think_open > think_close:
+                        # 在 <think> 块内
+                        if not in_thinking:
+                            in_thinking = True
+                            clean = token.replace('<think>', '')
+                            if clean:
+                                yield ('thinking', clean)
+                        else:
+                            yield ('thinking', token)
+                    else:
+                        if in_thinking:
+                            in_thinking = False
+                            clean = token.replace('</think>', '')
+                            if clean:
+                                yield ('content', clean)
+                        else:
+                            clean = token.replace('<think>', '').replace('</think>', '')
+                            if clean:
+                                yield ('content', clean)
+                progress.mark('generated')
+                progress.finished = True
+                return
+            except TRANSIENT_STREAM_ERRORS as e:
+                next_provider = provider if retries_left > 0 else self._take_fallback(provider)
+                if next_provider is None:
+                    raise
+                reason = str(e) or e.__class__.__name__
+            finally:
+                if stream is not None:
+                    _close_upstream(stream)
+
+            record_llm_retry(task, provider.display_name)
+            retries_left -= 1
+            provider = next_provider
+            progress.retries += 1
+            progress.model_name = provider.display_name
+            yield ('retry', {
+                'attempt': progress.retries,
+                'model_name': provider.display_name,
+                'reason': reason,
+                'resumed_chars': len(progress.accumulated),
+            })
+
+    def _take_fallback(self, current):
+        """当前模型重试用尽后换一次备用模型；已换过则返回 None"""
+        if current is not self or self.fallback_factory is None:
+            return None
+        factory, self.fallback_factory = self.fallback_factory, None
+        return factory()
 
     def analyze_answer(self, title, brief_answer, detailed_answer, key_points, user_answer, roles=None):
         """分析用户回答，返回结构化结果"""
@@ -48,17 +325,13 @@ class AiProvider:
             roles=roles,
         )
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-        )
+        response = self._chat(TASK_SCORING, prompt)
 
         content = response.choices[0].message.content
         return self._parse_response(content)
 
-    def analyze_answer_stream(self, title, brief_answer, detailed_answer, key_points, user_answer, roles=None):
+    def analyze_answer_stream(self, title, brief_answer, detailed_answer, key_points, user_answer, roles=None,
+                              progress=None):
         """流式分析用户回答，yield (event_type, content) 元组"""
         prompt = build_answer_analysis_prompt(
             title=title,
@@ -69,68 +342,21 @@ class AiProvider:
             roles=roles,
         )
 
-        stream = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-            stream=True,
-            stream_options={'include_usage': True},
-        )
-
-        accumulated = ''
-        in_thinking = False
-        usage_info = None
-
-        for chunk in stream:
-            # 捕获 usage 信息（通常在最后一个 chunk）
-            if hasattr(chunk, 'usage') and chunk.usage:
-                usage_info = {
-                    'prompt_tokens': chunk.usage.prompt_tokens or 0,
-                    'completion_tokens': chunk.usage.completion_tokens or 0,
-                    'total_tokens': chunk.usage.total_tokens or 0,
-                }
-
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if delta.content is None:
-                continue
-            token = delta.content
-            accumulated += token
-
-            # 判断 <think> 状态：用累积文本的标签位置判断
-            think_open = accumulated.rfind('<think>')
-            think_close = accumulated.rfind('</think>')
-
-            if think_open > think_close:
-                # 在 <think> 块内
-                if not in_thinking:
-                    in_thinking = True
-                    clean = token.replace('<think>', '')
-                    if clean:
-                        yield ('thinking', clean)
-                else:
-                    yield ('thinking', token)
-            else:
-                if in_thinking:
-                    in_thinking = False
-                    clean = token.replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
-                else:
-                    clean = token.replace('<think>', '').replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
+        progress = progress if progress is not None else StreamProgress()
+        yield from self._stream_chat(TASK_SCORING, prompt, progress, stream_options={'include_usage': True})
+        accumulated = progress.accumulated
+        usage_info = progress.usage
 
         # 流结束，解析最终结果
+        progress.mark('parse_start')
         content_text = re.sub(r'<think>.*?</think>', '', accumulated, flags=re.DOTALL).strip()
         result = self._parse_response(content_text)
+        progress.mark('parse_end')
 
-        # 计算费用
+        # 计算费用（按最终完成生成的模型计价，换过备用模型时不是 self.model）
         if usage_info:
             usage_info['cost'] = get_model_price(
-                self.model,
+                progress.model or self.model,
                 usage_info['prompt_tokens'],
                 usage_info['completion_tokens'],
             )
@@ -141,18 +367,14 @@ class AiProvider:
     def correct_text(self, text):
         """用 AI 纠正文本中的错别字，返回纠正后的文本"""
         prompt = TEXT_CORRECTION_PROMPT.format(text=text)
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.3,
-            max_tokens=2000,
-        )
+        response = self._chat(TASK_CORRECTION, prompt)
         content = response.choices[0].message.content or text
         # 去除可能的 <think> 块
         content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL).strip()
         return content
 
-    def follow_up_stream(self, title, user_answer, score, highlights, missing_points, suggestion, follow_up_history, follow_up_question):
+    def follow_up_stream(self, title, user_answer, score, highlights, missing_points, suggestion, follow_up_history,
+                         follow_up_question, progress=None):
         """流式追问，yield (event_type, content) 元组"""
         prompt = FOLLOW_UP_PROMPT.format(
             title=title,
@@ -165,47 +387,9 @@ class AiProvider:
             follow_up_question=follow_up_question,
         )
 
-        stream = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-            stream=True,
-        )
-
-        accumulated = ''
-        in_thinking = False
-
-        for chunk in stream:
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if delta.content is None:
-                continue
-            token = delta.content
-            accumulated += token
-
-            think_open = accumulated.rfind('<think>')
-            think_close = accumulated.rfind('</think>')
-
-            if think_open > think_close:
-                if not in_thinking:
-                    in_thinking = True
-                    clean = token.replace('<think>', '')
-                    if clean:
-                        yield ('thinking', clean)
-                else:
-                    yield ('thinking', token)
-            else:
-                if in_thinking:
-                    in_thinking = False
-                    clean = token.replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
-                else:
-                    clean = token.replace('<think>', '').replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
+        progress = progress if progress is not None else StreamProgress()
+        yield from self._stream_chat(TASK_FOLLOW_UP, prompt, progress)
+        accumulated = progress.accumulated
 
         # 返回完整回答文本
         final_text = re.sub(r'<think>.*?</think>', '', accumulated, flags=re.DOTALL).strip()
@@ -221,19 +405,14 @@ class AiProvider:
             recent_records=recent_records,
         )
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-        )
+        response = self._chat(TASK_PROFILE, prompt)
 
         content = response.choices[0].message.content or ''
         content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL).strip()
         return self._parse_profile_response(content)
 
     def battle_analysis_stream(self, title, user_a_name, user_a_answer, user_a_scores,
-                                user_b_name, user_b_answer, user_b_scores):
+                                user_b_name, user_b_answer, user_b_scores, progress=None):
         """流式对战分析，yield (event_type, content) 元组"""
         prompt = BATTLE_ANALYSIS_PROMPT.format(
             title=title,
@@ -245,47 +424,9 @@ class AiProvider:
             user_b_scores=user_b_scores,
         )
 
-        stream = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-            stream=True,
-        )
-
-        accumulated = ''
-        in_thinking = False
-
-        for chunk in stream:
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if delta.content is None:
-                continue
-            token = delta.content
-            accumulated += token
-
-            think_open = accumulated.rfind('<think>')
-            think_close = accumulated.rfind('</think>')
-
-            if think_open > think_close:
-                if not in_thinking:
-                    in_thinking = True
-                    clean = token.replace('<think>', '')
-                    if clean:
-                        yield ('thinking', clean)
-                else:
-                    yield ('thinking', token)
-            else:
-                if in_thinking:
-                    in_thinking = False
-                    clean = token.replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
-                else:
-                    clean = token.replace('<think>', '').replace('</think>', '')
-                    if clean:
-                        yield ('content', clean)
+        progress = progress if progress is not None else StreamProgress()
+        yield from self._stream_chat(TASK_BATTLE, prompt, progress)
+        accumulated = progress.accumulated
 
         # 解析最终结果
         content_text = re.sub(r'<think>.*?</think>', '', accumulated, flags=re.DOTALL).strip()
@@ -443,27 +584,104 @@ class AiProvider:
             }
 
 
-def get_ai_provider():
-    """从数据库配置获取默认 AI Provider"""
+def load_task_profiles():
+    """读取后台配置的任务生成参数：task -> GenerationProfile"""
+    from practice.models import AiTaskProfile
+    profiles = {}
+    for item in AiTaskProfile.objects.filter(is_enabled=True):
+        profiles[item.task] = GenerationProfile(
+            temperature=item.temperature,
+            max_tokens=item.max_tokens,
+            timeout=item.timeout or None,
+        )
+    return profiles
+
+
+def build_provider(config, profiles=None):
+    provider = AiProvider(
+        api_key=config.api_key,
+        base_url=config.base_url,
+        model_name=config.model_name,
+        config_id=config.id,
+        profiles=load_task_profiles() if profiles is None else profiles,
+    )
+    provider.display_name = config.name
+    return provider
+
+
+def resolve_task_model_config(task):
+    """按任务路由选择模型配置；未配置路由（或路由模型不可用）时返回 None"""
+    from practice.models import AiModelConfig, AiTaskProfile
+    if not task:
+        return None
+    route = AiTaskProfile.objects.select_related('model_config').filter(task=task, is_enabled=True).first()
+    if route is None:
+        return None
+
+    config = route.model_config
+    if route.policy == AiTaskProfile.POLICY_FASTEST:
+        # 候选只限本路由的模型（留空时为默认模型）和后台显式勾选的备选模型，路由模型排在最前
+        primary = config if config is not None and config.is_enabled else (
+            AiModelConfig.objects.filter(is_enabled=True, is_default=True).first()
+        )
+        candidates = {primary.id: primary} if primary is not None else {}
+        for alternate in route.alternate_models.filter(is_enabled=True).order_by('id'):
+            candidates.setdefault(alternate.id, alternate)
+        fastest_id = latency_tracker.choose_fastest(list(candidates))
+        if fastest_id is not None:
+            return candidates[fastest_id]
+
+    if config is not None and config.is_enabled:
+        return config
+    return None
+
+
+def get_routed_provider(task):
+    """仅当任务配置了专用模型时返回 (provider, 模型名)，否则返回 None"""
+    config = resolve_task_model_config(task)
+    if config is None:
+        return None
+    return build_provider(config), config.name
+
+
+def build_fallback_provider(primary_config_id):
+    """为续写挑选备用模型：除主模型外的已启用、健康模型中近期延迟最低者"""
+    from practice.models import AiModelConfig
+    candidates = {
+        config.id: config
+        for config in AiModelConfig.objects.filter(is_enabled=True).exclude(pk=primary_config_id).order_by('id')
+    }
+    fallback_id = latency_tracker.choose_fastest(list(candidates))
+    if fallback_id is None:
+        return None
+    return build_provider(candidates[fallback_id])
+
+
+def get_ai_provider(task=None):
+    """从数据库配置获取 AI Provider：优先任务路由模型，其次默认模型（流式中断时可换备用模型续写）"""
     from practice.models import AiModelConfig
-    config = AiModelConfig.objects.filter(is_enabled=True, is_default=True).first()
+    config = resolve_task_model_config(task)
+    if not config:
+        config = AiModelConfig.objects.filter(is_enabled=True, is_default=True).first()
     if not config:
         config = AiModelConfig.objects.filter(is_enabled=True).first()
     if not config:
         raise ValueError('未配置 AI 模型，请在 Django Admin 中添加 AI 模型配置')
-    return AiProvider(
-        api_key=config.api_key,
-        base_url=config.base_url,
-        model_name=config.model_name,
-    ), config.name
+    provider = build_provider(config)
+    provider.fallback_factory = lambda: build_fallback_provider(config.id)
+    return provider, config.name
 
 
 def get_ai_provider_by_id(model_id):
-    """根据模型 ID 获取 AI Provider"""
+    """
+    根据模型 ID 获取 AI Provider（生成参数仍按任务配置；用户指定了模型，中断时只在该模型上续写）。
+
+    只能使用已启用的配置；压测环境设置 AI_ALLOW_DISABLED_MODEL_IDS 后，才允许按 ID 使用禁用的配置。
+    """
+    from django.conf import settings
     from practice.models import AiModelConfig
-    config = AiModelConfig.objects.get(pk=model_id, is_enabled=True)
-    return AiProvider(
-        api_key=config.api_key,
-        base_url=config.base_url,
-        model_name=config.model_name,
-    ), config.name
+    configs = AiModelConfig.objects.all()
+    if not settings.AI_ALLOW_DISABLED_MODEL_IDS:
+        configs = configs.filter(is_enabled=True)
+    config = configs.get(pk=model_id)
+    return build_provider(config), config.name
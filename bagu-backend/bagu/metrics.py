@@ -0,0 +1,197 @@
+"""Prometheus 指标：HTTP / 数据库 / 缓存 / LLM / SSE 热路径埋点与 /metrics 导出
+
+gunicorn 多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR（启动前清空），各 worker 写各自的 mmap 文件，
+/metrics 由任一 worker 汇总输出；未设置时使用进程内默认 registry（runserver / 测试）。
+标签只使用 URL 名称、任务类型与模型配置名，基数受路由与后台配置数量约束。
+"""
+import os
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 120, 200, 400)
+
+HTTP_REQUESTS = Counter(
+    'bagu_http_requests_total', 'HTTP 请求数', ['view', 'method', 'status'],
+)
+HTTP_LATENCY = Histogram(
+    'bagu_http_request_duration_seconds', 'HTTP 请求耗时（流式响应只计到响应头返回）', ['view', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'bagu_db_queries_per_request', '单个请求的 SQL 查询数（流式响应计到流结束）', ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Histogram(
+    'bagu_db_query_seconds_per_request', '单个请求的 SQL 总耗时（流式响应计到流结束）', ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'bagu_cache_requests_total', 'API 缓存读写', ['namespace', 'result'],
+)
+SSE_DURATION = Histogram(
+    'bagu_sse_stream_duration_seconds', 'SSE 流从开始到结束的耗时', ['view', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+LLM_REQUESTS = Counter(
+    'bagu_llm_requests_total', 'LLM 调用次数', ['task', 'model', 'outcome'],
+)
+LLM_LATENCY = Histogram(
+    'bagu_llm_latency_seconds', 'LLM 非流式调用耗时', ['task', 'model'], buckets=LATENCY_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    'bagu_llm_ttft_seconds', 'LLM 流式首 token 延迟', ['task', 'model'], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    'bagu_llm_tokens_per_second', 'LLM 流式生成速度（首 token 之后）', ['task', 'model'],
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Counter(
+    'bagu_llm_completion_tokens_total', 'LLM 生成 token 数', ['task', 'model'],
+)
+LLM_STREAM_RETRIES = Counter(
+    'bagu_llm_stream_retries_total', '流式生成中断后的续写次数', ['task', 'model'],
+)
+LLM_CANCELLED_TOKENS = Counter(
+    'bagu_llm_cancelled_tokens_saved_total', '客户端断开后提前取消生成节省的 token（按上限估算）', ['task', 'model'],
+)
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def record_llm_call(task, model, outcome, seconds=None):
+    if not metrics_enabled():
+        return
+    LLM_REQUESTS.labels(task, model, outcome).inc()
+    if seconds is not None:
+        LLM_LATENCY.labels(task, model).observe(seconds)
+
+
+def record_llm_ttft(task, model, seconds):
+    if metrics_enabled():
+        LLM_TTFT.labels(task, model).observe(seconds)
+
+
+def record_llm_stream(task, model, completion_tokens, generation_seconds):
+    if not metrics_enabled():
+        return
+    LLM_COMPLETION_TOKENS.labels(task, model).inc(completion_tokens)
+    if generation_seconds > 0 and completion_tokens:
+        LLM_TOKENS_PER_SECOND.labels(task, model).observe(completion_tokens / generation_seconds)
+
+
+def record_llm_retry(task, model):
+    if metrics_enabled():
+        LLM_STREAM_RETRIES.labels(task, model).inc()
+
+
+def record_cancelled_tokens(task, model, saved_tokens):
+    if metrics_enabled() and saved_tokens:
+        LLM_CANCELLED_TOKENS.labels(task, model).inc(saved_tokens)
+
+
+def record_cache(key, result):
+    """key 形如 api:<namespace>:...，只取 namespace 作为标签"""
+    if not metrics_enabled():
+        return
+    parts = key.split(':', 2)
+    namespace = parts[1] if len(parts) > 1 else 'other'
+    CACHE_REQUESTS.labels(namespace, result).inc()
+
+
+class _QueryCounter:
+    """connection.execute_wrapper 钩子：统计当前请求的 SQL 条数与耗时"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+def _observe_queries(view, counter):
+    DB_QUERIES.labels(view).observe(counter.count)
+    DB_TIME.labels(view).observe(counter.seconds)
+
+
+def _instrument_stream(response, view, counter):
+    """包装流式输出：生成器里的 SQL 继续计入本请求，流结束/出错/客户端断开时记录 SQL 指标；SSE 另记总耗时"""
+    original = iter(response.streaming_content)
+    sse = response.get('Content-Type', '').startswith('text/event-stream')
+    started = time.perf_counter()
+
+    def wrapper():
+        outcome = 'aborted'
+        try:
+            while True:
+                # 只在取下一块时挂钩子，不跨 yield 持有，避免与其他 execute_wrapper 交错
+                with connection.execute_wrapper(counter):
+                    chunk = next(original, None)
+                if chunk is None:
+                    break
+                if sse and b'event: error' in chunk:
+                    outcome = 'error'
+                yield chunk
+            if outcome != 'error':
+                outcome = 'done'
+        finally:
+            _observe_queries(view, counter)
+            if sse:
+                SSE_DURATION.labels(view, outcome).observe(time.perf_counter() - started)
+
+    response.streaming_content = wrapper()
+
+
+class MetricsMiddleware:
+    """记录每个请求的耗时、状态码、SQL 条数/耗时（流式响应含生成器里的查询）；SSE 响应额外记录整条流的耗时"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_enabled() or request.path == '/metrics':
+            return self.get_response(request)
+
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = _view_label(request)
+        HTTP_REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        HTTP_LATENCY.labels(view, request.method).observe(elapsed)
+        if response.streaming:
+            _instrument_stream(response, view, counter)
+        else:
+            _observe_queries(view, counter)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus 抓取入口（仅 gunicorn 监听端口可访问，nginx 不对外转发）"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,290 @@
+"""按需请求性能剖析：管理员请求头或按比例抽样触发，输出火焰图可用的 collapsed stack
+
+触发条件（满足其一）：
+- 请求头 X-Bagu-Profile: 1，且当前会话是 staff 用户（或请求头值等于 PROFILING_TOKEN）
+- 按 PROFILING_SAMPLE_RATE 随机抽样（默认 0，不抽样）
+
+默认用后台线程定时读取 sys._current_frames() 采样请求线程的调用栈（对请求本身几乎无侵入），
+流式响应会一直采样到生成器结束或客户端断开；解释器不支持时退化为 cProfile。
+结果写入 PROFILING_DIR（<name>.folded + <name>.json），目录总大小超过 PROFILING_MAX_BYTES 时删除最旧的。
+.folded 每行 "帧1;帧2;... 次数"，可直接交给 flamegraph.pl / speedscope。
+"""
+import cProfile
+import json
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.html import format_html, format_html_join
+
+PROFILE_HEADER = 'HTTP_X_BAGU_PROFILE'
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+$')
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        filename = filename[len(base) + 1:]
+    elif 'site-packages/' in filename:
+        filename = filename.split('site-packages/', 1)[1]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def collapse_stack(frame):
+    """把调用栈转成 collapsed 格式（根在前，用 ; 连接）"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """后台线程按固定间隔采样目标线程的调用栈"""
+    mode = 'sampling'
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+            del frame
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class CProfileSampler:
+    """cProfile 退化方案：只有调用关系没有完整栈，collapsed 输出为 "调用者;函数 自身耗时(微秒)" 两层"""
+    mode = 'cprofile'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    @property
+    def samples(self):
+        return len(pstats.Stats(self.profiler).stats)
+
+    def collapsed(self):
+        lines = Counter()
+        for func, (_, _, self_time, _, callers) in pstats.Stats(self.profiler).stats.items():
+            label = self._label(func)
+            if not callers:
+                lines[label] += int(self_time * 1_000_000)
+            for caller, caller_stats in callers.items():
+                lines[f'{self._label(caller)};{label}'] += int(caller_stats[2] * 1_000_000)
+        return ''.join(f'{stack} {value}\n' for stack, value in lines.most_common() if value)
+
+    @staticmethod
+    def _label(func):
+        filename, line, name = func
+        if 'site-packages/' in filename:
+            filename = filename.split('site-packages/', 1)[1]
+        return f'{name} ({filename}:{line})'.replace(';', ':')
+
+
+def _build_sampler():
+    if getattr(settings, 'PROFILING_MODE', 'sampling') == 'sampling' and hasattr(sys, '_current_frames'):
+        return StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+    return CProfileSampler()
+
+
+def profile_dir():
+    path = Path(settings.PROFILING_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class RequestProfile:
+    """一次请求的剖析会话：start → finish 写文件并按大小上限清理"""
+
+    def __init__(self, request, reason):
+        self.reason = reason
+        self.method = request.method
+        self.path = request.path
+        self.started_at = datetime.now()
+        self.name = f"{self.started_at:%Y%m%d-%H%M%S}-{secrets.token_hex(4)}"
+        self.sampler = _build_sampler()
+        self._started = time.perf_counter()
+        self._finished = False
+
+    def start(self):
+        self.sampler.start()
+        return self
+
+    def finish(self, request, status_code, streamed=False):
+        if self._finished:
+            return
+        self._finished = True
+        self.sampler.stop()
+        duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        match = getattr(request, 'resolver_match', None)
+        meta = {
+            'name': self.name,
+            'method': self.method,
+            'path': self.path,
+            'view': match.view_name if match else '',
+            'status': status_code,
+            'streamed': streamed,
+            'duration_ms': duration_ms,
+            'mode': self.sampler.mode,
+            'samples': self.sampler.samples,
+            'reason': self.reason,
+            'created_at': self.started_at.isoformat(timespec='seconds'),
+        }
+        directory = profile_dir()
+        (directory / f'{self.name}.folded').write_text(self.sampler.collapsed(), encoding='utf-8')
+        (directory / f'{self.name}.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        prune_profiles(directory, settings.PROFILING_MAX_BYTES)
+
+
+def prune_profiles(directory, max_bytes):
+    """目录总大小超过上限时按时间从旧到新删除（.folded 与 .json 成对删除）"""
+    groups = {}
+    for item in directory.iterdir():
+        if item.suffix in {'.folded', '.json'}:
+            groups.setdefault(item.stem, []).append(item)
+    entries = sorted(
+        groups.items(), key=lambda pair: min(path.stat().st_mtime for path in pair[1]),
+    )
+    total = sum(path.stat().st_size for _, paths in entries for path in paths)
+    while entries and total > max_bytes:
+        _, paths = entries.pop(0)
+        for path in paths:
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+
+def list_profiles():
+    profiles = []
+    for meta_path in profile_dir().glob('*.json'):
+        try:
+            profiles.append(json.loads(meta_path.read_text(encoding='utf-8')))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(profiles, key=lambda item: item.get('created_at', ''), reverse=True)
+
+
+def _profile_reason(request):
+    header = request.META.get(PROFILE_HEADER, '').strip()
+    if header:
+        token = getattr(settings, 'PROFILING_TOKEN', '')
+        if token and secrets.compare_digest(header.encode('utf-8'), token.encode('utf-8')):
+            return 'token'
+        user = getattr(request, 'user', None)
+        if header.lower() in {'1', 'true', 'yes', 'on'} and user is not None and user.is_staff:
+            return 'header'
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    if rate > 0 and random.random() < rate:
+        return 'sampled'
+    return None
+
+
+def _profile_stream(content, profile, request, status_code):
+    """包装流式响应，生成器结束或被关闭（客户端断开）时才结束剖析"""
+    try:
+        yield from content
+    finally:
+        profile.finish(request, status_code, streamed=True)
+
+
+class ProfilingMiddleware:
+    """需放在 AuthenticationMiddleware 之后，以便识别 staff 会话"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = None if request.path.startswith('/admin/profiles') else _profile_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        try:
+            profile = RequestProfile(request, reason).start()
+        except ValueError:
+            # 已有其他 profiler 在运行（cProfile 不允许嵌套），放弃本次剖析
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            profile.finish(request, 500)
+            raise
+        if response.streaming:
+            response.streaming_content = _profile_stream(
+                response.streaming_content, profile, request, response.status_code,
+            )
+        else:
+            profile.finish(request, response.status_code)
+        response['X-Bagu-Profile-Id'] = profile.name
+        return response
+
+
+@staff_member_required
+def profile_list_view(request):
+    """后台剖析结果列表，可下载 collapsed stack"""
+    rows = format_html_join(
+        '\n',
+        '<tr><td>{}</td><td>{} {}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{} ({})</td>'
+        '<td><a href="{}.folded">下载</a></td></tr>',
+        (
+            (
+                item.get('created_at', ''), item.get('method', ''), item.get('path', ''), item.get('view', ''),
+                item.get('status', ''), item.get('duration_ms', ''), item.get('reason', ''),
+                item.get('samples', ''), item.get('mode', ''), item.get('name', ''),
+            )
+            for item in list_profiles()
+        ),
+    )
+    body = format_html(
+        '<!doctype html><html><head><meta charset="utf-8"><title>请求剖析</title></head><body>'
+        '<h1>请求剖析</h1><p>目录：{}（上限 {} MB）。collapsed 文件可用 flamegraph.pl 或 speedscope 打开。</p>'
+        '<table border="1" cellpadding="4"><tr><th>时间</th><th>请求</th><th>视图</th><th>状态</th>'
+        '<th>耗时(ms)</th><th>触发</th><th>样本</th><th></th></tr>{}</table></body></html>',
+        settings.PROFILING_DIR, settings.PROFILING_MAX_BYTES // (1024 * 1024), rows,
+    )
+    return HttpResponse(body)
+
+
+@staff_member_required
+def profile_download_view(request, name):
+    if not PROFILE_NAME_RE.match(name):
+        raise Http404
+    path = profile_dir() / f'{name}.folded'
+    if not path.is_file():
+        raise Http404
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name, content_type='text/plain')
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bagu.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -59,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'bagu.middleware.AutoLoginAdminMiddleware',
+    'bagu.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'bagu.urls'
@@ -126,5 +128,39 @@ CACHES = {
     }
 }
 
+# 答案纠错：默认只用本地术语词典，开启后本地无修改时再调用 LLM 兜底
+AI_CORRECTION_LLM_FALLBACK = os.getenv('AI_CORRECTION_LLM_FALLBACK', 'false').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+# 无可用 AI 模型时，流式评分退化为本地关键要点覆盖度估算（默认关闭，保持报错提示）
+LOCAL_SCORING_FALLBACK = os.getenv('LOCAL_SCORING_FALLBACK', 'false').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+# 压测专用：允许请求按 model_id 使用已禁用的模型配置（loadtest --fake-server 注册的假模型是禁用状态），
+# 禁用的配置不会被任务路由和续写选中；生产环境保持关闭
+AI_ALLOW_DISABLED_MODEL_IDS = os.getenv('AI_ALLOW_DISABLED_MODEL_IDS', 'false').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+# Prometheus 指标（/metrics）；多 worker 部署需同时设置 PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+# 评分流水线分阶段追踪：none（默认关闭）/ jsonl（追加写入文件）/ otlp（发送到本地 OTLP HTTP collector）
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none').strip().lower()
+TRACING_JSONL_PATH = os.getenv('TRACING_JSONL_PATH', str(BASE_DIR / 'logs' / 'traces.jsonl'))
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://127.0.0.1:4318/v1/traces')
+
+# 按需请求剖析：staff 会话带 X-Bagu-Profile: 1（或请求头值等于 PROFILING_TOKEN），或按比例抽样
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampling').strip().lower()  # sampling / cprofile
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', '5'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'logs' / 'profiles'))
+PROFILING_MAX_BYTES = int(os.getenv('PROFILING_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# 用户数据变更长轮询（/api/users/<id>/changes/）：等待期间占用一个 gunicorn 线程（共 workers × threads 个），
+# 所以单次等待很短，且每个进程同时等待的请求数有上限，超出时立即返回当前版本；设 CHANGE_FEED_MAX_WAIT=0 则从不等待
+CHANGE_FEED_MAX_WAIT = float(os.getenv('CHANGE_FEED_MAX_WAIT', '2'))
+CHANGE_FEED_MAX_WAITERS = int(os.getenv('CHANGE_FEED_MAX_WAITERS', '1'))
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv('CHANGE_FEED_POLL_INTERVAL', '0.5'))
+
 # 八股文源目录（导入用）
-BAGU_SOURCE_DIR = BASE_DIR.parent.parent / '2-Resource（参考资源）' / '90_八股文'
+BAGU_SOURCE_DIR = Path(os.getenv(
+    'BAGU_SOURCE_DIR', str(BASE_DIR.parent.parent / '2-Resource（参考资源）' / '90_八股文'),
+))
@@ -0,0 +1,50 @@
+"""列表 / 详情接口的字段投影（?fields=a,b）。
+
+序列化器混入 DynamicFieldsMixin，Meta 里声明：
+- fields：允许请求的全部字段
+- default_fields：不传 ?fields= 时的输出字段
+- field_columns：输出字段对应的查询列（外键名称等跨表字段），未列出的字段即同名列
+视图用 parse_fields 校验参数，再用 project_queryset 给 QuerySet 加 .only() 和必要的 select_related，
+只查要输出的列，响应体积和查询耗时都随请求的字段变化。
+"""
+from rest_framework.exceptions import ValidationError
+
+
+class DynamicFieldsMixin:
+    """按传入的 fields 裁剪输出字段；不传时输出 Meta.fields 全部字段"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def parse_fields(raw, meta):
+    """?fields=a,b 按 meta.fields 校验；不传（或为空）时用 meta.default_fields"""
+    fields = list(dict.fromkeys(name.strip() for name in (raw or '').split(',') if name.strip()))
+    if not fields:
+        return list(getattr(meta, 'default_fields', meta.fields))
+    unknown = [name for name in fields if name not in meta.fields]
+    if unknown:
+        raise ValidationError({'fields': f'未知字段：{", ".join(unknown)}；可选：{", ".join(meta.fields)}'})
+    return fields
+
+
+def query_columns(fields, meta, extra_columns=()):
+    """输出这些字段需要查的列（总是包含主键和 extra_columns，如分页排序用的列），用于 .only()"""
+    column_map = getattr(meta, 'field_columns', {})
+    columns = {'id', *extra_columns}
+    for name in fields:
+        columns.update(column_map.get(name, [name]))
+    return sorted(columns)
+
+
+def project_queryset(queryset, fields, meta, extra_columns=()):
+    """只取输出 fields 所需的列；跨表列（如 question__category__name）才 select_related 对应路径"""
+    columns = query_columns(fields, meta, extra_columns)
+    related = sorted({column.rsplit('__', 1)[0] for column in columns if '__' in column})
+    if related:
+        # 注意 select_related() 不带参数会关联全部非空外键，没有跨表列时不能调用
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
@@ -0,0 +1,129 @@
+"""
+测试公共工具
+
+各 app 的 tests.py 共用的假 Provider / 假 OpenAI 流，以及提交答案流式接口的基础 TestCase。
+文件名不以 test 开头，避免被测试发现当作用例模块加载。
+"""
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+from openai import APIConnectionError
+
+from practice.models import AiModelConfig, AiRoleConfig
+from questions.models import Category, Question
+from users.models import BaguUser
+
+
+def read_sse_events(response):
+    """把 StreamingHttpResponse 的 SSE 输出解析为 [(event, data), ...]"""
+    body = b''.join(response.streaming_content).decode('utf-8')
+    events = []
+    for block in body.split('\n\n'):
+        if not block.strip():
+            continue
+        event_type, data = 'message', ''
+        for line in block.split('\n'):
+            if line.startswith('event: '):
+                event_type = line[7:]
+            elif line.startswith('data: '):
+                data = line[6:]
+        events.append((event_type, json.loads(data) if data else None))
+    return events
+
+
+class FakeProvider:
+    """不访问网络的 Provider，按固定结果流式返回"""
+
+    def __init__(self, result=None):
+        self.result = result or {
+            'score': 80,
+            'highlights': ['基于内存'],
+            'missing_points': [],
+            'suggestion': '不错',
+            'improved_answer': '',
+            'role_scores': [{'role_key': 'r1', 'role_name': '角色1', 'score': 80, 'comment': '好'}],
+        }
+        self.correct_calls = 0
+
+    def correct_text(self, text):
+        self.correct_calls += 1
+        return text
+
+    def analyze_answer_stream(self, **kwargs):
+        yield ('content', '{"score": 80}')
+        yield ('result', dict(self.result))
+
+
+def fake_completion_client(calls, content='{}'):
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class FakeChunkStream:
+    """模拟 OpenAI SDK 的流式响应：逐个返回 token chunk，记录是否被关闭"""
+
+    def __init__(self, tokens, fail_after=None, finish_reason='stop', usage=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for idx, token in enumerate(self.tokens):
+            if self.closed:
+                return
+            if self.sent == self.fail_after:
+                raise APIConnectionError(request=None)
+            self.sent += 1
+            finish_reason = self.finish_reason if idx == len(self.tokens) - 1 else None
+            choice = SimpleNamespace(delta=SimpleNamespace(content=token), finish_reason=finish_reason)
+            yield SimpleNamespace(usage=None, choices=[choice])
+        if self.usage and not self.closed:
+            yield SimpleNamespace(usage=SimpleNamespace(**self.usage), choices=[])
+
+    def close(self):
+        self.closed = True
+
+
+def fake_streaming_client(*streams, calls=None):
+    """依次返回给定的流，calls 记录每次调用参数"""
+    pending = list(streams)
+
+    def create(**kwargs):
+        if calls is not None:
+            calls.append(kwargs)
+        return pending.pop(0)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class StreamingAnswerTestCase(TestCase):
+    """提交答案流式接口的公共夹具：一个用户、一道题、默认模型「测试模型」和唯一评分角色 r1"""
+
+    def setUp(self):
+        self.user = BaguUser.objects.create(username='tester')
+        category = Category.objects.create(name='Redis')
+        self.question = Question.objects.create(category=category, title='Redis 为什么快？')
+        AiModelConfig.objects.create(name='测试模型', api_key='k', model_name='test-model', is_default=True)
+        AiRoleConfig.objects.all().delete()
+        AiRoleConfig.objects.create(role_key='r1', name='角色1', weight=100)
+
+    def post_answer(self, provider, answer='Redis 基于内存', **extra):
+        """用给定 Provider 提交答案，返回尚未消费的流式响应"""
+        with mock.patch('practice.views.get_ai_provider', return_value=(provider, '测试模型')):
+            return self.client.post(
+                '/api/answers/submit-stream/',
+                data=json.dumps({'user_id': self.user.id, 'question_id': self.question.id, 'answer': answer}),
+                content_type='application/json',
+                **extra,
+            )
+
+    def submit_answer(self, provider, answer='Redis 基于内存', **extra):
+        """提交答案并读完整个流，返回 SSE 事件列表"""
+        return read_sse_events(self.post_answer(provider, answer, **extra))
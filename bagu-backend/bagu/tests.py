@@ -0,0 +1,428 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from ai_service.provider import TASK_SCORING, get_ai_provider
+from bagu import profiling, tracing
+from bagu.testing import (
+    FakeChunkStream, FakeProvider, StreamingAnswerTestCase, fake_streaming_client, read_sse_events,
+)
+from practice.models import AnswerRecord, EvaluationRound
+from questions.models import Category, Question, SubCategory, UserQuestionProgress
+from users.models import BaguUser, UserProfile
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MetricsTests(StreamingAnswerTestCase):
+    def test_http_db_and_cache_metrics_are_exposed(self):
+        before = sample('bagu_http_requests_total', view='category-list', method='GET', status='200')
+        queries_before = sample('bagu_db_queries_per_request_count', view='category-list')
+
+        self.client.get('/api/categories/')
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('bagu_http_request_duration_seconds_bucket', body)
+        self.assertIn('namespace="categories"', body)
+        self.assertEqual(sample('bagu_http_requests_total', view='category-list', method='GET', status='200'), before + 1)
+        self.assertEqual(sample('bagu_db_queries_per_request_count', view='category-list'), queries_before + 1)
+
+    def test_sse_stream_duration_is_recorded_when_stream_finishes(self):
+        before = sample('bagu_sse_stream_duration_seconds_count', view='submit-answer-stream', outcome='done')
+
+        response = self.post_answer(FakeProvider())
+        self.assertEqual(sample('bagu_sse_stream_duration_seconds_count', view='submit-answer-stream', outcome='done'), before)
+        read_sse_events(response)
+
+        self.assertEqual(sample('bagu_sse_stream_duration_seconds_count', view='submit-answer-stream', outcome='done'), before + 1)
+
+    def test_stream_queries_are_counted_until_stream_finishes(self):
+        count_before = sample('bagu_db_queries_per_request_count', view='submit-answer-stream')
+        sum_before = sample('bagu_db_queries_per_request_sum', view='submit-answer-stream')
+
+        response = self.post_answer(FakeProvider())
+        self.assertEqual(sample('bagu_db_queries_per_request_count', view='submit-answer-stream'), count_before)
+        with CaptureQueriesContext(connection) as captured:
+            read_sse_events(response)
+
+        self.assertEqual(sample('bagu_db_queries_per_request_count', view='submit-answer-stream'), count_before + 1)
+        # 生成器里写答题记录、更新统计的查询也计入本请求
+        self.assertGreaterEqual(
+            sample('bagu_db_queries_per_request_sum', view='submit-answer-stream') - sum_before, len(captured),
+        )
+        self.assertGreater(len(captured), 0)
+
+    def test_llm_ttft_tokens_and_cancelled_savings(self):
+        labels = {'task': TASK_SCORING, 'model': '测试模型'}
+        ttft_before = sample('bagu_llm_ttft_seconds_count', **labels)
+        saved_before = sample('bagu_llm_cancelled_tokens_saved_total', **labels)
+
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(FakeChunkStream(['{"score"'] * 50))
+        response = self.post_answer(provider)
+        chunks = iter(response.streaming_content)
+        received = b''
+        while b'event: content' not in received:
+            received += next(chunks)
+        response.close()
+
+        self.assertEqual(sample('bagu_llm_ttft_seconds_count', **labels), ttft_before + 1)
+        self.assertGreater(sample('bagu_llm_cancelled_tokens_saved_total', **labels), saved_before)
+        self.assertGreater(sample('bagu_llm_requests_total', outcome='cancelled', **labels), 0)
+
+
+class CollectingExporter:
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+class TracingTests(StreamingAnswerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exporter = CollectingExporter()
+        tracing.set_exporter(self.exporter)
+        self.addCleanup(tracing.set_exporter, None)
+
+    def test_scoring_stream_records_phase_spans_under_one_trace(self):
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(FakeChunkStream(
+            ['<think>', '想', '</think>', '```json\n', '{"score": 75, "role_scores": []}', '\n```'],
+        ))
+        queued_at = time.time() - 0.05
+        self.submit_answer(provider, HTTP_X_REQUEST_START=f't={queued_at:.3f}')
+
+        spans = {span.name: span for span in self.exporter.spans}
+        self.assertTrue({
+            'scoring.submit_stream', 'http.queue', 'db.lookup', 'local_scoring', 'correction',
+            'llm.request', 'llm.first_token', 'llm.generation', 'llm.parse_response',
+            'db.answer_record_write', 'db.stats_update',
+        } <= set(spans))
+        root = spans['scoring.submit_stream']
+        self.assertEqual(root.status, 'ok')
+        self.assertEqual({span.trace_id for span in self.exporter.spans}, {root.trace_id})
+        self.assertEqual(spans['llm.generation'].parent_id, root.span_id)
+        self.assertEqual(spans['llm.generation'].attributes['completion_tokens'], 6)
+        self.assertGreaterEqual(spans['http.queue'].duration_ms, 40)
+        # 各阶段都落在根 span 时间范围内
+        for span in self.exporter.spans:
+            if span is not root and span.name != 'http.queue':
+                self.assertGreaterEqual(span.start_ns, root.start_ns)
+                self.assertLessEqual(span.end_ns, root.end_ns)
+
+        record = AnswerRecord.objects.get()
+        self.assertEqual(record.trace_id, root.trace_id)
+        self.assertGreater(record.response_ms, 0)
+
+    def test_error_in_stream_marks_root_span(self):
+        provider = FakeProvider()
+        provider.analyze_answer_stream = mock.Mock(side_effect=RuntimeError('boom'))
+
+        events = self.submit_answer(provider)
+
+        self.assertEqual(events[-1][0], 'error')
+        root = next(span for span in self.exporter.spans if span.name == 'scoring.submit_stream')
+        self.assertEqual(root.status, 'error')
+        self.assertIn('boom', root.attributes['error'])
+
+    def test_disabled_tracing_is_noop(self):
+        tracing.set_exporter(tracing.NullExporter())
+
+        self.submit_answer(FakeProvider())
+
+        self.assertEqual(AnswerRecord.objects.get().trace_id, '')
+        self.assertIs(tracing.start_span('x'), tracing.NOOP_SPAN)
+
+    def test_otlp_payload_shape(self):
+        exporter = tracing.OtlpHttpExporter.__new__(tracing.OtlpHttpExporter)
+        exporter.service_name = 'bagu-backend'
+        item = tracing.start_span('db.lookup', rows=3, cached=False)
+        item.end()
+
+        payload = exporter.build_payload([item.to_dict()])
+
+        otlp_span = payload['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+        self.assertEqual(otlp_span['traceId'], item.trace_id)
+        self.assertEqual(otlp_span['attributes'], [
+            {'key': 'rows', 'value': {'intValue': '3'}},
+            {'key': 'cached', 'value': {'boolValue': False}},
+        ])
+
+
+class SlowProvider(FakeProvider):
+    def analyze_answer_stream(self, **kwargs):
+        time.sleep(0.05)
+        yield from super().analyze_answer_stream(**kwargs)
+
+
+class ProfilingTests(StreamingAnswerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(PROFILING_DIR=self.tmp.name, PROFILING_INTERVAL_MS=1)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = get_user_model().objects.create_user('ops', password='x', is_staff=True)
+
+    def _profiles(self):
+        return profiling.list_profiles()
+
+    def test_staff_header_profiles_request(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get('/api/categories/', HTTP_X_BAGU_PROFILE='1')
+
+        [meta] = self._profiles()
+        self.assertEqual(response['X-Bagu-Profile-Id'], meta['name'])
+        self.assertEqual((meta['view'], meta['status'], meta['reason']), ('category-list', 200, 'header'))
+        self.assertTrue((Path(self.tmp.name) / f"{meta['name']}.folded").exists())
+
+    def test_header_without_staff_session_is_ignored(self):
+        response = self.client.get('/api/categories/', HTTP_X_BAGU_PROFILE='1')
+
+        self.assertNotIn('X-Bagu-Profile-Id', response)
+        self.assertEqual(self._profiles(), [])
+
+    @override_settings(PROFILING_TOKEN='secret')
+    def test_token_header_profiles_without_session(self):
+        self.client.get('/api/categories/', HTTP_X_BAGU_PROFILE='secret')
+
+        self.assertEqual([meta['reason'] for meta in self._profiles()], ['token'])
+
+    def test_streaming_response_is_profiled_until_generator_finishes(self):
+        self.client.force_login(self.staff)
+
+        response = self.post_answer(SlowProvider(), HTTP_X_BAGU_PROFILE='1')
+        self.assertEqual(self._profiles(), [])
+        read_sse_events(response)
+
+        [meta] = self._profiles()
+        self.assertTrue(meta['streamed'])
+        self.assertGreaterEqual(meta['duration_ms'], 50)
+        folded = (Path(self.tmp.name) / f"{meta['name']}.folded").read_text(encoding='utf-8')
+        self.assertIn('analyze_answer_stream (bagu/tests.py', folded)
+
+    @override_settings(PROFILING_MODE='cprofile')
+    def test_cprofile_fallback_writes_caller_callee_pairs(self):
+        self.client.force_login(self.staff)
+
+        self.client.get('/api/categories/', HTTP_X_BAGU_PROFILE='1')
+
+        [meta] = self._profiles()
+        self.assertEqual(meta['mode'], 'cprofile')
+        lines = (Path(self.tmp.name) / f"{meta['name']}.folded").read_text(encoding='utf-8').splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+    def test_prune_keeps_newest_profiles_within_limit(self):
+        directory = Path(self.tmp.name)
+        for idx in range(3):
+            for suffix in ('.folded', '.json'):
+                path = directory / f'p{idx}{suffix}'
+                path.write_text('x' * 100)
+                os.utime(path, (1000 + idx, 1000 + idx))
+
+        profiling.prune_profiles(directory, 450)
+
+        self.assertEqual(sorted(path.name for path in directory.iterdir()), [
+            'p1.folded', 'p1.json', 'p2.folded', 'p2.json',
+        ])
+
+    def test_admin_listing_and_download(self):
+        self.client.force_login(self.staff)
+        name = self.client.get('/api/categories/', HTTP_X_BAGU_PROFILE='1')['X-Bagu-Profile-Id']
+
+        listing = self.client.get('/admin/profiles/')
+        download = self.client.get(f'/admin/profiles/{name}.folded')
+
+        self.assertContains(listing, f'{name}.folded')
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('attachment', download['Content-Disposition'])
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fsettings.folded').status_code, 404)
+
+
+PERF_CATEGORY_NAMES = ['JVM', 'Redis', '数据库', '消息队列', '并发编程', 'Spring']
+PERF_RUNS = 5
+
+
+def perf_timing_enabled():
+    """耗时预算与报告只在 PERF_TIMING=1 时启用；默认套件只断言 SQL 条数，避免机器负载导致的偶发失败"""
+    return os.getenv('PERF_TIMING') == '1'
+
+
+def seed_perf_dataset():
+    """接近线上规模的数据：6 分类 × 4 子分类 × 30 题、30 用户、3000 条答题记录"""
+    categories = Category.objects.bulk_create([
+        Category(name=name, sort_order=idx, question_count=120) for idx, name in enumerate(PERF_CATEGORY_NAMES)
+    ])
+    subcategories = SubCategory.objects.bulk_create([
+        SubCategory(category=category, name=f'子分类{idx}', sort_order=idx)
+        for category in categories for idx in range(4)
+    ])
+    questions = Question.objects.bulk_create([
+        Question(
+            category=sub.category, sub_category=sub, title=f'{sub.category.name}-{sub.name}-问题{idx}',
+            brief_answer='回答话术' * 50, detailed_answer='问题详解' * 300,
+            key_points=[f'要点{n}' for n in range(6)], tags=[sub.category.name],
+        )
+        for sub in subcategories for idx in range(30)
+    ])
+    users = BaguUser.objects.bulk_create([BaguUser(username=f'user{idx}') for idx in range(30)])
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    rounds = EvaluationRound.objects.bulk_create([
+        EvaluationRound(user=users[idx % 30], question=questions[idx], user_answer='回答') for idx in range(50)
+    ])
+    AnswerRecord.objects.bulk_create([
+        AnswerRecord(
+            user=users[idx % 30], question=questions[idx % len(questions)], user_answer='我的回答' * 40,
+            ai_score=60 + idx % 40, ai_highlights=['亮点'] * 3, ai_missing_points=['遗漏'] * 3,
+            ai_model_name=f'模型{idx % 3}', round=rounds[idx] if idx < len(rounds) else None,
+        )
+        for idx in range(3000)
+    ])
+    UserQuestionProgress.objects.bulk_create([
+        UserQuestionProgress(user=user, question=questions[(offset * 24 + idx) % len(questions)], completed_at=timezone.now())
+        for offset, user in enumerate(users) for idx in range(50)
+    ])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class PerformanceBudgetTests(TestCase):
+    """接口性能回归：种子数据下逐个请求，断言 SQL 条数与耗时预算（缓存关闭，测未命中路径）
+
+    SQL 条数预算始终断言；耗时预算只在 PERF_TIMING=1 时断言，此时结果写入 PERF_REPORT_PATH
+    （默认 logs/perf-report.json），并追加到同目录 perf-history.jsonl 便于跨版本对比。
+    耗时预算可用环境变量 PERF_TIME_SCALE 整体放宽（CI 机器较慢时）。
+    """
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_perf_dataset()
+        cls.user = BaguUser.objects.get(username='user0')
+        cls.category = Category.objects.get(name='Redis')
+        cls.question = Question.objects.filter(category=cls.category).first()
+        cls.record = AnswerRecord.objects.filter(user=cls.user).first()
+        cls.round = EvaluationRound.objects.filter(user=cls.user).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if perf_timing_enabled():
+            write_perf_report(cls.results)
+
+    def measure(self, name, method, url, max_queries, max_ms, data=None, headers=None):
+        timing = perf_timing_enabled()
+        timings, queries, status_code = [], 0, None
+        for _ in range(PERF_RUNS if timing else 1):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if method == 'post':
+                    response = self.client.post(url, data=json.dumps(data or {}), content_type='application/json')
+                else:
+                    response = self.client.get(url, headers=headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+            status_code = response.status_code
+        timings.sort()
+        budget_ms = max_ms * float(os.getenv('PERF_TIME_SCALE', '1'))
+        result = {
+            'endpoint': name,
+            'url': url,
+            'status': status_code,
+            'queries': queries,
+            'max_queries': max_queries,
+            'median_ms': round(timings[len(timings) // 2], 2),
+            'min_ms': round(timings[0], 2),
+            'budget_ms': budget_ms,
+        }
+        type(self).results.append(result)
+        self.assertLess(status_code, 400, f'{name}: HTTP {status_code}')
+        self.assertLessEqual(queries, max_queries, f'{name}: {queries} 条 SQL 超出预算 {max_queries}')
+        if timing:
+            self.assertLessEqual(
+                result['median_ms'], budget_ms, f'{name}: {result["median_ms"]}ms 超出预算 {budget_ms}ms',
+            )
+
+    def test_category_endpoints(self):
+        self.measure('categories.list', 'get', '/api/categories/', 3, 100)
+        self.measure('categories.list.user', 'get', f'/api/categories/?user_id={self.user.id}', 4, 100)
+        self.measure('categories.detail', 'get', f'/api/categories/{self.category.id}/', 2, 50)
+        self.measure('categories.quick_review', 'get', f'/api/categories/{self.category.id}/quick-review/', 2, 50)
+
+    def test_question_endpoints(self):
+        self.measure('questions.list', 'get', f'/api/questions/?category={self.category.id}', 2, 100)
+        self.measure('questions.list.user', 'get', f'/api/questions/?user_id={self.user.id}', 3, 100)
+        self.measure('questions.detail', 'get', f'/api/questions/{self.question.id}/', 1, 50)
+        self.measure('questions.random', 'get', f'/api/questions/random/?category={self.category.id}', 2, 50)
+        self.measure(
+            'questions.quick_review', 'get',
+            f'/api/questions/quick-review/?category={self.category.id}&user_id={self.user.id}', 2, 150,
+        )
+
+    def test_answer_endpoints(self):
+        self.measure('answers.list', 'get', f'/api/answers/?user_id={self.user.id}', 2, 100)
+        self.measure('answers.list.fields', 'get', f'/api/answers/?user_id={self.user.id}&fields=id,ai_score', 2, 100)
+        etag = self.client.get(f'/api/answers/?user_id={self.user.id}')['ETag']
+        self.measure(
+            'answers.list.not_modified', 'get', f'/api/answers/?user_id={self.user.id}', 1, 20,
+            headers={'If-None-Match': etag},
+        )
+        self.measure('answers.detail', 'get', f'/api/answers/{self.record.id}/', 1, 50)
+        self.measure(
+            'answers.question_history', 'get',
+            f'/api/answers/question-history/?user_id={self.user.id}&question_id={self.record.question_id}', 1, 50,
+        )
+
+    def test_user_endpoints(self):
+        self.measure('users.list', 'get', '/api/users/', 3, 50)
+        self.measure('users.detail', 'get', f'/api/users/{self.user.id}/', 3, 50)
+        self.measure('users.profile', 'get', f'/api/users/{self.user.id}/profile/', 3, 50)
+        etag = self.client.get(f'/api/users/{self.user.id}/profile/')['ETag']
+        self.measure(
+            'users.profile.not_modified', 'get', f'/api/users/{self.user.id}/profile/', 1, 20,
+            headers={'If-None-Match': etag},
+        )
+        self.measure('users.changes', 'get', f'/api/users/{self.user.id}/changes/?since=0', 1, 20)
+
+    def test_round_endpoints(self):
+        self.measure(
+            'rounds.create', 'post', '/api/rounds/create/', 3, 50,
+            data={'user_id': self.user.id, 'question_id': self.question.id, 'user_answer': '回答'},
+        )
+        self.measure('rounds.finalize', 'post', f'/api/rounds/{self.round.id}/finalize/', 6, 50)
+
+
+def write_perf_report(results):
+    if not results:
+        return
+    path = Path(os.getenv('PERF_REPORT_PATH') or Path(settings.BASE_DIR) / 'logs' / 'perf-report.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'generated_at': timezone.now().isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'endpoints': sorted(results, key=lambda item: item['endpoint']),
+    }
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    with (path.parent / 'perf-history.jsonl').open('a', encoding='utf-8') as fh:
+        fh.write(json.dumps(report, ensure_ascii=False) + '\n')
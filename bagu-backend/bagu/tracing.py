@@ -0,0 +1,281 @@
+"""轻量 span 追踪：上下文内的当前 span + 可插拔导出器（JSONL 文件 / OTLP HTTP 本地 collector）
+
+用法：
+    root = start_span('scoring.submit_stream', user_id=1)
+    with use_span(root):
+        with span('db.lookup'):
+            ...
+    root.end()
+
+也可以用 record_span() 按已知的起止时间补记阶段（如 Provider 记录的首 token 时间）。
+TRACING_EXPORTER=none（默认）时所有 span 都是空操作，trace_id 为空字符串。
+"""
+import contextvars
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('bagu_current_span', default=None)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, start_ns=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = 'ok'
+        self.attributes = dict(attributes or {})
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, status=None, end_ns=None):
+        if self.end_ns is not None:
+            return
+        if status:
+            self.status = status
+        self.end_ns = end_ns or time.time_ns()
+        get_exporter().export(self)
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class NoopSpan:
+    """未开启追踪时使用，接口与 Span 一致"""
+    trace_id = ''
+    span_id = ''
+    parent_id = None
+    name = ''
+    start_ns = None
+    end_ns = None
+    attributes = {}
+    duration_ms = 0.0
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, status=None, end_ns=None):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class NullExporter:
+    enabled = False
+
+    def export(self, span):
+        pass
+
+
+class JsonlExporter:
+    """每个 span 结束时追加一行 JSON，便于 grep trace_id / 离线分析"""
+    enabled = True
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with self.path.open('a', encoding='utf-8') as fh:
+                fh.write(line + '\n')
+
+
+class OtlpHttpExporter:
+    """按 OTLP/HTTP JSON 格式批量发送到本地 collector（如 otel-collector 的 4318 端口）；发送失败只记日志"""
+    enabled = True
+
+    def __init__(self, endpoint, service_name='bagu-backend', batch_size=64, flush_interval=2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, spans):
+        body = json.dumps(self.build_payload(spans), default=str).encode('utf-8')
+        request = urllib.request.Request(
+            self.endpoint, data=body, headers={'Content-Type': 'application/json'}, method='POST',
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError as e:
+            logger.warning('OTLP 导出失败: %s', e)
+
+    def build_payload(self, spans):
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'bagu.tracing'},
+                    'spans': [{
+                        'traceId': item['trace_id'],
+                        'spanId': item['span_id'],
+                        'parentSpanId': item['parent_id'] or '',
+                        'name': item['name'],
+                        'kind': 1,
+                        'startTimeUnixNano': str(item['start_ns']),
+                        'endTimeUnixNano': str(item['end_ns']),
+                        'status': {'code': 1 if item['status'] == 'ok' else 2},
+                        'attributes': [_otlp_attribute(key, value) for key, value in item['attributes'].items()],
+                    } for item in spans],
+                }],
+            }],
+        }
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def build_exporter():
+    kind = getattr(settings, 'TRACING_EXPORTER', 'none')
+    if kind == 'jsonl':
+        return JsonlExporter(settings.TRACING_JSONL_PATH)
+    if kind == 'otlp':
+        return OtlpHttpExporter(settings.TRACING_OTLP_ENDPOINT)
+    return NullExporter()
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = build_exporter()
+    return _exporter
+
+
+def set_exporter(exporter):
+    """替换导出器（测试或运行时切换）；传 None 时下次按配置重建"""
+    global _exporter
+    with _exporter_lock:
+        _exporter = exporter
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_trace_id():
+    return current_span().trace_id
+
+
+def start_span(name, parent=None, start_ns=None, **attributes):
+    """创建并开始一个 span（不切换当前上下文）；parent 默认取当前 span，没有则开启新 trace"""
+    if not get_exporter().enabled:
+        return NOOP_SPAN
+    parent = parent or _current_span.get()
+    if parent is None or parent is NOOP_SPAN:
+        return Span(name, secrets.token_hex(16), start_ns=start_ns, attributes=attributes)
+    return Span(name, parent.trace_id, parent_id=parent.span_id, start_ns=start_ns, attributes=attributes)
+
+
+def record_span(name, start_ns, end_ns, parent=None, **attributes):
+    """按已知的起止时间补记一个已完成的阶段"""
+    if start_ns is None or end_ns is None:
+        return NOOP_SPAN
+    item = start_span(name, parent=parent, start_ns=start_ns, **attributes)
+    item.end(end_ns=end_ns)
+    return item
+
+
+@contextmanager
+def use_span(item):
+    """在 with 块内把 item 设为当前 span（块内不要跨越生成器的 yield）"""
+    token = _current_span.set(item)
+    try:
+        yield item
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """开始子 span 并设为当前 span，块结束时自动结束；异常时标记 error 并继续抛出"""
+    item = start_span(name, parent=parent, **attributes)
+    token = _current_span.set(item)
+    try:
+        yield item
+    except Exception as e:
+        item.set(error=f'{e.__class__.__name__}: {e}')
+        item.end(status='error')
+        raise
+    finally:
+        _current_span.reset(token)
+        item.end()
+
+
+def request_queue_start_ns(request):
+    """解析 nginx 传入的 X-Request-Start: t=<秒.毫秒>，得到请求进入代理的时间（纳秒）"""
+    raw = request.META.get('HTTP_X_REQUEST_START', '')
+    if raw.startswith('t='):
+        raw = raw[2:]
+    try:
+        return int(float(raw) * 1_000_000_000)
+    except ValueError:
+        return None
@@ -1,9 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from bagu.metrics import metrics_view
+from bagu.profiling import profile_download_view, profile_list_view
+
 urlpatterns = [
+    path('admin/profiles/', profile_list_view, name='profile-list'),
+    path('admin/profiles/<str:name>.folded', profile_download_view, name='profile-download'),
     path('admin/', admin.site.urls),
     path('api/', include('questions.urls')),
     path('api/', include('practice.urls')),
     path('api/', include('users.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,8 @@
+"""gunicorn 配置：Prometheus 多进程模式下清理退出 worker 的指标文件"""
+import os
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,79 @@
+"""解析器微基准：把内置题库（questions/fixtures/builtin_questions.json）渲染成 Markdown 文件后反复解析计时。
+
+渲染时交替使用飞书（首行链接 + 正文）与语雀（链接 + 元信息代码块 + ## 分段）两种导出格式，
+与实际 Obsidian 目录的结构一致。
+"""
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .parser import parse_bagu_md
+
+BUILTIN_FIXTURE = Path(settings.BASE_DIR) / 'questions' / 'fixtures' / 'builtin_questions.json'
+
+
+def load_builtin_questions(limit=None):
+    with BUILTIN_FIXTURE.open(encoding='utf-8') as fh:
+        rows = [item['fields'] for item in json.load(fh) if item['model'] == 'questions.question']
+    return rows[:limit] if limit else rows
+
+
+def render_question_markdown(fields, index):
+    title = fields['title']
+    source_url = fields.get('source_url') or ''
+    key_points = '\n'.join(f'- **{point}**' for point in fields.get('key_points') or [])
+    if index % 2 == 0:
+        return f"{source_url}\n{fields.get('detailed_answer') or fields.get('brief_answer') or ''}\n"
+    return (
+        f'{source_url}\n'
+        '```\n'
+        f'title: {title}\n'
+        f"tags: {', '.join(fields.get('tags') or [])}\n"
+        '```\n\n'
+        f'# {title}\n\n'
+        f"## 回答话术\n{fields.get('brief_answer') or ''}\n\n"
+        f"## 问题详解\n{fields.get('detailed_answer') or ''}\n\n"
+        f'## 关键要点\n{key_points}\n'
+    )
+
+
+def render_corpus(target_dir, limit=None):
+    """写出 分类/题目.md 结构的语料，返回文件路径列表"""
+    target_dir = Path(target_dir)
+    paths = []
+    for index, fields in enumerate(load_builtin_questions(limit)):
+        path = target_dir / f"category-{fields['category']}" / f'{index + 1}. question-{index + 1}.md'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_question_markdown(fields, index), encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def benchmark_parser(paths, rounds=20, parse=parse_bagu_md):
+    """每轮解析全部文件，返回吞吐与单文件耗时统计（微秒）"""
+    per_file_us = []
+    round_seconds = []
+    total_bytes = sum(path.stat().st_size for path in paths)
+    for _ in range(rounds):
+        round_start = time.perf_counter()
+        for path in paths:
+            start = time.perf_counter()
+            parse(path)
+            per_file_us.append((time.perf_counter() - start) * 1_000_000)
+        round_seconds.append(time.perf_counter() - round_start)
+
+    best_round = min(round_seconds)
+    per_file_us.sort()
+    return {
+        'files': len(paths),
+        'bytes': total_bytes,
+        'rounds': rounds,
+        'best_round_ms': round(best_round * 1000, 2),
+        'files_per_second': round(len(paths) / best_round, 1) if best_round else 0.0,
+        'mb_per_second': round(total_bytes / best_round / 1024 / 1024, 2) if best_round else 0.0,
+        'median_us': round(statistics.median(per_file_us), 1) if per_file_us else 0.0,
+        'p95_us': round(per_file_us[int(len(per_file_us) * 0.95) - 1], 1) if per_file_us else 0.0,
+    }
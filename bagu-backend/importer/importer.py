@@ -1,10 +1,18 @@
 """批量导入八股文 MD 到数据库。"""
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
+import multiprocessing
+import os
 import re
 
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
 from questions.models import Category, SubCategory, Question
+from questions.rendering import RENDERED_CONTENT_FIELDS, RENDERED_FIELDS
 from .parser import parse_bagu_md
 
 # 跳过非题目文件
@@ -84,6 +92,8 @@ SOURCE_PRIORITY = {
 }
 
 BUSINESS_SOURCE_HOSTS = ('yuque.com', 'feishu.cn')
+IMPORT_BATCH_SIZE = 500
+QUESTION_IMPORT_FIELDS = ['sub_category', 'brief_answer', 'detailed_answer', 'key_points', 'source_url', 'tags']
 TITLE_PREFIX_PATTERN = re.compile(
     r'^\s*(?:[✅☑✔️]\s*)*(?:(?:\(?\d+\)?|[一二三四五六七八九十]+)\s*[.、,，:：)\）]\s*)*'
 )
@@ -94,9 +104,9 @@ class QuestionCandidate:
     source_name: str
     filepath: Path
     raw_category: str
-    raw_sub_category: str | None
+    raw_sub_category: Optional[str]
     category_name: str
-    sub_category_name: str | None
+    sub_category_name: Optional[str]
     title: str
     normalized_title: str
     brief_answer: str
@@ -105,8 +115,39 @@ class QuestionCandidate:
     source_url: str
     tags: list
 
+    @property
+    def content_length(self):
+        return len(self.brief_answer) + len(self.detailed_answer)
+
+    def digest(self):
+        return QuestionDigest(
+            source_name=self.source_name,
+            filepath=self.filepath,
+            raw_category=self.raw_category,
+            raw_sub_category=self.raw_sub_category,
+            category_name=self.category_name,
+            sub_category_name=self.sub_category_name,
+            title=self.title,
+            normalized_title=self.normalized_title,
+            content_length=self.content_length,
+        )
+
 
-def import_from_directory(source_dir, dry_run=False):
+@dataclass(frozen=True)
+class QuestionDigest:
+    """低内存模式第一遍只保留去重需要的字段，正文在第二遍只为胜出者重新解析"""
+    source_name: str
+    filepath: Path
+    raw_category: str
+    raw_sub_category: Optional[str]
+    category_name: str
+    sub_category_name: Optional[str]
+    title: str
+    normalized_title: str
+    content_length: int
+
+
+def import_from_directory(source_dir, dry_run=False, jobs=1):
     """
     兼容旧命令：从单目录导入。
 
@@ -117,6 +158,7 @@ def import_from_directory(source_dir, dry_run=False):
         source_name='single',
         require_source_url=False,
         require_business_source=False,
+        jobs=jobs,
     )
     deduped = deduplicate_candidates(candidates)
     stats = import_candidates(deduped, dry_run=dry_run)
@@ -124,27 +166,35 @@ def import_from_directory(source_dir, dry_run=False):
     return stats
 
 
-def build_merged_candidates(source_dirs, require_source_url=False, require_business_source=False):
+def build_merged_candidates(source_dirs, require_source_url=False, require_business_source=False, jobs=1):
     """
     扫描多来源目录，完成解析与去重。
 
     参数:
       source_dirs: [('feishu', '/path/to/dir'), ('yuque', '/path/to/dir')]
+      jobs: 解析进程数，1 为单进程，0 为 CPU 核数（多个来源共用同一个进程池）
     """
     all_candidates = []
     all_errors = []
     source_file_counts = {}
 
-    for source_name, source_dir in source_dirs:
-        candidates, source_stats = collect_candidates_from_directory(
-            source_dir=source_dir,
-            source_name=source_name,
-            require_source_url=require_source_url,
-            require_business_source=require_business_source,
-        )
-        all_candidates.extend(candidates)
-        all_errors.extend(source_stats['errors'])
-        source_file_counts[source_name] = source_stats['scanned']
+    executor = _create_parse_executor(jobs)
+    try:
+        for source_name, source_dir in source_dirs:
+            candidates, source_stats = collect_candidates_from_directory(
+                source_dir=source_dir,
+                source_name=source_name,
+                require_source_url=require_source_url,
+                require_business_source=require_business_source,
+                jobs=jobs,
+                executor=executor,
+            )
+            all_candidates.extend(candidates)
+            all_errors.extend(source_stats['errors'])
+            source_file_counts[source_name] = source_stats['scanned']
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     deduped_candidates = deduplicate_candidates(all_candidates)
     category_counts = {}
@@ -162,75 +212,145 @@ def build_merged_candidates(source_dirs, require_source_url=False, require_busin
     return deduped_candidates, summary
 
 
-def collect_candidates_from_directory(source_dir, source_name='single', require_source_url=False, require_business_source=False):
-    """扫描目录并解析题目。"""
+def collect_candidates_from_directory(source_dir, source_name='single', require_source_url=False,
+                                     require_business_source=False, jobs=1, executor=None):
+    """
+    扫描目录并解析题目。
+
+    jobs > 1 时按批分发到多进程解析（可传入共用的 executor）；结果与错误顺序和单进程一致（按文件遍历顺序）。
+    """
     source_path = Path(source_dir)
     if not source_path.exists():
         return [], {'scanned': 0, 'errors': [f'{source_dir}: 目录不存在']}
     if not source_path.is_dir():
         return [], {'scanned': 0, 'errors': [f'{source_dir}: 不是目录']}
 
-    candidates = []
-    errors = []
-    scanned = 0
+    entries = list(iter_markdown_entries(source_path))
+    candidates, errors = parse_markdown_entries(
+        entries, source_name, require_source_url, require_business_source, jobs=jobs, executor=executor,
+    )
+    return candidates, {'scanned': len(entries), 'errors': errors}
+
 
-    for filepath, raw_category, raw_sub_category in _iter_markdown_entries(source_path):
-        scanned += 1
+def parse_markdown_entries(entries, source_name, require_source_url=False, require_business_source=False,
+                           jobs=1, executor=None):
+    """解析 (filepath, raw_category, raw_sub_category) 列表，返回 (candidates, errors)，顺序与 entries 一致"""
+    results = parse_markdown_results(
+        entries, source_name, require_source_url, require_business_source, jobs=jobs, executor=executor,
+    )
+    candidates = [candidate for candidate, _ in results if candidate is not None]
+    errors = [error for _, error in results if error is not None]
+    return candidates, errors
+
+
+def parse_markdown_results(entries, source_name, require_source_url=False, require_business_source=False,
+                           jobs=1, executor=None, digest_only=False):
+    """逐文件解析结果 [(candidate, error), ...]，与 entries 一一对应；digest_only 时返回 QuestionDigest"""
+    options = (source_name, require_source_url, require_business_source, digest_only)
+    own_executor = None
+    if executor is None:
+        executor = own_executor = _create_parse_executor(jobs)
+    try:
+        if executor is None or len(entries) < 2:
+            return _parse_entries(entries, *options)
+        chunk_size = _parse_chunk_size(len(entries), resolve_jobs(jobs))
+        chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+        results = []
+        for chunk_results in executor.map(_parse_entries, chunks, *[[option] * len(chunks) for option in options]):
+            results.extend(chunk_results)
+        return results
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown()
+
+
+def _parse_entries(entries, source_name, require_source_url, require_business_source, digest_only=False):
+    """解析一批文件（在子进程中执行），返回 [(candidate, error), ...]，二者有且仅有一个非空"""
+    results = []
+    for filepath, raw_category, raw_sub_category in entries:
         try:
-            parsed = parse_bagu_md(filepath)
-            source_url = (parsed.get('source_url') or '').strip()
-            if require_source_url and not source_url:
-                raise ValueError('缺少 source_url')
-            if require_business_source and not is_business_source_url(source_url):
-                raise ValueError(f'source_url 不是飞书/语雀链接: {source_url or "空"}')
-
-            category_name = normalize_category_name(raw_category)
-            sub_category_name = normalize_sub_category_name(raw_category, raw_sub_category, category_name)
-            title = clean_title(parsed.get('title') or filepath.stem)
-
-            candidate = QuestionCandidate(
-                source_name=source_name,
-                filepath=filepath,
-                raw_category=raw_category,
-                raw_sub_category=raw_sub_category,
-                category_name=category_name,
-                sub_category_name=sub_category_name,
-                title=title,
-                normalized_title=normalize_title_for_dedupe(title),
-                brief_answer=(parsed.get('brief_answer') or '').strip(),
-                detailed_answer=(parsed.get('detailed_answer') or '').strip(),
-                key_points=parsed.get('key_points') or [],
-                source_url=source_url,
-                tags=parsed.get('tags') or [],
+            candidate = _build_candidate(
+                filepath, raw_category, raw_sub_category,
+                source_name, require_source_url, require_business_source,
             )
-            candidates.append(candidate)
+            results.append((candidate.digest() if digest_only else candidate, None))
         except Exception as exc:  # noqa: BLE001 - 收集每个文件错误，继续处理
-            errors.append(f'{filepath}: {exc}')
+            results.append((None, f'{filepath}: {exc}'))
+    return results
+
+
+def _build_candidate(filepath, raw_category, raw_sub_category, source_name, require_source_url,
+                     require_business_source):
+    parsed = parse_bagu_md(filepath)
+    source_url = (parsed.get('source_url') or '').strip()
+    if require_source_url and not source_url:
+        raise ValueError('缺少 source_url')
+    if require_business_source and not is_business_source_url(source_url):
+        raise ValueError(f'source_url 不是飞书/语雀链接: {source_url or "空"}')
+
+    category_name = normalize_category_name(raw_category)
+    sub_category_name = normalize_sub_category_name(raw_category, raw_sub_category, category_name)
+    title = clean_title(parsed.get('title') or filepath.stem)
+
+    return QuestionCandidate(
+        source_name=source_name,
+        filepath=filepath,
+        raw_category=raw_category,
+        raw_sub_category=raw_sub_category,
+        category_name=category_name,
+        sub_category_name=sub_category_name,
+        title=title,
+        normalized_title=normalize_title_for_dedupe(title),
+        brief_answer=(parsed.get('brief_answer') or '').strip(),
+        detailed_answer=(parsed.get('detailed_answer') or '').strip(),
+        key_points=parsed.get('key_points') or [],
+        source_url=source_url,
+        tags=parsed.get('tags') or [],
+    )
 
-    return candidates, {'scanned': scanned, 'errors': errors}
+
+def resolve_jobs(jobs):
+    """jobs <= 0 表示使用全部 CPU 核"""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _create_parse_executor(jobs):
+    """
+    创建解析用进程池；单进程或平台不支持 fork 时返回 None（退回顺序解析）。
+
+    使用 fork 启动：子进程直接继承已初始化的 Django 环境，解析过程不访问数据库。
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork'))
+
+
+def _parse_chunk_size(total, workers):
+    """每个进程约分到 4 批，兼顾负载均衡与进程间传输开销"""
+    return max(1, min(64, total // (workers * 4) or 1))
 
 
 def deduplicate_candidates(candidates):
-    """按 (归一化分类, 归一化标题) 去重。"""
-    selected = {}
-    sorted_candidates = sorted(
-        candidates,
-        key=lambda item: (
-            item.category_name,
-            item.normalized_title,
-            str(item.filepath),
-        ),
-    )
+    """
+    按 (归一化分类, 归一化标题) 去重，返回按键排序的胜出者。
 
-    for candidate in sorted_candidates:
+    逐个归并而不整体排序，只占用每个键一个候选的内存；候选可以是 QuestionCandidate 或 QuestionDigest。
+    结果与"按文件路径排序后依次比较"一致：内容长度相同时路径靠前的胜出。
+    """
+    selected = {}
+    for candidate in candidates:
         key = (candidate.category_name, candidate.normalized_title)
         current = selected.get(key)
         if current is None:
             selected[key] = candidate
-            continue
-        selected[key] = choose_better_candidate(current, candidate)
-
-    return list(selected.values())
+        elif str(candidate.filepath) < str(current.filepath):
+            selected[key] = choose_better_candidate(candidate, current)
+        else:
+            selected[key] = choose_better_candidate(current, candidate)
+    return [selected[key] for key in sorted(selected)]
 
 
 def choose_better_candidate(current, incoming):
@@ -242,23 +362,41 @@ def choose_better_candidate(current, incoming):
     if incoming_priority < current_priority:
         return current
 
-    current_score = len(current.brief_answer) + len(current.detailed_answer)
-    incoming_score = len(incoming.brief_answer) + len(incoming.detailed_answer)
-    if incoming_score > current_score:
+    if incoming.content_length > current.content_length:
         return incoming
     return current
 
 
+def load_full_candidates(digests, require_source_url=False, require_business_source=False):
+    """低内存模式第二遍：为胜出的 QuestionDigest 重新解析出完整候选，返回 (candidates, errors)"""
+    candidates, errors = [], []
+    for digest in digests:
+        results = _parse_entries(
+            [(digest.filepath, digest.raw_category, digest.raw_sub_category)],
+            digest.source_name, require_source_url, require_business_source,
+        )
+        candidate, error = results[0]
+        if candidate is not None:
+            candidates.append(candidate)
+        else:
+            errors.append(error)
+    return candidates, errors
+
+
 def import_candidates(candidates, dry_run=False):
-    """将候选题目写入数据库。"""
-    stats = {'created': 0, 'skipped': 0, 'errors': []}
+    """
+    将候选题目批量写入数据库；stats['question_ids'] 记录每个去重键对应的题目 ID。
+
+    已有题目按 (分类, 标题) 一次查出后在内存中比对：新题分批 bulk_create，内容有变化的分批 bulk_update，
+    全部在同一个事务内；最后用一条 UPDATE 重算各分类题数。
+    简答 / 详解有变化的题目在写入前重新渲染 HTML（见 Question.refresh_rendered），未变化的不渲染。
+    字段校验不通过的候选单独记入 errors；某批写入失败时该批退回逐条保存，只记录出错的题目。
+    """
+    stats = {'created': 0, 'skipped': 0, 'errors': [], 'question_ids': {}}
     if dry_run:
         stats['created'] = len(candidates)
         return stats
 
-    category_cache = {}
-    sub_category_cache = {}
-
     ordered_candidates = sorted(
         candidates,
         key=lambda item: (
@@ -268,53 +406,221 @@ def import_candidates(candidates, dry_run=False):
         ),
     )
 
-    for candidate in ordered_candidates:
-        try:
-            category = category_cache.get(candidate.category_name)
-            if category is None:
-                icon = CATEGORY_ICONS.get(candidate.category_name, 'book')
-                category, _ = Category.objects.get_or_create(
-                    name=candidate.category_name,
-                    defaults={'icon': icon},
-                )
-                category_cache[candidate.category_name] = category
-
-            sub_category = None
-            if candidate.sub_category_name:
-                sub_key = (category.id, candidate.sub_category_name)
-                sub_category = sub_category_cache.get(sub_key)
-                if sub_category is None:
-                    sub_category, _ = SubCategory.objects.get_or_create(
-                        category=category,
-                        name=candidate.sub_category_name,
-                    )
-                    sub_category_cache[sub_key] = sub_category
-
-            _, created = Question.objects.update_or_create(
-                title=candidate.title,
-                category=category,
-                defaults={
-                    'sub_category': sub_category,
-                    'brief_answer': candidate.brief_answer,
-                    'detailed_answer': candidate.detailed_answer,
-                    'key_points': candidate.key_points,
-                    'source_url': candidate.source_url,
-                    'tags': candidate.tags,
-                },
-            )
-            if created:
+    with transaction.atomic():
+        categories = _ensure_categories({candidate.category_name for candidate in ordered_candidates})
+        sub_categories = _ensure_sub_categories({
+            (categories[candidate.category_name], candidate.sub_category_name)
+            for candidate in ordered_candidates if candidate.sub_category_name
+        })
+        existing = _load_existing_questions(categories.values(), {candidate.title for candidate in ordered_candidates})
+
+        to_create, to_update, rerendered, links, owners = [], {}, set(), [], {}
+        for candidate in ordered_candidates:
+            error = _candidate_error(candidate)
+            if error:
+                stats['errors'].append(f'{candidate.filepath}: {error}')
+                continue
+            category = categories[candidate.category_name]
+            values = {
+                'sub_category': sub_categories.get((category.id, candidate.sub_category_name)),
+                'brief_answer': candidate.brief_answer,
+                'detailed_answer': candidate.detailed_answer,
+                'key_points': candidate.key_points,
+                'source_url': candidate.source_url,
+                'tags': candidate.tags,
+            }
+            question = existing.get((category.id, candidate.title))
+            if question is None:
+                question = Question(category=category, title=candidate.title, **values)
+                question.refresh_rendered()
+                existing[(category.id, candidate.title)] = question
+                to_create.append(question)
                 stats['created'] += 1
             else:
+                changed = _assign_question_values(question, values)
+                if question.refresh_rendered():
+                    rerendered.add(id(question))
+                    changed = True
+                if changed and question.pk is not None:
+                    to_update[id(question)] = question
                 stats['skipped'] += 1
-        except Exception as exc:  # noqa: BLE001 - 单文件失败不终止导入
-            stats['errors'].append(f'{candidate.filepath}: {exc}')
+            links.append((candidate, question))
+            owners[id(question)] = candidate
+
+        failed = set()
+        for batch in _batches(to_create):
+            failed |= _write_batch(batch, owners, stats, lambda items: Question.objects.bulk_create(items))
+        now = timezone.now()
+        for batch in _batches(list(to_update.values())):
+            for question in batch:
+                question.updated_at = now
+            failed |= _write_batch(
+                batch, owners, stats,
+                lambda items: _update_questions(items, rerendered),
+            )
+        _fill_missing_ids(to_create)
+
+        for candidate, question in links:
+            if id(question) in failed or question.pk is None:
+                continue
+            stats['question_ids'][(candidate.category_name, candidate.normalized_title)] = question.pk
+        stats['created'] -= sum(1 for question in to_create if id(question) in failed)
+        stats['skipped'] -= sum(1 for question in to_update.values() if id(question) in failed)
 
-    for category in Category.objects.all():
-        category.update_count()
+        Category.refresh_question_counts()
 
     return stats
 
 
+def _ensure_categories(names):
+    """一次查出已有分类，缺失的批量创建"""
+    categories = {category.name: category for category in Category.objects.filter(name__in=names)}
+    missing = [
+        Category(name=name, icon=CATEGORY_ICONS.get(name, 'book'))
+        for name in sorted(names) if name not in categories
+    ]
+    if missing:
+        Category.objects.bulk_create(missing)
+        categories.update(
+            (category.name, category) for category in Category.objects.filter(name__in=[item.name for item in missing])
+        )
+    return categories
+
+
+def _ensure_sub_categories(pairs):
+    """pairs 为 {(category, 子分类名)}，返回 {(category_id, 子分类名): SubCategory}"""
+    if not pairs:
+        return {}
+    category_ids = {category.id for category, _ in pairs}
+    names = {name for _, name in pairs}
+
+    def load():
+        return {
+            (item.category_id, item.name): item
+            for item in SubCategory.objects.filter(category_id__in=category_ids, name__in=names)
+        }
+
+    sub_categories = load()
+    missing = [
+        SubCategory(category=category, name=name)
+        for category, name in sorted(pairs, key=lambda pair: (pair[0].id, pair[1]))
+        if (category.id, name) not in sub_categories
+    ]
+    if missing:
+        SubCategory.objects.bulk_create(missing)
+        sub_categories = load()
+    return sub_categories
+
+
+def _load_existing_questions(categories, titles):
+    """按标题分批查出已有题目（只取本次涉及的题目，内存随批次大小而不是题库大小增长）"""
+    titles = sorted(titles)
+    existing = {}
+    for start in range(0, len(titles), IMPORT_BATCH_SIZE):
+        # 渲染结果只在内容变化、重新渲染时才会被覆盖，不需要读出来
+        for question in Question.objects.filter(
+            category__in=categories, title__in=titles[start:start + IMPORT_BATCH_SIZE],
+        ).defer(*RENDERED_CONTENT_FIELDS).order_by():
+            existing[(question.category_id, question.title)] = question
+    return existing
+
+
+def _candidate_error(candidate):
+    """批量写入前的字段校验（超长字段在 SQLite 上不会报错，需要提前拦下）"""
+    for field_name in ('title', 'source_url'):
+        max_length = Question._meta.get_field(field_name).max_length
+        if len(getattr(candidate, field_name)) > max_length:
+            return f'{field_name} 超过 {max_length} 个字符'
+    return None
+
+
+def _assign_question_values(question, values):
+    """把候选内容写到已有题目上，返回是否有字段变化"""
+    changed = False
+    for field_name, value in values.items():
+        if field_name == 'sub_category':
+            if question.sub_category_id != (value.id if value else None):
+                question.sub_category = value
+                changed = True
+        elif getattr(question, field_name) != value:
+            setattr(question, field_name, value)
+            changed = True
+    return changed
+
+
+def _update_questions(questions, rerendered):
+    """重新渲染过的题目连同渲染字段一起写回；其余题目不碰（延迟加载的）渲染字段"""
+    plain = [question for question in questions if id(question) not in rerendered]
+    rendered = [question for question in questions if id(question) in rerendered]
+    bulk_update_rows(Question, plain, QUESTION_IMPORT_FIELDS + ['updated_at'])
+    bulk_update_rows(Question, rendered, QUESTION_IMPORT_FIELDS + RENDERED_FIELDS + ['updated_at'])
+
+
+def _batches(items):
+    for start in range(0, len(items), IMPORT_BATCH_SIZE):
+        yield items[start:start + IMPORT_BATCH_SIZE]
+
+
+def bulk_update_rows(model, objects, fields):
+    """
+    按主键逐行 UPDATE，用 executemany 一次提交。
+
+    QuerySet.bulk_update 会为每个字段拼一个覆盖整批的 CASE WHEN，表达式构造开销随批量急剧增长
+    （1 万题约 30 秒，且都在写锁里）；逐行参数化语句只需准备一次。不触发 auto_now，调用方自行赋值。
+    """
+    if not objects:
+        return
+    meta = model._meta
+    model_fields = [meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in model_fields),
+        quote(meta.pk.column),
+    )
+    rows = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in model_fields] + [obj.pk]
+        for obj in objects
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _write_batch(batch, owners, stats, write):
+    """整批写入；失败时在保存点内逐条重试，返回失败题目的 id() 集合"""
+    try:
+        with transaction.atomic():
+            write(batch)
+        return set()
+    except DatabaseError:
+        pass
+    failed = set()
+    for question in batch:
+        try:
+            with transaction.atomic():
+                write([question])
+        except DatabaseError as exc:
+            failed.add(id(question))
+            stats['errors'].append(f'{owners[id(question)].filepath}: {exc}')
+    return failed
+
+
+def _fill_missing_ids(questions):
+    """数据库不支持 bulk_create 回填主键时，按 (分类, 标题) 补查一次"""
+    missing = [question for question in questions if question.pk is None]
+    if not missing:
+        return
+    ids = {
+        (category_id, title): pk
+        for pk, category_id, title in Question.objects.filter(
+            category_id__in={question.category_id for question in missing},
+            title__in={question.title for question in missing},
+        ).values_list('id', 'category_id', 'title')
+    }
+    for question in missing:
+        question.pk = ids.get((question.category_id, question.title))
+
+
 def normalize_category_name(raw_category):
     return CATEGORY_NORMALIZATION_MAP.get(raw_category, raw_category)
 
@@ -345,7 +651,8 @@ def is_business_source_url(source_url):
     return bool(source_url) and any(host in source_url for host in BUSINESS_SOURCE_HOSTS)
 
 
-def _iter_markdown_entries(source_path):
+def iter_markdown_entries(source_path):
+    """按 分类目录/[子分类目录/]题目.md 遍历，返回 (filepath, raw_category, raw_sub_category)"""
     for category_dir in sorted(source_path.iterdir()):
         if not category_dir.is_dir():
             continue
@@ -364,3 +671,18 @@ def _iter_markdown_entries(source_path):
                 if item.stem in SKIP_FILES:
                     continue
                 yield item, raw_category, None
+
+
+def markdown_entry_for_path(source_path, filepath):
+    """单个文件对应的 (filepath, raw_category, raw_sub_category)；按 iter_markdown_entries 的规则不算题目文件时返回 None"""
+    try:
+        parts = filepath.relative_to(source_path).parts
+    except ValueError:
+        return None
+    if not parts or parts[0].startswith('.') or filepath.stem in SKIP_FILES:
+        return None
+    if len(parts) == 2 and filepath.suffix.lower() == '.md':
+        return filepath, parts[0], None
+    if len(parts) == 3 and filepath.name.endswith('.md'):
+        return filepath, parts[0], parts[1]
+    return None
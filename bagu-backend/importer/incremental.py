@@ -0,0 +1,553 @@
+"""增量导入：按源文件清单（QuestionSourceFile）只处理新增 / 修改 / 删除的 Markdown 文件。
+
+plan_sync 只读不写：扫描目录并与清单比对，mtime 与大小都没变的文件直接跳过（不读内容），
+变了但内容哈希相同的只刷新 mtime；只解析真正变化的文件，并且只对受影响的去重键
+（归一化分类 + 归一化标题）重新选优，同键未变化的文件才会被重新解析参与比较。
+apply_sync 在一个事务内写题目并更新清单；源文件被删除 / 移动 / 改了标题后不再有来源的题目，
+只有 prune=True 时才删除（连带删除答题记录），默认保留，统计在 orphaned 里。
+
+fresh（整库重建）不再先清空分类：plan_sync 把现有题目按稳定键（归一化分类 + 归一化标题）对应到新候选，
+apply_sync 原地更新这些题目（ID 不变，答题记录随之保留），只删除不再有来源的题目和空分类。
+解析、比对都在事务外完成，SQLite 写锁只覆盖最后的批量写入。
+
+low_memory（两遍模式）：第一遍只保留 QuestionDigest（分类、标题、来源、内容长度、路径）做去重，
+第二遍只为胜出者按批重新解析出正文并逐批写库，峰值内存取决于批大小而不是题库规模。
+代价是第二遍的读文件和解析发生在 apply_sync 的事务内，SQLite 写锁覆盖整个第二遍而不只是批量写入，
+期间站点的写请求会排队；适合首次导入或维护窗口，日常增量同步不需要。
+
+near_dedupe（相似度阈值）：精确去重后再用 MinHash + LSH 找出措辞略有不同的同一道题，
+每个近似重复簇只保留 choose_better_candidate 选出的一题；落选的已有题目先把答题记录、评估轮次、
+做题进度改挂到保留的题目上再删除，用户历史不会丢。只在本次计划涉及的题目之间比较，完整检测需要配合 full / fresh。
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from django.db import reset_queries, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from practice.models import AnswerRecord, EvaluationRound, GenerationAttempt
+from questions.catalog_cache import invalidate_questions
+from questions.models import Category, Question, QuestionSourceFile, SubCategory, UserQuestionProgress
+from users.models import BaguUser
+from .importer import (
+    IMPORT_BATCH_SIZE, _create_parse_executor, bulk_update_rows, deduplicate_candidates, import_candidates,
+    iter_markdown_entries, load_full_candidates, markdown_entry_for_path, normalize_title_for_dedupe, parse_markdown_results,
+)
+from .near_dedupe import MinHasher, merge_near_duplicates, question_hashes
+
+
+@dataclass
+class FileChange:
+    source_name: str
+    path: str
+    entry: tuple  # (filepath, raw_category, raw_sub_category)
+    mtime_ns: int
+    size: int
+    content_hash: str
+    row: Optional[QuestionSourceFile]
+    candidate: object = None
+    error: str = ''
+
+    @property
+    def key(self):
+        if self.candidate is None:
+            return None
+        return (self.candidate.category_name, self.candidate.normalized_title)
+
+
+@dataclass
+class SyncPlan:
+    scopes: list
+    fresh: bool
+    low_memory: bool = False
+    options: tuple = (False, False)  # (require_source_url, require_business_source)，第二遍解析时沿用
+    scanned: dict = field(default_factory=dict)
+    unchanged: int = 0
+    touched: list = field(default_factory=list)
+    changes: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    members: dict = field(default_factory=dict)  # 受影响的键 -> [候选]（低内存模式下为 QuestionDigest）
+    relinks: list = field(default_factory=list)  # 同键未变化、需要改指向的清单行
+    winners: list = field(default_factory=list)
+    previous: dict = field(default_factory=dict)  # 键 -> 原题目 ID
+    near_duplicates: list = field(default_factory=list)  # NearDuplicateCluster，未胜出的已从 winners 中去掉
+    errors: list = field(default_factory=list)
+
+    @property
+    def added(self):
+        return sum(1 for change in self.changes if change.row is None)
+
+    @property
+    def modified(self):
+        return sum(1 for change in self.changes if change.row is not None)
+
+    @property
+    def has_changes(self):
+        return bool(self.changes or self.removed or self.touched)
+
+    def summary(self):
+        """与 build_merged_candidates 的 summary 字段一致（统计范围是受影响的去重键）"""
+        parsed = sum(len(items) for items in self.members.values())
+        category_counts = {}
+        for candidate in self.winners:
+            category_counts[candidate.category_name] = category_counts.get(candidate.category_name, 0) + 1
+        return {
+            'source_file_counts': dict(self.scanned),
+            'parsed_candidates': parsed,
+            'selected_candidates': len(self.winners),
+            'deduped_count': parsed - len(self.winners),
+            'category_counts': category_counts,
+            'near_duplicates': list(self.near_duplicates),
+            'errors': list(self.errors),
+        }
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scope_filter(scopes):
+    condition = Q(pk__in=[])
+    for source_name, prefix in scopes:
+        condition |= Q(source_name=source_name, path__startswith=prefix + os.sep)
+    return condition
+
+
+def plan_sync(source_dirs, require_source_url=False, require_business_source=False, jobs=1, full=False,
+              fresh=False, paths=None, low_memory=False, near_dedupe=None):
+    """
+    比对目录与清单，得到待执行的同步计划（不写数据库）。
+
+    full: 忽略 mtime / 哈希，重新解析全部文件（仍沿用清单里的题目关联）
+    fresh: 整库重建（隐含 full），现有题目按稳定键对应到新候选，没有对应的在 apply_sync 时删除
+    paths: 只检查这些文件（watch 模式下收到变更的路径，已删除的也算），为 None 时扫描整个目录
+    low_memory: 解析结果只保留 QuestionDigest，正文留到 apply_sync 时再读
+    near_dedupe: 近似重复的相似度阈值（0~1），为 None 时只做精确去重
+    """
+    options = (require_source_url, require_business_source)
+    plan = SyncPlan(scopes=[], fresh=fresh, low_memory=low_memory, options=options)
+    entries = _scan_entries(plan, source_dirs, paths)
+
+    manifest = {}
+    if plan.scopes:
+        rows = QuestionSourceFile.objects.filter(_scope_filter(plan.scopes))
+        if paths is not None:
+            rows = rows.filter(path__in=[str(Path(path)) for path in paths])
+        manifest = {(row.source_name, row.path): row for row in rows}
+    full = full or fresh
+
+    for (source_name, path), entry in entries.items():
+        row = manifest.get((source_name, path))
+        try:
+            stat = entry[0].stat()
+            if row is not None and not full and row.mtime_ns == stat.st_mtime_ns and row.size == stat.st_size:
+                plan.unchanged += 1
+                if row.error:
+                    plan.errors.append(row.error)
+                continue
+            digest = file_digest(entry[0])
+        except OSError as exc:
+            plan.errors.append(f'{path}: {exc}')
+            continue
+        if row is not None and not full and row.content_hash == digest:
+            row.mtime_ns, row.size = stat.st_mtime_ns, stat.st_size
+            plan.touched.append(row)
+            plan.unchanged += 1
+            if row.error:
+                plan.errors.append(row.error)
+            continue
+        plan.changes.append(FileChange(source_name, path, entry, stat.st_mtime_ns, stat.st_size, digest, row))
+    plan.removed = [row for key, row in manifest.items() if key not in entries]
+
+    executor = _create_parse_executor(jobs) if len(plan.changes) > 1 else None
+    try:
+        _parse_changes(plan.changes, options, jobs, executor, low_memory)
+        plan.errors.extend(change.error for change in plan.changes if change.error)
+
+        # 解析失败的文件保留原有题目关联（编辑到一半不应删题、连带删掉答题记录），修好后再按新内容同步
+        old_rows = [change.row for change in plan.changes if change.row is not None and change.key] + plan.removed
+        affected = {change.key for change in plan.changes if change.key}
+        affected.update((row.category_name, row.normalized_title) for row in old_rows if row.category_name)
+        skipped = {(row.source_name, row.path) for row in old_rows} | {
+            (change.source_name, change.path) for change in plan.changes
+        }
+        if paths is None:
+            others = [row for key, row in manifest.items() if key not in skipped]
+        else:
+            others = _load_key_rows(plan.scopes, affected, skipped)
+        others = [row for row in others if (row.category_name, row.normalized_title) in affected]
+        _collect_members(plan, others, entries, options, jobs, executor, low_memory)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if fresh:
+        plan.previous = _catalog_keys()
+    for row in old_rows + plan.relinks:
+        key = (row.category_name, row.normalized_title)
+        if row.question_id and key in affected and key not in plan.previous:
+            plan.previous[key] = row.question_id
+    for key in affected:
+        plan.members.setdefault(key, [])
+    plan.winners = deduplicate_candidates(
+        [candidate for candidates in plan.members.values() for candidate in candidates]
+    )
+    if near_dedupe is not None and len(plan.winners) > 1:
+        plan.winners, plan.near_duplicates = merge_near_duplicates(
+            plan.winners, _winner_signatures(plan), threshold=near_dedupe,
+        )
+    return plan
+
+
+def _catalog_keys():
+    """现有题目的稳定键 -> 题目 ID（同键多题时取最早的一题，其余在重建时删除）"""
+    keys = {}
+    for question_id, category_name, title in Question.objects.order_by('id').values_list('id', 'category__name', 'title'):
+        keys.setdefault((category_name, normalize_title_for_dedupe(title)), question_id)
+    return keys
+
+
+def _winner_signatures(plan):
+    """按批算胜出候选的 MinHash 签名；低内存模式下按批重新读取正文，只保留签名矩阵"""
+    hasher = MinHasher()
+    blocks = []
+    for start in range(0, len(plan.winners), IMPORT_BATCH_SIZE):
+        batch = plan.winners[start:start + IMPORT_BATCH_SIZE]
+        if plan.low_memory:
+            candidates, _ = load_full_candidates(batch, *plan.options)
+            loaded = {str(candidate.filepath): candidate for candidate in candidates}
+            # 两遍之间被改坏的文件没有签名，不参与近似去重
+            hash_sets = [
+                question_hashes(loaded[str(digest.filepath)]) if str(digest.filepath) in loaded else set()
+                for digest in batch
+            ]
+        else:
+            hash_sets = [question_hashes(candidate) for candidate in batch]
+        blocks.append(hasher.signatures(hash_sets))
+    return np.vstack(blocks)
+
+
+def _scan_entries(plan, source_dirs, paths):
+    """解析来源目录（记录到 plan.scopes），返回 {(source_name, path): entry}"""
+    entries = {}
+    for source_name, source_dir in source_dirs:
+        source_path = Path(source_dir)
+        if not source_path.exists():
+            plan.errors.append(f'{source_dir}: 目录不存在')
+            plan.scanned[source_name] = 0
+            continue
+        if not source_path.is_dir():
+            plan.errors.append(f'{source_dir}: 不是目录')
+            plan.scanned[source_name] = 0
+            continue
+        source_path = source_path.resolve()
+        plan.scopes.append((source_name, str(source_path)))
+        if paths is None:
+            found = iter_markdown_entries(source_path)
+        else:
+            found = (markdown_entry_for_path(source_path, Path(path)) for path in paths)
+            found = [entry for entry in found if entry is not None and entry[0].is_file()]
+        count = 0
+        for filepath, raw_category, raw_sub_category in found:
+            entries[(source_name, str(filepath))] = (filepath, raw_category, raw_sub_category)
+            count += 1
+        plan.scanned[source_name] = count
+    return entries
+
+
+def _load_key_rows(scopes, keys, exclude):
+    """按去重键查出同键的其他清单行（只检查部分文件时用；标题分批查询后在内存里精确匹配）"""
+    titles = sorted({title for _, title in keys})
+    rows = []
+    for start in range(0, len(titles), 500):
+        rows.extend(
+            row for row in QuestionSourceFile.objects.filter(
+                _scope_filter(scopes), normalized_title__in=titles[start:start + 500],
+            )
+            if (row.source_name, row.path) not in exclude and (row.category_name, row.normalized_title) in keys
+        )
+    return rows
+
+
+def _parse_changes(changes, options, jobs, executor, digest_only=False):
+    by_source = {}
+    for change in changes:
+        by_source.setdefault(change.source_name, []).append(change)
+    for source_name, items in by_source.items():
+        results = parse_markdown_results(
+            [change.entry for change in items], source_name, *options, jobs=jobs, executor=executor,
+            digest_only=digest_only,
+        )
+        for change, (candidate, error) in zip(items, results):
+            change.candidate, change.error = candidate, error or ''
+
+
+def _collect_members(plan, others, entries, options, jobs, executor, digest_only=False):
+    """收集受影响键的全部候选：变化的文件已解析，同键未变化的文件（others）需要重新解析"""
+    for change in plan.changes:
+        if change.key:
+            plan.members.setdefault(change.key, []).append(change.candidate)
+
+    scope_paths = dict(plan.scopes)
+    reparse = {}
+    for row in others:
+        entry = entries.get((row.source_name, row.path)) or markdown_entry_for_path(
+            Path(scope_paths[row.source_name]), Path(row.path),
+        )
+        if entry is None or not entry[0].is_file():
+            # 文件已不在但还没收到删除事件，留给下一次同步处理
+            continue
+        plan.relinks.append(row)
+        reparse.setdefault(row.source_name, []).append(entry)
+    for source_name, items in reparse.items():
+        results = parse_markdown_results(
+            items, source_name, *options, jobs=jobs, executor=executor, digest_only=digest_only,
+        )
+        for candidate, error in results:
+            if candidate is not None:
+                plan.members.setdefault((candidate.category_name, candidate.normalized_title), []).append(candidate)
+            elif error:
+                plan.errors.append(error)
+
+
+def apply_sync(plan, prune=False):
+    """
+    执行同步计划，返回 import_candidates 风格的统计（另含 deleted / orphaned 与文件变化数）。
+
+    prune: 删除已无来源的题目（答题记录随之级联删除）；为 False 时保留这些题目，只计入 orphaned。
+    fresh 整库重建总是删除，近似重复合并的落选题目总是在改挂答题记录后删除。
+    """
+    stats = {
+        'created': 0, 'skipped': 0, 'deleted': 0, 'merged': 0, 'orphaned': 0, 'errors': [],
+        'unchanged': plan.unchanged, 'added': plan.added, 'modified': plan.modified, 'removed': len(plan.removed),
+        'affected_users': set(), 'merged_users': set(),
+    }
+    deleted_ids = []
+    with transaction.atomic():
+        winner_keys = {(candidate.category_name, candidate.normalized_title) for candidate in plan.winners}
+        _rename_previous_questions(plan)
+
+        held = {change.row.question_id for change in plan.changes if change.row is not None and not change.key}
+        merges = _near_duplicate_merges(plan)
+        orphaned = [
+            question_id for key, question_id in plan.previous.items()
+            if key not in winner_keys and question_id not in held and question_id not in merges
+        ]
+        if orphaned and not plan.fresh:
+            # 仍被本次范围之外的源文件引用的题目保留
+            in_scope = [row.pk for row in plan.removed] + [
+                change.row.pk for change in plan.changes if change.row is not None
+            ] + [row.pk for row in plan.relinks]
+            referenced = set(
+                QuestionSourceFile.objects.filter(question_id__in=orphaned)
+                .exclude(pk__in=in_scope).values_list('question_id', flat=True)
+            )
+            orphaned = [question_id for question_id in orphaned if question_id not in referenced]
+            if prune:
+                deleted_ids = orphaned
+                stats['affected_users'] = _delete_questions(deleted_ids)
+            else:
+                stats['orphaned'] = len(orphaned)
+
+        if plan.winners or orphaned or merges:
+            # import_candidates 末尾会重算分类题数，删除题目后也需要走一遍
+            import_stats = _import_winners(plan)
+        else:
+            import_stats = {'created': 0, 'skipped': 0, 'errors': [], 'question_ids': {}}
+        stats['created'] = import_stats['created']
+        stats['skipped'] = import_stats['skipped']
+        stats['errors'] = import_stats['errors']
+        question_ids = import_stats['question_ids']
+
+        if merges:
+            # 近似重复簇里落选的题目：答题记录等先改挂到保留的题目上，再删除（不随题目级联删掉）
+            merged = {
+                question_id: question_ids[key] for question_id, key in merges.items()
+                if question_ids.get(key) not in (None, question_id)
+            }
+            stats['merged'] = len(merged)
+            stats['merged_users'] = _merge_questions(merged)
+            if not plan.fresh:
+                deleted_ids = deleted_ids + list(merged)
+                stats['affected_users'] |= _delete_questions(list(merged))
+
+        if plan.fresh:
+            kept = set(question_ids.values())
+            deleted_ids = [
+                question_id for question_id in Question.objects.values_list('id', flat=True) if question_id not in kept
+            ]
+            stats['affected_users'] = _delete_questions(deleted_ids)
+            SubCategory.objects.filter(questions__isnull=True).delete()
+            Category.objects.filter(questions__isnull=True).delete()
+            Category.refresh_question_counts()
+        stats['deleted'] = len(deleted_ids)
+
+        _write_manifest(plan, question_ids)
+
+        affected_ids = set(question_ids.values()) | set(plan.previous.values()) | set(deleted_ids)
+        if affected_ids:
+            transaction.on_commit(lambda: invalidate_questions(affected_ids))
+    return stats
+
+
+def _near_duplicate_merges(plan):
+    """近似重复簇中落选候选原来对应的题目 ID -> 保留候选的去重键"""
+    merges = {}
+    for cluster in plan.near_duplicates:
+        winner_key = (cluster.winner.category_name, cluster.winner.normalized_title)
+        for loser in cluster.losers:
+            question_id = plan.previous.get((loser.category_name, loser.normalized_title))
+            if question_id is not None and question_id != plan.previous.get(winner_key):
+                merges[question_id] = winner_key
+    return merges
+
+
+def _merge_questions(targets):
+    """
+    把题目的答题记录、评估轮次、生成记录和做题进度改挂到目标题目（{原题目 ID: 目标题目 ID}），返回涉及的用户。
+
+    做题进度按 (用户, 题目) 唯一：两题都有进度的用户保留目标题目那条（任一已完成即视为完成），其余整行改挂。
+    """
+    users = set()
+    for source_id, target_id in targets.items():
+        users.update(AnswerRecord.objects.filter(question_id=source_id).values_list('user_id', flat=True))
+        AnswerRecord.objects.filter(question_id=source_id).update(question_id=target_id)
+        EvaluationRound.objects.filter(question_id=source_id).update(question_id=target_id)
+        GenerationAttempt.objects.filter(question_id=source_id).update(question_id=target_id)
+
+        progress = UserQuestionProgress.objects.filter(question_id=source_id)
+        users.update(progress.values_list('user_id', flat=True))
+        both = set(
+            UserQuestionProgress.objects.filter(question_id=target_id, user_id__in=progress.values('user_id'))
+            .values_list('user_id', flat=True)
+        )
+        completed = progress.filter(user_id__in=both, is_completed=True).values('user_id')
+        UserQuestionProgress.objects.filter(
+            question_id=target_id, user_id__in=completed, is_completed=False,
+        ).update(is_completed=True, completed_at=timezone.now(), updated_at=timezone.now())
+        progress.exclude(user_id__in=both).update(question_id=target_id)
+    if users:
+        BaguUser.bump_data_version(users)
+    return users
+
+
+def _delete_questions(question_ids):
+    """分批删除题目（答题记录随之级联删除），重算受影响用户的答题统计，返回这些用户的 ID"""
+    users = set()
+    for start in range(0, len(question_ids), IMPORT_BATCH_SIZE):
+        chunk = question_ids[start:start + IMPORT_BATCH_SIZE]
+        users.update(AnswerRecord.objects.filter(question_id__in=chunk).values_list('user_id', flat=True))
+        Question.objects.filter(id__in=chunk).delete()
+    if users:
+        BaguUser.refresh_answer_stats(users)
+    return users
+
+
+def _import_winners(plan):
+    """写入胜出候选；低内存模式下按批重新解析正文，每批写完即可释放（解析在调用方的事务内，会延长写锁）"""
+    if not plan.low_memory:
+        return import_candidates(plan.winners, dry_run=False)
+
+    totals = {'created': 0, 'skipped': 0, 'errors': [], 'question_ids': {}}
+    winners = sorted(
+        plan.winners, key=lambda digest: (digest.category_name, digest.sub_category_name or '', digest.title),
+    )
+    for start in range(0, max(len(winners), 1), IMPORT_BATCH_SIZE):
+        candidates, errors = load_full_candidates(winners[start:start + IMPORT_BATCH_SIZE], *plan.options)
+        totals['errors'].extend(errors)
+        batch_stats = import_candidates(candidates, dry_run=False)
+        totals['created'] += batch_stats['created']
+        totals['skipped'] += batch_stats['skipped']
+        totals['errors'].extend(batch_stats['errors'])
+        totals['question_ids'].update(batch_stats['question_ids'])
+        # DEBUG 下 connection.queries 会保留带正文的 INSERT/UPDATE 语句，逐批清掉
+        reset_queries()
+    return totals
+
+
+def _rename_previous_questions(plan):
+    """胜出候选标题与原题目不同（如标点调整）时原地改名，保留答题记录关联"""
+    winners = {(candidate.category_name, candidate.normalized_title): candidate for candidate in plan.winners}
+    previous = {key: question_id for key, question_id in plan.previous.items() if key in winners}
+    if not previous:
+        return
+    questions = {}
+    ids = list(previous.values())
+    for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+        questions.update(
+            (question_id, (category_id, title))
+            for question_id, category_id, title in Question.objects.filter(
+                pk__in=ids[start:start + IMPORT_BATCH_SIZE],
+            ).values_list('id', 'category_id', 'title')
+        )
+    for key, question_id in previous.items():
+        if question_id not in questions:
+            continue
+        category_id, current = questions[question_id]
+        title = winners[key].title
+        if current == title:
+            continue
+        if Question.objects.filter(category_id=category_id, title=title).exists():
+            continue
+        Question.objects.filter(pk=question_id).update(title=title)
+
+
+def _write_manifest(plan, question_ids):
+    if plan.removed:
+        QuestionSourceFile.objects.filter(pk__in=[row.pk for row in plan.removed]).delete()
+    if plan.touched:
+        bulk_update_rows(QuestionSourceFile, plan.touched, ['mtime_ns', 'size'])
+
+    created, updated = [], []
+    for change in plan.changes:
+        row = change.row or QuestionSourceFile(source_name=change.source_name, path=change.path)
+        row.mtime_ns, row.size, row.content_hash = change.mtime_ns, change.size, change.content_hash
+        if change.key or change.row is None:
+            row.category_name, row.normalized_title = change.key or ('', '')
+            row.question_id = question_ids.get(change.key) if change.key else None
+        row.error = change.error
+        (updated if change.row is not None else created).append(row)
+    for row in plan.relinks:
+        row.question_id = question_ids.get((row.category_name, row.normalized_title))
+        updated.append(row)
+
+    if created:
+        QuestionSourceFile.objects.bulk_create(created, batch_size=500)
+    if updated:
+        bulk_update_rows(
+            QuestionSourceFile, updated,
+            ['mtime_ns', 'size', 'content_hash', 'category_name', 'normalized_title', 'question', 'error'],
+        )
+
+
+def sync_sources(source_dirs, require_source_url=False, require_business_source=False, jobs=1, full=False,
+                 dry_run=False, paths=None, low_memory=False, near_dedupe=None, prune=False):
+    """
+    增量导入入口：返回 (stats, plan)；dry_run 只返回计划统计。
+
+    paths / low_memory / near_dedupe 见 plan_sync，prune 见 apply_sync。
+    """
+    plan = plan_sync(
+        source_dirs, require_source_url, require_business_source, jobs=jobs, full=full, paths=paths,
+        low_memory=low_memory, near_dedupe=near_dedupe,
+    )
+    if dry_run:
+        return {
+            'created': len(plan.winners), 'skipped': 0, 'deleted': 0, 'merged': 0, 'orphaned': 0,
+            'errors': list(plan.errors),
+            'unchanged': plan.unchanged, 'added': plan.added, 'modified': plan.modified,
+            'removed': len(plan.removed),
+        }, plan
+    stats = apply_sync(plan, prune=prune)
+    stats['errors'] = plan.errors + stats['errors']
+    return stats, plan
@@ -0,0 +1,32 @@
+"""manage.py benchmark_parser 命令 - Markdown 解析器微基准"""
+import json
+from tempfile import TemporaryDirectory
+
+from django.core.management.base import BaseCommand
+
+from importer.benchmark import benchmark_parser, render_corpus
+
+
+class Command(BaseCommand):
+    help = '用内置题库渲染的 Markdown 语料对 parse_bagu_md 计时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='重复轮数（取最快一轮计算吞吐）')
+        parser.add_argument('--limit', type=int, default=None, help='只取前 N 道题')
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+
+    def handle(self, *args, **options):
+        with TemporaryDirectory() as tmp:
+            paths = render_corpus(tmp, limit=options['limit'])
+            result = benchmark_parser(paths, rounds=max(options['rounds'], 1))
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False))
+            return
+        self.stdout.write(
+            f'语料: {result["files"]} 个文件, {result["bytes"] / 1024:.0f} KB, {result["rounds"]} 轮'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'最快一轮 {result["best_round_ms"]} ms: {result["files_per_second"]} 文件/秒, '
+            f'{result["mb_per_second"]} MB/秒; 单文件中位数 {result["median_us"]} µs, P95 {result["p95_us"]} µs'
+        ))
@@ -1,7 +1,7 @@
 """manage.py import_questions 命令 - 导入八股文"""
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from importer.importer import import_from_directory
+from importer.incremental import sync_sources
 
 
 class Command(BaseCommand):
@@ -16,6 +16,23 @@ class Command(BaseCommand):
             '--dry-run', action='store_true',
             help='预演模式，不写入数据库'
         )
+        parser.add_argument(
+            '--jobs', type=int, default=1,
+            help='解析进程数（默认 1，0 表示使用全部 CPU 核）'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='忽略文件清单的 mtime/哈希，重新解析全部文件'
+        )
+        parser.add_argument(
+            '--low-memory', action='store_true',
+            help='两遍导入：先只用标题/来源/长度去重，再按批读取胜出文件的正文写库'
+                 '（第二遍在写库事务内读文件，写锁持有时间明显变长）'
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='删除源文件已删除 / 移走 / 改了标题的题目（答题记录随之删除）；默认保留'
+        )
 
     def handle(self, *args, **options):
         source_dir = options['source_dir'] or str(settings.BAGU_SOURCE_DIR)
@@ -25,11 +42,22 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('预演模式 - 不会写入数据库'))
 
-        stats = import_from_directory(source_dir, dry_run=dry_run)
+        stats, _ = sync_sources(
+            [('single', source_dir)], jobs=options['jobs'], full=options['full'], dry_run=dry_run,
+            low_memory=options['low_memory'], prune=options['prune'],
+        )
 
+        self.stdout.write(
+            f'文件: 未变化 {stats["unchanged"]}, 新增 {stats["added"]}, '
+            f'修改 {stats["modified"]}, 删除 {stats["removed"]}'
+        )
         self.stdout.write(self.style.SUCCESS(
-            f'\n导入完成: 新增 {stats["created"]} 题, 跳过 {stats["skipped"]} 题'
+            f'\n导入完成: 新增 {stats["created"]} 题, 跳过 {stats["skipped"]} 题, 删除 {stats["deleted"]} 题'
         ))
+        if stats['orphaned']:
+            self.stdout.write(self.style.WARNING(
+                f'保留 {stats["orphaned"]} 道已无源文件的题目（及其答题记录），确认后可加 --prune 删除'
+            ))
         if stats['errors']:
             self.stdout.write(self.style.ERROR(f'错误 {len(stats["errors"])} 个:'))
             for err in stats['errors']:
@@ -1,11 +1,18 @@
-"""重建八股题库：扫描多来源 -> 校验 -> 清库 -> 重建。"""
+"""重建八股题库：扫描多来源 -> 校验 -> 比对 -> 切换。
+
+已有文件清单时默认增量同步（只处理新增/修改/删除的文件）；清单为空或指定 --full 时走完整重建。
+完整重建也不清库：解析与比对在事务外完成（期间站点照常读写），最后在一个短事务里按稳定键
+（归一化分类 + 归一化标题）原地更新现有题目、删除不再有来源的题目，答题记录跟着题目 ID 保留；
+提交后递增目录缓存版本。
+"""
+import time
 
 from django.core.management.base import BaseCommand, CommandError
-from django.core.cache import cache
 from django.db import transaction
 
-from importer.importer import build_merged_candidates, import_candidates
-from questions.models import Category
+from importer.incremental import apply_sync, plan_sync
+from importer.near_dedupe import DEFAULT_THRESHOLD
+from questions.models import QuestionSourceFile
 from users.models import BaguUser, UserProfile
 
 
@@ -28,6 +35,32 @@ class Command(BaseCommand):
             action='store_true',
             help='仅扫描与校验，不写库不删库',
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='解析进程数（默认 1，0 表示使用全部 CPU 核）',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略文件清单，重新解析全部文件并原地重建（不清库，题目 ID 与答题记录保留）',
+        )
+        parser.add_argument(
+            '--low-memory',
+            action='store_true',
+            help='两遍导入：先只用标题/来源/长度去重，再按批读取胜出文件的正文写库（适合超大题库；'
+                 '第二遍在写库事务内读文件，写锁持有时间明显变长）',
+        )
+        parser.add_argument(
+            '--near-dedupe',
+            nargs='?',
+            type=float,
+            const=DEFAULT_THRESHOLD,
+            default=None,
+            metavar='THRESHOLD',
+            help=f'合并措辞略有不同的近似重复题（MinHash 相似度阈值，默认 {DEFAULT_THRESHOLD}）',
+        )
 
     def handle(self, *args, **options):
         feishu_dir = options['feishu_dir']
@@ -39,54 +72,79 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('预演模式 - 不会写入数据库'))
 
-        candidates, summary = build_merged_candidates(
-            source_dirs=[('feishu', feishu_dir), ('yuque', yuque_dir)],
+        source_dirs = [('feishu', feishu_dir), ('yuque', yuque_dir)]
+        fresh = options['full'] or not QuestionSourceFile.objects.filter(
+            source_name__in=[name for name, _ in source_dirs],
+        ).exists()
+        self.stdout.write('模式: 完整重建' if fresh else '模式: 增量同步')
+
+        plan = plan_sync(
+            source_dirs,
             require_source_url=True,
             require_business_source=True,
+            jobs=options['jobs'],
+            fresh=fresh,
+            low_memory=options['low_memory'],
+            near_dedupe=options['near_dedupe'],
         )
+        summary = plan.summary()
         self._print_summary(summary)
+        if options['near_dedupe'] is not None:
+            self._print_near_duplicates(summary['near_duplicates'])
 
         if summary['errors']:
             self._print_errors(summary['errors'])
             raise CommandError(f'检测到 {len(summary["errors"])} 个解析/链接错误，已中止。')
 
-        if not candidates:
+        if fresh and not plan.winners:
             raise CommandError('候选题目为空，已中止。')
 
+        if not fresh:
+            self.stdout.write(
+                f'文件: 未变化 {plan.unchanged} 份, 新增 {plan.added} 份, '
+                f'修改 {plan.modified} 份, 删除 {len(plan.removed)} 份'
+            )
+            if not plan.has_changes:
+                self.stdout.write(self.style.SUCCESS('题库已是最新，无需同步。'))
+                return
+
         if dry_run:
-            self.stdout.write(self.style.SUCCESS(f'预演通过：预计导入 {len(candidates)} 题。'))
+            self.stdout.write(self.style.SUCCESS(f'预演通过：预计导入 {len(plan.winners)} 题。'))
             return
 
+        reset_profiles = 0
+        started = time.monotonic()
         with transaction.atomic():
-            Category.objects.all().delete()
-
-            import_stats = import_candidates(candidates, dry_run=False)
+            # rebuild 以两个来源目录为准，不再有来源的题目一并删除（与原先清库重建的结果一致）
+            import_stats = apply_sync(plan, prune=True)
             if import_stats['errors']:
                 self._print_errors(import_stats['errors'])
                 raise CommandError(f'导入阶段失败，共 {len(import_stats["errors"])} 个错误，事务已回滚。')
 
-            reset_users = BaguUser.objects.update(total_answers=0, avg_score=0.0)
-            reset_profiles = UserProfile.objects.update(
-                category_scores={},
-                strengths=[],
-                weaknesses=[],
-                suggestions=[],
-                overall_level='beginner',
-            )
-
-            try:
-                cache.clear()
-            except Exception:
-                # Redis 不可用时跳过缓存清理，不影响导入
-                pass
-
+            affected_users = import_stats['affected_users']
+            if fresh and affected_users:
+                # 丢了答题记录的用户画像已不可信，等待重新生成
+                reset_profiles = UserProfile.objects.filter(user_id__in=affected_users).update(
+                    category_scores={},
+                    strengths=[],
+                    weaknesses=[],
+                    suggestions=[],
+                    overall_level='beginner',
+                )
+                BaguUser.bump_data_version(affected_users)
+        elapsed = time.monotonic() - started
+
+        merged = import_stats['merged']
+        merged_note = f'其中合并近似重复 {merged} 题（答题记录已改挂到保留的题目），' if merged else ''
         self.stdout.write(
             self.style.SUCCESS(
                 '\n重建完成：'
                 f'新增 {import_stats["created"]} 题，'
                 f'覆盖 {import_stats["skipped"]} 题，'
-                f'重置用户 {reset_users} 条，'
-                f'重置画像 {reset_profiles} 条。'
+                f'删除 {import_stats["deleted"]} 题，{merged_note}'
+                f'重算用户 {len(affected_users)} 条，'
+                f'重置画像 {reset_profiles} 条，'
+                f'切换耗时 {elapsed:.2f} 秒。'
             )
         )
 
@@ -113,6 +171,18 @@ class Command(BaseCommand):
             ):
                 self.stdout.write(f'  - {category}: {count}')
 
+    def _print_near_duplicates(self, clusters):
+        merged = sum(len(cluster.losers) for cluster in clusters)
+        self.stdout.write(f'近似重复: {len(clusters)} 组, 合并 {merged} 题（最多展示前 20 组）')
+        for cluster in clusters[:20]:
+            winner = cluster.winner
+            self.stdout.write(
+                f'  - [{winner.category_name}] 保留 {winner.title}（{winner.source_name}），'
+                f'相似度 ≥ {cluster.similarity:.2f}'
+            )
+            for loser in cluster.losers:
+                self.stdout.write(f'      合并 {loser.title}（{loser.source_name}: {loser.filepath}）')
+
     def _print_errors(self, errors):
         self.stdout.write(self.style.ERROR(f'错误 {len(errors)} 个（最多展示前 20 个）:'))
         for err in errors[:20]:
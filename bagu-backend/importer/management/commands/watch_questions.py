@@ -0,0 +1,62 @@
+"""manage.py watch_questions 命令 - 常驻监听八股文目录，增量同步到题库"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from importer.watcher import create_watcher, watch_and_sync
+
+
+class Command(BaseCommand):
+    help = '监听 Markdown 目录变动，防抖后只同步改动的文件（可在 supervisord 下常驻）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source_dir', nargs='?', type=str,
+            help='八股文目录路径（默认使用 settings.BAGU_SOURCE_DIR）'
+        )
+        parser.add_argument('--feishu-dir', help='飞书八股目录（与 --yuque-dir 一起使用时按 rebuild_questions 的规则校验链接）')
+        parser.add_argument('--yuque-dir', help='语雀八股目录')
+        parser.add_argument('--debounce', type=float, default=0.3, help='防抖间隔秒数（默认 0.3）')
+        parser.add_argument('--max-delay', type=float, default=1.0, help='连续变动时最长合并等待秒数（默认 1）')
+        parser.add_argument('--polling', action='store_true', help='强制使用 mtime 轮询（如网络盘不支持 inotify）')
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='轮询间隔秒数（默认 0.5）')
+        parser.add_argument('--prune', action='store_true',
+                            help='删除源文件已删除 / 移走 / 改了标题的题目（答题记录随之删除）；默认保留')
+
+    def handle(self, *args, **options):
+        if options['feishu_dir'] or options['yuque_dir']:
+            source_dirs = [
+                (name, options[f'{name}_dir']) for name in ('feishu', 'yuque') if options[f'{name}_dir']
+            ]
+            strict = True
+        else:
+            source_dirs = [('single', options['source_dir'] or str(settings.BAGU_SOURCE_DIR))]
+            strict = False
+
+        watcher = create_watcher(
+            [source_dir for _, source_dir in source_dirs],
+            polling=options['polling'], poll_interval=options['poll_interval'],
+        )
+        for name, source_dir in source_dirs:
+            self.stdout.write(f'监听目录 [{name}]: {source_dir}')
+        self.stdout.write(f'监听方式: {watcher.kind}')
+
+        watch_and_sync(
+            source_dirs,
+            require_source_url=strict,
+            require_business_source=strict,
+            watcher=watcher,
+            debounce=options['debounce'],
+            max_delay=options['max_delay'],
+            on_sync=self._report,
+            prune=options['prune'],
+        )
+
+    def _report(self, stats, paths, rescan):
+        scope = '整目录' if rescan else f'{len(paths)} 个文件'
+        self.stdout.write(
+            f'同步[{scope}]: 新增 {stats["created"]} 题, 更新 {stats["skipped"]} 题, 删除 {stats["deleted"]} 题,'
+            f' 保留无来源 {stats["orphaned"]} 题 (文件 未变化 {stats["unchanged"]}, 新增 {stats["added"]}, 修改 {stats["modified"]}, 删除 {stats["removed"]})'
+        )
+        for err in stats['errors'][:20]:
+            self.stdout.write(self.style.ERROR(f'  - {err}'))
+        self.stdout.flush()
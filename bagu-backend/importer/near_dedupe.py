@@ -0,0 +1,196 @@
+"""近似重复题目检测：MinHash + LSH 分桶。
+
+精确去重只合并归一化标题完全相同的题目，飞书 / 语雀措辞略有差别的同一道题会漏掉，两两比较又是 O(n²)。
+这里对每道题的「标题 + 简答开头」取字符 2-gram（中文不分词也适用），算 MinHash 签名，
+再把签名切成若干段做 LSH 分桶：只有至少一段完全相同的题目才会被比较，整体接近线性。
+候选对用签名估计的 Jaccard 相似度复核，超过阈值的用并查集连成簇，簇内按 choose_better_candidate 选出保留的题目。
+
+只在同一归一化分类内比较；标题的 shingle 计 TITLE_WEIGHT 份，避免简答较长时淹没标题的差异。
+"""
+import re
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from .importer import choose_better_candidate
+
+NUM_PERM = 64
+BANDS = 16  # 每段 4 行：相似度 0.7 的两题至少一段相同的概率约 99%
+SHINGLE_SIZE = 2
+TITLE_WEIGHT = 3
+BRIEF_ANSWER_CHARS = 120
+DEFAULT_THRESHOLD = 0.7
+SIGNATURE_BATCH_TOKENS = 20_000  # 一批中间矩阵约 NUM_PERM * 20k * 8 字节 ≈ 20MB
+EMPTY_SIGNATURE = np.iinfo(np.uint32).max
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+@dataclass
+class NearDuplicateCluster:
+    winner: object
+    members: list  # 含 winner，按文件路径排序
+    similarity: float  # 簇内各题与保留题目的最低估计相似度
+
+    @property
+    def losers(self):
+        return [member for member in self.members if member is not self.winner]
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE, salt=0):
+    """
+    去掉空白与标点后取字符 n-gram 的 crc32（不足 n 个字符时整体作为一个 shingle）。
+
+    文本整体编码成 UTF-32 后按定长切片，每个字符 4 字节，免去逐个 shingle 编码；crc32 跨进程稳定，
+    预演与正式导入的结果一致。salt 作为 crc32 初值，同一 shingle 换个初值即得到另一个独立哈希。
+    """
+    data = SEPARATOR_PATTERN.sub('', str(text or '').lower()).encode('utf-32-le')
+    width = 4 * size
+    if len(data) <= width:
+        return {zlib.crc32(data, salt)} if data else set()
+    return {zlib.crc32(data[offset:offset + width], salt) for offset in range(0, len(data) - width + 4, 4)}
+
+
+def question_hashes(candidate):
+    """标题 shingle 用 TITLE_WEIGHT 个不同的初值各算一次（相当于加权），再并上简答开头的 shingle"""
+    hashes = set()
+    for salt in range(1, TITLE_WEIGHT + 1):
+        hashes.update(shingle_hashes(candidate.title, salt=salt))
+    hashes.update(shingle_hashes(candidate.brief_answer[:BRIEF_ANSWER_CHARS]))
+    return hashes
+
+
+class MinHasher:
+    """multiply-shift 哈希族 h(x) = ((a * x + b) mod 2^64) >> 32，uint64 乘法自然回绕，不需要取模"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=20240601):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signatures(self, hash_sets, batch_tokens=SIGNATURE_BATCH_TOKENS):
+        """返回 (len(hash_sets), num_perm) 的 uint32 签名矩阵；按 token 总数分批，一批只做一次矩阵运算"""
+        matrix = np.full((len(hash_sets), self.num_perm), EMPTY_SIGNATURE, dtype=np.uint32)
+        start = 0
+        while start < len(hash_sets):
+            stop, tokens = start, 0
+            while stop < len(hash_sets) and (stop == start or tokens + len(hash_sets[stop]) <= batch_tokens):
+                tokens += len(hash_sets[stop])
+                stop += 1
+            self._fill(matrix, hash_sets, start, stop)
+            start = stop
+        return matrix
+
+    def _fill(self, matrix, hash_sets, start, stop):
+        rows = [index for index in range(start, stop) if hash_sets[index]]
+        if not rows:
+            return
+        lengths = np.fromiter((len(hash_sets[index]) for index in rows), dtype=np.int64, count=len(rows))
+        hashes = np.fromiter(
+            (value for index in rows for value in hash_sets[index]), dtype=np.uint64, count=int(lengths.sum()),
+        )
+        permuted = ((self._a * hashes + self._b) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        matrix[rows] = np.minimum.reduceat(permuted, offsets, axis=1).T
+
+
+def signature_similarity(left, right):
+    """两个签名相同位置取值相等的比例，即 Jaccard 相似度的无偏估计"""
+    return float(np.count_nonzero(left == right)) / len(left)
+
+
+def candidate_pairs(groups, signatures, bands=BANDS):
+    """
+    LSH：签名切成 bands 段，同组内任意一段完全相同的两题成为候选对。
+
+    每段的 rows 个取值混合成一个 uint64，按 (组, 段哈希) 排序后相邻相等的即同桶，不需要逐题建字典。
+    """
+    count = len(groups)
+    if count < 2:
+        return set()
+    rows = signatures.shape[1] // bands
+    group_ids = {group: index for index, group in enumerate(sorted(set(groups)))}
+    group_column = np.fromiter((group_ids[group] for group in groups), dtype=np.uint64, count=count)
+    # 没有任何 shingle 的题目签名全是同一个值，各自单独成组，避免彼此误判为重复
+    empty = np.flatnonzero((signatures == EMPTY_SIGNATURE).all(axis=1))
+    group_column[empty] = len(group_ids) + np.arange(len(empty), dtype=np.uint64)
+    multipliers = np.random.default_rng(BANDS).integers(1, 1 << 62, size=rows, dtype=np.uint64) | np.uint64(1)
+
+    pairs = set()
+    with np.errstate(over='ignore'):
+        for band in range(bands):
+            chunk = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            keys = (chunk * multipliers).sum(axis=1, dtype=np.uint64)
+            order = np.lexsort((keys, group_column))
+            sorted_keys, sorted_groups = keys[order], group_column[order]
+            same = (sorted_keys[1:] == sorted_keys[:-1]) & (sorted_groups[1:] == sorted_groups[:-1])
+            if not same.any():
+                continue
+            # 连续相等的一段即一个桶，桶内两两成对
+            for run in np.split(order, np.flatnonzero(~same) + 1):
+                if len(run) < 2:
+                    continue
+                members = sorted(run.tolist())
+                for position, left in enumerate(members):
+                    for right in members[position + 1:]:
+                        pairs.add((left, right))
+    return pairs
+
+
+def find_near_duplicates(candidates, signatures=None, threshold=DEFAULT_THRESHOLD, bands=BANDS, hasher=None):
+    """
+    返回近似重复簇列表（按分类、保留题目的归一化标题排序）。
+
+    candidates 是已经精确去重后的候选（QuestionCandidate 或 QuestionDigest）；
+    signatures 是与之逐行对应的签名矩阵，缺省时按 question_hashes 现算（QuestionDigest 没有正文，必须传入）。
+    """
+    if signatures is None:
+        hasher = hasher or MinHasher()
+        signatures = hasher.signatures([question_hashes(candidate) for candidate in candidates])
+
+    parent = list(range(len(candidates)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    groups = [candidate.category_name for candidate in candidates]
+    for left, right in candidate_pairs(groups, signatures, bands):
+        if signature_similarity(signatures[left], signatures[right]) >= threshold:
+            parent[find(left)] = find(right)
+
+    clustered = {}
+    for index in range(len(candidates)):
+        clustered.setdefault(find(index), []).append(index)
+
+    clusters = []
+    for indexes in clustered.values():
+        if len(indexes) < 2:
+            continue
+        indexes.sort(key=lambda index: str(candidates[index].filepath))
+        winner_index = indexes[0]
+        for index in indexes[1:]:
+            chosen = choose_better_candidate(candidates[winner_index], candidates[index])
+            if chosen is not candidates[winner_index]:
+                winner_index = index
+        similarity = min(
+            signature_similarity(signatures[winner_index], signatures[index])
+            for index in indexes if index != winner_index
+        )
+        clusters.append(NearDuplicateCluster(
+            winner=candidates[winner_index],
+            members=[candidates[index] for index in indexes],
+            similarity=round(similarity, 3),
+        ))
+    clusters.sort(key=lambda cluster: (cluster.winner.category_name, cluster.winner.normalized_title))
+    return clusters
+
+
+def merge_near_duplicates(candidates, signatures=None, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+    """去掉近似重复簇中未胜出的候选，返回 (保留的候选（保持原顺序）, 簇列表)"""
+    clusters = find_near_duplicates(candidates, signatures, threshold=threshold, bands=bands)
+    losers = {id(loser) for cluster in clusters for loser in cluster.losers}
+    return [candidate for candidate in candidates if id(candidate) not in losers], clusters
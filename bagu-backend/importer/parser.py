@@ -1,5 +1,10 @@
-"""Markdown 八股文解析器。"""
+"""Markdown 八股文解析器。
 
+正文由 scan_markdown 单次遍历完成：顶部链接行 / 语雀元信息代码块 / 源链接 / 一级标题 /
+## 分段 / 首段 / 关键要点都在同一趟逐行扫描里得到，正则全部预编译。
+"""
+
+from dataclasses import dataclass, field
 from pathlib import Path
 import re
 
@@ -15,205 +20,232 @@ META_LINE_PATTERN = re.compile(r'^\s*([A-Za-z0-9_\-\u4e00-\u9fa5]+)\s*:\s*(.*?)\
 TITLE_PREFIX_PATTERN = re.compile(
     r'^\s*(?:[✅☑✔️]\s*)*(?:(?:\(?\d+\)?|[一二三四五六七八九十]+)\s*[.、,，:：)\）]\s*)*'
 )
+CHECK_MARK_PATTERN = re.compile(r'^\s*[✅☑✔️]+\s*')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+KEY_POINT_PATTERN = re.compile(r'^(?:[-*]|\d+[.、)])\s+(.+)$')
+BOLD_PATTERN = re.compile(r'\*\*(.+?)\*\*')
+TAG_SPLIT_PATTERN = re.compile(r'[,，]')
 BUSINESS_DOMAINS = ('yuque.com', 'feishu.cn')
+# 源链接只在正文前若干行里找
+SOURCE_URL_SCAN_LINES = 40
+KEY_POINTS_SECTION = '关键要点'
 
 
 def parse_bagu_md(filepath):
     """解析八股文 Markdown 文件，返回结构化数据。"""
     filepath = Path(filepath)
     raw_text = filepath.read_text(encoding='utf-8', errors='ignore')
-    post = frontmatter.loads(raw_text)
-
-    meta = dict(post.metadata or {})
-    content = post.content or ''
-
-    fenced_meta, content = _extract_fenced_meta(content)
-    merged_meta = {**fenced_meta, **meta}
+    meta, content = frontmatter.parse(raw_text)
+    meta = dict(meta or {})
 
-    title = _extract_title(merged_meta, content, filepath.stem)
-    source_url = _extract_source_url(merged_meta, content)
-    clean_content = _strip_leading_source_lines(content)
-    sections = _split_sections(clean_content)
+    scan = scan_markdown(content or '')
+    merged_meta = {**scan.fenced_meta, **meta}
 
-    brief_answer = sections.get('回答话术', '').strip()
-    if not brief_answer:
-        brief_answer = _extract_first_paragraph(clean_content)
+    title = str(merged_meta.get('title') or '').strip() or scan.title or filepath.stem
+    source_url = scan.business_url or _meta_source_url(merged_meta) or scan.first_url
 
-    detailed_answer = sections.get('问题详解', '').strip()
-    if not detailed_answer:
-        detailed_answer = clean_content.strip()
-
-    key_points = _extract_key_points(sections.get('关键要点', ''))
-    tags = _normalize_tags(merged_meta.get('tags', []))
+    brief_answer = scan.sections.get('回答话术', '').strip() or scan.first_paragraph
+    detailed_answer = scan.sections.get('问题详解', '').strip() or scan.body
 
     return {
-        'title': title,
+        'title': _clean_title(title),
         'brief_answer': brief_answer,
         'detailed_answer': detailed_answer,
-        'key_points': key_points,
+        'key_points': scan.key_points,
         'source_url': source_url,
-        'tags': tags,
+        'tags': _normalize_tags(merged_meta.get('tags', [])),
     }
 
 
-def _extract_source_url(meta, content):
-    # 优先取正文前部业务链接（飞书/语雀导出格式）
-    business_url = _extract_first_url(content, business_only=True)
-    if business_url:
-        return business_url
+@dataclass
+class MarkdownScan:
+    fenced_meta: dict = field(default_factory=dict)
+    title: str = ''  # 代码块外的第一个一级标题
+    business_url: str = ''  # 前 40 行里第一个飞书/语雀链接
+    first_url: str = ''  # 前 40 行里第一个任意链接
+    body: str = ''  # 去掉顶部链接行后的正文
+    sections: dict = field(default_factory=dict)
+    first_paragraph: str = ''  # 正文第一个非标题、不含链接的段落
+    key_points: list = field(default_factory=list)
 
-    # 回退到 frontmatter/source 字段
-    source_meta = meta.get('source', '')
-    if isinstance(source_meta, list):
-        for item in source_meta:
-            cleaned = _clean_url(str(item))
-            if cleaned:
-                return cleaned
-    else:
-        cleaned = _clean_url(str(source_meta))
-        if cleaned:
-            return cleaned
 
-    # 最后回退正文前部任意链接，兼容历史样本
-    return _extract_first_url(content, business_only=False)
+def scan_markdown(content):
+    """
+    单次逐行扫描正文。
 
-
-def _extract_title(meta, content, fallback_stem):
-    title = str(meta.get('title') or '').strip()
-    if not title:
-        title = _extract_first_h1_outside_fence(content) or fallback_stem
-    return _clean_title(title)
-
-
-def _clean_title(title):
-    title = re.sub(r'^\s*[✅☑✔️]+\s*', '', title or '')
-    title = TITLE_PREFIX_PATTERN.sub('', title)
-    title = re.sub(r'\s+', ' ', title).strip()
-    return title or '未命名题目'
-
-
-def _extract_fenced_meta(content):
-    """解析语雀导出中顶部代码块元信息。"""
+    顶部的空行 / 链接行属于"前导区"：前导区后紧跟的代码块若含 key: value 行，视为语雀元信息并从正文移除，
+    移除后紧接的空行 / 链接行仍属于前导区。前导区之后才是正文（分段、首段、关键要点都只看正文）。
+    """
+    scan = MarkdownScan()
     lines = content.split('\n')
+    total = len(lines)
+
+    position = 0  # 移除元信息块后的行号
+    leading = True
+    meta_checked = False
+    title_fence = False
+    title_found = False  # 与旧实现一致：只看代码块外的第一个一级标题，即使它是空标题
+    body = []
+    section = None
+    section_lines = []
+    section_points = []
+    pending_header = None  # 只有 "##" 加空白的行：若是正文最后一行则按普通文本处理
+    paragraph = []
+    paragraph_done = False
+
+    def close_section():
+        if section:
+            scan.sections[section] = '\n'.join(section_lines).strip()
+            if section == KEY_POINTS_SECTION:
+                scan.key_points = list(section_points)
+
+    def close_paragraph():
+        nonlocal paragraph_done
+        text = '\n'.join(paragraph).strip()
+        paragraph.clear()
+        if text and not text.startswith('#') and not URL_PATTERN.search(text):
+            scan.first_paragraph = text
+            paragraph_done = True
+
+    def add_section_line(line, stripped):
+        section_lines.append(line)
+        if section == KEY_POINTS_SECTION:
+            match = KEY_POINT_PATTERN.match(stripped)
+            if match:
+                point = BOLD_PATTERN.sub(r'\1', match.group(1).strip())
+                if point:
+                    section_points.append(point)
+
     idx = 0
-    while idx < len(lines):
-        stripped = lines[idx].strip()
-        if not stripped:
-            idx += 1
-            continue
-        # 兼容语雀“首行链接 + 元数据代码块”格式
-        if TOP_URL_PATTERN.match(stripped) or _extract_url_from_text(stripped):
-            idx += 1
-            continue
-        break
-
-    if idx >= len(lines) or not FENCE_OPEN_PATTERN.match(lines[idx]):
-        return {}, content
-
-    close_idx = idx + 1
-    while close_idx < len(lines):
+    while idx < total:
+        line = lines[idx]
+        stripped = line.strip()
+
+        if leading and not _is_leading_line(stripped):
+            if not meta_checked:
+                meta_checked = True
+                if FENCE_OPEN_PATTERN.match(line):
+                    fenced_meta, close_idx = _read_fenced_meta(lines, idx)
+                    if fenced_meta:
+                        scan.fenced_meta = fenced_meta
+                        idx = close_idx + 1
+                        if position == 0:
+                            # 元信息块前没有内容时，块后的空行会被一并去掉
+                            while idx < total and lines[idx] == '':
+                                idx += 1
+                        continue
+            leading = False
+
+        if position < SOURCE_URL_SCAN_LINES and stripped and not scan.business_url:
+            business_url, any_url = _line_urls(stripped)
+            scan.business_url = business_url
+            if not scan.first_url:
+                scan.first_url = any_url
+        position += 1
+
+        # 先用首字符过滤，只有可能命中的行才跑正则
+        if not title_found and stripped[:1] in ('#', '`'):
+            if FENCE_OPEN_PATTERN.match(stripped):
+                title_fence = not title_fence
+            elif not title_fence:
+                match = H1_LINE_PATTERN.match(line)
+                if match:
+                    title_found = True
+                    scan.title = match.group(1).strip()
+
+        if not leading:
+            body.append(line)
+            if stripped and pending_header is not None:
+                close_section()
+                section, section_lines, section_points = '', [], []
+                pending_header = None
+            match = SECTION_PATTERN.match(line) if stripped.startswith('##') else None
+            if match:
+                name = match.group(1).strip()
+                if name:
+                    close_section()
+                    section, section_lines, section_points = name, [], []
+                else:
+                    pending_header = line
+            elif pending_header is None:
+                if section == KEY_POINTS_SECTION:
+                    add_section_line(line, stripped)
+                else:
+                    section_lines.append(line)
+
+            if not paragraph_done:
+                if stripped:
+                    paragraph.append(line)
+                elif paragraph:
+                    close_paragraph()
+        idx += 1
+
+    if pending_header is not None:
+        add_section_line(pending_header.rstrip(), pending_header.strip())
+    close_section()
+    if not paragraph_done and paragraph:
+        close_paragraph()
+    scan.body = '\n'.join(body).strip()
+    return scan
+
+
+def _is_leading_line(stripped):
+    """顶部可跳过的行：空行或链接行"""
+    return not stripped or bool(TOP_URL_PATTERN.match(stripped)) or bool(URL_PATTERN.search(stripped))
+
+
+def _read_fenced_meta(lines, start):
+    """读取 start 处代码块里的 key: value 行；未闭合或没有元信息行时返回 ({}, None)"""
+    for close_idx in range(start + 1, len(lines)):
         if FENCE_CLOSE_PATTERN.match(lines[close_idx]):
             break
-        close_idx += 1
-
-    if close_idx >= len(lines):
-        return {}, content
+    else:
+        return {}, None
 
-    block = lines[idx + 1:close_idx]
     parsed = {}
-    valid_pairs = 0
-    for raw_line in block:
+    for raw_line in lines[start + 1:close_idx]:
         match = META_LINE_PATTERN.match(raw_line)
-        if not match:
-            continue
-        key = match.group(1).strip().lower()
-        value = match.group(2).strip()
-        parsed[key] = value
-        valid_pairs += 1
+        if match:
+            parsed[match.group(1).strip().lower()] = match.group(2).strip()
+    return parsed, close_idx
 
-    # 非 metadata 代码块（比如示例代码）不应吞掉正文
-    if valid_pairs == 0:
-        return {}, content
 
-    remain = '\n'.join(lines[:idx] + lines[close_idx + 1:]).lstrip('\n')
-    return parsed, remain
+def _line_urls(stripped):
+    """返回该行的 (业务链接, 任意链接)，规则：先看 "链接：" 前缀，再看行内第一个 URL"""
+    prefixed = TOP_URL_PATTERN.match(stripped)
+    prefixed_url = _clean_url(prefixed.group(1)) if prefixed else ''
+    text_url = _extract_url_from_text(stripped)
+    if prefixed_url and _is_business_url(prefixed_url):
+        business_url = prefixed_url
+    else:
+        business_url = text_url if text_url and _is_business_url(text_url) else ''
+    return business_url, prefixed_url or text_url
 
 
-def _strip_leading_source_lines(content):
-    lines = content.split('\n')
-    idx = 0
-    while idx < len(lines):
-        stripped = lines[idx].strip()
-        if not stripped:
-            idx += 1
-            continue
-        if TOP_URL_PATTERN.match(stripped):
-            idx += 1
-            continue
-        if _extract_url_from_text(stripped):
-            idx += 1
-            continue
-        break
-    return '\n'.join(lines[idx:]).strip()
-
-
-def _split_sections(content):
-    """按 ## 标题分割内容为 dict。"""
-    sections = {}
-    current_section = None
-    current_lines = []
-
-    for line in content.split('\n'):
-        h2_match = SECTION_PATTERN.match(line)
-        if h2_match:
-            if current_section:
-                sections[current_section] = '\n'.join(current_lines).strip()
-            current_section = h2_match.group(1).strip()
-            current_lines = []
-            continue
-        current_lines.append(line)
-
-    if current_section:
-        sections[current_section] = '\n'.join(current_lines).strip()
-
-    return sections
-
-
-def _extract_first_h1_outside_fence(content):
-    in_fence = False
-    for line in content.split('\n'):
-        if FENCE_OPEN_PATTERN.match(line.strip()):
-            in_fence = not in_fence
-            continue
-        if in_fence:
-            continue
-        match = H1_LINE_PATTERN.match(line)
-        if match:
-            return match.group(1).strip()
-    return ''
-
-
-def _extract_key_points(text):
-    """从关键要点部分提取要点列表。"""
-    if not text:
-        return []
-    points = []
-    for line in text.split('\n'):
-        match = re.match(r'^(?:[-*]|\d+[.、)])\s+(.+)$', line.strip())
-        if not match:
-            continue
-        point = match.group(1).strip()
-        point = re.sub(r'\*\*(.+?)\*\*', r'\1', point)
-        if point:
-            points.append(point)
-    return points
+def _meta_source_url(meta):
+    """frontmatter/元信息里的 source 字段"""
+    source_meta = meta.get('source', '')
+    if isinstance(source_meta, list):
+        for item in source_meta:
+            cleaned = _clean_url(str(item))
+            if cleaned:
+                return cleaned
+        return ''
+    return _clean_url(str(source_meta))
+
+
+def _clean_title(title):
+    title = CHECK_MARK_PATTERN.sub('', title or '')
+    title = TITLE_PREFIX_PATTERN.sub('', title)
+    title = WHITESPACE_PATTERN.sub(' ', title).strip()
+    return title or '未命名题目'
 
 
 def _normalize_tags(tags):
     if isinstance(tags, list):
         raw_items = tags
     elif isinstance(tags, str):
-        raw_items = re.split(r'[,，]', tags)
+        raw_items = TAG_SPLIT_PATTERN.split(tags)
     else:
         raw_items = []
 
@@ -225,41 +257,6 @@ def _normalize_tags(tags):
     return normalized
 
 
-def _extract_first_paragraph(content):
-    blocks = re.split(r'\n\s*\n', content.strip())
-    for block in blocks:
-        text = block.strip()
-        if not text:
-            continue
-        if text.startswith('#'):
-            continue
-        if _extract_url_from_text(text):
-            continue
-        return text
-    return ''
-
-
-def _extract_first_url(content, business_only):
-    for raw_line in content.split('\n')[:40]:
-        line = raw_line.strip()
-        if not line:
-            continue
-
-        prefixed = TOP_URL_PATTERN.match(line)
-        if prefixed:
-            candidate = _clean_url(prefixed.group(1))
-            if candidate and (not business_only or _is_business_url(candidate)):
-                return candidate
-
-        candidate = _extract_url_from_text(line)
-        if not candidate:
-            continue
-        if business_only and not _is_business_url(candidate):
-            continue
-        return candidate
-    return ''
-
-
 def _extract_url_from_text(text):
     match = URL_PATTERN.search(text or '')
     if not match:
@@ -1,13 +1,21 @@
+import sys
+from io import StringIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
 
 import importer.importer as importer_service
-from importer.parser import parse_bagu_md
-from questions.models import Category, Question
+from importer.benchmark import benchmark_parser, load_builtin_questions, render_corpus
+from importer.parser import parse_bagu_md, scan_markdown
+from importer.watcher import InotifyWatcher, PollingWatcher, collect_changes, watch_and_sync
+from importer.incremental import sync_sources
+from importer.near_dedupe import find_near_duplicates, merge_near_duplicates
+from practice.models import AnswerRecord
+from questions.models import Category, Question, QuestionSourceFile, UserQuestionProgress
 from users.models import BaguUser, UserProfile
 
 
@@ -46,6 +54,14 @@ class ParserTests(TestCase):
         self.assertEqual(data['brief_answer'], '正文第一段。')
         self.assertIn('正文第一段。', data['detailed_answer'])
 
+    def test_blank_first_h1_falls_back_to_filename(self):
+        with TemporaryDirectory() as tmp:
+            md = Path(tmp) / '1. Redis为什么这么快？.md'
+            write_file(md, '#  \n\n# 正文里的标题\n\n正文第一段。')
+            data = parse_bagu_md(md)
+
+        self.assertEqual(data['title'], 'Redis为什么这么快？')
+
     def test_parse_yuque_fenced_meta_and_sections(self):
         with TemporaryDirectory() as tmp:
             md = Path(tmp) / 'sample.md'
@@ -135,6 +151,32 @@ class ParserTests(TestCase):
         self.assertEqual(data['source_url'], 'https://www.yuque.com/magestack/open8gu/oegct3ayo729baqc')
         self.assertEqual(data['tags'], ['持久化'])
 
+    def test_scan_key_points_from_last_section_and_first_paragraph(self):
+        scan = scan_markdown(
+            '链接：https://nageoffer.feishu.cn/wiki/kp\n\n'
+            '# 标题\n\n'
+            '含链接的段落 https://example.com\n\n'
+            '真正的首段。\n\n'
+            '## 关键要点\n- 旧要点\n'
+            '## 关键要点\n- **新要点**\n2) 第二条\n'
+        )
+
+        self.assertEqual(scan.business_url, 'https://nageoffer.feishu.cn/wiki/kp')
+        self.assertEqual(scan.title, '标题')
+        self.assertEqual(scan.first_paragraph, '真正的首段。')
+        self.assertEqual(scan.key_points, ['新要点', '第二条'])
+
+    def test_benchmark_parser_over_builtin_corpus(self):
+        with TemporaryDirectory() as tmp:
+            paths = render_corpus(tmp, limit=4)
+            parsed = [parse_bagu_md(path) for path in paths]
+            result = benchmark_parser(paths, rounds=2)
+
+        self.assertEqual(result['files'], 4)
+        self.assertGreater(result['files_per_second'], 0)
+        self.assertTrue(all(item['source_url'].startswith('http') for item in parsed))
+        self.assertEqual(parsed[1]['title'], load_builtin_questions(limit=2)[1]['title'])
+
 
 class ImporterFlowTests(TestCase):
     def test_cache_category_normalized_to_redis(self):
@@ -217,6 +259,26 @@ class ImporterFlowTests(TestCase):
         self.assertEqual(len(summary['errors']), 1)
         self.assertIn('缺少 source_url', summary['errors'][0])
 
+    def test_parallel_parsing_matches_sequential_order(self):
+        with TemporaryDirectory() as tmp:
+            source_dir = Path(tmp)
+            for idx in range(40):
+                category = ['Redis', 'Java并发', 'Kafka'][idx % 3]
+                body = '没有链接' if idx % 7 == 0 else f'https://www.yuque.com/magestack/open8gu/q{idx}\n正文 {idx}'
+                write_file(source_dir / category / f'子类{idx % 2}' / f'{idx:02d}. 题目{idx}？.md', body)
+
+            sequential, sequential_stats = importer_service.collect_candidates_from_directory(
+                source_dir, source_name='yuque', require_source_url=True,
+            )
+            parallel, parallel_stats = importer_service.collect_candidates_from_directory(
+                source_dir, source_name='yuque', require_source_url=True, jobs=3,
+            )
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel_stats, sequential_stats)
+        self.assertEqual(len(parallel), 34)
+        self.assertEqual(len(parallel_stats['errors']), 6)
+
 
 class RebuildCommandTests(TestCase):
     def test_rebuild_questions_fail_does_not_clear_existing_data(self):
@@ -244,16 +306,21 @@ class RebuildCommandTests(TestCase):
         self.assertTrue(Category.objects.filter(name='旧分类').exists())
         self.assertTrue(Question.objects.filter(title='旧题目').exists())
 
-    def test_rebuild_questions_success_and_reset_user_stats(self):
+    def test_rebuild_questions_swaps_catalog_and_keeps_answer_records(self):
         old_category = Category.objects.create(name='旧分类', icon='book')
-        Question.objects.create(category=old_category, title='旧题目', source_url='https://open8gu.com/old')
+        old_question = Question.objects.create(
+            category=old_category, title='旧题目', source_url='https://open8gu.com/old',
+        )
+        redis = Category.objects.create(name='Redis', icon='book')
+        kept = Question.objects.create(category=redis, title='Redis为什么这么快?', detailed_answer='旧正文')
 
         user = BaguUser.objects.create(
             username='tester',
             nickname='测试用户',
-            total_answers=8,
-            avg_score=86.5,
+            total_answers=2,
+            avg_score=70.0,
         )
+        other = BaguUser.objects.create(username='other', total_answers=1, avg_score=90.0)
         profile = UserProfile.objects.create(
             user=user,
             category_scores={'旧分类': 90},
@@ -262,6 +329,10 @@ class RebuildCommandTests(TestCase):
             suggestions=['旧建议'],
             overall_level='advanced',
         )
+        other_profile = UserProfile.objects.create(user=other, strengths=['缓存'], overall_level='advanced')
+        AnswerRecord.objects.create(user=user, question=old_question, user_answer='旧回答', ai_score=60)
+        kept_record = AnswerRecord.objects.create(user=user, question=kept, user_answer='回答', ai_score=80)
+        AnswerRecord.objects.create(user=other, question=kept, user_answer='回答', ai_score=90)
 
         with TemporaryDirectory() as tmp:
             root = Path(tmp)
@@ -285,15 +356,21 @@ class RebuildCommandTests(TestCase):
                 'https://www.yuque.com/magestack/open8gu/redis-fast\nRedis 正文。',
             )
 
+            output = StringIO()
             call_command(
                 'rebuild_questions',
                 feishu_dir=str(feishu_dir),
                 yuque_dir=str(yuque_dir),
+                jobs=2,
+                stdout=output,
             )
 
+        self.assertIn('删除 1 题，重算用户 1 条，重置画像 1 条', output.getvalue())
         self.assertFalse(Category.objects.filter(name='旧分类').exists())
+        self.assertFalse(Question.objects.filter(pk=old_question.pk).exists())
         self.assertEqual(Question.objects.count(), 2)
         self.assertEqual(Question.objects.filter(source_url='').count(), 0)
+        self.assertEqual(Category.objects.get(name='Redis').question_count, 1)
 
         thread_pool = Question.objects.get(title='线程池有哪些应用场景？')
         self.assertEqual(
@@ -301,12 +378,447 @@ class RebuildCommandTests(TestCase):
             'https://www.yuque.com/magestack/open8gu/thread-pool',
         )
 
+        # 同一稳定键的题目原地更新，答题记录仍指向它
+        kept.refresh_from_db()
+        self.assertEqual(kept.title, 'Redis为什么这么快？')
+        self.assertEqual(kept.detailed_answer, 'Redis 正文。')
+        self.assertEqual(AnswerRecord.objects.get(pk=kept_record.pk).question_id, kept.pk)
+
         user.refresh_from_db()
+        other.refresh_from_db()
         profile.refresh_from_db()
-        self.assertEqual(user.total_answers, 0)
-        self.assertEqual(user.avg_score, 0.0)
+        other_profile.refresh_from_db()
+        self.assertEqual((user.total_answers, user.avg_score), (1, 80.0))
+        self.assertEqual((other.total_answers, other.avg_score), (1, 90.0))
         self.assertEqual(profile.category_scores, {})
         self.assertEqual(profile.strengths, [])
         self.assertEqual(profile.weaknesses, [])
         self.assertEqual(profile.suggestions, [])
         self.assertEqual(profile.overall_level, 'beginner')
+        self.assertEqual(other_profile.overall_level, 'advanced')
+
+
+class IncrementalImportTests(TestCase):
+    def test_unchanged_files_are_not_parsed_again(self):
+        with TemporaryDirectory() as tmp:
+            source_dir = Path(tmp)
+            write_file(source_dir / 'Redis' / '1. Redis为什么这么快？.md', '单线程 + IO 多路复用。')
+            write_file(source_dir / 'Redis' / '2. 缓存穿透怎么解决？.md', '布隆过滤器。')
+
+            stats, _ = sync_sources([('single', source_dir)])
+            self.assertEqual((stats['created'], stats['added']), (2, 2))
+            self.assertEqual(QuestionSourceFile.objects.filter(question__isnull=False).count(), 2)
+
+            with mock.patch('importer.incremental.parse_markdown_results') as parse:
+                stats, _ = sync_sources([('single', source_dir)])
+            parse.assert_not_called()
+            self.assertEqual(stats['unchanged'], 2)
+            self.assertEqual((stats['created'], stats['skipped'], stats['deleted']), (0, 0, 0))
+
+    def test_modified_and_deleted_files(self):
+        with TemporaryDirectory() as tmp:
+            source_dir = Path(tmp)
+            fast = source_dir / 'Redis' / '1. Redis为什么这么快？.md'
+            penetration = source_dir / 'Redis' / '2. 缓存穿透怎么解决？.md'
+            write_file(fast, '旧答案。')
+            write_file(penetration, '布隆过滤器。')
+            sync_sources([('single', source_dir)])
+            question_id = Question.objects.get(title='Redis为什么这么快？').id
+
+            write_file(fast, '新答案：单线程 + IO 多路复用。')
+            penetration.unlink()
+            stats, _ = sync_sources([('single', source_dir)], prune=True)
+
+        self.assertEqual((stats['modified'], stats['removed'], stats['unchanged']), (1, 1, 0))
+        self.assertEqual((stats['skipped'], stats['deleted']), (1, 1))
+        question = Question.objects.get(id=question_id)
+        self.assertIn('新答案', question.detailed_answer)
+        self.assertFalse(Question.objects.filter(title='缓存穿透怎么解决？').exists())
+        self.assertEqual(QuestionSourceFile.objects.count(), 1)
+        self.assertEqual(Category.objects.get(name='Redis').question_count, 1)
+
+    def test_deleted_file_keeps_question_without_prune(self):
+        with TemporaryDirectory() as tmp:
+            source_dir = Path(tmp)
+            penetration = source_dir / 'Redis' / '2. 缓存穿透怎么解决？.md'
+            write_file(penetration, '布隆过滤器。')
+            sync_sources([('single', source_dir)])
+            question = Question.objects.get(title='缓存穿透怎么解决？')
+            user = BaguUser.objects.create(username='tester', nickname='测试用户')
+            record = AnswerRecord.objects.create(user=user, question=question, user_answer='回答', ai_score=80)
+
+            penetration.unlink()
+            stats, _ = sync_sources([('single', source_dir)])
+
+        self.assertEqual((stats['removed'], stats['deleted'], stats['orphaned']), (1, 0, 1))
+        self.assertTrue(Question.objects.filter(id=question.id).exists())
+        self.assertTrue(AnswerRecord.objects.filter(id=record.id).exists())
+        self.assertEqual(QuestionSourceFile.objects.count(), 0)
+
+    def test_rebuild_reevaluates_dedupe_for_affected_key(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            feishu_dir = root / 'feishu'
+            yuque_dir = root / 'yuque'
+            write_file(
+                feishu_dir / 'Java并发' / '1. 线程池有哪些应用场景？.md',
+                'https://nageoffer.feishu.cn/wiki/thread-pool\n飞书版本。',
+            )
+            yuque_file = yuque_dir / '并发编程' / '✅ 线程池有哪些应用场景？.md'
+            write_file(yuque_file, 'https://www.yuque.com/magestack/open8gu/thread-pool\n语雀版本。')
+            write_file(
+                yuque_dir / 'Redis' / '✅ Redis为什么这么快？.md',
+                'https://www.yuque.com/magestack/open8gu/redis-fast\nRedis 正文。',
+            )
+            options = {'feishu_dir': str(feishu_dir), 'yuque_dir': str(yuque_dir), 'stdout': StringIO()}
+
+            call_command('rebuild_questions', **options)
+            thread_pool = Question.objects.get(title='线程池有哪些应用场景？')
+            self.assertIn('yuque.com', thread_pool.source_url)
+            user = BaguUser.objects.create(username='tester', nickname='测试用户', total_answers=3)
+
+            yuque_file.unlink()
+            call_command('rebuild_questions', **options)
+
+        self.assertIn('增量同步', options['stdout'].getvalue())
+        thread_pool.refresh_from_db()
+        self.assertEqual(thread_pool.source_url, 'https://nageoffer.feishu.cn/wiki/thread-pool')
+        self.assertEqual(Question.objects.count(), 2)
+        user.refresh_from_db()
+        self.assertEqual(user.total_answers, 3)
+        self.assertEqual(
+            QuestionSourceFile.objects.filter(question=thread_pool).values_list('source_name', flat=True).get(),
+            'feishu',
+        )
+
+
+def make_candidate(title, category_name='Redis', sub_category_name=None, **fields):
+    values = {
+        'source_name': 'single',
+        'filepath': Path(f'/vault/{category_name}/{title}.md'),
+        'raw_category': category_name,
+        'raw_sub_category': sub_category_name,
+        'category_name': category_name,
+        'sub_category_name': sub_category_name,
+        'title': title,
+        'normalized_title': importer_service.normalize_title_for_dedupe(title),
+        'brief_answer': '',
+        'detailed_answer': f'{title} 详解',
+        'key_points': [],
+        'source_url': '',
+        'tags': [],
+    }
+    values.update(fields)
+    return importer_service.QuestionCandidate(**values)
+
+
+class BulkImportTests(TestCase):
+    def test_query_count_does_not_grow_with_candidates(self):
+        candidates = [
+            make_candidate(f'题目{index}', category_name=f'分类{index % 3}', sub_category_name=f'子类{index % 2}')
+            for index in range(60)
+        ]
+        with self.assertNumQueries(13):
+            stats = importer_service.import_candidates(candidates)
+
+        self.assertEqual((stats['created'], stats['skipped'], stats['errors']), (60, 0, []))
+        self.assertEqual(len(stats['question_ids']), 60)
+        self.assertEqual(Question.objects.count(), 60)
+        self.assertEqual(
+            sorted(Category.objects.values_list('question_count', flat=True)), [20, 20, 20],
+        )
+
+    def test_updates_only_changed_questions_and_keeps_ids(self):
+        importer_service.import_candidates([make_candidate('甲'), make_candidate('乙')])
+        first = Question.objects.get(title='甲')
+        second_updated_at = Question.objects.get(title='乙').updated_at
+
+        stats = importer_service.import_candidates([
+            make_candidate('甲', detailed_answer='新的详解', sub_category_name='热门'),
+            make_candidate('乙'),
+        ])
+
+        self.assertEqual((stats['created'], stats['skipped']), (0, 2))
+        self.assertEqual(stats['question_ids'][('Redis', '甲')], first.id)
+        first.refresh_from_db()
+        self.assertEqual(first.detailed_answer, '新的详解')
+        self.assertEqual(first.detailed_html, '<p>新的详解</p>')
+        self.assertEqual(first.sub_category.name, '热门')
+        self.assertEqual(Question.objects.get(title='乙').updated_at, second_updated_at)
+        self.assertEqual(Question.objects.get(title='乙').detailed_html, '<p>乙 详解</p>')
+
+    def test_invalid_candidate_is_reported_without_blocking_others(self):
+        stats = importer_service.import_candidates([
+            make_candidate('正常题目'),
+            make_candidate('长' * 201),
+        ])
+
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(len(stats['errors']), 1)
+        self.assertIn('title', stats['errors'][0])
+        self.assertEqual(Category.objects.get(name='Redis').question_count, 1)
+
+
+class LowMemoryImportTests(TestCase):
+    def _write_vault(self, root):
+        write_file(
+            root / 'feishu' / 'Redis' / '1. Redis为什么这么快？.md',
+            'https://nageoffer.feishu.cn/wiki/redis-fast\n飞书版本，内容更长更长更长。',
+        )
+        write_file(
+            root / 'yuque' / 'Redis' / '✅ Redis为什么这么快？.md',
+            'https://www.yuque.com/magestack/open8gu/redis-fast\n语雀版本。',
+        )
+        # 同来源同长度：路径靠前的胜出
+        write_file(root / 'yuque' / 'Redis' / 'a' / '✅ 持久化.md', 'https://www.yuque.com/x/aof\n正文甲。')
+        write_file(root / 'yuque' / 'Redis' / 'b' / '✅ 持久化.md', 'https://www.yuque.com/x/rdb\n正文乙。')
+        for index in range(5):
+            write_file(
+                root / 'feishu' / 'MySQL' / f'{index}. 索引问题{index}？.md',
+                f'https://nageoffer.feishu.cn/wiki/index-{index}\n正文 {index}。',
+            )
+        return [('feishu', root / 'feishu'), ('yuque', root / 'yuque')]
+
+    def _snapshot(self):
+        return list(Question.objects.order_by('category__name', 'title').values_list(
+            'category__name', 'sub_category__name', 'title', 'source_url', 'detailed_answer',
+        ))
+
+    def test_low_memory_sync_matches_in_memory_sync(self):
+        with TemporaryDirectory() as tmp:
+            source_dirs = self._write_vault(Path(tmp))
+            options = {'require_source_url': True, 'require_business_source': True}
+
+            stats, _ = sync_sources(source_dirs, **options)
+            expected = self._snapshot()
+            self.assertEqual(stats['created'], 7)
+            Category.objects.all().delete()
+            QuestionSourceFile.objects.all().delete()
+
+            with mock.patch('importer.incremental.IMPORT_BATCH_SIZE', 2):
+                stats, plan = sync_sources(source_dirs, low_memory=True, **options)
+
+        self.assertEqual(stats['created'], 7)
+        self.assertEqual(stats['errors'], [])
+        self.assertTrue(all(isinstance(item, importer_service.QuestionDigest) for item in plan.winners))
+        self.assertEqual(self._snapshot(), expected)
+        self.assertIn(('Redis', 'a', '持久化', 'https://www.yuque.com/x/aof', '正文甲。'), expected)
+        self.assertEqual(Category.objects.get(name='数据库').question_count, 5)
+        self.assertEqual(QuestionSourceFile.objects.filter(question__isnull=True).count(), 0)
+
+    def test_deduplicate_is_independent_of_input_order(self):
+        candidates = [
+            make_candidate('题', filepath=Path(f'/vault/{name}.md'), detailed_answer=answer)
+            for name, answer in [('c', '长度四四'), ('a', '长度四四'), ('b', '短'), ('d', '长度四四')]
+        ]
+        for ordering in (candidates, candidates[::-1], candidates[1:] + candidates[:1]):
+            winners = importer_service.deduplicate_candidates(ordering)
+            self.assertEqual([winner.filepath for winner in winners], [Path('/vault/a.md')])
+
+
+class NearDuplicateTests(TestCase):
+    def test_clusters_pick_winner_by_source_priority(self):
+        feishu = make_candidate(
+            'Redis为什么这么快？', source_name='feishu', filepath=Path('/feishu/redis.md'),
+            brief_answer='基于内存、单线程避免上下文切换、IO 多路复用', detailed_answer='很长的飞书版本' * 10,
+        )
+        yuque = make_candidate(
+            'Redis 为什么那么快', source_name='yuque', filepath=Path('/yuque/redis.md'),
+            brief_answer='基于内存，单线程避免上下文切换，IO多路复用',
+        )
+        other = make_candidate('Redis的持久化机制有哪些？', brief_answer='RDB 和 AOF')
+        same_text_other_category = make_candidate(
+            'Redis为什么这么快？', category_name='缓存', brief_answer='基于内存、单线程避免上下文切换、IO 多路复用',
+        )
+        untitled = [make_candidate('？？', filepath=Path(f'/vault/{index}.md')) for index in range(2)]
+
+        kept, clusters = merge_near_duplicates([feishu, other, yuque, same_text_other_category, *untitled])
+
+        self.assertEqual(len(clusters), 1)
+        self.assertIs(clusters[0].winner, yuque)
+        self.assertEqual(clusters[0].losers, [feishu])
+        self.assertGreaterEqual(clusters[0].similarity, 0.7)
+        self.assertEqual(kept, [other, yuque, same_text_other_category, *untitled])
+
+    def test_builtin_corpus_has_no_false_positive_at_default_threshold(self):
+        candidates = [
+            make_candidate(fields['title'], category_name=str(fields['category']), brief_answer=fields['brief_answer'])
+            for fields in load_builtin_questions()
+        ]
+        for cluster in find_near_duplicates(candidates):
+            titles = {importer_service.normalize_title_for_dedupe(item.title).replace(' ', '') for item in cluster.members}
+            self.assertEqual(len(titles), 1, cluster)
+
+    def test_rebuild_dry_run_reports_clusters(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            write_file(
+                root / 'feishu' / 'Java并发' / '1. ThreadLocal 有哪些扩展实现？.md',
+                'https://nageoffer.feishu.cn/wiki/thread-local\nInheritableThreadLocal 与 TransmittableThreadLocal。',
+            )
+            write_file(
+                root / 'yuque' / '并发编程' / '✅ ThreadLocal有哪些扩展实现.md',
+                'https://www.yuque.com/magestack/open8gu/thread-local\nInheritableThreadLocal、TransmittableThreadLocal。',
+            )
+            write_file(
+                root / 'yuque' / 'Redis' / '✅ Redis为什么这么快？.md',
+                'https://www.yuque.com/magestack/open8gu/redis-fast\nRedis 正文。',
+            )
+            output = StringIO()
+            call_command(
+                'rebuild_questions', feishu_dir=str(root / 'feishu'), yuque_dir=str(root / 'yuque'),
+                dry_run=True, near_dedupe=0.6, stdout=output,
+            )
+            _, plan = sync_sources(
+                [('feishu', root / 'feishu'), ('yuque', root / 'yuque')], low_memory=True, near_dedupe=0.6,
+            )
+
+        text = output.getvalue()
+        self.assertIn('近似重复: 1 组, 合并 1 题', text)
+        self.assertIn('保留 ThreadLocal有哪些扩展实现（yuque）', text)
+        self.assertIn('预计导入 2 题', text)
+        self.assertEqual(sorted(question.title for question in Question.objects.all()), [
+            'Redis为什么这么快？', 'ThreadLocal有哪些扩展实现',
+        ])
+        self.assertEqual(len(plan.near_duplicates), 1)
+
+
+    def test_rebuild_merge_keeps_answer_history(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            write_file(
+                root / 'feishu' / 'Java并发' / '1. ThreadLocal 有哪些扩展实现？.md',
+                'https://nageoffer.feishu.cn/wiki/thread-local\nInheritableThreadLocal 与 TransmittableThreadLocal。',
+            )
+            write_file(
+                root / 'yuque' / '并发编程' / '✅ ThreadLocal有哪些扩展实现.md',
+                'https://www.yuque.com/magestack/open8gu/thread-local\nInheritableThreadLocal、TransmittableThreadLocal。',
+            )
+            options = {'feishu_dir': str(root / 'feishu'), 'yuque_dir': str(root / 'yuque'), 'stdout': StringIO()}
+            call_command('rebuild_questions', **options)
+            loser = Question.objects.get(title='ThreadLocal 有哪些扩展实现？')
+            winner = Question.objects.get(title='ThreadLocal有哪些扩展实现')
+            first = BaguUser.objects.create(username='first')
+            second = BaguUser.objects.create(username='second')
+            for user, question in [(first, loser), (second, winner)]:
+                AnswerRecord.objects.create(user=user, question=question, user_answer='答案', ai_score=80)
+            UserQuestionProgress.objects.create(user=first, question=loser)
+            UserQuestionProgress.objects.create(user=second, question=loser)
+            UserQuestionProgress.objects.create(user=second, question=winner, is_completed=False)
+
+            call_command('rebuild_questions', full=True, near_dedupe=0.6, **options)
+
+        self.assertEqual(list(Question.objects.values_list('id', flat=True)), [winner.id])
+        self.assertEqual(AnswerRecord.objects.filter(question=winner).count(), 2)
+        self.assertEqual(
+            sorted(UserQuestionProgress.objects.filter(question=winner).values_list('user__username', 'is_completed')),
+            [('first', True), ('second', True)],
+        )
+        self.assertIn('合并近似重复 1 题', options['stdout'].getvalue())
+
+
+class WatchSyncTests(TestCase):
+    def test_sync_only_given_paths_and_reevaluate_competitors(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source_dirs = [('feishu', root / 'feishu'), ('yuque', root / 'yuque')]
+            write_file(
+                root / 'feishu' / 'Java并发' / '1. 线程池有哪些应用场景？.md',
+                'https://nageoffer.feishu.cn/wiki/thread-pool\n飞书版本。',
+            )
+            yuque_file = root / 'yuque' / '并发编程' / '✅ 线程池有哪些应用场景？.md'
+            write_file(yuque_file, 'https://www.yuque.com/magestack/open8gu/thread-pool\n语雀版本。')
+            write_file(root / 'yuque' / 'Redis' / '✅ Redis为什么这么快？.md', 'https://www.yuque.com/r\n正文。')
+            sync_sources(source_dirs)
+            question_id = Question.objects.get(title='线程池有哪些应用场景？').id
+
+            yuque_file.unlink()
+            with mock.patch(
+                'importer.incremental.parse_markdown_results', wraps=importer_service.parse_markdown_results,
+            ) as parse:
+                stats, plan = sync_sources(source_dirs, paths=[yuque_file.resolve()])
+
+        self.assertEqual(plan.scanned, {'feishu': 0, 'yuque': 0})
+        self.assertEqual((stats['removed'], stats['deleted']), (1, 0))
+        self.assertEqual(parse.call_count, 1)
+        question = Question.objects.get(id=question_id)
+        self.assertEqual(question.source_url, 'https://nageoffer.feishu.cn/wiki/thread-pool')
+        self.assertEqual(QuestionSourceFile.objects.get(question=question).source_name, 'feishu')
+
+    def test_parse_error_keeps_existing_question(self):
+        with TemporaryDirectory() as tmp:
+            source_dirs = [('yuque', Path(tmp))]
+            md = Path(tmp) / 'Redis' / '✅ Redis为什么这么快？.md'
+            write_file(md, 'https://www.yuque.com/magestack/open8gu/redis-fast\n正文。')
+            sync_sources(source_dirs, require_source_url=True)
+            question = Question.objects.get()
+
+            write_file(md, '编辑到一半，链接被删掉了。')
+            stats, _ = sync_sources(source_dirs, require_source_url=True, paths=[md.resolve()])
+
+        self.assertEqual(len(stats['errors']), 1)
+        self.assertEqual(stats['deleted'], 0)
+        row = QuestionSourceFile.objects.get()
+        self.assertEqual(row.question_id, question.id)
+        self.assertIn('缺少 source_url', row.error)
+        self.assertTrue(Question.objects.filter(id=question.id).exists())
+
+    def test_polling_watcher_debounces_changes(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            kept = root / 'Redis' / '1. 保留.md'
+            removed = root / 'Redis' / '2. 删除.md'
+            write_file(kept, '旧')
+            write_file(removed, '旧')
+            watcher = PollingWatcher([root], interval=0.01)
+
+            write_file(kept, '新内容')
+            removed.unlink()
+            write_file(root / 'Redis' / 'notes.txt', '不是题目')
+            paths, rescan = collect_changes(watcher, timeout=1, debounce=0.05, max_delay=0.2)
+
+        self.assertEqual(paths, {kept, removed})
+        self.assertFalse(rescan)
+
+    @skipUnless(sys.platform.startswith('linux'), 'inotify 仅 Linux 可用')
+    def test_inotify_watcher_reports_files_and_directory_moves(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / 'Redis').mkdir()
+            watcher = InotifyWatcher([root])
+            try:
+                md = root / 'Redis' / '1. 新题.md'
+                write_file(md, '内容')
+                paths, rescan = collect_changes(watcher, timeout=1, debounce=0.05)
+                self.assertEqual(paths, {md})
+                self.assertFalse(rescan)
+
+                (root / 'Redis').rename(root / '缓存')
+                _, rescan = collect_changes(watcher, timeout=1, debounce=0.05)
+                self.assertTrue(rescan)
+            finally:
+                watcher.close()
+
+    def test_watch_and_sync_applies_batches(self):
+        with TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            md = root / 'Redis' / '1. Redis为什么这么快？.md'
+            write_file(md, '旧答案。')
+            watcher = mock.Mock(kind='fake')
+            watcher.read.side_effect = [({md}, False), (set(), False)]
+            synced = []
+
+            def edit_then_report(stats, paths, rescan):
+                synced.append((stats, paths, rescan))
+                if rescan:
+                    write_file(md, '新答案，内容更长了。')
+
+            watch_and_sync(
+                [('single', root)], watcher=watcher, max_batches=1, on_sync=edit_then_report,
+            )
+
+        self.assertEqual(len(synced), 2)
+        self.assertEqual(synced[0][0]['created'], 1)
+        self.assertEqual((synced[1][0]['modified'], synced[1][2]), (1, False))
+        self.assertIn('新答案', Question.objects.get().detailed_answer)
+        watcher.close.assert_called_once()
@@ -0,0 +1,244 @@
+"""题库目录监听：Linux 下用 inotify（ctypes 调用 libc），不可用时退化为 mtime 轮询。
+
+watcher.read(timeout) 返回 (paths, rescan)：paths 是有变动的 Markdown 文件（含已删除的），
+rescan=True 表示发生了目录级变动（目录移入/移出/删除、事件队列溢出），需要按整目录同步一次。
+collect_changes 负责防抖：收到第一批事件后等到 debounce 秒内没有新事件（最长 max_delay 秒）再合并返回，
+保存一次文件产生的多个事件、批量改名等连续操作只触发一次同步。
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+from django.db import close_old_connections, connection
+
+from .incremental import sync_sources
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _is_markdown(name):
+    return name.lower().endswith('.md')
+
+
+class InotifyWatcher:
+    """递归监听目录树（跳过 . 开头的目录，如 .obsidian），新建的子目录会自动加入监听"""
+    kind = 'inotify'
+
+    def __init__(self, roots):
+        library = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f'inotify_init1 失败: {os.strerror(code)}')
+        self._dirs = {}
+        try:
+            for root in roots:
+                self._watch_tree(Path(root))
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                raise OSError(code, 'inotify 监听数量达到上限（fs.inotify.max_user_watches）')
+            # 目录在遍历过程中被删除，忽略
+            return
+        self._dirs[wd] = path
+
+    def _watch_tree(self, root):
+        if not root.is_dir():
+            return
+        self._add_watch(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for name in dirnames:
+                self._add_watch(Path(dirpath) / name)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set(), False
+
+        paths, rescan = set(), False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    rescan = True
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if path.name.startswith('.'):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._watch_tree(path)
+                    # 目录里的文件不会逐个产生事件，交给整目录同步
+                    rescan = True
+                elif _is_markdown(path.name):
+                    paths.add(path)
+        return paths, rescan
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """按间隔用 os.scandir 比对 (mtime_ns, size) 快照；只 stat .md 文件，不读内容"""
+    kind = 'polling'
+
+    def __init__(self, roots, interval=0.5):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        stack = [str(root) for root in self.roots]
+        while stack:
+            directory = stack.pop()
+            try:
+                iterator = os.scandir(directory)
+            except OSError:
+                continue
+            with iterator:
+                for entry in iterator:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                stack.append(entry.path)
+                        elif _is_markdown(entry.name):
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        continue
+        return snapshot
+
+    def read(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path, signature in current.items() if self._snapshot.get(path) != signature}
+            changed.update(self._snapshot.keys() - current.keys())
+            self._snapshot = current
+            if changed:
+                return {Path(path) for path in changed}, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set(), False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, polling=False, poll_interval=0.5):
+    """优先 inotify，失败（非 Linux、监听数超限等）时退化为轮询"""
+    if not polling and hasattr(os, 'O_CLOEXEC'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as exc:
+            logger.warning('inotify 不可用，改用轮询: %s', exc)
+    return PollingWatcher(roots, interval=poll_interval)
+
+
+def collect_changes(watcher, timeout, debounce=0.3, max_delay=1.0):
+    """阻塞最多 timeout 秒等待变更，收到后防抖合并；返回 (paths, rescan)"""
+    paths, rescan = watcher.read(timeout)
+    if not paths and not rescan:
+        return paths, rescan
+    first_event = time.monotonic()
+    while True:
+        remaining = min(debounce, max_delay - (time.monotonic() - first_event))
+        if remaining <= 0:
+            break
+        more, more_rescan = watcher.read(remaining)
+        if not more and not more_rescan:
+            break
+        paths |= more
+        rescan = rescan or more_rescan
+    return paths, rescan
+
+
+def watch_and_sync(source_dirs, require_source_url=False, require_business_source=False, watcher=None,
+                   debounce=0.3, max_delay=1.0, idle_timeout=60.0, max_batches=None, on_sync=None, prune=False):
+    """
+    先整目录增量同步一次（补上停机期间的改动），之后按防抖后的批次只同步变动的文件。
+
+    on_sync(stats, paths, rescan) 在每次同步后回调；max_batches 用于测试，限制处理的变更批次数；
+    prune 见 apply_sync（默认不删除已无来源的题目）。
+    """
+    options = {
+        'require_source_url': require_source_url, 'require_business_source': require_business_source, 'prune': prune,
+    }
+    source_dirs = [(source_name, Path(source_dir).resolve()) for source_name, source_dir in source_dirs]
+    watcher = watcher or create_watcher([source_dir for _, source_dir in source_dirs])
+    try:
+        stats, _ = sync_sources(source_dirs, **options)
+        if on_sync:
+            on_sync(stats, None, True)
+
+        batches = 0
+        retry = False
+        while max_batches is None or batches < max_batches:
+            paths, rescan = collect_changes(watcher, idle_timeout, debounce=debounce, max_delay=max_delay)
+            rescan = rescan or retry
+            if not paths and not rescan:
+                continue
+            batches += 1
+            if not connection.in_atomic_block:
+                # 长驻进程：像请求开始时一样丢弃失效的数据库连接
+                close_old_connections()
+            try:
+                stats, _ = sync_sources(source_dirs, paths=None if rescan else paths, **options)
+            except Exception:
+                # 单次同步失败（如数据库被锁）不退出；这批路径已丢失，下次（最迟 idle_timeout 后）整目录重新比对
+                logger.exception('题库同步失败')
+                retry = True
+                continue
+            retry = False
+            if on_sync:
+                on_sync(stats, paths, rescan)
+    finally:
+        watcher.close()
@@ -1,13 +1,13 @@
 from django.contrib import admin
-from .models import AnswerRecord, AiModelConfig, AiRoleConfig, EvaluationRound, FollowUpQuestion
+from .models import AnswerRecord, AiModelConfig, AiRoleConfig, AiTaskProfile, EvaluationRound, FollowUpQuestion, GenerationAttempt
 
 
 @admin.register(AnswerRecord)
 class AnswerRecordAdmin(admin.ModelAdmin):
-    list_display = ['user', 'question', 'ai_score', 'ai_model_name', 'created_at']
+    list_display = ['user', 'question', 'ai_score', 'ai_model_name', 'response_ms', 'created_at']
     list_filter = ['ai_model_name', 'created_at']
-    search_fields = ['question__title']
-    readonly_fields = ['created_at']
+    search_fields = ['question__title', 'trace_id']
+    readonly_fields = ['trace_id', 'response_ms', 'created_at']
 
 
 @admin.register(AiModelConfig)
@@ -25,6 +25,14 @@ class AiRoleConfigAdmin(admin.ModelAdmin):
     search_fields = ['name', 'role_key', 'voice', 'role_prompt']
 
 
+@admin.register(AiTaskProfile)
+class AiTaskProfileAdmin(admin.ModelAdmin):
+    list_display = ['task', 'model_config', 'policy', 'temperature', 'max_tokens', 'timeout', 'is_enabled']
+    list_filter = ['policy', 'is_enabled']
+    list_editable = ['model_config', 'policy', 'temperature', 'max_tokens', 'timeout', 'is_enabled']
+    filter_horizontal = ['alternate_models']
+
+
 @admin.register(EvaluationRound)
 class EvaluationRoundAdmin(admin.ModelAdmin):
     list_display = ['user', 'question', 'composite_score', 'model_count', 'completed', 'created_at']
@@ -37,3 +45,10 @@ class FollowUpQuestionAdmin(admin.ModelAdmin):
     list_display = ['answer_record', 'user_question', 'ai_model_name', 'created_at']
     list_filter = ['ai_model_name', 'created_at']
     readonly_fields = ['created_at']
+
+
+@admin.register(GenerationAttempt)
+class GenerationAttemptAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'user', 'question', 'ai_model_name', 'generated_tokens', 'saved_tokens', 'retries', 'duration_ms', 'created_at']
+    list_filter = ['task', 'status', 'ai_model_name', 'created_at']
+    readonly_fields = ['created_at']
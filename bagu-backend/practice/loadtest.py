@@ -0,0 +1,254 @@
+"""SSE 压测驱动 - 回放练习 / PK 工作负载，统计 TTFT、吞吐、分位延迟与数据库锁等待
+
+练习会话：submit-stream 提交答案，按比例继续 follow-up 追问；
+PK 会话：两名用户并发回答同一题，再请求 battle-analysis 对比分析。
+只依赖标准库，通过 HTTP 访问运行中的后端（runserver / gunicorn 均可）。
+"""
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+SUBMIT_PATH = '/api/answers/submit-stream/'
+FOLLOW_UP_PATH = '/api/answers/follow-up/'
+BATTLE_PATH = '/api/answers/battle-analysis/'
+TOKEN_EVENTS = {'thinking', 'content'}
+FOLLOW_UP_QUESTIONS = ['能再展开讲讲底层实现吗？', '实际项目里怎么用？', '和其他方案相比有什么优缺点？']
+
+
+@dataclass
+class StreamSample:
+    """一次 SSE 请求的测量结果"""
+    endpoint: str
+    ok: bool = False
+    status: int = 0
+    ttft: Optional[float] = None
+    duration: float = 0.0
+    tokens: int = 0
+    retries: int = 0
+    error: str = ''
+    events: dict = field(default_factory=dict, repr=False)
+
+
+def percentile(values, pct):
+    """最近秩法分位数；空列表返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def stream_request(base_url, path, payload, timeout=120):
+    """POST 并逐行读取 SSE，记录首个 token 事件时间；返回 StreamSample（events 保存最后一次各类事件数据）"""
+    sample = StreamSample(endpoint=path)
+    request = urllib.request.Request(
+        base_url.rstrip('/') + path,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+        method='POST',
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            sample.status = response.status
+            event_type = 'message'
+            for raw_line in response:
+                line = raw_line.decode('utf-8').rstrip('\r\n')
+                if line.startswith('event: '):
+                    event_type = line[7:]
+                elif line.startswith('data: '):
+                    if event_type in TOKEN_EVENTS:
+                        sample.tokens += 1
+                        if sample.ttft is None:
+                            sample.ttft = time.perf_counter() - started
+                    else:
+                        try:
+                            sample.events[event_type] = json.loads(line[6:])
+                        except json.JSONDecodeError:
+                            sample.events[event_type] = line[6:]
+                        if event_type == 'retry':
+                            sample.retries += 1
+                elif not line:
+                    event_type = 'message'
+    except urllib.error.HTTPError as e:
+        sample.status = e.code
+        sample.error = e.read().decode('utf-8', 'replace')[:200]
+    except (urllib.error.URLError, OSError) as e:
+        sample.error = str(e)
+    sample.duration = time.perf_counter() - started
+
+    if 'error' in sample.events:
+        sample.error = str(sample.events['error'].get('detail', sample.events['error']))
+    sample.ok = sample.status == 200 and not sample.error and 'done' in sample.events
+    return sample
+
+
+class SqliteLockProbe:
+    """后台线程周期性执行 BEGIN IMMEDIATE，测量获取 SQLite 写锁需要等待的时间"""
+
+    def __init__(self, db_path, interval=0.2):
+        self.db_path = str(db_path)
+        self.interval = interval
+        self.waits = []
+        self.timeouts = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sqlite-lock-probe', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            started = time.perf_counter()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                self.waits.append(time.perf_counter() - started)
+                conn.execute('ROLLBACK')
+            except sqlite3.OperationalError:
+                self.timeouts += 1
+            finally:
+                conn.close()
+            self._stop.wait(self.interval)
+
+
+@dataclass
+class LoadConfig:
+    base_url: str
+    users: list
+    questions: list
+    sessions: int = 20
+    concurrency: int = 4
+    pk_ratio: float = 0.3
+    follow_up_ratio: float = 0.3
+    model_id: Optional[int] = None
+    timeout: float = 120
+    seed: Optional[int] = None
+
+
+class LoadRunner:
+    """按配置并发回放会话，收集所有 StreamSample"""
+
+    def __init__(self, config):
+        self.config = config
+        self.samples = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+
+    def _record(self, sample):
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    def _answer_for(self, question, rng):
+        """用参考话术的一部分模拟用户回答（长度随机），没有话术时用题目"""
+        text = question.get('brief_answer') or question['title']
+        cut = rng.randint(max(len(text) // 3, 1), max(len(text), 1))
+        return text[:cut]
+
+    def _submit(self, user_id, question, answer):
+        payload = {'user_id': user_id, 'question_id': question['id'], 'answer': answer}
+        if self.config.model_id:
+            payload['model_id'] = self.config.model_id
+        return self._record(stream_request(self.config.base_url, SUBMIT_PATH, payload, self.config.timeout))
+
+    def practice_session(self, rng):
+        user_id = rng.choice(self.config.users)
+        question = rng.choice(self.config.questions)
+        sample = self._submit(user_id, question, self._answer_for(question, rng))
+        record = sample.events.get('result')
+        if sample.ok and isinstance(record, dict) and rng.random() < self.config.follow_up_ratio:
+            payload = {'record_id': record['id'], 'question': rng.choice(FOLLOW_UP_QUESTIONS)}
+            if self.config.model_id:
+                payload['model_id'] = self.config.model_id
+            self._record(stream_request(self.config.base_url, FOLLOW_UP_PATH, payload, self.config.timeout))
+
+    def pk_session(self, rng):
+        user_a, user_b = rng.sample(self.config.users, 2)
+        question = rng.choice(self.config.questions)
+        answers = {user_a: self._answer_for(question, rng), user_b: self._answer_for(question, rng)}
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            samples = list(pool.map(lambda user_id: self._submit(user_id, question, answers[user_id]), answers))
+        if not all(sample.ok for sample in samples):
+            return
+        sides = []
+        for user_id, sample in zip(answers, samples):
+            record = sample.events['result']
+            sides.append({
+                'name': f'user-{user_id}',
+                'answer': answers[user_id],
+                'scores': f"综合 {record.get('ai_score', 0)} 分",
+            })
+        payload = {'question_id': question['id'], 'user_a': sides[0], 'user_b': sides[1]}
+        if self.config.model_id:
+            payload['model_id'] = self.config.model_id
+        self._record(stream_request(self.config.base_url, BATTLE_PATH, payload, self.config.timeout))
+
+    def run(self):
+        # 预先抽好每个会话的类型与随机种子，保证固定 seed 时可复现
+        plans = []
+        for _ in range(self.config.sessions):
+            is_pk = len(self.config.users) >= 2 and self._rng.random() < self.config.pk_ratio
+            plans.append((self.pk_session if is_pk else self.practice_session, self._rng.random()))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.config.concurrency) as pool:
+            for future in [pool.submit(session, random.Random(seed)) for session, seed in plans]:
+                future.result()
+        return time.perf_counter() - started
+
+
+def summarize(samples, wall_seconds, lock_probe=None):
+    """按接口汇总：成功率、TTFT/耗时 p50/p99、单流与整体吞吐（token 事件/秒）"""
+    endpoints = {}
+    for endpoint in (SUBMIT_PATH, FOLLOW_UP_PATH, BATTLE_PATH):
+        items = [sample for sample in samples if sample.endpoint == endpoint]
+        if not items:
+            continue
+        ok = [sample for sample in items if sample.ok]
+        ttfts = [sample.ttft for sample in ok if sample.ttft is not None]
+        durations = [sample.duration for sample in ok]
+        per_stream = [sample.tokens / sample.duration for sample in ok if sample.duration > 0]
+        endpoints[endpoint] = {
+            'requests': len(items),
+            'ok': len(ok),
+            'errors': len(items) - len(ok),
+            'retries': sum(sample.retries for sample in items),
+            'ttft_p50': percentile(ttfts, 50),
+            'ttft_p99': percentile(ttfts, 99),
+            'duration_p50': percentile(durations, 50),
+            'duration_p99': percentile(durations, 99),
+            'tokens_per_stream_p50': percentile(per_stream, 50),
+            'tokens_total': sum(sample.tokens for sample in ok),
+            'sample_errors': sorted({sample.error for sample in items if sample.error})[:5],
+        }
+
+    report = {
+        'wall_seconds': wall_seconds,
+        'requests': len(samples),
+        'requests_per_second': len(samples) / wall_seconds if wall_seconds else 0.0,
+        'tokens_per_second': sum(sample.tokens for sample in samples) / wall_seconds if wall_seconds else 0.0,
+        'endpoints': endpoints,
+    }
+    if lock_probe is not None:
+        report['db_lock_wait'] = {
+            'probes': len(lock_probe.waits),
+            'timeouts': lock_probe.timeouts,
+            'p50': percentile(lock_probe.waits, 50),
+            'p99': percentile(lock_probe.waits, 99),
+            'max': max(lock_probe.waits) if lock_probe.waits else None,
+        }
+    return report
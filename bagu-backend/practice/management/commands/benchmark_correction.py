@@ -0,0 +1,93 @@
+"""对比本地术语纠错与 LLM 纠错的准确率和耗时。"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_service.corrector import get_local_corrector
+from ai_service.provider import get_ai_provider, get_ai_provider_by_id
+
+# (原始回答, 期望纠正结果)
+BENCHMARK_CASES = [
+    ('Rdis 为什么这么快？因为基于内存和 IO 多路复用', 'Redis 为什么这么快？因为基于内存和 IO 多路复用'),
+    ('ConcurentHashMap 在 JDK8 用 CAS 加 sychronized', 'ConcurrentHashMap 在 JDK8 用 CAS 加 synchronized'),
+    ('volatle 保证可见性和有序性', 'volatile 保证可见性和有序性'),
+    ('线程吃的核心参数有核心线程数和最大线程数', '线程池的核心参数有核心线程数和最大线程数'),
+    ('用布龙过滤器解决缓存穿头问题', '用布隆过滤器解决缓存穿透问题'),
+    ('RocketMQ 的事物消息通过半消息实现', 'RocketMQ 的事务消息通过半消息实现'),
+    ('Kafka 通过 Partiton 保证分区内有序', 'Kafka 通过 Partition 保证分区内有序'),
+    ('InnoDB 的 MVCC 依赖 ReadVeiw 和 undolog', 'InnoDB 的 MVCC 依赖 ReadView 和 undolog'),
+    ('分布式锁可以用 Redisson 的看门狗续期', '分布式锁可以用 Redisson 的看门狗续期'),
+    ('垃圾会收器有 CMS 和 G1', '垃圾回收器有 CMS 和 G1'),
+    ('乐关锁一般用版本号实现', '乐观锁一般用版本号实现'),
+    ('双亲委派模型保证核心类不被篡改', '双亲委派模型保证核心类不被篡改'),
+]
+
+
+class Command(BaseCommand):
+    help = '纠错基准：本地术语词典 vs LLM 纠错（准确率与耗时）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=200, help='本地纠错每条样本重复次数')
+        parser.add_argument('--llm', action='store_true', help='同时调用 LLM 纠错做对比（会消耗 token）')
+        parser.add_argument('--model-id', type=int, help='LLM 对比使用的模型配置 ID（默认用默认模型）')
+
+    def handle(self, *args, **options):
+        rounds = max(options['rounds'], 1)
+
+        started = time.perf_counter()
+        corrector = get_local_corrector()
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'本地索引构建: {build_ms:.1f} ms（进程内缓存，仅首次）')
+
+        local_hits = 0
+        timings_us = []
+        for original, expected in BENCHMARK_CASES:
+            result = corrector.correct(original)
+            if result.text == expected:
+                local_hits += 1
+            else:
+                self.stdout.write(self.style.WARNING(f'  本地未命中: {original} -> {result.text}'))
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                corrector.correct(original)
+                timings_us.append((time.perf_counter() - t0) * 1_000_000)
+
+        self._report('本地词典', local_hits, timings_us, unit='µs')
+
+        if not options['llm']:
+            return
+
+        try:
+            if options['model_id']:
+                provider, model_name = get_ai_provider_by_id(options['model_id'])
+            else:
+                provider, model_name = get_ai_provider()
+        except Exception as exc:  # noqa: BLE001 - 直接提示配置问题
+            raise CommandError(f'无法获取 AI 模型: {exc}')
+
+        llm_hits = 0
+        llm_timings_ms = []
+        for original, expected in BENCHMARK_CASES:
+            t0 = time.perf_counter()
+            try:
+                corrected = provider.correct_text(original)
+            except Exception as exc:  # noqa: BLE001 - 单条失败继续
+                self.stdout.write(self.style.ERROR(f'  LLM 调用失败: {exc}'))
+                continue
+            llm_timings_ms.append((time.perf_counter() - t0) * 1000)
+            if corrected.strip() == expected:
+                llm_hits += 1
+
+        self._report(f'LLM（{model_name}）', llm_hits, llm_timings_ms, unit='ms')
+
+    def _report(self, label, hits, timings, unit):
+        if not timings:
+            self.stdout.write(self.style.ERROR(f'{label}: 无有效样本'))
+            return
+        ordered = sorted(timings)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: 准确率 {hits}/{len(BENCHMARK_CASES)}，'
+            f'p50 {statistics.median(ordered):.1f} {unit}，p99 {p99:.1f} {unit}'
+        ))
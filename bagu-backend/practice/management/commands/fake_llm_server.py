@@ -0,0 +1,38 @@
+"""启动本地假 OpenAI 兼容服务（压测 / 离线联调用）。"""
+from django.core.management.base import BaseCommand
+
+from ai_service.fake_server import FakeOpenAIServer, FakeServerConfig
+
+
+class Command(BaseCommand):
+    help = '启动假 OpenAI 兼容服务：/v1/chat/completions（流式/非流式）与 /v1/audio/speech'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=18080)
+        parser.add_argument('--ttft', type=float, default=0.5, help='首 token 延迟（秒）')
+        parser.add_argument('--tps', type=float, default=60.0, help='生成速度（tokens/s），0 表示不限速')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='请求直接返回 500 的概率')
+        parser.add_argument('--drop-rate', type=float, default=0.0, help='流式输出中途断开的概率')
+        parser.add_argument('--think-tokens', type=int, default=40, help='<think> 块长度，0 表示不输出思考过程')
+        parser.add_argument('--seed', type=int, help='随机种子（固定后输出与故障注入可复现）')
+        parser.add_argument('--verbose', action='store_true', help='打印每个请求的访问日志')
+
+    def handle(self, *args, **options):
+        config = FakeServerConfig(
+            ttft=options['ttft'],
+            tokens_per_second=options['tps'],
+            error_rate=options['error_rate'],
+            drop_rate=options['drop_rate'],
+            think_tokens=options['think_tokens'],
+            seed=options['seed'],
+        )
+        server = FakeOpenAIServer((options['host'], options['port']), config=config, verbose=options['verbose'])
+        self.stdout.write(self.style.SUCCESS(f'假模型服务已启动: {server.base_url}'))
+        self.stdout.write(f'在 AI 模型配置中把 API Base URL 设为该地址即可（API Key 任意）。{config}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('已停止')
+        finally:
+            server.server_close()
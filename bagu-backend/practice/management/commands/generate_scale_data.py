@@ -0,0 +1,56 @@
+"""批量生成大规模合成用户与答题历史，用于复现大数据量下的慢查询与基准测试。"""
+from django.core.management.base import BaseCommand, CommandError
+
+from practice.scale_data import ScaleDataConfig, ScaleDataGenerator, clear_scale_data
+from questions.models import Question
+
+
+class Command(BaseCommand):
+    help = '生成合成用户 / 答题记录 / 追问 / 评估轮次 / 做题进度（题目复用现有题库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='用户数')
+        parser.add_argument('--answers', type=int, default=100_000, help='答题记录总数')
+        parser.add_argument('--follow-up-ratio', type=float, default=0.2, help='带追问的记录比例（每条 1~3 个追问）')
+        parser.add_argument('--round-ratio', type=float, default=0.1, help='多模型评估轮次比例（每轮 2~3 条记录）')
+        parser.add_argument('--progress-per-user', type=int, default=100, help='每个用户已完成题目数')
+        parser.add_argument('--days', type=int, default=365, help='答题时间分布在最近多少天')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--prefix', default='scale', help='生成用户的用户名前缀')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--clear', action='store_true', help='只删除本命令生成的、用户名前缀匹配的数据')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_scale_data(options['prefix'])
+            self.stdout.write(self.style.SUCCESS(
+                '已删除：' + '，'.join(f'{table} {count}' for table, count in deleted.items())
+            ))
+            return
+
+        question_ids = list(Question.objects.order_by('id').values_list('id', flat=True))
+        if not question_ids:
+            raise CommandError('题库为空，请先执行 bootstrap_seed_data 或 import_questions')
+
+        config = ScaleDataConfig(
+            users=max(options['users'], 1),
+            answers=max(options['answers'], 0),
+            follow_up_ratio=options['follow_up_ratio'],
+            round_ratio=options['round_ratio'],
+            progress_per_user=max(options['progress_per_user'], 0),
+            days=max(options['days'], 1),
+            batch_size=max(options['batch_size'], 1),
+            prefix=options['prefix'],
+            seed=options['seed'],
+        )
+        generator = ScaleDataGenerator(config, question_ids, log=self.stdout.write)
+        report = generator.generate()
+
+        total_rows = sum(report.rows.values())
+        total_seconds = sum(report.seconds.values())
+        for table, rows in report.rows.items():
+            seconds = report.seconds[table]
+            self.stdout.write(f'  {table}: {rows} 行，{seconds:.1f}s（{rows / seconds if seconds else 0:.0f} 行/秒）')
+        self.stdout.write(self.style.SUCCESS(
+            f'完成：共 {total_rows} 行，写入耗时 {total_seconds:.1f}s'
+        ))
@@ -0,0 +1,127 @@
+"""回放练习 / PK 工作负载压测流式接口，输出 TTFT、吞吐、p50/p99 与数据库锁等待。"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_service.fake_server import FakeServerConfig, start_fake_server
+from practice.loadtest import LoadConfig, LoadRunner, SqliteLockProbe, summarize
+from practice.models import AiModelConfig
+from questions.models import Question
+from users.models import BaguUser
+
+FAKE_MODEL_NAME = '压测假模型'
+FAKE_PROVIDER = 'fake'
+
+
+class Command(BaseCommand):
+    help = '压测 submit-stream / follow-up / battle-analysis（需先启动后端服务）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='被测后端地址')
+        parser.add_argument('--sessions', type=int, default=20, help='会话总数（练习 + PK）')
+        parser.add_argument('--concurrency', type=int, default=4, help='并发会话数')
+        parser.add_argument('--pk-ratio', type=float, default=0.3, help='PK 会话占比')
+        parser.add_argument('--follow-up-ratio', type=float, default=0.3, help='练习后继续追问的比例')
+        parser.add_argument('--model-id', type=int, help='指定模型配置 ID（默认按任务路由 / 默认模型）')
+        parser.add_argument('--fake-server', action='store_true',
+                            help='在本进程启动假模型服务，并临时注册指向它的模型配置（禁用，'
+                                 '被测服务需设置 AI_ALLOW_DISABLED_MODEL_IDS=1 才能按 ID 使用）')
+        parser.add_argument('--fake-port', type=int, default=0)
+        parser.add_argument('--ttft', type=float, default=0.5, help='假服务首 token 延迟（秒）')
+        parser.add_argument('--tps', type=float, default=60.0, help='假服务生成速度（tokens/s）')
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--drop-rate', type=float, default=0.0)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--json', dest='json_path', help='把完整报告写入 JSON 文件')
+
+    def handle(self, *args, **options):
+        # 压测会写入答题记录、统计和追问，只用 generate_scale_data 生成的合成用户，不碰真实账号
+        users = list(BaguUser.objects.filter(is_synthetic=True).order_by('id').values_list('id', flat=True)[:50])
+        if not users:
+            raise CommandError('没有合成用户：请先运行 generate_scale_data 生成压测用户（PK 会话需要 2 个）')
+        questions = list(Question.objects.order_by('id').values('id', 'title', 'brief_answer')[:500])
+        if not questions:
+            raise CommandError('需要至少 1 道题目')
+
+        if options['fake_server'] and not settings.AI_ALLOW_DISABLED_MODEL_IDS:
+            raise CommandError('--fake-server 注册的假模型是禁用状态：被测服务与本命令都需要设置 AI_ALLOW_DISABLED_MODEL_IDS=1')
+
+        fake_server, fake_model, probe = None, None, None
+        model_id = options['model_id']
+        try:
+            if options['fake_server']:
+                fake_server = start_fake_server(port=options['fake_port'], config=FakeServerConfig(
+                    ttft=options['ttft'],
+                    tokens_per_second=options['tps'],
+                    error_rate=options['error_rate'],
+                    drop_rate=options['drop_rate'],
+                    seed=options['seed'],
+                ))
+                # 上次被强行中断时残留的假模型配置
+                AiModelConfig.objects.filter(name=FAKE_MODEL_NAME, provider=FAKE_PROVIDER).delete()
+                # 禁用状态注册：任务路由（含 fastest）和续写备选都不会选中它，只有压测请求按 model_id 显式使用
+                fake_model = AiModelConfig.objects.create(
+                    name=FAKE_MODEL_NAME, provider=FAKE_PROVIDER, api_key='fake',
+                    base_url=fake_server.base_url, model_name='fake-model', is_enabled=False, is_default=False,
+                )
+                model_id = fake_model.id
+                self.stdout.write(f'假模型服务: {fake_server.base_url}（模型配置 #{model_id}）')
+
+            database = settings.DATABASES['default']
+            if database['ENGINE'].endswith('sqlite3'):
+                probe = SqliteLockProbe(database['NAME']).start()
+
+            runner = LoadRunner(LoadConfig(
+                base_url=options['base_url'],
+                users=users,
+                questions=questions,
+                sessions=max(options['sessions'], 1),
+                concurrency=max(options['concurrency'], 1),
+                pk_ratio=options['pk_ratio'],
+                follow_up_ratio=options['follow_up_ratio'],
+                model_id=model_id,
+                seed=options['seed'],
+            ))
+            wall_seconds = runner.run()
+        finally:
+            if probe is not None:
+                probe.stop()
+            if fake_model is not None:
+                fake_model.delete()
+            if fake_server is not None:
+                fake_server.shutdown()
+                fake_server.server_close()
+
+        report = summarize(runner.samples, wall_seconds, probe)
+        self._print_report(report)
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(f'报告已写入 {options["json_path"]}')
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f'共 {report["requests"]} 个请求，用时 {report["wall_seconds"]:.1f}s，'
+            f'{report["requests_per_second"]:.2f} req/s，{report["tokens_per_second"]:.1f} tokens/s'
+        )
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(endpoint))
+            self.stdout.write(
+                f'  成功 {stats["ok"]}/{stats["requests"]}，续写 {stats["retries"]} 次 | '
+                f'TTFT p50 {_ms(stats["ttft_p50"])} p99 {_ms(stats["ttft_p99"])} | '
+                f'耗时 p50 {_ms(stats["duration_p50"])} p99 {_ms(stats["duration_p99"])} | '
+                f'单流 {stats["tokens_per_stream_p50"] or 0:.1f} tokens/s'
+            )
+            for error in stats['sample_errors']:
+                self.stdout.write(self.style.WARNING(f'  错误示例: {error}'))
+        lock = report.get('db_lock_wait')
+        if lock:
+            self.stdout.write(
+                f'SQLite 写锁等待: p50 {_ms(lock["p50"])} p99 {_ms(lock["p99"])} max {_ms(lock["max"])}'
+                f'（{lock["probes"]} 次探测，超时 {lock["timeouts"]} 次）'
+            )
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.0f}ms'
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0006_set_role_difficulty_levels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AiTaskProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(choices=[('correction', '答案纠错'), ('scoring', '答案评分'), ('follow_up', '追问'), ('profile', '知识画像'), ('battle', '对战分析')], max_length=20, unique=True, verbose_name='任务类型')),
+                ('policy', models.CharField(choices=[('fixed', '固定模型'), ('fastest', '最快健康模型')], default='fixed', help_text='最快健康模型：按近期首 token 延迟在已启用模型中自动选择', max_length=20, verbose_name='路由策略')),
+                ('temperature', models.FloatField(default=0.7, verbose_name='temperature')),
+                ('max_tokens', models.IntegerField(default=2000, verbose_name='max_tokens')),
+                ('timeout', models.FloatField(default=0, help_text='0 表示使用 SDK 默认超时', verbose_name='超时(秒)')),
+                ('is_enabled', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('model_config', models.ForeignKey(blank=True, help_text='留空则使用默认模型', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_profiles', to='practice.aimodelconfig', verbose_name='使用模型')),
+            ],
+            options={
+                'verbose_name': 'AI 任务路由',
+                'verbose_name_plural': 'AI 任务路由',
+                'ordering': ['id'],
+            },
+        ),
+    ]
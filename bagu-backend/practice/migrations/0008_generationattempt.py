@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_userquestionprogress'),
+        ('users', '0001_initial'),
+        ('practice', '0007_aitaskprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(choices=[('correction', '答案纠错'), ('scoring', '答案评分'), ('follow_up', '追问'), ('profile', '知识画像'), ('battle', '对战分析')], max_length=20, verbose_name='任务类型')),
+                ('status', models.CharField(choices=[('aborted', '客户端断开')], default='aborted', max_length=20, verbose_name='状态')),
+                ('ai_model_name', models.CharField(blank=True, default='', max_length=100, verbose_name='AI模型')),
+                ('partial_output', models.TextField(blank=True, default='', verbose_name='部分输出')),
+                ('generated_tokens', models.IntegerField(default=0, verbose_name='已生成token')),
+                ('max_tokens', models.IntegerField(default=0, verbose_name='max_tokens')),
+                ('saved_tokens', models.IntegerField(default=0, verbose_name='节省token(估算)')),
+                ('duration_ms', models.IntegerField(default=0, verbose_name='耗时(ms)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_attempts', to='questions.question', verbose_name='题目')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_attempts', to='users.baguuser', verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '中断的生成',
+                'verbose_name_plural': '中断的生成',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0008_generationattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationattempt',
+            name='retries',
+            field=models.IntegerField(default=0, verbose_name='续写次数'),
+        ),
+        migrations.AlterField(
+            model_name='generationattempt',
+            name='status',
+            field=models.CharField(choices=[('aborted', '客户端断开'), ('failed', '上游失败')], default='aborted', max_length=20, verbose_name='状态'),
+        ),
+    ]
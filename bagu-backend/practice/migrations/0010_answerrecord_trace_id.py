@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0009_generationattempt_retries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answerrecord',
+            name='response_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='评分耗时(ms)'),
+        ),
+        migrations.AddField(
+            model_name='answerrecord',
+            name='trace_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32, verbose_name='追踪 ID'),
+        ),
+    ]
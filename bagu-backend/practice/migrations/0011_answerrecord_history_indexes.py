@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0010_answerrecord_trace_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answerrecord',
+            index=models.Index(fields=['user', 'created_at'], name='practice_an_user_id_a8eb3d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answerrecord',
+            index=models.Index(fields=['user', 'question', 'created_at'], name='practice_an_user_id_22e9c4_idx'),
+        ),
+    ]
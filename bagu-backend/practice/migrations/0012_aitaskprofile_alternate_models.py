@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0011_answerrecord_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aitaskprofile',
+            name='alternate_models',
+            field=models.ManyToManyField(blank=True, help_text='仅最快健康模型策略使用：允许切换到的其他已启用模型', related_name='alternate_task_profiles', to='practice.aimodelconfig', verbose_name='备选模型'),
+        ),
+        migrations.AlterField(
+            model_name='aitaskprofile',
+            name='policy',
+            field=models.CharField(choices=[('fixed', '固定模型'), ('fastest', '最快健康模型')], default='fixed', help_text='最快健康模型：按近期首 token 延迟在「使用模型」和「备选模型」中自动选择', max_length=20, verbose_name='路由策略'),
+        ),
+    ]
@@ -60,12 +60,21 @@ class AnswerRecord(models.Model):
         EvaluationRound, null=True, blank=True, on_delete=models.SET_NULL,
         related_name='answer_records', verbose_name='评估轮次'
     )
+    # 链路追踪：关联评分请求的 trace，便于按记录查各阶段耗时
+    trace_id = models.CharField('追踪 ID', max_length=32, blank=True, default='', db_index=True)
+    response_ms = models.PositiveIntegerField('评分耗时(ms)', default=0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
 
     class Meta:
         verbose_name = '答题记录'
         verbose_name_plural = '答题记录'
         ordering = ['-created_at']
+        indexes = [
+            # 答题历史：按用户倒序游标分页
+            models.Index(fields=['user', 'created_at']),
+            # 某用户在某题的历史（question-history）
+            models.Index(fields=['user', 'question', 'created_at']),
+        ]
 
     def __str__(self):
         return f'{self.user} - {self.question.title} ({self.ai_score}分)'
@@ -170,3 +179,84 @@ class AiRoleConfig(models.Model):
 
     def __str__(self):
         return f'{self.name} ({self.role_key})'
+
+
+class AiTaskProfile(models.Model):
+    """按任务类型路由模型与生成参数（纠错/评分/追问/画像/对战）"""
+    TASK_CHOICES = [
+        ('correction', '答案纠错'),
+        ('scoring', '答案评分'),
+        ('follow_up', '追问'),
+        ('profile', '知识画像'),
+        ('battle', '对战分析'),
+    ]
+    POLICY_FIXED = 'fixed'
+    POLICY_FASTEST = 'fastest'
+    POLICY_CHOICES = [
+        (POLICY_FIXED, '固定模型'),
+        (POLICY_FASTEST, '最快健康模型'),
+    ]
+
+    task = models.CharField('任务类型', max_length=20, choices=TASK_CHOICES, unique=True)
+    model_config = models.ForeignKey(
+        AiModelConfig, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='task_profiles', verbose_name='使用模型',
+        help_text='留空则使用默认模型',
+    )
+    policy = models.CharField(
+        '路由策略', max_length=20, choices=POLICY_CHOICES, default=POLICY_FIXED,
+        help_text='最快健康模型：按近期首 token 延迟在「使用模型」和「备选模型」中自动选择',
+    )
+    alternate_models = models.ManyToManyField(
+        AiModelConfig, blank=True, related_name='alternate_task_profiles', verbose_name='备选模型',
+        help_text='仅最快健康模型策略使用：允许切换到的其他已启用模型',
+    )
+    temperature = models.FloatField('temperature', default=0.7)
+    max_tokens = models.IntegerField('max_tokens', default=2000)
+    timeout = models.FloatField('超时(秒)', default=0, help_text='0 表示使用 SDK 默认超时')
+    is_enabled = models.BooleanField('是否启用', default=True)
+
+    class Meta:
+        verbose_name = 'AI 任务路由'
+        verbose_name_plural = 'AI 任务路由'
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.get_task_display()} -> {self.model_config or "默认模型"}'
+
+
+class GenerationAttempt(models.Model):
+    """未正常完成的流式生成（客户端断开、上游故障续写失败），保留部分输出与 token 统计"""
+    STATUS_ABORTED = 'aborted'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_ABORTED, '客户端断开'),
+        (STATUS_FAILED, '上游失败'),
+    ]
+
+    task = models.CharField('任务类型', max_length=20, choices=AiTaskProfile.TASK_CHOICES)
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default=STATUS_ABORTED)
+    user = models.ForeignKey(
+        'users.BaguUser', null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='generation_attempts', verbose_name='用户',
+    )
+    question = models.ForeignKey(
+        'questions.Question', null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='generation_attempts', verbose_name='题目',
+    )
+    ai_model_name = models.CharField('AI模型', max_length=100, blank=True, default='')
+    partial_output = models.TextField('部分输出', blank=True, default='')
+    generated_tokens = models.IntegerField('已生成token', default=0)
+    max_tokens = models.IntegerField('max_tokens', default=0)
+    saved_tokens = models.IntegerField('节省token(估算)', default=0)
+    retries = models.IntegerField('续写次数', default=0)
+    duration_ms = models.IntegerField('耗时(ms)', default=0)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '中断的生成'
+        verbose_name_plural = '中断的生成'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.get_task_display()} {self.get_status_display()} ({self.generated_tokens} tokens)'
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AnswerHistoryPagination(CursorPagination):
+    """
+    答题历史的游标分页：按 (created_at, id) 倒序，翻页条件是 created_at 小于上一页最后一条（时间相同的再按偏移），
+    配合 (user, created_at) 索引，无论翻到多深都只扫一页的行，也不做 COUNT(*)。
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # 游标定位要读的列，字段投影时也必须查出来
+    position_columns = ('created_at',)
@@ -0,0 +1,317 @@
+"""大规模合成数据生成 - 复现百万级答题记录下的慢查询，用于基准测试
+
+生成 BaguUser / EvaluationRound / AnswerRecord / FollowUpQuestion / UserQuestionProgress：
+- 题目复用库中已有题目（先执行 bootstrap_seed_data）
+- 文本长度、角色评分 JSON 与真实记录接近，created_at 在最近 N 天内按插入顺序递增
+- 主键预先分配，按批 executemany 直接写表（绕过 ORM 对象构造与 SQLite 999 参数的分批限制）
+- SQLite 下临时关闭同步、把回滚日志放内存，生成完成后恢复
+"""
+import json
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from practice.models import AnswerRecord, EvaluationRound, FollowUpQuestion, GenerationAttempt
+from questions.models import UserQuestionProgress
+from users.models import BaguUser, UserProfile
+
+ANSWER_SENTENCES = [
+    '这个问题的核心在于理解底层数据结构的设计取舍。',
+    '首先要说明它解决了什么问题，然后再展开实现原理。',
+    '在高并发场景下需要考虑线程安全和锁的粒度。',
+    '实际项目中我们通过压测验证了这个方案的吞吐量。',
+    '需要注意异常情况下的数据一致性问题。',
+    '可以结合源码中的关键方法来说明执行流程。',
+    '和其他方案相比，它的优势是实现简单、性能稳定。',
+    '缺点是在极端情况下会有额外的内存开销。',
+]
+MODEL_NAMES = ['DeepSeek-R1', 'GPT-5.1 Chat', 'Doubao Seed 1.6', 'Gemini 2.5 Flash']
+ROLE_NAMES = [('junior', '初级面试官'), ('mid', '中级面试官'), ('senior', '高级面试官')]
+FOLLOW_UP_QUESTIONS = ['能再展开讲讲底层实现吗？', '实际项目里怎么用？', '和其他方案相比有什么优缺点？', '有哪些常见的坑？']
+TEXT_POOL_SIZE = 64
+ROLE_SCORE_POOL_SIZE = 256
+
+ANSWER_COLUMNS = [
+    'id', 'user_id', 'question_id', 'user_answer', 'corrected_answer', 'ai_analysis', 'ai_score',
+    'ai_highlights', 'ai_missing_points', 'ai_suggestion', 'ai_improved_answer', 'ai_model_name',
+    'ai_role_scores', 'ai_junior_score', 'ai_junior_comment', 'ai_mid_score', 'ai_mid_comment',
+    'ai_senior_score', 'ai_senior_comment', 'round_id', 'trace_id', 'response_ms', 'created_at',
+]
+
+
+@dataclass
+class ScaleDataConfig:
+    users: int = 1000
+    answers: int = 100_000
+    follow_up_ratio: float = 0.2
+    round_ratio: float = 0.1
+    progress_per_user: int = 100
+    days: int = 365
+    batch_size: int = 10_000
+    prefix: str = 'scale'
+    seed: Optional[int] = None
+
+
+@dataclass
+class ScaleDataReport:
+    rows: dict = field(default_factory=dict)
+    seconds: dict = field(default_factory=dict)
+
+    def add(self, table, count, seconds):
+        self.rows[table] = self.rows.get(table, 0) + count
+        self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+
+@contextmanager
+def fast_sqlite_pragmas():
+    """批量写入期间放宽 SQLite 持久性：synchronous=OFF、回滚日志放内存、加大页缓存（仅当前连接）"""
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        # PRAGMA synchronous 不能在事务内修改（如测试用例中），此时按默认设置写入
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        if journal_mode.lower() != 'wal':
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+        cursor.execute('PRAGMA cache_size = -262144')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            if journal_mode.lower() != 'wal':
+                cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+
+
+def _next_id(model):
+    last = model.objects.order_by('-id').values_list('id', flat=True).first()
+    return (last or 0) + 1
+
+
+def _insert_sql(model, columns):
+    quote = connection.ops.quote_name
+    return 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns)),
+    )
+
+
+class ScaleDataGenerator:
+    def __init__(self, config, question_ids, log=None):
+        if not question_ids:
+            raise ValueError('题库为空，请先导入题目')
+        self.config = config
+        self.question_ids = list(question_ids)
+        self.rng = random.Random(config.seed)
+        self.log = log or (lambda message: None)
+        self.report = ScaleDataReport()
+        self.now = timezone.now()
+        self._user_stats = {}
+        self._build_pools()
+
+    def _build_pools(self):
+        """预先生成并序列化文本与 JSON 样本，逐行只做随机挑选"""
+        rng = self.rng
+
+        def text(min_sentences, max_sentences):
+            return ''.join(rng.choice(ANSWER_SENTENCES) for _ in range(rng.randint(min_sentences, max_sentences)))
+
+        self.answer_texts = [text(4, 30) for _ in range(TEXT_POOL_SIZE)]
+        self.improved_texts = [text(12, 60) for _ in range(TEXT_POOL_SIZE)]
+        self.suggestions = [text(1, 4) for _ in range(TEXT_POOL_SIZE)]
+        self.point_lists = [
+            json.dumps([text(1, 1) for _ in range(rng.randint(0, 4))], ensure_ascii=False)
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.role_scores = []
+        for _ in range(ROLE_SCORE_POOL_SIZE):
+            scores = [max(0, min(100, int(rng.gauss(70, 15)))) for _ in ROLE_NAMES]
+            comments = [text(1, 2)[:200] for _ in ROLE_NAMES]
+            payload = json.dumps([
+                {'role_key': key, 'role_name': name, 'score': score, 'comment': comment}
+                for (key, name), score, comment in zip(ROLE_NAMES, scores, comments)
+            ], ensure_ascii=False)
+            self.role_scores.append((round(sum(scores) / len(scores)), payload, scores, comments))
+
+    def _created_at(self, index, total):
+        """按插入顺序在最近 days 天内递增，附带少量抖动"""
+        span = timedelta(days=self.config.days).total_seconds()
+        offset = span * (1 - (index + self.rng.random()) / max(total, 1))
+        return connection.ops.adapt_datetimefield_value(self.now - timedelta(seconds=offset))
+
+    def _insert(self, model, columns, rows, label):
+        if not rows:
+            return
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(_insert_sql(model, columns), rows)
+        self.report.add(label, len(rows), time.perf_counter() - started)
+
+    def generate(self):
+        with fast_sqlite_pragmas():
+            user_ids = self._generate_users()
+            self._generate_answers(user_ids)
+            self._generate_progress(user_ids)
+            self._update_user_stats()
+        self._reset_sequences()
+        return self.report
+
+    def _generate_users(self):
+        first_id = _next_id(BaguUser)
+        user_ids = list(range(first_id, first_id + self.config.users))
+        for start in range(0, len(user_ids), self.config.batch_size):
+            batch = user_ids[start:start + self.config.batch_size]
+            created_at = connection.ops.adapt_datetimefield_value(self.now - timedelta(days=self.config.days))
+            self._insert(BaguUser, ['id', 'username', 'nickname', 'role', 'total_answers', 'avg_score', 'created_at',
+                                     'data_version', 'is_synthetic'], [
+                (user_id, f'{self.config.prefix}{user_id}', f'压测用户{user_id}', 0, 0, 0.0, created_at, 0, True)
+                for user_id in batch
+            ], 'users')
+            self._insert(UserProfile, ['user_id', 'category_scores', 'strengths', 'weaknesses', 'suggestions',
+                                       'overall_level', 'updated_at'], [
+                (user_id, '{}', '[]', '[]', '[]', 'beginner', created_at) for user_id in batch
+            ], 'user_profiles')
+        self.log(f'用户 {len(user_ids)} 个')
+        return user_ids
+
+    def _generate_answers(self, user_ids):
+        config, rng = self.config, self.rng
+        next_answer_id = _next_id(AnswerRecord)
+        answers, rounds, follow_ups = [], [], []
+        pending_round = None  # [round_id, user_id, question_id, 剩余记录数]
+        for index in range(config.answers):
+            if pending_round is None and rng.random() < config.round_ratio:
+                round_id = uuid.UUID(int=rng.getrandbits(128), version=4).hex
+                pending_round = [round_id, rng.choice(user_ids), rng.choice(self.question_ids), rng.randint(2, 3)]
+                rounds.append(pending_round[:3] + [0, 0])
+            if pending_round is not None:
+                round_id, user_id, question_id = pending_round[:3]
+                pending_round[3] -= 1
+                if pending_round[3] == 0:
+                    pending_round = None
+            else:
+                round_id, user_id, question_id = None, rng.choice(user_ids), rng.choice(self.question_ids)
+
+            answer_id = next_answer_id + index
+            created_at = self._created_at(index, config.answers)
+            score, role_payload, role_scores, role_comments = rng.choice(self.role_scores)
+            user_answer = rng.choice(self.answer_texts)
+            answers.append((
+                answer_id, user_id, question_id, user_answer,
+                user_answer if rng.random() < 0.2 else '', '', score,
+                rng.choice(self.point_lists), rng.choice(self.point_lists), rng.choice(self.suggestions),
+                rng.choice(self.improved_texts), rng.choice(MODEL_NAMES), role_payload,
+                role_scores[0], role_comments[0], role_scores[1], role_comments[1], role_scores[2], role_comments[2],
+                round_id, '', rng.randint(3000, 60000), created_at,
+            ))
+            if round_id is not None:
+                rounds[-1][3] += score
+                rounds[-1][4] += 1
+            stats = self._user_stats.setdefault(user_id, [0, 0])
+            stats[0] += 1
+            stats[1] += score
+
+            if rng.random() < config.follow_up_ratio:
+                for _ in range(rng.randint(1, 3)):
+                    follow_ups.append((
+                        answer_id, rng.choice(FOLLOW_UP_QUESTIONS), rng.choice(self.improved_texts),
+                        rng.choice(MODEL_NAMES), created_at,
+                    ))
+
+            # 同一轮次的记录（2~3 条）写入同一批，轮次行先于记录写入
+            if len(answers) >= config.batch_size and pending_round is None:
+                self._flush_answers(answers, rounds, follow_ups)
+                self.log(f'答题记录 {index + 1}/{config.answers}')
+
+        self._flush_answers(answers, rounds, follow_ups)
+
+    def _flush_answers(self, answers, rounds, follow_ups):
+        created_at = connection.ops.adapt_datetimefield_value(self.now)
+        self._insert(EvaluationRound, [
+            'id', 'user_id', 'question_id', 'user_answer', 'composite_score', 'model_count', 'completed', 'created_at',
+        ], [
+            (round_id, user_id, question_id, self.answer_texts[0], round(total / count, 1), count, True, created_at)
+            for round_id, user_id, question_id, total, count in rounds
+        ], 'evaluation_rounds')
+        self._insert(AnswerRecord, ANSWER_COLUMNS, answers, 'answer_records')
+        self._insert(FollowUpQuestion, [
+            'answer_record_id', 'user_question', 'ai_response', 'ai_model_name', 'created_at',
+        ], follow_ups, 'follow_ups')
+        answers.clear()
+        rounds.clear()
+        follow_ups.clear()
+
+    def _generate_progress(self, user_ids):
+        per_user = min(self.config.progress_per_user, len(self.question_ids))
+        rows = []
+        for user_id in user_ids:
+            for question_id in self.rng.sample(self.question_ids, per_user):
+                updated_at = self._created_at(self.rng.randrange(1000), 1000)
+                rows.append((user_id, question_id, True, updated_at, updated_at, updated_at))
+            if len(rows) >= self.config.batch_size:
+                self._insert(UserQuestionProgress, [
+                    'user_id', 'question_id', 'is_completed', 'completed_at', 'created_at', 'updated_at',
+                ], rows, 'question_progress')
+                rows = []
+        self._insert(UserQuestionProgress, [
+            'user_id', 'question_id', 'is_completed', 'completed_at', 'created_at', 'updated_at',
+        ], rows, 'question_progress')
+
+    def _update_user_stats(self):
+        """生成过程中累计的答题数 / 平均分回写到用户表（与 _save_stream_record 维护的冗余字段一致）"""
+        rows = [
+            (count, round(total / count, 1), user_id) for user_id, (count, total) in self._user_stats.items()
+        ]
+        quote = connection.ops.quote_name
+        sql = 'UPDATE {0} SET {1} = %s, {2} = %s, {3} = {3} + 1 WHERE {4} = %s'.format(
+            quote(BaguUser._meta.db_table), quote('total_answers'), quote('avg_score'), quote('data_version'),
+            quote('id'),
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def _reset_sequences(self):
+        """显式写入了主键，非 SQLite 数据库需要重置自增序列"""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [BaguUser, UserProfile, AnswerRecord, FollowUpQuestion, UserQuestionProgress],
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def clear_scale_data(prefix):
+    """
+    删除 prefix 开头的压测用户及其全部数据（直接按表删除，避免 ORM 逐条级联）。
+
+    只删除生成时标记了 is_synthetic 的用户，用户名恰好以同样前缀开头的真实用户不受影响。
+    _raw_delete 不执行 on_delete，SET_NULL 的外键（中断的生成 → 用户、答题记录 → 评估轮次）先手动置空。
+    """
+    users = BaguUser.objects.filter(is_synthetic=True, username__startswith=prefix)
+    deleted = {}
+    with transaction.atomic():
+        # 压测（loadtest）会给合成用户留下中断的生成记录，保留记录只断开用户
+        GenerationAttempt.objects.filter(user__in=users).update(user=None)
+        AnswerRecord.objects.filter(round__user__in=users).exclude(user__in=users).update(round=None)
+        answer_ids = AnswerRecord.objects.filter(user__in=users).values('id')
+        deleted['follow_ups'] = FollowUpQuestion.objects.filter(answer_record_id__in=answer_ids)._raw_delete(
+            connection.alias)
+        deleted['answer_records'] = AnswerRecord.objects.filter(user__in=users)._raw_delete(connection.alias)
+        deleted['evaluation_rounds'] = EvaluationRound.objects.filter(user__in=users)._raw_delete(connection.alias)
+        deleted['question_progress'] = UserQuestionProgress.objects.filter(user__in=users)._raw_delete(
+            connection.alias)
+        deleted['user_profiles'] = UserProfile.objects.filter(user__in=users)._raw_delete(connection.alias)
+        deleted['users'] = users._raw_delete(connection.alias)
+    return deleted
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import AnswerRecord, AiModelConfig, AiRoleConfig, EvaluationRound, FollowUpQuestion
+
+from bagu.sparse_fields import DynamicFieldsMixin
+from .models import AnswerRecord, AiModelConfig, AiRoleConfig, AiTaskProfile, EvaluationRound, FollowUpQuestion
 
 
 class AnswerSubmitSerializer(serializers.Serializer):
@@ -15,7 +17,7 @@ class AnswerSubmitSerializer(serializers.Serializer):
     )
 
 
-class AnswerRecordSerializer(serializers.ModelSerializer):
+class AnswerRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     question_title = serializers.CharField(source='question.title', read_only=True)
     category_name = serializers.CharField(source='question.category.name', read_only=True)
 
@@ -28,20 +30,22 @@ class AnswerRecordSerializer(serializers.ModelSerializer):
                   'ai_junior_score', 'ai_junior_comment',
                   'ai_mid_score', 'ai_mid_comment',
                   'ai_senior_score', 'ai_senior_comment',
-                  'round', 'created_at']
+                  'round', 'trace_id', 'response_ms', 'created_at']
+        field_columns = {
+            'user': ['user_id'],
+            'question': ['question_id'],
+            'question_title': ['question__title'],
+            'category_name': ['question__category__name'],
+            'round': ['round_id'],
+        }
 
 
-class AnswerRecordListSerializer(serializers.ModelSerializer):
-    """轻量版 - 用于列表展示（历史记录等）"""
-    question_title = serializers.CharField(source='question.title', read_only=True)
-    category_name = serializers.CharField(source='question.category.name', read_only=True)
+class AnswerRecordListSerializer(AnswerRecordSerializer):
+    """轻量版 - 用于列表展示（历史记录等）：默认只有标题、分类、分数等短字段，正文用 ?fields= 或详情接口按需取"""
 
-    class Meta:
-        model = AnswerRecord
-        fields = ['id', 'question', 'question_title', 'category_name',
-                  'ai_score', 'ai_model_name', 'created_at',
-                  'user_answer', 'ai_highlights', 'ai_missing_points',
-                  'ai_suggestion', 'ai_improved_answer']
+    class Meta(AnswerRecordSerializer.Meta):
+        default_fields = ['id', 'question', 'question_title', 'category_name',
+                          'ai_score', 'ai_model_name', 'created_at']
 
 
 class EvaluationRoundSerializer(serializers.ModelSerializer):
@@ -108,3 +112,26 @@ class AiRoleConfigSerializer(serializers.ModelSerializer):
             'sort_order',
             'is_enabled',
         ]
+
+
+class AiTaskProfileSerializer(serializers.ModelSerializer):
+    model_config_name = serializers.CharField(source='model_config.name', read_only=True, default='')
+    # 最快健康模型策略可切换到的其他模型（见 resolve_task_model_config）
+    alternate_models = serializers.PrimaryKeyRelatedField(
+        many=True, required=False, queryset=AiModelConfig.objects.all(),
+    )
+
+    class Meta:
+        model = AiTaskProfile
+        fields = [
+            'id',
+            'task',
+            'model_config',
+            'model_config_name',
+            'policy',
+            'alternate_models',
+            'temperature',
+            'max_tokens',
+            'timeout',
+            'is_enabled',
+        ]
@@ -1,3 +1,706 @@
-from django.test import TestCase
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Avg, Count
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_service.fake_server import FakeServerConfig, start_fake_server
+from ai_service.corrector import (
+    CURATED_TERMS, TermCorrector, build_corrector_from_questions, get_local_corrector, reset_local_corrector,
+)
+from ai_service.latency import latency_tracker
+from ai_service.local_scoring import reference_points, score_answer_locally
+from ai_service.provider import (
+    TASK_BATTLE, TASK_CORRECTION, TASK_SCORING, AiProvider, StreamProgress,
+    build_fallback_provider, get_ai_provider, get_ai_provider_by_id, resolve_task_model_config,
+)
+from bagu.testing import (
+    FakeChunkStream, FakeProvider, StreamingAnswerTestCase, fake_completion_client, fake_streaming_client,
+    read_sse_events,
+)
+from practice.loadtest import percentile
+from practice.models import (
+    AiModelConfig, AiTaskProfile, AnswerRecord, EvaluationRound, FollowUpQuestion, GenerationAttempt,
+)
+from practice.scale_data import ScaleDataConfig, ScaleDataGenerator, clear_scale_data
+from questions.catalog_cache import invalidate_questions
+from questions.models import Category, Question, UserQuestionProgress
+from users.models import BaguUser
+
+
+class LocalCorrectorTests(TestCase):
+    def setUp(self):
+        reset_local_corrector()
+        self.addCleanup(reset_local_corrector)
+        self.corrector = TermCorrector(
+            ['Redis', 'ConcurrentHashMap', 'synchronized', 'Kafka'],
+            cjk_terms=['线程池', '缓存穿透'],
+        )
+
+    def test_corrects_misspelled_terms(self):
+        result = self.corrector.correct('Rdis 和 ConcurentHashMap 都用到了 sychronized')
+
+        self.assertEqual(result.text, 'Redis 和 ConcurrentHashMap 都用到了 synchronized')
+        self.assertEqual(
+            [(item['original'], item['replacement']) for item in result.diff()],
+            [('Rdis', 'Redis'), ('ConcurentHashMap', 'ConcurrentHashMap'), ('sychronized', 'synchronized')],
+        )
+
+    def test_corrects_transposition(self):
+        self.assertEqual(self.corrector.correct('用 Kafak 削峰').text, '用 Kafka 削峰')
+
+    def test_corrects_pinyin_confusion(self):
+        result = self.corrector.correct('线程吃满了会导致缓存穿头吗')
+
+        self.assertEqual(result.text, '线程池满了会导致缓存穿透吗')
+        self.assertEqual({item['kind'] for item in result.diff()}, {'pinyin'})
+
+    def test_keeps_valid_text_untouched(self):
+        text = '这个 block 会表达清楚，所以 redis 的 Sets 不改'
+        result = self.corrector.correct(text)
+
+        self.assertFalse(result.changed)
+        self.assertEqual(result.diff(), [])
+
+    def test_keeps_ordinary_english_and_versions(self):
+        corrector = TermCorrector(CURATED_TERMS)
+        text = (
+            'the pool was consumed, the key expired, the thread interrupted; '
+            'selected indexes by a reader on JDK8'
+        )
+        result = corrector.correct(text)
+
+        self.assertEqual(result.diff(), [])
+        self.assertEqual(corrector.correct('Rdis 的 epol 模型').text, 'Redis 的 epoll 模型')
+
+    def test_keeps_plurals_of_terms(self):
+        corrector = TermCorrector(CURATED_TERMS)
+
+        self.assertEqual(corrector.correct('strings 和 brokers').diff(), [])
+        self.assertEqual(corrector.correct('多个 producers 写入').diff(), [])
+        self.assertEqual(corrector.correct('Kafak consumers 拉取').text, 'Kafka consumers 拉取')
+
+    def test_keeps_ordinary_english_sentences(self):
+        corrector = TermCorrector(CURATED_TERMS)
+        for text in [
+            'we finished the sprint and booked two Seats',
+            'queries stopped because the threads were blocked',
+            'partitions and offsets are stored per topic',
+        ]:
+            self.assertEqual(corrector.correct(text).diff(), [], text)
+
+    def test_build_from_question_corpus(self):
+        corrector = build_corrector_from_questions([
+            ('ShardingSphere 分片原理', ['Snowflake 算法'], ['分片算法', 'Mycat'], ''),
+        ])
+
+        self.assertEqual(corrector.correct('ShardingSpere 的分片').text, 'ShardingSphere 的分片')
+        self.assertIn('分片算法', corrector.cjk_terms)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_local_corrector_rebuilds_after_question_change(self):
+        category = Category.objects.create(name='Redis')
+        Question.objects.create(category=category, title='Lettuce 客户端', tags=[])
+        first = get_local_corrector()
+        self.assertIs(get_local_corrector(), first)
+
+        question = Question.objects.create(category=category, title='Jedis 连接池', tags=[])
+        invalidate_questions([question.id])
+        self.assertIsNot(get_local_corrector(), first)
+
+    def test_local_corrector_skips_signature_query_between_checks(self):
+        category = Category.objects.create(name='Redis')
+        Question.objects.create(category=category, title='Lettuce 客户端', tags=[])
+        first = get_local_corrector()
+        with self.assertNumQueries(0):
+            self.assertIs(get_local_corrector(), first)
+
+        Question.objects.create(category=category, title='Jedis 连接池', tags=[])
+        self.assertIs(get_local_corrector(), first)
+        with mock.patch('ai_service.corrector.time.monotonic', return_value=time.monotonic() + 3600):
+            self.assertIsNot(get_local_corrector(), first)
+
+
+class LocalScoringTests(TestCase):
+    def test_reports_matched_and_missing_key_points(self):
+        estimate = score_answer_locally(
+            ['基于内存操作', 'IO 多路复用', '单线程避免上下文切换'],
+            '',
+            'Redis 快主要是因为基于内存，同时用了 IO 多路复用。',
+        )
+
+        self.assertEqual(estimate['matched_points'], ['基于内存操作', 'IO 多路复用'])
+        self.assertEqual(estimate['missing_points'], ['单线程避免上下文切换'])
+        self.assertGreater(estimate['score'], 0)
+        self.assertLess(estimate['score'], 100)
+
+    def test_derives_points_from_brief_answer_when_key_points_missing(self):
+        points = reference_points([], '1. 核心线程数决定常驻线程；2. 阻塞队列缓冲任务。\n拒绝策略兜底')
+
+        self.assertEqual(points, ['核心线程数决定常驻线程', '阻塞队列缓冲任务', '拒绝策略兜底'])
+
+    def test_empty_answer_scores_zero(self):
+        estimate = score_answer_locally(['基于内存操作'], '', '')
+
+        self.assertEqual(estimate['score'], 0)
+        self.assertEqual(estimate['missing_points'], ['基于内存操作'])
+
+
+class SubmitAnswerStreamCorrectionTests(StreamingAnswerTestCase):
+    def setUp(self):
+        reset_local_corrector()
+        self.addCleanup(reset_local_corrector)
+        super().setUp()
+        self.question.tags = ['Redis']
+        self.question.save()
+
+    def test_stream_uses_local_corrector_without_llm(self):
+        provider = FakeProvider()
+        events = self.submit_answer(provider, 'Rdis 基于内存')
+
+        correction = dict(events)['correction']
+        self.assertEqual(correction['corrected'], 'Redis 基于内存')
+        self.assertEqual(correction['diff'][0]['replacement'], 'Redis')
+        self.assertEqual(provider.correct_calls, 0)
+        record = AnswerRecord.objects.get()
+        self.assertEqual(record.corrected_answer, 'Redis 基于内存')
+
+    def test_provisional_event_precedes_llm_output(self):
+        self.question.key_points = ['基于内存', '多路复用']
+        self.question.save()
+
+        events = self.submit_answer(FakeProvider(), 'Redis 基于内存')
+
+        self.assertEqual(events[0][0], 'provisional')
+        self.assertEqual(events[0][1]['matched_points'], ['基于内存'])
+        self.assertEqual(events[0][1]['missing_points'], ['多路复用'])
+
+    def test_missing_model_config_returns_error_by_default(self):
+        AiModelConfig.objects.all().delete()
+        response = self.client.post(
+            '/api/answers/submit-stream/',
+            data=json.dumps({'user_id': self.user.id, 'question_id': self.question.id, 'answer': '基于内存'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(LOCAL_SCORING_FALLBACK=True)
+    def test_offline_fallback_scores_locally_without_model(self):
+        AiModelConfig.objects.all().delete()
+        self.question.key_points = ['基于内存', '多路复用']
+        self.question.save()
+
+        response = self.client.post(
+            '/api/answers/submit-stream/',
+            data=json.dumps({'user_id': self.user.id, 'question_id': self.question.id, 'answer': 'Redis 基于内存'}),
+            content_type='application/json',
+        )
+        events = dict(read_sse_events(response))
+
+        record = AnswerRecord.objects.get()
+        self.assertEqual(record.ai_model_name, '本地评分')
+        self.assertEqual(record.ai_score, events['provisional']['score'])
+        self.assertEqual(record.ai_highlights, ['基于内存'])
+        self.assertEqual(events['result']['id'], record.id)
+
+    @override_settings(AI_CORRECTION_LLM_FALLBACK=True)
+    def test_llm_fallback_only_when_local_finds_nothing(self):
+        provider = FakeProvider()
+        self.submit_answer(provider, 'Redis 基于内存')
+        self.assertEqual(provider.correct_calls, 1)
+
+        self.submit_answer(provider, 'Rdis 基于内存')
+        self.assertEqual(provider.correct_calls, 1)
+
+
+class TaskRoutingTests(TestCase):
+    def setUp(self):
+        latency_tracker.reset()
+        self.strong = AiModelConfig.objects.create(
+            name='强模型', api_key='k', model_name='deepseek-ai/DeepSeek-R1', is_default=True,
+        )
+        self.fast = AiModelConfig.objects.create(name='快模型', api_key='k', model_name='fast-chat')
+
+    def tearDown(self):
+        latency_tracker.reset()
+
+    def test_without_routes_uses_default_model_and_legacy_params(self):
+        provider, model_name = get_ai_provider(task=TASK_CORRECTION)
+
+        self.assertEqual(model_name, '强模型')
+        self.assertEqual(provider.get_profile(TASK_CORRECTION).temperature, 0.3)
+        self.assertEqual(provider.get_profile(TASK_SCORING).max_tokens, 2000)
+
+    def test_task_route_selects_model_and_generation_params(self):
+        AiTaskProfile.objects.create(
+            task=TASK_BATTLE, model_config=self.fast, temperature=0.2, max_tokens=512, timeout=15,
+        )
+
+        provider, model_name = get_ai_provider(task=TASK_BATTLE)
+        calls = []
+        provider.client = fake_completion_client(calls)
+        provider._chat(TASK_BATTLE, 'prompt')
+
+        self.assertEqual(model_name, '快模型')
+        self.assertEqual(calls[0]['model'], 'fast-chat')
+        self.assertEqual(calls[0]['temperature'], 0.2)
+        self.assertEqual(calls[0]['max_tokens'], 512)
+        self.assertEqual(calls[0]['timeout'], 15)
+        # 其他任务不受影响
+        self.assertEqual(get_ai_provider(task=TASK_SCORING)[1], '强模型')
+
+    def test_disabled_route_falls_back_to_default(self):
+        AiTaskProfile.objects.create(task=TASK_SCORING, model_config=self.fast, is_enabled=False)
+
+        self.assertEqual(get_ai_provider(task=TASK_SCORING)[1], '强模型')
+
+    def test_fastest_policy_picks_lowest_latency_healthy_model(self):
+        route = AiTaskProfile.objects.create(task=TASK_SCORING, policy=AiTaskProfile.POLICY_FASTEST)
+        route.alternate_models.add(self.fast)
+        latency_tracker.record_success(self.strong.id, 4.0)
+        latency_tracker.record_success(self.fast.id, 0.5)
+
+        self.assertEqual(get_ai_provider(task=TASK_SCORING)[1], '快模型')
+
+        for _ in range(3):
+            latency_tracker.record_failure(self.fast.id)
+        self.assertEqual(get_ai_provider(task=TASK_SCORING)[1], '强模型')
+
+    def test_fastest_policy_only_considers_route_and_alternate_models(self):
+        other = AiModelConfig.objects.create(name='未授权模型', api_key='k', model_name='other-chat')
+        route = AiTaskProfile.objects.create(
+            task=TASK_SCORING, model_config=self.fast, policy=AiTaskProfile.POLICY_FASTEST,
+        )
+        route.alternate_models.add(self.strong)
+
+        # 都还没有测量数据时用路由模型，而不是去探测其他模型
+        self.assertEqual(resolve_task_model_config(TASK_SCORING), self.fast)
+
+        latency_tracker.record_success(self.fast.id, 2.0)
+        latency_tracker.record_success(self.strong.id, 1.0)
+        latency_tracker.record_success(other.id, 0.1)
+        self.assertEqual(resolve_task_model_config(TASK_SCORING), self.strong)
+
+    def test_api_configures_fastest_route_alternates(self):
+        response = self.client.post('/api/ai-task-profiles/', data={
+            'task': TASK_SCORING, 'model_config': self.strong.id, 'policy': AiTaskProfile.POLICY_FASTEST,
+            'alternate_models': [self.fast.id],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['alternate_models'], [self.fast.id])
+
+        latency_tracker.record_success(self.strong.id, 4.0)
+        latency_tracker.record_success(self.fast.id, 0.5)
+        self.assertEqual(resolve_task_model_config(TASK_SCORING), self.fast)
+
+        response = self.client.patch(
+            f'/api/ai-task-profiles/{response.json()["id"]}/', data={'alternate_models': []},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['alternate_models'], [])
+        self.assertEqual(resolve_task_model_config(TASK_SCORING), self.strong)
+
+    def test_chat_records_latency_for_routing(self):
+        provider, _ = get_ai_provider()
+        provider.client = fake_completion_client([])
+        provider.correct_text('文本')
+
+        self.assertEqual(latency_tracker.snapshot()[self.strong.id]['samples'], 1)
+
+
+class StreamCancellationTests(StreamingAnswerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstream = FakeChunkStream(['<think>', '想', '一想', '</think>'] + ['{"score"'] * 200)
+
+    def test_closing_provider_stream_closes_upstream(self):
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(self.upstream)
+        progress = StreamProgress()
+        events = provider.analyze_answer_stream('t', '', '', [], 'a', progress=progress)
+
+        self.assertEqual(next(events), ('thinking', '想'))
+        events.close()
+
+        self.assertTrue(self.upstream.closed)
+        self.assertFalse(progress.finished)
+        self.assertEqual(progress.accumulated, '<think>想')
+        self.assertEqual(progress.saved_tokens, 2000 - 2)
+
+    def test_client_disconnect_records_aborted_attempt(self):
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(self.upstream)
+        response = self.post_answer(provider)
+        chunks = iter(response.streaming_content)
+        received = b''
+        while b'event: content' not in received:
+            received += next(chunks)
+        # WSGI 服务器在客户端断开后调用 response.close()
+        response.close()
+
+        self.assertTrue(self.upstream.closed)
+        self.assertLess(self.upstream.sent, len(self.upstream.tokens))
+        attempt = GenerationAttempt.objects.get()
+        self.assertEqual(attempt.status, GenerationAttempt.STATUS_ABORTED)
+        self.assertEqual(attempt.task, TASK_SCORING)
+        self.assertEqual(attempt.user, self.user)
+        self.assertTrue(attempt.partial_output.startswith('<think>想一想</think>'))
+        self.assertEqual(attempt.saved_tokens, 2000 - attempt.generated_tokens)
+        self.assertFalse(AnswerRecord.objects.exists())
+
+    def test_completed_stream_is_not_recorded_as_aborted(self):
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(FakeChunkStream(['{"score": 70}']))
+        response = self.post_answer(provider)
+        events = dict(read_sse_events(response))
+        response.close()
+
+        self.assertIn('result', events)
+        self.assertTrue(AnswerRecord.objects.exists())
+        self.assertFalse(GenerationAttempt.objects.exists())
+
+
+class StreamContinuationTests(StreamingAnswerTestCase):
+    def setUp(self):
+        latency_tracker.reset()
+        super().setUp()
+        self.answer_json = '{"score": 70, "role_scores": [{"role_key": "r1", "score": 70, "comment": "ok"}]}'
+
+    def tearDown(self):
+        latency_tracker.reset()
+
+    def test_resumes_from_checkpoint_on_same_model(self):
+        head, tail = self.answer_json[:20], self.answer_json[20:]
+        calls = []
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(
+            FakeChunkStream(['<think>', '分析', '</think>', head, 'lost'], fail_after=4),
+            FakeChunkStream([tail]),
+            calls=calls,
+        )
+
+        events = self.submit_answer(provider)
+
+        retry = dict(events)['retry']
+        self.assertEqual(retry['attempt'], 1)
+        self.assertEqual(retry['model_name'], '测试模型')
+        self.assertEqual(calls[1]['messages'][1], {'role': 'assistant', 'content': '<think>分析</think>' + head})
+        self.assertEqual(calls[1]['messages'][2]['role'], 'user')
+        content = ''.join(data['content'] for event, data in events if event == 'content')
+        self.assertEqual(content, self.answer_json)
+        self.assertEqual(AnswerRecord.objects.get().ai_score, 70)
+        self.assertFalse(GenerationAttempt.objects.exists())
+
+    def test_switches_to_fallback_model_after_retries(self):
+        AiModelConfig.objects.create(name='备用模型', api_key='k', model_name='backup')
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(
+            FakeChunkStream(['{"score"', 'x'], fail_after=1),
+            FakeChunkStream(['x'], fail_after=0),
+        )
+        backup_calls = []
+        build_fallback = provider.fallback_factory
+
+        def fallback_factory():
+            fallback = build_fallback()
+            fallback.client = fake_streaming_client(FakeChunkStream([self.answer_json[8:]]), calls=backup_calls)
+            return fallback
+        provider.fallback_factory = fallback_factory
+
+        events = self.submit_answer(provider)
+
+        retries = [data for event, data in events if event == 'retry']
+        self.assertEqual([item['model_name'] for item in retries], ['测试模型', '备用模型'])
+        self.assertEqual(backup_calls[0]['model'], 'backup')
+        self.assertEqual(AnswerRecord.objects.get().ai_model_name, '备用模型')
+
+    def test_stream_without_finish_reason_is_not_retried(self):
+        calls = []
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(FakeChunkStream([self.answer_json], finish_reason=None), calls=calls)
+
+        events = self.submit_answer(provider)
+
+        self.assertNotIn('retry', dict(events))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(AnswerRecord.objects.get().ai_score, 70)
+
+    def test_usage_is_priced_with_the_model_that_finished(self):
+        provider = AiProvider(api_key='k', model_name='deepseek-ai/DeepSeek-R1')
+        provider.client = fake_streaming_client(
+            FakeChunkStream(['{"score"', 'x'], fail_after=1),
+            FakeChunkStream(['x'], fail_after=0),
+        )
+        usage = {'prompt_tokens': 1_000_000, 'completion_tokens': 0, 'total_tokens': 1_000_000}
+        fallback = AiProvider(api_key='k', model_name='glm-4')
+        fallback.client = fake_streaming_client(FakeChunkStream([self.answer_json[8:]], usage=usage))
+        provider.fallback_factory = lambda: fallback
+
+        events = list(provider.analyze_answer_stream('Redis 为什么快？', '', '', [], '基于内存'))
+
+        # glm 输入 1 元 / 百万 token；按主模型 DeepSeek-R1 计价会是 4 元
+        self.assertEqual(events[-1][1]['usage']['cost'], 1.0)
+
+    def test_records_partial_output_when_retries_exhausted(self):
+        provider, _ = get_ai_provider(task=TASK_SCORING)
+        provider.client = fake_streaming_client(
+            FakeChunkStream(['{"score"', 'x'], fail_after=1),
+            FakeChunkStream(['x'], fail_after=0),
+        )
+
+        events = self.submit_answer(provider)
+
+        self.assertEqual(events[-1][0], 'error')
+        attempt = GenerationAttempt.objects.get()
+        self.assertEqual(attempt.status, GenerationAttempt.STATUS_FAILED)
+        self.assertEqual(attempt.partial_output, '{"score"')
+        self.assertEqual(attempt.retries, 1)
+        self.assertFalse(AnswerRecord.objects.exists())
+
+
+class FakeServerTests(TestCase):
+    def setUp(self):
+        self.server = start_fake_server(config=FakeServerConfig(ttft=0, tokens_per_second=0, seed=7))
+        self.provider = AiProvider(api_key='fake', base_url=self.server.base_url, model_name='fake-model')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_streams_thinking_content_and_usage(self):
+        progress = StreamProgress()
+        events = list(self.provider.analyze_answer_stream('Redis 为什么快？', '', '', [], '基于内存', progress=progress))
+
+        kinds = {event for event, _ in events}
+        self.assertTrue({'thinking', 'content', 'result'} <= kinds)
+        result = events[-1][1]
+        self.assertTrue(40 <= result['score'] <= 95)
+        self.assertEqual(len(result['role_scores']), 3)
+        self.assertEqual(result['usage']['completion_tokens'], progress.chunks)
+
+    def test_dropped_stream_resumes_without_duplicates(self):
+        self.server.config.drop_rate = 1.0
+        progress = StreamProgress()
+        events = []
+        for event, content in self.provider.analyze_answer_stream('Redis 为什么快？', '', '', [], '基于内存', progress=progress):
+            if event == 'retry':
+                self.server.config.drop_rate = 0.0
+            events.append((event, content))
+
+        self.assertEqual(progress.retries, 1)
+        self.assertEqual(progress.accumulated.count('<think>'), 1)
+        self.assertTrue(40 <= events[-1][1]['score'] <= 95)
+
+    def test_disabled_loadtest_model_needs_explicit_opt_in(self):
+        real = AiModelConfig.objects.create(name='real', api_key='k', base_url='http://real', model_name='m')
+        fake = AiModelConfig.objects.create(
+            name='fake', provider='fake', api_key='fake', base_url=self.server.base_url,
+            model_name='fake-model', is_enabled=False,
+        )
+        AiTaskProfile.objects.create(task=TASK_SCORING, model_config=real, policy=AiTaskProfile.POLICY_FASTEST)
+        latency_tracker.reset()
+        self.addCleanup(latency_tracker.reset)
+        latency_tracker.record_success(fake.id, 0.01)
+
+        self.assertEqual(resolve_task_model_config(TASK_SCORING), real)
+        self.assertIsNone(build_fallback_provider(real.id))
+        # 供应商标识不再有特殊含义：禁用的配置默认不能按 ID 使用
+        with self.assertRaises(AiModelConfig.DoesNotExist):
+            get_ai_provider_by_id(fake.id)
+        with override_settings(AI_ALLOW_DISABLED_MODEL_IDS=True):
+            self.assertEqual(get_ai_provider_by_id(fake.id)[1], 'fake')
+
+    def test_loadtest_refuses_to_run_without_synthetic_users(self):
+        BaguUser.objects.create(username='real-user')
+        Question.objects.create(category=Category.objects.create(name='Redis'), title='Redis 为什么快？')
+
+        with self.assertRaisesMessage(CommandError, '没有合成用户'):
+            call_command('loadtest', base_url='http://127.0.0.1:9', stdout=StringIO())
+
+    def test_percentile_uses_nearest_rank(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+
+
+class ScaleDataTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Redis')
+        self.question_ids = [
+            Question.objects.create(category=category, title=f'问题{idx}').id for idx in range(20)
+        ]
+
+    def test_generates_consistent_history(self):
+        config = ScaleDataConfig(users=5, answers=300, progress_per_user=10, batch_size=50, seed=3)
+        report = ScaleDataGenerator(config, self.question_ids).generate()
+
+        self.assertEqual(report.rows['users'], 5)
+        self.assertEqual(AnswerRecord.objects.count(), 300)
+        self.assertEqual(UserQuestionProgress.objects.count(), 50)
+        self.assertEqual(FollowUpQuestion.objects.count(), report.rows['follow_ups'])
+        user = BaguUser.objects.filter(username__startswith='scale').first()
+        stats = AnswerRecord.objects.filter(user=user).aggregate(count=Count('id'), avg=Avg('ai_score'))
+        self.assertEqual(user.total_answers, stats['count'])
+        self.assertAlmostEqual(user.avg_score, stats['avg'], places=0)
+        for evaluation_round in EvaluationRound.objects.all():
+            records = list(evaluation_round.answer_records.all())
+            self.assertEqual(evaluation_round.model_count, len(records))
+            self.assertEqual({(r.user_id, r.question_id) for r in records},
+                             {(evaluation_round.user_id, evaluation_round.question_id)})
+        record = AnswerRecord.objects.order_by('id').last()
+        self.assertEqual(len(record.ai_role_scores), 3)
+        self.assertGreater(record.created_at, AnswerRecord.objects.order_by('id').first().created_at)
+
+        # 生成后 ORM 仍能正常新建（主键序列未被打乱）
+        self.assertGreater(BaguUser.objects.create(username='after').id, user.id)
+
+    def test_clear_removes_only_generated_users(self):
+        BaguUser.objects.create(username='real-user')
+        # 真实用户名恰好以前缀开头，也不能被删除
+        BaguUser.objects.create(username='scaleway-fan')
+        ScaleDataGenerator(ScaleDataConfig(users=3, answers=20, progress_per_user=2, seed=1), self.question_ids).generate()
+        # 压测后合成用户名下会有中断的生成记录
+        attempt = GenerationAttempt.objects.create(
+            task='scoring', user=BaguUser.objects.filter(is_synthetic=True).first(), partial_output='半截',
+        )
+
+        deleted = clear_scale_data('scale')
+
+        self.assertEqual(deleted['users'], 3)
+        self.assertEqual(
+            sorted(BaguUser.objects.values_list('username', flat=True)), ['real-user', 'scaleway-fan'],
+        )
+        self.assertFalse(AnswerRecord.objects.exists())
+        attempt.refresh_from_db()
+        self.assertIsNone(attempt.user_id)
+
+
+class AnswerRecordFieldsTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Redis')
+        question = Question.objects.create(category=category, title='Redis 为什么快？')
+        self.user = BaguUser.objects.create(username='fields-user')
+        self.record = AnswerRecord.objects.create(
+            user=self.user, question=question, user_answer='很长的回答' * 100, ai_score=80,
+            ai_highlights=['内存'], ai_suggestion='补充 IO 多路复用', ai_model_name='m1',
+        )
+
+    def test_list_default_is_compact(self):
+        response = self.client.get('/api/answers/', {'user_id': self.user.id})
+
+        item = response.json()['results'][0]
+        self.assertEqual(
+            set(item), {'id', 'question', 'question_title', 'category_name', 'ai_score', 'ai_model_name', 'created_at'},
+        )
+        self.assertEqual(item['category_name'], 'Redis')
+
+    def test_fields_projection_limits_columns(self):
+        # 第一条查询是 ETag 用的用户版本号
+        with self.assertNumQueries(2) as captured:
+            response = self.client.get('/api/answers/', {'user_id': self.user.id, 'fields': 'id,ai_score'})
+
+        self.assertEqual(response.json()['results'], [{'id': self.record.id, 'ai_score': 80}])
+        select = captured.captured_queries[-1]['sql']
+        self.assertNotIn('user_answer', select)
+        self.assertNotIn('questions_question', select)
+
+    def test_detail_fields_for_lazy_loading(self):
+        response = self.client.get(
+            f'/api/answers/{self.record.id}/', {'fields': 'id,user_answer,ai_highlights,ai_suggestion'},
+        )
+        self.assertEqual(response.json()['ai_highlights'], ['内存'])
+        self.assertEqual(set(response.json()), {'id', 'user_answer', 'ai_highlights', 'ai_suggestion'})
+
+        full = self.client.get(f'/api/answers/{self.record.id}/').json()
+        self.assertEqual(full['question_title'], 'Redis 为什么快？')
+        self.assertIn('ai_role_scores', full)
+        self.assertEqual(self.client.get('/api/answers/', {'fields': 'id,secret'}).status_code, 400)
+
+
+class AnswerHistoryPaginationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Redis')
+        question = Question.objects.create(category=category, title='Redis 为什么快？')
+        self.user = BaguUser.objects.create(username='cursor-user')
+        other = BaguUser.objects.create(username='other-user')
+        base = timezone.now()
+        records = [
+            AnswerRecord(user=self.user, question=question, user_answer=str(index), ai_score=index)
+            for index in range(7)
+        ] + [AnswerRecord(user=other, question=question, user_answer='x')]
+        AnswerRecord.objects.bulk_create(records)
+        # 两条记录时间相同，翻页时不能重复或遗漏
+        for index, record in enumerate(AnswerRecord.objects.filter(user=self.user).order_by('id')):
+            record.created_at = base - timedelta(minutes=min(index, 4) if index != 5 else 4)
+            record.save(update_fields=['created_at'])
+
+    def test_cursor_walks_all_records_without_count(self):
+        url, seen = f'/api/answers/?user_id={self.user.id}&page_size=2&fields=id,ai_score', []
+        while url:
+            with self.assertNumQueries(2):
+                data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+
+        expected = list(
+            AnswerRecord.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AnswerHistoryConditionalTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Redis')
+        self.question = Question.objects.create(category=category, title='Redis 为什么快？')
+        self.user = BaguUser.objects.create(username='etag-user')
+        self.record = AnswerRecord.objects.create(user=self.user, question=self.question, user_answer='单线程', ai_score=70)
+        self.url = f'/api/answers/?user_id={self.user.id}'
+
+    def test_unchanged_history_returns_304_without_listing(self):
+        first = self.client.get(self.url)
+        etag = first['ETag']
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # nginx 压缩后会把 ETag 改成弱校验值，同样算命中
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+        self.assertNotEqual(self.client.get(self.url + '&fields=id', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_writes_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        FollowUpQuestion.objects.create(answer_record=self.record, user_question='为什么？', ai_response='IO 多路复用')
+        BaguUser.bump_data_version([self.user.id])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.user.total_answers = 2
+        self.user.save(update_fields=['total_answers'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # 题目改名影响历史里的题目标题，题库版本也在 ETag 里
+        etag = response['ETag']
+        invalidate_questions([self.question.id])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_finalize_round_bumps_version(self):
+        round_obj = EvaluationRound.objects.create(user=self.user, question=self.question, user_answer='单线程')
+        self.record.round = round_obj
+        self.record.save(update_fields=['round'])
+        version = BaguUser.objects.get(pk=self.user.pk).data_version
+
+        self.client.post(f'/api/rounds/{round_obj.id}/finalize/')
+
+        self.assertEqual(BaguUser.objects.get(pk=self.user.pk).data_version, version + 1)
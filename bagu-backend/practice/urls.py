@@ -6,6 +6,7 @@ router = DefaultRouter()
 router.register('answers', views.AnswerRecordViewSet, basename='answers')
 router.register('ai-models', views.AiModelConfigViewSet, basename='ai-models')
 router.register('ai-roles', views.AiRoleConfigViewSet, basename='ai-roles')
+router.register('ai-task-profiles', views.AiTaskProfileViewSet, basename='ai-task-profiles')
 
 urlpatterns = [
     path('answers/submit/', views.submit_answer, name='submit-answer'),
@@ -1,20 +1,35 @@
 import json
+import time
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from django.conf import settings
 from django.db.models import Avg
 from django.http import StreamingHttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
-from .models import AnswerRecord, AiModelConfig, AiRoleConfig, EvaluationRound, FollowUpQuestion
+from .models import (
+    AnswerRecord, AiModelConfig, AiRoleConfig, AiTaskProfile, EvaluationRound, FollowUpQuestion, GenerationAttempt,
+)
+from .pagination import AnswerHistoryPagination
 from .serializers import (
     AnswerSubmitSerializer, AnswerRecordSerializer, AnswerRecordListSerializer,
-    AiModelConfigSerializer, AiModelConfigWriteSerializer, AiRoleConfigSerializer,
+    AiModelConfigSerializer, AiModelConfigWriteSerializer, AiRoleConfigSerializer, AiTaskProfileSerializer,
     EvaluationRoundSerializer, FollowUpQuestionSerializer,
 )
+from questions.catalog_cache import CATALOG_TAG, tag_versions
 from questions.models import Question, mark_question_completed
+from users.changes import not_modified, user_data_version, user_etag, with_etag
 from users.models import BaguUser
-from ai_service.provider import get_ai_provider, get_ai_provider_by_id
+from ai_service.corrector import get_local_corrector
+from bagu import tracing
+from bagu.metrics import record_cancelled_tokens
+from bagu.sparse_fields import parse_fields, project_queryset
+from ai_service.local_scoring import LOCAL_MODEL_NAME, build_offline_result, score_answer_locally
+from ai_service.provider import (
+    TASK_BATTLE, TASK_CORRECTION, TASK_FOLLOW_UP, TASK_SCORING, StreamProgress,
+    get_ai_provider, get_ai_provider_by_id, get_routed_provider,
+)
 
 
 def _get_enabled_roles(role_key=None, difficulty_level=None):
@@ -77,6 +92,18 @@ def _merge_role_scores(result, roles):
     return result
 
 
+def _correct_answer_text(provider, text):
+    """本地词典纠错；仅在开启兜底且本地无修改时走 LLM 慢路径。返回 (纠正后文本, diff)"""
+    result = get_local_corrector().correct(text)
+    if result.changed or not settings.AI_CORRECTION_LLM_FALLBACK:
+        return result.text, result.diff()
+    # 纠错任务配置了专用（便宜快速）模型时优先用它
+    routed = get_routed_provider(TASK_CORRECTION)
+    if routed is not None:
+        provider = routed[0]
+    return provider.correct_text(text), []
+
+
 @api_view(['POST'])
 def submit_answer(request):
     """提交答案 → AI 分析 → 保存记录 → 更新用户统计"""
@@ -104,7 +131,7 @@ def submit_answer(request):
         if 'model_id' in data and data['model_id']:
             provider, model_name = get_ai_provider_by_id(data['model_id'])
         else:
-            provider, model_name = get_ai_provider()
+            provider, model_name = get_ai_provider(task=TASK_SCORING)
 
         result = provider.analyze_answer(
             title=question.title,
@@ -150,10 +177,89 @@ def submit_answer(request):
     return Response(AnswerRecordSerializer(record).data, status=status.HTTP_201_CREATED)
 
 
+def _save_stream_record(user, question, answer_text, corrected_text, result, model_name, evaluation_round,
+                        response_ms=0):
+    """保存流式评分记录并更新用户统计（记录关联当前追踪的 trace_id）"""
+    with tracing.span('db.answer_record_write'):
+        record = AnswerRecord.objects.create(
+            user=user,
+            question=question,
+            user_answer=answer_text,
+            corrected_answer=corrected_text if corrected_text != answer_text else '',
+            ai_score=result['score'],
+            ai_highlights=result['highlights'],
+            ai_missing_points=result['missing_points'],
+            ai_suggestion=result['suggestion'],
+            ai_improved_answer=result['improved_answer'],
+            ai_model_name=model_name,
+            ai_role_scores=result.get('role_scores', []),
+            ai_junior_score=result.get('junior_score', 0),
+            ai_junior_comment=result.get('junior_comment', ''),
+            ai_mid_score=result.get('mid_score', 0),
+            ai_mid_comment=result.get('mid_comment', ''),
+            ai_senior_score=result.get('senior_score', 0),
+            ai_senior_comment=result.get('senior_comment', ''),
+            round=evaluation_round,
+            trace_id=tracing.current_trace_id(),
+            response_ms=response_ms,
+        )
+    # 更新用户统计
+    with tracing.span('db.stats_update'):
+        user.total_answers += 1
+        avg = AnswerRecord.objects.filter(user=user).aggregate(avg=Avg('ai_score'))
+        user.avg_score = round(avg['avg'] or 0, 1)
+        user.save(update_fields=['total_answers', 'avg_score'])
+        mark_question_completed(user_id=user.id, question_id=question.id)
+    return record
+
+
+def _trace_llm_phases(root, progress):
+    """按 Provider 记录的阶段时间补记 LLM 相关 span：排队/建连 → 首 token → 生成 → 解析"""
+    marks = progress.marks
+    tracing.record_span('llm.request', marks.get('request'), marks.get('response'), parent=root,
+                        model=progress.model_name or '')
+    tracing.record_span('llm.first_token', marks.get('response'), marks.get('first_token'), parent=root)
+    tracing.record_span('llm.generation', marks.get('first_token'), marks.get('generated'), parent=root,
+                        completion_tokens=progress.generated_tokens, retries=progress.retries)
+    tracing.record_span('llm.parse_response', marks.get('parse_start'), marks.get('parse_end'), parent=root)
+
+
+def _record_generation_attempt(progress, task, status, model_name, user=None, question=None):
+    """把未正常完成的流式生成（已生成的部分输出）记为 GenerationAttempt"""
+    if not progress.started or progress.finished:
+        return None
+    return GenerationAttempt.objects.create(
+        task=task,
+        status=status,
+        user=user,
+        question=question,
+        ai_model_name=progress.model_name or model_name or '',
+        partial_output=progress.accumulated,
+        generated_tokens=progress.generated_tokens,
+        max_tokens=progress.max_tokens,
+        saved_tokens=progress.saved_tokens if status == GenerationAttempt.STATUS_ABORTED else 0,
+        retries=progress.retries,
+        duration_ms=round((time.monotonic() - progress.started_at) * 1000),
+    )
+
+
+def _abort_generation(events, progress, task, model_name, user=None, question=None):
+    """SSE 客户端断开：立即关闭上游模型流（释放连接与 worker），并把已生成的部分输出记为中断的生成"""
+    if events is None:
+        return None
+    events.close()
+    attempt = _record_generation_attempt(
+        progress, task, GenerationAttempt.STATUS_ABORTED, model_name, user=user, question=question,
+    )
+    if attempt is not None:
+        record_cancelled_tokens(task, attempt.ai_model_name, attempt.saved_tokens)
+    return attempt
+
+
 @csrf_exempt
 @require_POST
 def submit_answer_stream(request):
-    """流式提交答案 → AI 纠错 → SSE 实时推送 AI 分析过程"""
+    """流式提交答案 → 本地预估分 → 纠错 → SSE 实时推送 AI 分析过程"""
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
@@ -170,98 +276,146 @@ def submit_answer_stream(request):
     if not all([user_id, question_id, answer_text]):
         return JsonResponse({'detail': '缺少必要参数'}, status=400)
 
-    try:
-        user = BaguUser.objects.get(pk=user_id)
-    except BaguUser.DoesNotExist:
-        return JsonResponse({'detail': '用户不存在'}, status=404)
+    request_started = time.monotonic()
+    root = tracing.start_span(
+        'scoring.submit_stream', user_id=user_id, question_id=question_id, answer_length=len(answer_text),
+    )
+    tracing.record_span('http.queue', tracing.request_queue_start_ns(request), root.start_ns, parent=root)
 
-    try:
-        question = Question.objects.get(pk=question_id)
-    except Question.DoesNotExist:
-        return JsonResponse({'detail': '题目不存在'}, status=404)
+    def reject(detail, status_code):
+        root.end(status='error')
+        return JsonResponse({'detail': detail}, status=status_code)
 
-    try:
-        roles = _get_enabled_roles(role_key=role_key, difficulty_level=difficulty_level)
-        if model_id:
-            provider, model_name = get_ai_provider_by_id(model_id)
-        else:
-            provider, model_name = get_ai_provider()
-    except (AiModelConfig.DoesNotExist, ValueError) as e:
-        return JsonResponse({'detail': str(e)}, status=400)
+    with tracing.use_span(root), tracing.span('db.lookup'):
+        try:
+            user = BaguUser.objects.get(pk=user_id)
+        except BaguUser.DoesNotExist:
+            return reject('用户不存在', 404)
+
+        try:
+            question = Question.objects.get(pk=question_id)
+        except Question.DoesNotExist:
+            return reject('题目不存在', 404)
 
-    # 获取关联的 round
-    evaluation_round = None
-    if round_id:
         try:
-            evaluation_round = EvaluationRound.objects.get(pk=round_id)
-        except EvaluationRound.DoesNotExist:
-            pass
+            roles = _get_enabled_roles(role_key=role_key, difficulty_level=difficulty_level)
+        except ValueError as e:
+            return reject(str(e), 400)
+
+        try:
+            if model_id:
+                provider, model_name = get_ai_provider_by_id(model_id)
+            else:
+                provider, model_name = get_ai_provider(task=TASK_SCORING)
+        except (AiModelConfig.DoesNotExist, ValueError) as e:
+            if not settings.LOCAL_SCORING_FALLBACK:
+                return reject(str(e), 400)
+            # 无可用模型：退化为本地关键要点覆盖度评分
+            provider, model_name = None, LOCAL_MODEL_NAME
+
+        # 获取关联的 round
+        evaluation_round = None
+        if round_id:
+            try:
+                evaluation_round = EvaluationRound.objects.get(pk=round_id)
+            except EvaluationRound.DoesNotExist:
+                pass
+    root.set(model=model_name)
+
+    def elapsed_ms():
+        return round((time.monotonic() - request_started) * 1000)
 
     def sse_generator():
+        events, progress = None, StreamProgress()
+        outcome = 'error'
         try:
-            # Step 1: AI 纠错（始终发送 correction 事件，前端根据是否有修改显示不同状态）
-            corrected_text = answer_text
+            # Step 0: 本地覆盖度预估分，LLM 首 token 之前先给用户反馈
+            with tracing.use_span(root), tracing.span('local_scoring') as phase:
+                estimate = score_answer_locally(question.key_points, question.brief_answer, answer_text)
+                phase.set(score=estimate['score'], coverage=estimate['coverage'])
+            yield f"event: provisional\ndata: {json.dumps(estimate, ensure_ascii=False, default=str)}\n\n"
+
+            if provider is None:
+                with tracing.use_span(root):
+                    final_result = _merge_role_scores(
+                        build_offline_result(estimate, roles, reference_answer=question.brief_answer),
+                        roles,
+                    )
+                    record = _save_stream_record(
+                        user, question, answer_text, answer_text, final_result, model_name, evaluation_round,
+                        response_ms=elapsed_ms(),
+                    )
+                outcome = 'ok'
+                yield f"event: result\ndata: {json.dumps(AnswerRecordSerializer(record).data, ensure_ascii=False, default=str)}\n\n"
+                yield "event: done\ndata: {}\n\n"
+                return
+
+            # Step 1: 本地术语纠错（始终发送 correction 事件，前端根据是否有修改显示不同状态）
+            corrected_text, diff = answer_text, []
             try:
-                corrected_text = provider.correct_text(answer_text)
-                if corrected_text != answer_text:
-                    yield f"event: correction\ndata: {json.dumps({'original': answer_text, 'corrected': corrected_text}, ensure_ascii=False, default=str)}\n\n"
-                else:
-                    yield f"event: correction\ndata: {json.dumps({'corrected': None}, ensure_ascii=False, default=str)}\n\n"
+                with tracing.use_span(root), tracing.span('correction') as phase:
+                    corrected_text, diff = _correct_answer_text(provider, answer_text)
+                    phase.set(changed=corrected_text != answer_text, corrections=len(diff))
             except Exception:
                 # 纠错失败也发送事件，让前端知道纠错已完成
+                corrected_text = answer_text
+            if corrected_text != answer_text:
+                yield f"event: correction\ndata: {json.dumps({'original': answer_text, 'corrected': corrected_text, 'diff': diff}, ensure_ascii=False, default=str)}\n\n"
+            else:
                 yield f"event: correction\ndata: {json.dumps({'corrected': None}, ensure_ascii=False, default=str)}\n\n"
 
             # Step 2: 流式评分（使用纠错后的文本）
             final_result = None
-            for event_type, content in provider.analyze_answer_stream(
+            events = provider.analyze_answer_stream(
                 title=question.title,
                 brief_answer=question.brief_answer,
                 detailed_answer=question.detailed_answer,
                 key_points=question.key_points,
                 user_answer=corrected_text,
                 roles=roles,
-            ):
+                progress=progress,
+            )
+            for event_type, content in events:
                 if event_type == 'result':
+                    _trace_llm_phases(root, progress)
                     final_result = _merge_role_scores(content, roles)
-                    # 保存记录
-                    record = AnswerRecord.objects.create(
-                        user=user,
-                        question=question,
-                        user_answer=answer_text,
-                        corrected_answer=corrected_text if corrected_text != answer_text else '',
-                        ai_score=final_result['score'],
-                        ai_highlights=final_result['highlights'],
-                        ai_missing_points=final_result['missing_points'],
-                        ai_suggestion=final_result['suggestion'],
-                        ai_improved_answer=final_result['improved_answer'],
-                        ai_model_name=model_name,
-                        ai_role_scores=final_result.get('role_scores', []),
-                        ai_junior_score=final_result.get('junior_score', 0),
-                        ai_junior_comment=final_result.get('junior_comment', ''),
-                        ai_mid_score=final_result.get('mid_score', 0),
-                        ai_mid_comment=final_result.get('mid_comment', ''),
-                        ai_senior_score=final_result.get('senior_score', 0),
-                        ai_senior_comment=final_result.get('senior_comment', ''),
-                        round=evaluation_round,
-                    )
-                    # 更新用户统计
-                    user.total_answers += 1
-                    avg = AnswerRecord.objects.filter(user=user).aggregate(avg=Avg('ai_score'))
-                    user.avg_score = round(avg['avg'] or 0, 1)
-                    user.save(update_fields=['total_answers', 'avg_score'])
-                    mark_question_completed(user_id=user.id, question_id=question.id)
-
+                    with tracing.use_span(root):
+                        record = _save_stream_record(
+                            user, question, answer_text, corrected_text, final_result,
+                            progress.model_name or model_name, evaluation_round,
+                            response_ms=elapsed_ms(),
+                        )
+                    outcome = 'ok'
                     result_data = AnswerRecordSerializer(record).data
                     # 附加 usage 信息（不入库，仅前端展示）
                     if 'usage' in final_result:
                         result_data['usage'] = final_result['usage']
                     yield f"event: result\ndata: {json.dumps(result_data, ensure_ascii=False, default=str)}\n\n"
+                elif event_type == 'retry':
+                    # 上游中断后已从检查点续写，前端保留已输出内容继续展示
+                    yield f"event: retry\ndata: {json.dumps(content, ensure_ascii=False, default=str)}\n\n"
                 else:
                     yield f"event: {event_type}\ndata: {json.dumps({'content': content}, ensure_ascii=False, default=str)}\n\n"
 
             yield "event: done\ndata: {}\n\n"
+        except GeneratorExit:
+            outcome = 'aborted'
+            _abort_generation(events, progress, TASK_SCORING, model_name, user=user, question=question)
+            raise
         except Exception as e:
+            root.set(error=f'{e.__class__.__name__}: {e}')
+            _record_generation_attempt(
+                progress, TASK_SCORING, GenerationAttempt.STATUS_FAILED, model_name, user=user, question=question,
+            )
             yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False, default=str)}\n\n"
+        finally:
+            if progress.started:
+                root.set(
+                    completion_tokens=progress.generated_tokens,
+                    prompt_tokens=(progress.usage or {}).get('prompt_tokens', 0),
+                    retries=progress.retries,
+                )
+            root.end(status=outcome)
 
     response = StreamingHttpResponse(
         sse_generator(),
@@ -346,6 +500,7 @@ def finalize_round(request, round_id):
     round_obj.model_count = len(scores)
     round_obj.completed = True
     round_obj.save(update_fields=['composite_score', 'model_count', 'completed'])
+    BaguUser.bump_data_version([round_obj.user_id])
 
     return JsonResponse(EvaluationRoundSerializer(round_obj).data)
 
@@ -375,7 +530,7 @@ def follow_up_stream(request):
         if model_id:
             provider, model_name = get_ai_provider_by_id(model_id)
         else:
-            provider, model_name = get_ai_provider()
+            provider, model_name = get_ai_provider(task=TASK_FOLLOW_UP)
     except (AiModelConfig.DoesNotExist, ValueError) as e:
         return JsonResponse({'detail': str(e)}, status=400)
 
@@ -388,8 +543,9 @@ def follow_up_stream(request):
     follow_up_history = '\n'.join(history_lines) if history_lines else ''
 
     def sse_generator():
+        events, progress = None, StreamProgress()
         try:
-            for event_type, content in provider.follow_up_stream(
+            events = provider.follow_up_stream(
                 title=record.question.title,
                 user_answer=record.user_answer,
                 score=record.ai_score,
@@ -398,21 +554,34 @@ def follow_up_stream(request):
                 suggestion=record.ai_suggestion,
                 follow_up_history=follow_up_history,
                 follow_up_question=question_text,
-            ):
+                progress=progress,
+            )
+            for event_type, content in events:
                 if event_type == 'done':
                     # 保存追问记录
                     fu = FollowUpQuestion.objects.create(
                         answer_record=record,
                         user_question=question_text,
                         ai_response=content,
-                        ai_model_name=model_name,
+                        ai_model_name=progress.model_name or model_name,
                     )
+                    BaguUser.bump_data_version([record.user_id])
                     yield f"event: followup_result\ndata: {json.dumps(FollowUpQuestionSerializer(fu).data, ensure_ascii=False, default=str)}\n\n"
+                elif event_type == 'retry':
+                    # 上游中断后已从检查点续写，前端保留已输出内容继续展示
+                    yield f"event: retry\ndata: {json.dumps(content, ensure_ascii=False, default=str)}\n\n"
                 else:
                     yield f"event: {event_type}\ndata: {json.dumps({'content': content}, ensure_ascii=False, default=str)}\n\n"
 
             yield "event: done\ndata: {}\n\n"
+        except GeneratorExit:
+            _abort_generation(events, progress, TASK_FOLLOW_UP, model_name, user=record.user, question=record.question)
+            raise
         except Exception as e:
+            _record_generation_attempt(
+                progress, TASK_FOLLOW_UP, GenerationAttempt.STATUS_FAILED, model_name,
+                user=record.user, question=record.question,
+            )
             yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False, default=str)}\n\n"
 
     response = StreamingHttpResponse(
@@ -425,15 +594,44 @@ def follow_up_stream(request):
 
 
 class AnswerRecordViewSet(viewsets.ReadOnlyModelViewSet):
-    """答题历史"""
+    """
+    答题历史。
+
+    ?fields=a,b 投影输出字段（列表默认只有短字段，详情默认全部字段），查询只取对应的列。
+    列表用游标分页（?cursor= 取自上一页的 next），深翻页不随页码变慢。
+    按 ?user_id= 查列表时带 ETag（用户数据版本 + 题库版本），未变化时直接 304，不查记录。
+    """
+    pagination_class = AnswerHistoryPagination
+
+    def list(self, request, *args, **kwargs):
+        user_id = request.query_params.get('user_id')
+        version = user_data_version(user_id) if user_id else None
+        if version is None:
+            return super().list(request, *args, **kwargs)
+        etag = user_etag(request, f'u{user_id}', version, tag_versions([CATALOG_TAG]))
+        return not_modified(request, etag) or with_etag(super().list(request, *args, **kwargs), etag)
 
     def get_serializer_class(self):
         if self.action == 'list':
             return AnswerRecordListSerializer
         return AnswerRecordSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self._fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def _fields(self):
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = parse_fields(
+                self.request.query_params.get('fields'), self.get_serializer_class().Meta,
+            )
+        return self._requested_fields
+
     def get_queryset(self):
-        qs = AnswerRecord.objects.select_related('question', 'question__category').all()
+        qs = project_queryset(
+            AnswerRecord.objects.all(), self._fields(), self.get_serializer_class().Meta,
+            extra_columns=self.pagination_class.position_columns,
+        )
         user_id = self.request.query_params.get('user_id')
         if user_id:
             qs = qs.filter(user_id=user_id)
@@ -486,6 +684,12 @@ class AiRoleConfigViewSet(viewsets.ModelViewSet):
         })
 
 
+class AiTaskProfileViewSet(viewsets.ModelViewSet):
+    """AI 任务路由 CRUD（各任务使用的模型与生成参数）"""
+    queryset = AiTaskProfile.objects.select_related('model_config').prefetch_related('alternate_models')
+    serializer_class = AiTaskProfileSerializer
+
+
 @csrf_exempt
 @require_POST
 def battle_analysis_stream(request):
@@ -510,15 +714,16 @@ def battle_analysis_stream(request):
 
     try:
         if model_id:
-            provider, _ = get_ai_provider_by_id(model_id)
+            provider, model_name = get_ai_provider_by_id(model_id)
         else:
-            provider, _ = get_ai_provider()
+            provider, model_name = get_ai_provider(task=TASK_BATTLE)
     except (AiModelConfig.DoesNotExist, ValueError) as e:
         return JsonResponse({'detail': str(e)}, status=400)
 
     def sse_generator():
+        events, progress = None, StreamProgress()
         try:
-            for event_type, content in provider.battle_analysis_stream(
+            events = provider.battle_analysis_stream(
                 title=question.title,
                 user_a_name=user_a['name'],
                 user_a_answer=user_a.get('answer', ''),
@@ -526,14 +731,25 @@ def battle_analysis_stream(request):
                 user_b_name=user_b['name'],
                 user_b_answer=user_b.get('answer', ''),
                 user_b_scores=user_b.get('scores', ''),
-            ):
+                progress=progress,
+            )
+            for event_type, content in events:
                 if event_type == 'result':
                     yield f"event: battle_result\ndata: {json.dumps(content, ensure_ascii=False, default=str)}\n\n"
+                elif event_type == 'retry':
+                    # 上游中断后已从检查点续写，前端保留已输出内容继续展示
+                    yield f"event: retry\ndata: {json.dumps(content, ensure_ascii=False, default=str)}\n\n"
                 else:
                     yield f"event: {event_type}\ndata: {json.dumps({'content': content}, ensure_ascii=False, default=str)}\n\n"
 
             yield "event: done\ndata: {}\n\n"
+        except GeneratorExit:
+            _abort_generation(events, progress, TASK_BATTLE, model_name, question=question)
+            raise
         except Exception as e:
+            _record_generation_attempt(
+                progress, TASK_BATTLE, GenerationAttempt.STATUS_FAILED, model_name, question=question,
+            )
             yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False, default=str)}\n\n"
 
     response = StreamingHttpResponse(
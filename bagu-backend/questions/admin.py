@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, SubCategory, Question, UserQuestionProgress
+from .models import Category, SubCategory, Question, QuestionSourceFile, UserQuestionProgress
+from .rendering import RENDERED_FIELDS
 
 
 class SubCategoryInline(admin.TabularInline):
@@ -27,6 +28,8 @@ class QuestionAdmin(admin.ModelAdmin):
     list_filter = ['category', 'sub_category', 'difficulty']
     search_fields = ['title', 'brief_answer']
     readonly_fields = ['created_at', 'updated_at']
+    # 预渲染字段在保存时自动生成
+    exclude = RENDERED_FIELDS
 
 
 @admin.register(UserQuestionProgress)
@@ -35,3 +38,12 @@ class UserQuestionProgressAdmin(admin.ModelAdmin):
     list_filter = ['is_completed', 'question__category']
     search_fields = ['user__username', 'user__nickname', 'question__title']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(QuestionSourceFile)
+class QuestionSourceFileAdmin(admin.ModelAdmin):
+    list_display = ['path', 'source_name', 'question', 'category_name', 'updated_at']
+    list_filter = ['source_name', 'category_name']
+    search_fields = ['path', 'normalized_title']
+    readonly_fields = ['content_hash', 'mtime_ns', 'size', 'updated_at']
+    raw_id_fields = ['question']
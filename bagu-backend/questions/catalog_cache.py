@@ -0,0 +1,48 @@
+"""题库接口缓存的标签失效。
+
+缓存键里带上相关标签的版本号（一次 get_many 取回），失效时只需改写标签版本，旧键随 TTL 自然过期：
+- catalog：分类列表 / 分类详情 / 题目列表，任意题目变化都会影响
+- question:<id>：单题详情
+Redis 不可用时版本号视为 0，缓存本身也会降级为直查 DB。
+"""
+import time
+
+from django.core.cache import cache
+
+CATALOG_TAG = 'catalog'
+
+
+def question_tag(question_id):
+    return f'question:{question_id}'
+
+
+def _version_key(tag):
+    return f'api:tag:{tag}'
+
+
+def tag_versions(tags):
+    """返回标签版本拼成的字符串，用于拼进缓存键"""
+    keys = [_version_key(tag) for tag in tags]
+    try:
+        values = cache.get_many(keys)
+    except Exception:
+        return '0'
+    return '.'.join(str(values.get(key, 0)) for key in keys)
+
+
+def bump_tags(tags):
+    """使带有这些标签的缓存全部失效"""
+    tags = set(tags)
+    if not tags:
+        return
+    version = time.time_ns()
+    try:
+        cache.set_many({_version_key(tag): version for tag in tags}, timeout=None)
+    except Exception:
+        # Redis 不可用时没有可失效的缓存
+        pass
+
+
+def invalidate_questions(question_ids):
+    """题目新增 / 更新 / 删除后调用：目录类缓存与对应单题缓存失效"""
+    bump_tags([CATALOG_TAG, *(question_tag(question_id) for question_id in question_ids)])
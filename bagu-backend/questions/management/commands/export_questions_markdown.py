@@ -3,38 +3,50 @@ from pathlib import Path
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
-from questions.markdown_export import render_questions_markdown
-from questions.models import Question
+from questions.markdown_export import (
+    export_category_shards, export_questions_queryset, iter_questions_markdown, write_markdown,
+)
 
 
 class Command(BaseCommand):
-    help = '将题库导出为一个便于直接阅读的 Markdown 文件'
+    help = '将题库导出为一个便于直接阅读的 Markdown 文件（或按分类拆分为多个文件）'
 
     def add_arguments(self, parser):
         parser.add_argument(
             'output_path',
             nargs='?',
-            default=str(settings.BASE_DIR.parent / 'docs' / 'bagu-qa.md'),
-            help='导出的 Markdown 路径，默认写入项目根目录 docs/bagu-qa.md',
+            default=None,
+            help='导出的 Markdown 路径，默认写入项目根目录 docs/bagu-qa.md（--split 时为目录，默认 docs/bagu-qa/）',
+        )
+        parser.add_argument(
+            '--split',
+            action='store_true',
+            help='每个分类导出一个文件，并生成 index.md',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='--split 时的并行进程数（默认 1，0 表示使用全部 CPU 核）',
         )
 
     def handle(self, *args, **options):
-        output_path = Path(options['output_path']).expanduser()
+        default_name = 'bagu-qa' if options['split'] else 'bagu-qa.md'
+        output_path = Path(options['output_path'] or settings.BASE_DIR.parent / 'docs' / default_name).expanduser()
         if not output_path.is_absolute():
             output_path = (Path.cwd() / output_path).resolve()
 
-        questions = (
-            Question.objects
-            .select_related('category', 'sub_category')
-            .order_by('category__sort_order', 'sub_category__sort_order', 'id')
-        )
-        markdown = render_questions_markdown(questions)
-
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(markdown, encoding='utf-8')
-
+        if options['split']:
+            results = export_category_shards(output_path, jobs=options['jobs'])
+            changed = sum(1 for _, _, file_changed in results if file_changed)
+            self.stdout.write(self.style.SUCCESS(
+                f'已导出 {results[0][1]} 题到 {output_path}（{len(results)} 个文件，改写 {changed} 个）'
+            ))
+            return
+
+        questions = export_questions_queryset()
+        changed = write_markdown(output_path, iter_questions_markdown(questions))
+        suffix = '' if changed else '（内容未变化，未改写）'
         self.stdout.write(self.style.SUCCESS(
-            f'已导出 {questions.count()} 题到 {output_path}'
+            f'已导出 {questions.count()} 题到 {output_path}{suffix}'
         ))
-
-
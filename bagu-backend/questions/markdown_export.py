@@ -1,41 +1,110 @@
+"""题库导出为 Markdown。
+
+iter_questions_markdown 逐题生成文本块：QuerySet 用 .iterator(chunk_size) 分块取数，不把整个题库载入内存；
+render_questions_markdown 是把文本块拼成字符串的便捷写法。
+write_markdown 边写临时文件边算内容哈希（忽略第一行「导出时间」），内容没变时保留原文件不动。
+export_category_shards 每个分类导出一个文件，可用多进程并行。
+"""
+import hashlib
+import multiprocessing
+import os
+import re
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
+from django.db import connections
+from django.db.models import QuerySet
 from django.utils import timezone
 
+from .models import Category, Question
 
-def render_questions_markdown(questions, generated_at=None):
-    question_list = list(questions)
-    generated_at = generated_at or timezone.localtime()
-    sub_category_sentinel = object()
+EXPORT_CHUNK_SIZE = 200
+DEFAULT_TITLE = '八股 QA 汇总'
+GENERATED_AT_PREFIX = '> 导出时间：'
+GENERATED_AT_PATTERN = re.compile(rf'^{GENERATED_AT_PREFIX}.*\n', re.MULTILINE)
+SHARD_INDEX_NAME = 'index.md'
+SHARD_NAME_PATTERN = re.compile(r'^\d{2,}-.+\.md$')
+UNSAFE_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|\s]+')
 
-    category_counts = OrderedDict()
-    for question in question_list:
-        category_counts.setdefault(question.category.name, 0)
-        category_counts[question.category.name] += 1
 
-    lines = [
-        '# 八股 QA 汇总',
+def export_questions_queryset(category_id=None):
+    questions = (
+        Question.objects
+        .select_related('category', 'sub_category')
+        .order_by('category__sort_order', 'sub_category__sort_order', 'id')
+    )
+    if category_id is not None:
+        questions = questions.filter(category_id=category_id)
+    return questions
+
+
+def render_questions_markdown(questions, generated_at=None, title=DEFAULT_TITLE):
+    return ''.join(iter_questions_markdown(questions, generated_at=generated_at, title=title))
+
+
+def iter_questions_markdown(questions, generated_at=None, title=DEFAULT_TITLE):
+    """
+    逐块生成 Markdown，拼接结果与一次性渲染完全一致。
+
+    每块是若干完整的行；前一块在下一块生成后才输出，以便去掉全文末尾的空行。
+    """
+    generated_at = generated_at or timezone.localtime()
+    category_counts = _category_counts(questions)
+
+    pending = [
+        f'# {title}',
         '',
         '这个文档由 `python manage.py export_questions_markdown` 自动生成，方便在不启动程序时直接查看题库。',
         '',
-        f'> 导出时间：{generated_at.strftime("%Y-%m-%d %H:%M:%S")}',
-        f'> 题目总数：{len(question_list)}',
+        f'{GENERATED_AT_PREFIX}{generated_at.strftime("%Y-%m-%d %H:%M:%S")}',
+        f'> 题目总数：{sum(category_counts.values())}',
         '',
         '## 分类索引',
         '',
     ]
-
     if category_counts:
         for name, count in category_counts.items():
-            lines.append(f'- {name}（{count} 题）')
+            pending.append(f'- {name}（{count} 题）')
     else:
-        lines.append('- 当前没有可导出的题目')
+        pending.append('- 当前没有可导出的题目')
 
+    for block in _question_blocks(_iter_questions(questions)):
+        yield '\n'.join(pending) + '\n'
+        pending = block
+
+    while pending and not pending[-1].strip():
+        pending.pop()
+    yield '\n'.join(pending) + '\n'
+
+
+def _iter_questions(questions):
+    if isinstance(questions, QuerySet):
+        return questions.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return iter(questions)
+
+
+def _category_counts(questions):
+    """按分类首次出现的顺序统计题数；QuerySet 只多查一列分类名，不载入题目正文"""
+    if isinstance(questions, QuerySet):
+        names = questions.values_list('category__name', flat=True).iterator(chunk_size=EXPORT_CHUNK_SIZE * 10)
+    else:
+        names = (question.category.name for question in questions)
+    counts = OrderedDict()
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def _question_blocks(questions):
+    """每道题生成一块行列表（换分类 / 子分类时标题行并入该题的块）"""
+    sub_category_sentinel = object()
     current_category_id = None
     current_sub_category_id = sub_category_sentinel
     category_question_no = 0
 
-    for question in question_list:
+    for question in questions:
+        lines = []
         if question.category_id != current_category_id:
             if current_category_id is not None:
                 lines.extend(['', '---', ''])
@@ -96,8 +165,119 @@ def render_questions_markdown(questions, generated_at=None):
 
         lines.append('---')
         lines.append('')
+        yield lines
+
+
+def write_markdown(path, chunks):
+    """
+    流式写入临时文件并计算内容哈希，与现有文件一致（忽略第一行导出时间）时丢弃临时文件。
+
+    返回是否改写了文件。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f'.{path.name}.tmp')
+    digest = hashlib.sha256()
+    skipped = False
+    try:
+        with temp_path.open('w', encoding='utf-8', newline='') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                if not skipped:
+                    chunk, skipped = GENERATED_AT_PATTERN.subn('', chunk, count=1)
+                digest.update(chunk.encode('utf-8'))
+        if path.exists() and markdown_digest(path) == digest.hexdigest():
+            temp_path.unlink()
+            return False
+        os.replace(temp_path, path)
+        return True
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
 
-    while lines and not lines[-1].strip():
-        lines.pop()
 
-    return '\n'.join(lines) + '\n'
+def markdown_digest(path):
+    """导出文件的内容哈希（跳过第一行导出时间），按行流式读取"""
+    digest = hashlib.sha256()
+    skipped = False
+    with Path(path).open(encoding='utf-8', newline='') as fh:
+        for line in fh:
+            if not skipped and line.startswith(GENERATED_AT_PREFIX):
+                skipped = True
+                continue
+            digest.update(line.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def shard_filename(position, category_name):
+    return f'{position:02d}-{UNSAFE_FILENAME_PATTERN.sub("-", category_name).strip("-") or "category"}.md'
+
+
+def export_category_shards(output_dir, jobs=1, generated_at=None):
+    """
+    每个分类导出一个文件，另写一个 index.md 汇总；内容没变的文件不改写，已不存在的分类文件会被删除。
+
+    jobs > 1 时用 fork 进程池并行渲染，每个子进程自己连数据库、流式取数和写文件。
+    返回 [(文件路径, 题数, 是否改写), ...]，index.md 在最前。
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    generated_at = generated_at or timezone.localtime()
+    categories = list(
+        Category.objects.filter(questions__isnull=False).distinct().order_by('sort_order', 'id').values_list('id', 'name')
+    )
+    tasks = [
+        (category_id, name, str(output_dir / shard_filename(position, name)), generated_at)
+        for position, (category_id, name) in enumerate(categories, start=1)
+    ]
+
+    executor = _create_export_executor(jobs, len(tasks))
+    try:
+        results = list(executor.map(_export_shard, tasks)) if executor else [_export_shard(task) for task in tasks]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    produced = {Path(path).name for path, _, _ in results}
+    for stale in output_dir.iterdir():
+        if SHARD_NAME_PATTERN.match(stale.name) and stale.name not in produced:
+            stale.unlink()
+
+    index_path = output_dir / SHARD_INDEX_NAME
+    changed = write_markdown(index_path, _iter_shard_index(tasks, results, generated_at))
+    return [(str(index_path), sum(count for _, count, _ in results), changed)] + results
+
+
+def _create_export_executor(jobs, tasks):
+    """与导入解析相同：fork 启动的进程池；fork 前关闭连接，子进程各自重新连接数据库"""
+    jobs = min(jobs if jobs > 0 else os.cpu_count() or 1, tasks)
+    if jobs <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork'))
+
+
+def _export_shard(task):
+    category_id, name, path, generated_at = task
+    questions = export_questions_queryset(category_id)
+    changed = write_markdown(path, iter_questions_markdown(questions, generated_at=generated_at, title=f'八股 QA · {name}'))
+    return path, questions.count(), changed
+
+
+def _iter_shard_index(tasks, results, generated_at):
+    lines = [
+        f'# {DEFAULT_TITLE}',
+        '',
+        '这个目录由 `python manage.py export_questions_markdown --split` 自动生成，每个分类一个文件。',
+        '',
+        f'{GENERATED_AT_PREFIX}{generated_at.strftime("%Y-%m-%d %H:%M:%S")}',
+        f'> 题目总数：{sum(count for _, count, _ in results)}',
+        '',
+        '## 分类索引',
+        '',
+    ]
+    for (_, name, _, _), (path, count, _) in zip(tasks, results):
+        lines.append(f'- [{name}](./{Path(path).name})（{count} 题）')
+    if not tasks:
+        lines.append('- 当前没有可导出的题目')
+    yield '\n'.join(lines) + '\n'
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_userquestionprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSourceFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=20, verbose_name='来源')),
+                ('path', models.CharField(max_length=500, verbose_name='文件路径')),
+                ('mtime_ns', models.BigIntegerField(default=0, verbose_name='修改时间(ns)')),
+                ('size', models.BigIntegerField(default=0, verbose_name='文件大小')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='内容哈希')),
+                ('category_name', models.CharField(blank=True, default='', max_length=50, verbose_name='分类')),
+                ('normalized_title', models.CharField(blank=True, default='', max_length=200, verbose_name='归一化标题')),
+                ('error', models.TextField(blank=True, default='', verbose_name='解析错误')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='source_files', to='questions.question', verbose_name='题目')),
+            ],
+            options={
+                'verbose_name': '导入源文件',
+                'verbose_name_plural': '导入源文件',
+                'indexes': [models.Index(fields=['category_name', 'normalized_title'], name='questions_q_categor_0701e5_idx')],
+                'unique_together': {('source_name', 'path')},
+            },
+        ),
+    ]
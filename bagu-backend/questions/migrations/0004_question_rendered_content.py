@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+from questions.rendering import RENDERED_FIELDS, render_question_content
+
+BACKFILL_BATCH_SIZE = 200
+
+
+def backfill_rendered_content(apps, schema_editor):
+    """已有题目逐批渲染一次；按主键翻页，只读正文两列"""
+    Question = apps.get_model('questions', 'Question')
+    last_id = 0
+    while True:
+        rows = list(
+            Question.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'brief_answer', 'detailed_answer')[:BACKFILL_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        questions = [
+            Question(id=question_id, **render_question_content(brief_answer, detailed_answer))
+            for question_id, brief_answer, detailed_answer in rows
+        ]
+        Question.objects.bulk_update(questions, RENDERED_FIELDS)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_questionsourcefile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='brief_html',
+            field=models.TextField(blank=True, default='', verbose_name='回答话术 HTML'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='detailed_html',
+            field=models.TextField(blank=True, default='', verbose_name='问题详解 HTML'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='rendered_hash',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='渲染内容哈希'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='sections',
+            field=models.JSONField(blank=True, default=list, verbose_name='详解分段'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, verbose_name='详解目录'),
+        ),
+        migrations.RunPython(backfill_rendered_content, migrations.RunPython.noop),
+    ]
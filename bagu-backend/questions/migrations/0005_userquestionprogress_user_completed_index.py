@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_question_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userquestionprogress',
+            index=models.Index(fields=['user', 'is_completed'], name='questions_u_user_id_3c068f_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from questions.rendering import RENDERED_FIELDS, render_question_content
+
+RERENDER_BATCH_SIZE = 200
+
+
+def rerender_with_safe_urls(apps, schema_editor):
+    """RENDERER_VERSION 2 起过滤不安全的链接 / 图片地址，已存的 HTML 逐批重新渲染"""
+    Question = apps.get_model('questions', 'Question')
+    last_id = 0
+    while True:
+        rows = list(
+            Question.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'brief_answer', 'detailed_answer')[:RERENDER_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        questions = [
+            Question(id=question_id, **render_question_content(brief_answer, detailed_answer))
+            for question_id, brief_answer, detailed_answer in rows
+        ]
+        Question.objects.bulk_update(questions, RENDERED_FIELDS)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_userquestionprogress_user_completed_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rerender_with_safe_urls, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from .rendering import RENDERED_FIELDS, content_hash, render_question_content
+
 
 class Category(models.Model):
     """八股文大分类：Redis/并发编程/消息队列 等"""
@@ -21,6 +24,15 @@ class Category(models.Model):
         self.question_count = self.questions.count()
         self.save(update_fields=['question_count'])
 
+    @classmethod
+    def refresh_question_counts(cls):
+        """一条 UPDATE 重算全部分类的题数"""
+        counts = (
+            Question.objects.filter(category=models.OuterRef('pk'))
+            .order_by().values('category').annotate(total=models.Count('id')).values('total')
+        )
+        cls.objects.update(question_count=Coalesce(models.Subquery(counts), 0))
+
 
 class SubCategory(models.Model):
     """子分类：热门问题/数据结构/线程池 等"""
@@ -60,6 +72,12 @@ class Question(models.Model):
     difficulty = models.IntegerField('难度', choices=DIFFICULTY_CHOICES, default=3)
     source_url = models.URLField('来源链接', blank=True, default='')
     tags = models.JSONField('标签', default=list, blank=True)
+    # 预渲染结果（见 questions.rendering），随简答 / 详解变化自动更新
+    brief_html = models.TextField('回答话术 HTML', blank=True, default='')
+    detailed_html = models.TextField('问题详解 HTML', blank=True, default='')
+    toc = models.JSONField('详解目录', default=list, blank=True)
+    sections = models.JSONField('详解分段', default=list, blank=True)
+    rendered_hash = models.CharField('渲染内容哈希', max_length=40, blank=True, default='')
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
@@ -71,6 +89,47 @@ class Question(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.refresh_rendered() and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(RENDERED_FIELDS)
+        super().save(*args, **kwargs)
+
+    def refresh_rendered(self):
+        """简答 / 详解（或渲染器版本）变化时重新渲染，返回是否有更新；bulk 写入前需要手动调用"""
+        if self.rendered_hash == content_hash(self.brief_answer, self.detailed_answer):
+            return False
+        for field_name, value in render_question_content(self.brief_answer, self.detailed_answer).items():
+            setattr(self, field_name, value)
+        return True
+
+
+class QuestionSourceFile(models.Model):
+    """导入清单：每个 Markdown 源文件的状态，增量导入时跳过未变化的文件"""
+    source_name = models.CharField('来源', max_length=20)
+    path = models.CharField('文件路径', max_length=500)
+    mtime_ns = models.BigIntegerField('修改时间(ns)', default=0)
+    size = models.BigIntegerField('文件大小', default=0)
+    content_hash = models.CharField('内容哈希', max_length=64)
+    # 去重键（归一化分类 + 归一化标题），解析失败时为空
+    category_name = models.CharField('分类', max_length=50, blank=True, default='')
+    normalized_title = models.CharField('归一化标题', max_length=200, blank=True, default='')
+    question = models.ForeignKey(
+        Question, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='source_files', verbose_name='题目'
+    )
+    error = models.TextField('解析错误', blank=True, default='')
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '导入源文件'
+        verbose_name_plural = '导入源文件'
+        unique_together = ['source_name', 'path']
+        indexes = [models.Index(fields=['category_name', 'normalized_title'])]
+
+    def __str__(self):
+        return f'[{self.source_name}] {self.path}'
+
 
 class UserQuestionProgress(models.Model):
     """用户题目完成状态（LeetCode 风格勾选）"""
@@ -91,6 +150,7 @@ class UserQuestionProgress(models.Model):
         verbose_name = '题目完成进度'
         verbose_name_plural = '题目完成进度'
         unique_together = ['user', 'question']
+        indexes = [models.Index(fields=['user', 'is_completed'])]
         ordering = ['-updated_at']
 
     def __str__(self):
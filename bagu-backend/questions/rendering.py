@@ -0,0 +1,131 @@
+"""题目正文预渲染：Markdown → HTML、目录与分段。
+
+导入 / 保存题目时渲染一次存进题目表，详情接口直接返回，前端不必每次打开都解析整篇 Markdown。
+- toc：详解里的全部标题 [{level, id, title}]，id 即 HTML 里标题的锚点
+- sections：按详解中最高一级标题切段 [{id, title, level, start, end}]，start/end 是在 detailed_html 里的字符区间，
+  按段取内容时直接切片；第一个标题之前的引言单独成段，id 为 INTRO_SECTION_ID
+
+题目正文来自笔记，这里禁用原始 HTML（按文本转义输出），链接 / 图片地址只保留 http、https、mailto 和相对地址，
+渲染结果可以直接插入页面。
+RENDERER_VERSION 参与 content_hash；调整渲染选项后把它加一，下次导入会重新渲染全部题目。
+"""
+import hashlib
+import html as html_lib
+import re
+import threading
+
+import markdown
+from markdown.extensions.toc import slugify_unicode
+from markdown.treeprocessors import Treeprocessor
+
+RENDERER_VERSION = 2
+INTRO_SECTION_ID = 'intro'
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists', 'toc']
+MARKDOWN_EXTENSION_CONFIGS = {'toc': {'slugify': slugify_unicode, 'permalink': False}}
+HEADING_PATTERN = re.compile(r'<h([1-6]) id="([^"]*)">')
+# 允许的 URL 协议；没有协议的相对地址 / 锚点也允许
+SAFE_URL_SCHEMES = {'http', 'https', 'mailto'}
+URL_SCHEME_PATTERN = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+# 浏览器解析 URL 前会忽略的空白与控制字符（"java\tscript:" 仍按 javascript: 执行）
+URL_IGNORED_CHARS_PATTERN = re.compile(r'[\x00-\x20\x7f]+')
+URL_ATTRIBUTES = {'a': 'href', 'img': 'src'}
+
+RENDERED_CONTENT_FIELDS = ['brief_html', 'detailed_html', 'toc', 'sections']
+RENDERED_FIELDS = RENDERED_CONTENT_FIELDS + ['rendered_hash']
+
+
+def content_hash(brief_answer, detailed_answer):
+    payload = f'{RENDERER_VERSION}\0{brief_answer or ""}\0{detailed_answer or ""}'
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+_local = threading.local()
+
+
+def render_markdown(text):
+    """返回 (html, 扁平的标题列表)"""
+    md = _markdown()
+    html = md.reset().convert(text or '')
+    return html, _flatten_toc(md.toc_tokens)
+
+
+def is_safe_url(url):
+    """只放行 http / https / mailto 与相对地址（javascript:、data: 等一律拒绝）"""
+    normalized = URL_IGNORED_CHARS_PATTERN.sub('', html_lib.unescape(url or '')).lower()
+    match = URL_SCHEME_PATTERN.match(normalized)
+    return match is None or match.group(1) in SAFE_URL_SCHEMES
+
+
+class SafeUrlTreeprocessor(Treeprocessor):
+    """去掉不安全的 a[href] / img[src]，链接文字和图片 alt 保留"""
+
+    def run(self, root):
+        for element in root.iter():
+            attribute = URL_ATTRIBUTES.get(element.tag)
+            if attribute and not is_safe_url(element.get(attribute)):
+                del element.attrib[attribute]
+
+
+def _markdown():
+    """每个线程复用一个 Markdown 实例：构造（加载扩展、建解析器）约占渲染一篇的三成"""
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+        # 不渲染原始 HTML 块与行内标签，按普通文本转义
+        md.preprocessors.deregister('html_block')
+        md.inlinePatterns.deregister('html')
+        # 在 unescape（优先级 0）之后检查，拿到的是最终输出的地址
+        md.treeprocessors.register(SafeUrlTreeprocessor(md), 'safe_url', -10)
+        _local.markdown = md
+    return md
+
+
+def render_question_content(brief_answer, detailed_answer):
+    """渲染简答与详解，返回可直接赋给 Question 的字段字典（键见 RENDERED_FIELDS）"""
+    brief_html, _ = render_markdown(brief_answer)
+    detailed_html, toc = render_markdown(detailed_answer)
+    return {
+        'brief_html': brief_html,
+        'detailed_html': detailed_html,
+        'toc': toc,
+        'sections': split_sections(detailed_html, toc),
+        'rendered_hash': content_hash(brief_answer, detailed_answer),
+    }
+
+
+def split_sections(html, toc):
+    """在最高一级标题处切分 detailed_html"""
+    if not html:
+        return []
+    if not toc:
+        return [{'id': INTRO_SECTION_ID, 'title': '', 'level': 0, 'start': 0, 'end': len(html)}]
+
+    top_level = min(entry['level'] for entry in toc)
+    titles = {entry['id']: entry['title'] for entry in toc}
+    starts = [
+        (match.start(), match.group(2))
+        for match in HEADING_PATTERN.finditer(html) if int(match.group(1)) == top_level
+    ]
+    sections = []
+    if starts and html[:starts[0][0]].strip():
+        sections.append({'id': INTRO_SECTION_ID, 'title': '', 'level': 0, 'start': 0, 'end': starts[0][0]})
+    for position, (start, anchor) in enumerate(starts):
+        end = starts[position + 1][0] if position + 1 < len(starts) else len(html)
+        sections.append({'id': anchor, 'title': titles.get(anchor, ''), 'level': top_level, 'start': start, 'end': end})
+    return sections
+
+
+def section_html(question, section_id):
+    """按段 id 返回 (段信息, 该段 HTML)；没有这一段时返回 None"""
+    for section in question.sections or []:
+        if section['id'] == section_id:
+            return section, question.detailed_html[section['start']:section['end']]
+    return None
+
+
+def _flatten_toc(tokens):
+    entries = []
+    for token in tokens:
+        entries.append({'level': token['level'], 'id': token['id'], 'title': html_lib.unescape(token['name'])})
+        entries.extend(_flatten_toc(token['children']))
+    return entries
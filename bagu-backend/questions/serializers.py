@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from bagu.sparse_fields import DynamicFieldsMixin
 from .models import Category, SubCategory, Question
 
 
@@ -10,6 +12,9 @@ class SubCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'sort_order', 'question_count']
 
     def get_question_count(self, obj):
+        # 列表接口通过 annotate 预先计算，避免每个子分类一条 COUNT
+        if hasattr(obj, 'question_total'):
+            return obj.question_total
         return obj.questions.count()
 
 
@@ -86,4 +91,42 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Question
-        fields = '__all__'
+        exclude = ['brief_html', 'detailed_html', 'sections', 'rendered_hash']
+
+
+class QuestionSummarySerializer(serializers.ModelSerializer):
+    """题目摘要（?view=summary）：预渲染的简答 HTML + 目录，不含详解正文，详解按段另取"""
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    sub_category_name = serializers.CharField(source='sub_category.name', read_only=True, default='')
+    sections = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Question
+        fields = ['id', 'title', 'category', 'category_name', 'sub_category', 'sub_category_name',
+                  'difficulty', 'tags', 'key_points', 'source_url', 'brief_html', 'toc', 'sections', 'updated_at']
+
+    def get_sections(self, obj):
+        return [
+            {'id': section['id'], 'title': section['title'], 'level': section['level']}
+            for section in obj.sections
+        ]
+
+
+class QuestionBatchSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """批量详情（/questions/batch/）：可按 fields 投影，包含预渲染的 HTML 与目录"""
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    sub_category_name = serializers.CharField(source='sub_category.name', read_only=True, default='')
+
+    class Meta:
+        model = Question
+        fields = ['id', 'title', 'category', 'category_name', 'sub_category', 'sub_category_name',
+                  'difficulty', 'tags', 'key_points', 'source_url', 'brief_answer', 'detailed_answer',
+                  'brief_html', 'detailed_html', 'toc', 'created_at', 'updated_at']
+        # 不指定 fields 时与单题详情一致：原始 Markdown，不含 HTML
+        default_fields = [name for name in fields if name not in ('brief_html', 'detailed_html')]
+        field_columns = {
+            'category': ['category_id'],
+            'category_name': ['category__name'],
+            'sub_category': ['sub_category_id'],
+            'sub_category_name': ['sub_category__name'],
+        }
@@ -4,11 +4,15 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.management import call_command
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from practice.models import AiModelConfig
-from questions.markdown_export import render_questions_markdown
+from questions.catalog_cache import CATALOG_TAG, bump_tags, invalidate_questions, question_tag, tag_versions
+from questions.markdown_export import render_questions_markdown, write_markdown
 from questions.models import Category, Question, SubCategory
 
 
@@ -84,6 +88,54 @@ class MarkdownExportTests(TestCase):
         self.assertIn('线程池有哪些核心参数？', content)
         self.assertIn('已导出 2 题到', out.getvalue())
 
+    def test_write_markdown_skips_unchanged_content_ignoring_timestamp(self):
+        questions = Question.objects.select_related('category', 'sub_category').order_by('id')
+        with TemporaryDirectory() as tmp:
+            output_path = Path(tmp) / 'bagu-qa.md'
+            first = render_questions_markdown(questions, generated_at=datetime(2026, 4, 7, 18, 30, 0))
+
+            self.assertTrue(write_markdown(output_path, [first]))
+            later = render_questions_markdown(questions, generated_at=datetime(2026, 4, 8, 9, 0, 0))
+            self.assertFalse(write_markdown(output_path, [later]))
+            self.assertEqual(output_path.read_text(encoding='utf-8'), first)
+
+            Question.objects.filter(title='线程池有哪些核心参数？').update(brief_answer='改过的回答')
+            self.assertTrue(write_markdown(output_path, [render_questions_markdown(questions)]))
+            self.assertIn('改过的回答', output_path.read_text(encoding='utf-8'))
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], ['bagu-qa.md'])
+
+    def test_export_questions_markdown_split_writes_shards(self):
+        with TemporaryDirectory() as tmp:
+            output_dir = Path(tmp) / 'bagu-qa'
+            output_dir.mkdir()
+            (output_dir / '09-已删除分类.md').write_text('旧文件', encoding='utf-8')
+            out = StringIO()
+
+            call_command('export_questions_markdown', str(output_dir), '--split', stdout=out)
+            names = sorted(p.name for p in output_dir.iterdir())
+            index = (output_dir / 'index.md').read_text(encoding='utf-8')
+            redis = (output_dir / '01-Redis.md').read_text(encoding='utf-8')
+
+            call_command('export_questions_markdown', str(output_dir), '--split', stdout=out)
+
+        self.assertEqual(names, ['01-Redis.md', '02-并发编程.md', 'index.md'])
+        self.assertIn('- [Redis](./01-Redis.md)（1 题）', index)
+        self.assertIn('Redis 为什么这么快？', redis)
+        self.assertNotIn('线程池有哪些核心参数？', redis)
+        self.assertIn('（3 个文件，改写 3 个）', out.getvalue())
+        self.assertIn('（3 个文件，改写 0 个）', out.getvalue())
+
+    def test_export_endpoint_streams_markdown(self):
+        response = self.client.get('/api/questions/export/', {'category': self.redis.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Redis 为什么这么快？', content)
+        self.assertNotIn('线程池有哪些核心参数？', content)
+        self.assertEqual(self.client.get('/api/questions/export/', {'category': 'x'}).status_code, 400)
+
 
 class BootstrapSeedDataTests(TestCase):
     def setUp(self):
@@ -154,3 +206,159 @@ class AdminAutoLoginTests(TestCase):
         self.assertEqual(response.redirect_chain[-1][0], '/admin/')
         self.assertTrue(response.wsgi_request.user.is_authenticated)
         self.assertTrue(response.wsgi_request.user.is_superuser)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Redis', icon='database')
+        self.question = Question.objects.create(category=category, title='旧标题')
+
+    def test_invalidate_questions_refreshes_cached_detail_and_list(self):
+        detail_url = f'/api/questions/{self.question.id}/'
+        self.assertEqual(self.client.get(detail_url).json()['title'], '旧标题')
+        self.client.get('/api/questions/')
+
+        Question.objects.filter(id=self.question.id).update(title='新标题')
+        self.assertEqual(self.client.get(detail_url).json()['title'], '旧标题')
+
+        invalidate_questions([self.question.id])
+        self.assertEqual(self.client.get(detail_url).json()['title'], '新标题')
+        titles = [item['title'] for item in self.client.get('/api/questions/').json()['results']]
+        self.assertEqual(titles, ['新标题'])
+
+    def test_question_tag_only_affects_that_question(self):
+        before = tag_versions([CATALOG_TAG])
+        bump_tags([question_tag(self.question.id)])
+        self.assertEqual(tag_versions([CATALOG_TAG]), before)
+        self.assertNotEqual(tag_versions([question_tag(self.question.id)]), '0')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QuestionRenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Redis', icon='database')
+        self.question = Question.objects.create(
+            category=category,
+            title='Redis 持久化',
+            brief_answer='**RDB** 和 AOF <script>alert(1)</script>',
+            detailed_answer='先说结论。\n\n## RDB\n快照。\n\n### fork\n写时复制。\n\n## AOF\n追加日志。\n',
+        )
+
+    def test_save_renders_html_toc_and_sections(self):
+        question = self.question
+        self.assertIn('<strong>RDB</strong>', question.brief_html)
+        self.assertIn('&lt;script&gt;', question.brief_html)
+        self.assertEqual([entry['id'] for entry in question.toc], ['rdb', 'fork', 'aof'])
+        self.assertEqual([section['id'] for section in question.sections], ['intro', 'rdb', 'aof'])
+
+        rendered_hash = question.rendered_hash
+        question.save()
+        self.assertEqual(question.rendered_hash, rendered_hash)
+
+        question.detailed_answer = '## 混合持久化\n两者结合。'
+        question.save(update_fields=['detailed_answer'])
+        question.refresh_from_db()
+        self.assertEqual([section['title'] for section in question.sections], ['混合持久化'])
+        self.assertIn('两者结合', question.detailed_html)
+
+    def test_render_drops_unsafe_link_and_image_urls(self):
+        question = Question.objects.create(
+            category=self.question.category,
+            title='链接过滤',
+            brief_answer='[点我](javascript:alert(1)) ![图](JaVaScript:alert(1)) [官网](https://redis.io)',
+            detailed_answer='[相对](/questions/1) [邮件](mailto:a@b.cn) [数据](data:text/html,x)',
+        )
+
+        self.assertNotIn('javascript', question.brief_html.lower())
+        self.assertIn('<a>点我</a>', question.brief_html)
+        self.assertIn('<img alt="图" />', question.brief_html)
+        self.assertIn('href="https://redis.io"', question.brief_html)
+        self.assertIn('href="/questions/1"', question.detailed_html)
+        self.assertIn('href="mailto:a@b.cn"', question.detailed_html)
+        self.assertNotIn('data:', question.detailed_html)
+
+    def test_detail_summary_and_section_views(self):
+        url = f'/api/questions/{self.question.id}/'
+        full = self.client.get(url).json()
+        self.assertIn('detailed_answer', full)
+        self.assertNotIn('detailed_html', full)
+        self.assertEqual(len(full['toc']), 3)
+
+        summary = self.client.get(url, {'view': 'summary'}).json()
+        self.assertNotIn('detailed_answer', summary)
+        self.assertIn('<strong>RDB</strong>', summary['brief_html'])
+        self.assertEqual(summary['sections'][1], {'id': 'rdb', 'title': 'RDB', 'level': 2})
+
+        section = self.client.get(url, {'section': 'rdb'}).json()
+        self.assertEqual(section['section']['title'], 'RDB')
+        self.assertTrue(section['html'].startswith('<h2 id="rdb">RDB</h2>'))
+        self.assertIn('写时复制', section['html'])
+        self.assertNotIn('追加日志', section['html'])
+
+        self.assertEqual(self.client.get(url, {'section': 'missing'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'view': 'bogus'}).status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QuestionBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = Category.objects.create(name='Redis', icon='database')
+        other = Category.objects.create(name='MySQL', icon='database')
+        hot = SubCategory.objects.create(category=self.redis, name='热门', sort_order=1)
+        self.questions = [
+            Question.objects.create(
+                category=self.redis, sub_category=hot, title=f'Redis 题 {index}',
+                brief_answer=f'**简答 {index}**', detailed_answer=f'## 详解\n内容 {index}',
+            )
+            for index in range(3)
+        ]
+        self.other = Question.objects.create(category=other, title='MySQL 题')
+
+    def test_batch_by_ids_keeps_order_and_reports_missing(self):
+        ids = [self.questions[2].id, self.other.id, 999999, self.questions[0].id]
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/questions/batch/', {'ids': ','.join(map(str, ids))}).json()
+
+        self.assertEqual([item['id'] for item in data['results']], [ids[0], ids[1], ids[3]])
+        self.assertEqual(data['missing'], [999999])
+        self.assertEqual(data['results'][0]['category_name'], 'Redis')
+        self.assertEqual(data['results'][0]['detailed_answer'], '## 详解\n内容 2')
+        self.assertNotIn('detailed_html', data['results'][0])
+
+    def test_batch_by_category_with_field_projection(self):
+        response = self.client.get('/api/questions/batch/', {
+            'category': self.redis.id, 'fields': 'id,title,brief_html,sub_category_name',
+        })
+
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/api/questions/batch/', {'ids': self.other.id, 'fields': 'id,title'})
+        self.assertNotIn('JOIN', captured.captured_queries[-1]['sql'])
+        self.assertEqual(
+            data['results'][1],
+            {'id': self.questions[1].id, 'title': 'Redis 题 1', 'brief_html': '<p><strong>简答 1</strong></p>',
+             'sub_category_name': '热门'},
+        )
+
+    def test_batch_is_cached_until_catalog_changes(self):
+        params = {'category': self.redis.id, 'fields': 'id,title'}
+        self.client.get('/api/questions/batch/', params)
+        Question.objects.filter(id=self.questions[0].id).update(title='改名')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/questions/batch/', params).json()
+        self.assertEqual(cached['results'][0]['title'], 'Redis 题 0')
+
+        invalidate_questions([self.questions[0].id])
+        self.assertEqual(self.client.get('/api/questions/batch/', params).json()['results'][0]['title'], '改名')
+
+    def test_batch_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/questions/batch/').status_code, 400)
+        self.assertEqual(self.client.get('/api/questions/batch/', {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/questions/batch/', {'ids': '1', 'fields': 'id,password'}).status_code, 400)
+        too_many = ','.join(str(index) for index in range(1, 202))
+        self.assertEqual(self.client.get('/api/questions/batch/', {'ids': too_many}).status_code, 400)
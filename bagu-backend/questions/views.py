@@ -1,22 +1,32 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Q, Count
+from django.http import StreamingHttpResponse
+from django.db.models import Q, Count, Prefetch
 import random
-from .models import Category, Question, UserQuestionProgress
+from .models import Category, Question, SubCategory, UserQuestionProgress
 from .serializers import (
     CategorySerializer,
-    QuestionListSerializer, QuestionQuickReviewSerializer, QuestionDetailSerializer,
+    QuestionListSerializer, QuestionQuickReviewSerializer, QuestionDetailSerializer, QuestionSummarySerializer,
+    QuestionBatchSerializer,
 )
+from .catalog_cache import CATALOG_TAG, question_tag, tag_versions
+from .markdown_export import export_questions_queryset, iter_questions_markdown
+from .rendering import section_html
 from .quick_review_presets import get_quick_review_preset
 from users.models import BaguUser
+from bagu.metrics import record_cache
+from bagu.sparse_fields import parse_fields, project_queryset
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """分类接口"""
-    queryset = Category.objects.prefetch_related('subcategories').all()
+    queryset = Category.objects.prefetch_related(
+        Prefetch('subcategories', queryset=SubCategory.objects.annotate(question_total=Count('questions'))),
+    ).all()
     serializer_class = CategorySerializer
 
     def get_serializer_class(self):
@@ -88,6 +98,17 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
+DETAIL_VIEWS = ('full', 'summary')
+# 各详情形态用不到的大字段，查询时不取
+DETAIL_DEFERRED_FIELDS = {
+    'full': ['brief_html', 'detailed_html', 'sections'],
+    'summary': ['brief_answer', 'detailed_answer', 'detailed_html'],
+    'section': ['brief_answer', 'detailed_answer', 'brief_html'],
+}
+
+BATCH_MAX_IDS = 200
+
+
 class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     """题目接口"""
     queryset = Question.objects.select_related('category', 'sub_category').all()
@@ -95,8 +116,19 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     def get_serializer_class(self):
         if self.action == 'list':
             return QuestionListSerializer
+        if self.action == 'retrieve' and self._detail_view() == 'summary':
+            return QuestionSummarySerializer
         return QuestionDetailSerializer
 
+    def _detail_view(self):
+        """详情形态：?section= 取详解的某一段，?view=summary 只要摘要，默认完整内容"""
+        if self.request.query_params.get('section'):
+            return 'section'
+        view = self.request.query_params.get('view') or 'full'
+        if view not in DETAIL_VIEWS:
+            raise ValidationError({'view': f'可选值：{", ".join(DETAIL_VIEWS)}'})
+        return view
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         user_id = self.request.query_params.get('user_id')
@@ -128,6 +160,8 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(sub_category_id=sub_category_id)
         if search:
             qs = qs.filter(Q(title__icontains=search) | Q(tags__contains=search))
+        if self.action == 'retrieve':
+            qs = qs.defer(*DETAIL_DEFERRED_FIELDS[self._detail_view()])
         return qs
 
     def list(self, request, *args, **kwargs):
@@ -146,17 +180,73 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         if request.query_params.get('user_id'):
-            return super().retrieve(request, *args, **kwargs)
+            return self._retrieve_detail(request, *args, **kwargs)
 
-        cache_key = _build_cache_key('questions:detail', request, lookup=kwargs.get('pk'))
+        cache_key = _build_cache_key(
+            'questions:detail', request, lookup=kwargs.get('pk'), tags=[question_tag(kwargs.get('pk'))],
+        )
         cached = _cache_get(cache_key)
         if cached is not None:
             return Response(cached)
 
-        response = super().retrieve(request, *args, **kwargs)
+        response = self._retrieve_detail(request, *args, **kwargs)
         _cache_set(cache_key, response.data, settings.API_CACHE_TTL)
         return response
 
+    def _retrieve_detail(self, request, *args, **kwargs):
+        if self._detail_view() == 'section':
+            return self._retrieve_section()
+        return super().retrieve(request, *args, **kwargs)
+
+    def _retrieve_section(self):
+        """?section=<段 id>：只返回详解中的一段预渲染 HTML（段 id 见摘要里的 sections）"""
+        question = self.get_object()
+        found = section_html(question, self.request.query_params.get('section'))
+        if found is None:
+            raise NotFound('没有这一段')
+        section, html = found
+        return Response({
+            'id': question.id,
+            'section': {'id': section['id'], 'title': section['title'], 'level': section['level']},
+            'html': html,
+        })
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        批量取题目详情，一次查询返回，代替逐题请求详情。
+
+        Query params:
+          - ids: 逗号分隔的题目 ID（最多 BATCH_MAX_IDS 个，按传入顺序返回），或
+          - category: 该分类下全部题目（按子分类、ID 排序）
+          - fields: 逗号分隔的输出字段，可选 brief_html / detailed_html 等预渲染内容；默认与单题详情一致
+        结果按目录版本缓存，任意题目变化后失效。
+        """
+        ids, category_id = _parse_batch_target(request.query_params)
+        fields = parse_fields(request.query_params.get('fields'), QuestionBatchSerializer.Meta)
+
+        cache_key = _build_cache_key('questions:batch', request)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+        qs = project_queryset(Question.objects.all(), fields, QuestionBatchSerializer.Meta)
+        if ids is not None:
+            by_id = {question.id: question for question in qs.filter(id__in=ids).order_by()}
+            questions = [by_id[question_id] for question_id in ids if question_id in by_id]
+            missing = [question_id for question_id in ids if question_id not in by_id]
+        else:
+            questions = list(qs.filter(category_id=category_id).order_by('sub_category__sort_order', 'id'))
+            missing = []
+
+        data = {
+            'count': len(questions),
+            'results': QuestionBatchSerializer(questions, many=True, fields=fields).data,
+            'missing': missing,
+        }
+        _cache_set(cache_key, data, settings.API_CACHE_TTL)
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def random(self, request):
         """随机出题"""
@@ -195,6 +285,31 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = QuestionQuickReviewSerializer(qs, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_markdown(self, request):
+        """
+        下载 Markdown 题库（与 export_questions_markdown 命令输出一致）。
+
+        流式输出：边分块查库边发送，不在内存里拼出整个文件。
+        Query params:
+          - category: 可选，只导出该分类
+        """
+        category_id = request.query_params.get('category')
+        if category_id:
+            try:
+                category_id = int(category_id)
+            except (TypeError, ValueError):
+                return Response({'detail': 'category 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            category_id = None
+
+        response = StreamingHttpResponse(
+            iter_questions_markdown(export_questions_queryset(category_id)),
+            content_type='text/markdown; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="bagu-qa.md"'
+        return response
+
     @action(detail=True, methods=['post'])
     def completion(self, request, pk=None):
         """手动标记某题完成/未完成"""
@@ -229,20 +344,46 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
-def _build_cache_key(prefix, request, lookup=None):
+def _parse_batch_target(params):
+    """返回 (ids, category_id)，二者取其一"""
+    raw_ids = params.get('ids')
+    if raw_ids:
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(',') if value.strip()))
+        except ValueError:
+            raise ValidationError({'ids': '必须是逗号分隔的整数'})
+        if len(ids) > BATCH_MAX_IDS:
+            raise ValidationError({'ids': f'一次最多 {BATCH_MAX_IDS} 个'})
+        return ids, None
+
+    category_id = params.get('category')
+    if not category_id:
+        raise ValidationError({'detail': '缺少 ids 或 category'})
+    try:
+        return None, int(category_id)
+    except ValueError:
+        raise ValidationError({'category': '必须是整数'})
+
+
+def _build_cache_key(prefix, request, lookup=None, tags=(CATALOG_TAG,)):
+    """键里带上标签版本号，题库变化时 bump 标签即可失效（见 catalog_cache）"""
     pairs = sorted((key, value) for key, value in request.query_params.items())
     params = '&'.join(f'{k}={v}' for k, v in pairs)
+    version = tag_versions(tags)
     if lookup is not None:
-        return f'api:{prefix}:{lookup}:{params}'
-    return f'api:{prefix}:{params}'
+        return f'api:{prefix}:{lookup}:v{version}:{params}'
+    return f'api:{prefix}:v{version}:{params}'
 
 
 def _cache_get(key):
     try:
-        return cache.get(key)
+        value = cache.get(key)
     except Exception:
         # Redis 不可用时降级为直查 DB
+        record_cache(key, 'error')
         return None
+    record_cache(key, 'miss' if value is None else 'hit')
+    return value
 
 
 def _cache_set(key, value, timeout):
@@ -250,4 +391,5 @@ def _cache_set(key, value, timeout):
         cache.set(key, value, timeout)
     except Exception:
         # Redis 不可用时降级为直查 DB
+        record_cache(key, 'set_error')
         return None
@@ -0,0 +1,99 @@
+"""按用户的数据版本做条件请求与变更通知。
+
+BaguUser.data_version 在该用户的统计、答题记录、追问或画像变化时加一：
+- user_etag / not_modified：历史、画像等接口先查一列版本号拼出 ETag，与 If-None-Match 相同时直接返回 304，
+  不再执行列表查询和序列化；ETag 里带上请求路径（含查询参数），不同分页 / 字段投影互不混淆
+- wait_for_change：「版本号大于 N 时返回」的短时长轮询，前端据此只在数据真正变化后重新拉取；
+  等待时长和同时等待的请求数都有上限，不会占满 gunicorn 的线程
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import BaguUser
+
+
+def user_data_version(user_id):
+    """用户当前的数据版本；用户不存在（或 id 不合法）时返回 None"""
+    try:
+        return BaguUser.objects.filter(pk=user_id).values_list('data_version', flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def users_list_version():
+    """用户列表整体的版本：任一用户更新、增删都会改变"""
+    stats = BaguUser.objects.aggregate(count=Count('id'), last_id=Max('id'), total=Sum('data_version'))
+    return f'{stats["count"]}.{stats["last_id"] or 0}.{stats["total"] or 0}'
+
+
+def user_etag(request, scope, version, *extra):
+    """scope 区分用户 / 列表，extra 是会影响响应内容的其他版本号（如题库标签版本）"""
+    path_digest = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()[:12]
+    return '"{}"'.format('-'.join(str(part) for part in (scope, version, *extra, path_digest)))
+
+
+def not_modified(request, etag):
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    response = get_conditional_response(request, etag=etag)
+    return with_etag(response, etag) if response is not None else None
+
+
+def with_etag(response, etag):
+    """带上 ETag，并要求浏览器每次都带 If-None-Match 回源校验（不直接用本地副本）"""
+    if etag and response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def wait_for_change(user_id, since, wait):
+    """
+    等到用户版本号大于 since 或超时，返回当前版本号（用户不存在时返回 None）。
+
+    gunicorn 只有 workers × threads 个请求槽位，等待会占住其中一个：wait 不超过 CHANGE_FEED_MAX_WAIT，
+    每个进程同时等待的请求不超过 CHANGE_FEED_MAX_WAITERS，超出时不等待、直接返回当前版本（客户端按间隔再问）。
+    等待期间每 CHANGE_FEED_POLL_INTERVAL 秒查一次版本号（主键单列查询）。
+    """
+    version = user_data_version(user_id)
+    wait = max(0.0, min(wait, settings.CHANGE_FEED_MAX_WAIT))
+    if version is None or since is None or version > since or wait <= 0:
+        return version
+
+    with _waiter_slot() as acquired:
+        if not acquired:
+            return version
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return version
+            time.sleep(min(settings.CHANGE_FEED_POLL_INTERVAL, remaining))
+            version = user_data_version(user_id)
+            if version is None or version > since:
+                return version
+
+
+_waiting = 0
+_waiting_lock = threading.Lock()
+
+
+@contextmanager
+def _waiter_slot():
+    """本进程的等待名额，拿不到时返回 False（不阻塞）"""
+    global _waiting
+    with _waiting_lock:
+        acquired = _waiting < settings.CHANGE_FEED_MAX_WAITERS
+        if acquired:
+            _waiting += 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with _waiting_lock:
+                _waiting -= 1
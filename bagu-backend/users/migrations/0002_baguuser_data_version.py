@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baguuser',
+            name='data_version',
+            field=models.BigIntegerField(default=0, editable=False, help_text='用户的统计、答题记录、追问或画像变化时加一，用于 ETag 与变更通知', verbose_name='数据版本'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_baguuser_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baguuser',
+            name='is_synthetic',
+            field=models.BooleanField(default=False, editable=False, help_text='generate_scale_data 生成的合成用户，--clear 只删除带此标记的用户', verbose_name='压测数据'),
+        ),
+    ]
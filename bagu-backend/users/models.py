@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Round
 
 
 class BaguUser(models.Model):
@@ -13,6 +14,14 @@ class BaguUser(models.Model):
     total_answers = models.IntegerField('总答题数', default=0)
     avg_score = models.FloatField('平均分', default=0.0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    data_version = models.BigIntegerField(
+        '数据版本', default=0, editable=False,
+        help_text='用户的统计、答题记录、追问或画像变化时加一，用于 ETag 与变更通知'
+    )
+    is_synthetic = models.BooleanField(
+        '压测数据', default=False, editable=False,
+        help_text='generate_scale_data 生成的合成用户，--clear 只删除带此标记的用户'
+    )
 
     class Meta:
         verbose_name = '用户'
@@ -21,6 +30,37 @@ class BaguUser(models.Model):
     def __str__(self):
         return self.nickname or self.username
 
+    def save(self, *args, **kwargs):
+        """更新已有用户时 data_version 原子加一（F 表达式），不会把内存里的旧版本号写回去"""
+        updating = not self._state.adding
+        if updating:
+            self.data_version = models.F('data_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'data_version'}
+        super().save(*args, **kwargs)
+        if updating:
+            self.refresh_from_db(fields=['data_version'])
+
+    @classmethod
+    def bump_data_version(cls, user_ids):
+        """用户名下的答题记录、追问、画像等关联数据变化后调用，一条 UPDATE"""
+        cls.objects.filter(pk__in=user_ids).update(data_version=models.F('data_version') + 1)
+
+    @classmethod
+    def refresh_answer_stats(cls, user_ids):
+        """按剩余答题记录重算答题数与平均分（题目删除后答题记录随之级联删除时调用），一条 UPDATE"""
+        from practice.models import AnswerRecord
+
+        records = AnswerRecord.objects.filter(user=models.OuterRef('pk')).order_by().values('user')
+        cls.objects.filter(pk__in=user_ids).update(
+            total_answers=Coalesce(models.Subquery(records.annotate(total=models.Count('id')).values('total')), 0),
+            avg_score=Round(
+                Coalesce(models.Subquery(records.annotate(avg=models.Avg('ai_score')).values('avg')), 0.0),
+                precision=1,
+            ),
+            data_version=models.F('data_version') + 1,
+        )
+
 
 class UserProfile(models.Model):
     """用户知识画像"""
@@ -51,3 +91,7 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f'{self.user} 的画像'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        BaguUser.bump_data_version([self.user_id])
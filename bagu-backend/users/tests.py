@@ -1,3 +1,113 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from practice.models import AnswerRecord
+from questions.models import Category, Question
+from users.changes import wait_for_change
+from users.models import BaguUser, UserProfile
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        self.user = BaguUser.objects.create(username='version-user')
+
+    def test_save_bumps_atomically(self):
+        stale = BaguUser.objects.get(pk=self.user.pk)
+        self.user.total_answers = 3
+        self.user.save(update_fields=['total_answers'])
+        self.assertEqual(self.user.data_version, 1)
+
+        # 内存里是旧版本号的实例整行保存，也不会把版本号写回去
+        stale.nickname = '旧实例'
+        stale.save()
+        self.assertEqual(stale.data_version, 2)
+
+    def test_profile_and_stats_refresh_bump(self):
+        UserProfile.objects.create(user=self.user)
+        category = Category.objects.create(name='Redis')
+        question = Question.objects.create(category=category, title='Redis 为什么快？')
+        AnswerRecord.objects.create(user=self.user, question=question, user_answer='单线程', ai_score=80)
+
+        BaguUser.refresh_answer_stats([self.user.id])
+
+        user = BaguUser.objects.get(pk=self.user.pk)
+        self.assertEqual((user.total_answers, user.data_version), (1, 2))
+
+
+class UserConditionalTests(TestCase):
+    def setUp(self):
+        self.user = BaguUser.objects.create(username='etag-user')
+        UserProfile.objects.create(user=self.user)
+
+    def test_profile_returns_304_until_profile_changes(self):
+        url = f'/api/users/{self.user.id}/profile/'
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.strengths = ['Redis']
+        profile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['strengths'], ['Redis'])
+        self.assertEqual(self.client.get('/api/users/999/profile/').status_code, 404)
+
+    def test_user_list_etag_changes_with_any_user(self):
+        etag = self.client.get('/api/users/')['ETag']
+        self.assertEqual(self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        BaguUser.objects.create(username='another')
+        self.assertEqual(self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_etag(self):
+        url = f'/api/users/{self.user.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(url, {'nickname': '改名'}, content_type='application/json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['nickname'], '改名')
+
+
+@override_settings(CHANGE_FEED_MAX_WAIT=1, CHANGE_FEED_MAX_WAITERS=1, CHANGE_FEED_POLL_INTERVAL=0.01)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.user = BaguUser.objects.create(username='feed-user')
+        self.url = f'/api/users/{self.user.id}/changes/'
+
+    def test_returns_current_version_immediately(self):
+        BaguUser.bump_data_version([self.user.id])
+
+        self.assertEqual(self.client.get(self.url).json(), {'user_id': self.user.id, 'version': 1, 'changed': False})
+        self.assertEqual(self.client.get(self.url, {'since': 0, 'wait': 30}).json()['changed'], True)
+
+    def test_waits_until_timeout_without_changes(self):
+        with mock.patch('users.changes.time.sleep') as sleep:
+            data = self.client.get(self.url, {'since': 0, 'wait': 0}).json()
+        self.assertEqual(data['changed'], False)
+        sleep.assert_not_called()
+
+        data = self.client.get(self.url, {'since': 0, 'wait': 1}).json()
+        self.assertEqual((data['version'], data['changed']), (0, False))
+
+    def test_wakes_up_on_change(self):
+        with mock.patch('users.changes.time.sleep', side_effect=lambda _: BaguUser.bump_data_version([self.user.id])):
+            self.assertEqual(wait_for_change(self.user.id, 0, 1), 1)
+
+    def test_waiter_limit_returns_without_waiting(self):
+        with mock.patch('users.changes.time.sleep') as sleep:
+            with override_settings(CHANGE_FEED_MAX_WAITERS=0):
+                self.assertEqual(wait_for_change(self.user.id, 0, 1), 0)
+            sleep.assert_not_called()
+
+            # 名额用完后归还，下一次请求仍可等待
+            sleep.side_effect = lambda _: BaguUser.bump_data_version([self.user.id])
+            self.assertEqual(wait_for_change(self.user.id, 0, 1), 1)
+            self.assertEqual(wait_for_change(self.user.id, 1, 1), 2)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/users/999/changes/', {'since': 0, 'wait': 1}).status_code, 404)
@@ -1,13 +1,20 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from django.db.models import Avg
+from .changes import not_modified, user_data_version, user_etag, users_list_version, wait_for_change, with_etag
 from .models import BaguUser, UserProfile
 from .serializers import BaguUserSerializer, BaguUserDetailSerializer, UserProfileSerializer
 
 
 class BaguUserViewSet(viewsets.ModelViewSet):
-    """用户接口"""
+    """
+    用户接口。
+
+    列表、详情和画像带 ETag（由用户的 data_version 算出），If-None-Match 未变化时直接返回 304；
+    changes 是按版本号的长轮询，页面据此只在数据变化后重新拉取。
+    """
     queryset = BaguUser.objects.all()
 
     def get_serializer_class(self):
@@ -20,18 +27,54 @@ class BaguUserViewSet(viewsets.ModelViewSet):
         # 创建用户时自动创建画像
         UserProfile.objects.get_or_create(user=user)
 
+    def list(self, request, *args, **kwargs):
+        etag = user_etag(request, 'users', users_list_version())
+        return not_modified(request, etag) or with_etag(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        retrieve = super().retrieve
+        return self._conditional(request, lambda: retrieve(request, *args, **kwargs))
+
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
         """获取用户画像"""
-        user = self.get_object()
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        return Response(UserProfileSerializer(profile).data)
+        def build():
+            profile, _ = UserProfile.objects.get_or_create(user=self.get_object())
+            return Response(UserProfileSerializer(profile).data)
+
+        return self._conditional(request, build)
+
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        """
+        ?since=N&wait=秒：版本号大于 N 时立即返回，否则最多等待 wait 秒（上限 CHANGE_FEED_MAX_WAIT）。
+
+        返回 {user_id, version, changed}；不传 since 时直接返回当前版本（changed 为 false）。
+        """
+        since = _optional_int(request.query_params.get('since'), 'since')
+        wait = _optional_int(request.query_params.get('wait'), 'wait') or 0
+        version = wait_for_change(pk, since, wait)
+        if version is None:
+            raise NotFound('用户不存在')
+        return Response({
+            'user_id': int(pk),
+            'version': version,
+            'changed': since is not None and version > since,
+        })
+
+    def _conditional(self, request, build):
+        """按用户版本号做条件请求：未变化时 304，不执行 build（查询与序列化）"""
+        version = user_data_version(self.kwargs['pk'])
+        if version is None:
+            raise NotFound('用户不存在')
+        etag = user_etag(request, f'u{self.kwargs["pk"]}', version)
+        return not_modified(request, etag) or with_etag(build(), etag)
 
     @action(detail=True, methods=['post'])
     def generate_profile(self, request, pk=None):
         """一键生成 AI 知识画像"""
         from practice.models import AnswerRecord
-        from ai_service.provider import get_ai_provider
+        from ai_service.provider import TASK_PROFILE, get_ai_provider
 
         user = self.get_object()
         profile, _ = UserProfile.objects.get_or_create(user=user)
@@ -74,7 +117,7 @@ class BaguUserViewSet(viewsets.ModelViewSet):
         recent_records = '\n'.join(recent_lines)
 
         try:
-            provider, _ = get_ai_provider()
+            provider, _ = get_ai_provider(task=TASK_PROFILE)
             result = provider.generate_profile(
                 username=user.nickname or user.username,
                 total_answers=user.total_answers,
@@ -103,3 +146,12 @@ class BaguUserViewSet(viewsets.ModelViewSet):
         profile.save()
 
         return Response(UserProfileSerializer(profile).data)
+
+
+def _optional_int(value, name):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: '必须是整数'})
@@ -31,6 +31,58 @@ export interface Question {
   key_points?: string[]
   source_url?: string
   is_completed?: boolean
+  toc?: TocEntry[]
+  brief_html?: string
+  detailed_html?: string
+}
+
+// 用户数据版本：答题、追问、画像变化时递增
+export interface UserChanges {
+  user_id: number
+  version: number
+  changed: boolean
+}
+
+export interface QuestionBatch {
+  count: number
+  results: Question[]
+  missing: number[]
+}
+
+export interface TocEntry {
+  level: number
+  id: string
+  title: string
+}
+
+export interface QuestionSectionMeta {
+  id: string
+  title: string
+  level: number
+}
+
+// ?view=summary：预渲染的简答 HTML + 目录，详解按段另取
+export interface QuestionSummary {
+  id: number
+  title: string
+  category: number
+  category_name: string
+  sub_category: number | null
+  sub_category_name: string
+  difficulty: number
+  tags: string[]
+  key_points: string[]
+  source_url: string
+  brief_html: string
+  toc: TocEntry[]
+  sections: QuestionSectionMeta[]
+  updated_at: string
+}
+
+export interface QuestionSection {
+  id: number
+  section: QuestionSectionMeta
+  html: string
 }
 
 export interface RoleScore {
@@ -200,6 +252,19 @@ export const getCategoryQuickReview = (categoryId: number) =>
 export const getQuestions = (params?: { category?: number; sub_category?: number; search?: string; user_id?: number }) =>
   request.get('/questions/', { params })
 export const getQuestion = (id: number) => request.get<Question>(`/questions/${id}/`)
+// 批量详情：ids 或 category 二选一，fields 投影输出字段（一次请求代替逐题 getQuestion）
+export const getQuestionsBatch = (params: { ids?: number[]; category?: number; fields?: (keyof Question)[] }) =>
+  request.get<QuestionBatch>('/questions/batch/', {
+    params: {
+      ids: params.ids?.join(','),
+      category: params.category,
+      fields: params.fields?.join(','),
+    },
+  })
+export const getQuestionSummary = (id: number) =>
+  request.get<QuestionSummary>(`/questions/${id}/`, { params: { view: 'summary' } })
+export const getQuestionSection = (id: number, sectionId: string) =>
+  request.get<QuestionSection>(`/questions/${id}/`, { params: { section: sectionId } })
 export const getRandomQuestion = (categoryId?: number) =>
   request.get<Question>('/questions/random/', { params: categoryId ? { category: categoryId } : {} })
 export const setQuestionCompletion = (questionId: number, data: { user_id: number; completed: boolean }) =>
@@ -215,8 +280,30 @@ export const submitAnswer = (data: {
   difficulty_level?: 'easy' | 'medium' | 'hard'
 }) =>
   request.post<AnswerResult>('/answers/submit/', data)
-export const getAnswerHistory = (userId?: number) =>
-  request.get('/answers/', { params: userId ? { user_id: userId } : {} })
+// 游标分页：next 是下一页的完整 URL（其中的 cursor 参数传回即可），没有更多时为 null
+export interface CursorPage<T> {
+  next: string | null
+  previous: string | null
+  results: T[]
+}
+
+export const cursorFromUrl = (url: string | null) => (url ? new URL(url, window.location.origin).searchParams.get('cursor') : null)
+
+// 列表默认只有标题、分类、分数等短字段；fields 可指定输出字段（见 AnswerResult）
+export const getAnswerHistory = (
+  userId?: number,
+  params: { fields?: (keyof AnswerResult)[]; cursor?: string | null; page_size?: number } = {},
+) =>
+  request.get<CursorPage<AnswerRecordListItem>>('/answers/', {
+    params: {
+      user_id: userId,
+      fields: params.fields?.join(','),
+      cursor: params.cursor || undefined,
+      page_size: params.page_size,
+    },
+  })
+export const getAnswerRecord = (id: number, fields?: (keyof AnswerResult)[]) =>
+  request.get<Partial<AnswerResult>>(`/answers/${id}/`, { params: { fields: fields?.join(',') } })
 export const getQuestionHistory = (userId: number, questionId: number) =>
   request.get<AnswerRecordListItem[]>('/answers/question-history/', { params: { user_id: userId, question_id: questionId } })
 
@@ -231,6 +318,9 @@ export const getUsers = () => request.get<BaguUser[]>('/users/')
 export const createUser = (data: { username: string; nickname?: string }) => request.post<BaguUser>('/users/', data)
 export const getUserProfile = (userId: number) => request.get<UserProfile>(`/users/${userId}/profile/`)
 export const generateUserProfile = (userId: number) => request.post<UserProfile>(`/users/${userId}/generate_profile/`)
+// 长轮询：用户数据版本大于 since 时立即返回，否则最多等待 wait 秒
+export const getUserChanges = (userId: number, params: { since?: number; wait?: number }, signal?: AbortSignal) =>
+  request.get<UserChanges>(`/users/${userId}/changes/`, { params, signal, timeout: 0 })
 
 // AI 模型
 export const getAiModels = () => request.get('/ai-models/')
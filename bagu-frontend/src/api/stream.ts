@@ -2,11 +2,37 @@
  * SSE 流式消费 - 用 fetch + ReadableStream 实现 POST SSE
  */
 
+export interface CorrectionDiff {
+  start: number
+  end: number
+  original: string
+  replacement: string
+  kind: 'term' | 'pinyin'
+}
+
+export interface ProvisionalScore {
+  score: number
+  coverage: number
+  similarity: number
+  matched_points: string[]
+  missing_points: string[]
+  elapsed_ms: number
+}
+
+export interface StreamRetry {
+  attempt: number
+  model_name: string
+  reason: string
+  resumed_chars: number
+}
+
 export interface SSECallbacks {
   onThinking?: (content: string) => void
   onContent?: (content: string) => void
   onResult?: (data: any) => void
-  onCorrection?: (data: { original: string; corrected: string }) => void
+  onProvisional?: (data: ProvisionalScore) => void
+  onRetry?: (data: StreamRetry) => void
+  onCorrection?: (data: { original: string; corrected: string; diff?: CorrectionDiff[] }) => void
   onFollowUpResult?: (data: any) => void
   onBattleResult?: (data: any) => void
   onError?: (detail: string) => void
@@ -75,6 +101,12 @@ export async function fetchSSE(
           case 'result':
             callbacks.onResult?.(parsed)
             break
+          case 'provisional':
+            callbacks.onProvisional?.(parsed)
+            break
+          case 'retry':
+            callbacks.onRetry?.(parsed)
+            break
           case 'correction':
             callbacks.onCorrection?.(parsed)
             break
@@ -4,13 +4,19 @@ import rehypeHighlight from 'rehype-highlight'
 import 'highlight.js/styles/github.css'
 
 interface Props {
-  content: string
+  content?: string
+  // 后端预渲染的 HTML（原始 HTML 已转义、链接 / 图片只保留 http(s)、mailto 与相对地址），传入时直接插入，不再在浏览器里解析 Markdown
+  html?: string
   inline?: boolean
 }
 
-export default function MarkdownRender({ content, inline }: Props) {
+export default function MarkdownRender({ content = '', html, inline }: Props) {
+  const className = inline ? 'markdown-body-inline' : 'markdown-body'
+  if (html) {
+    return <div className={className} dangerouslySetInnerHTML={{ __html: html }} />
+  }
   return (
-    <div className={inline ? 'markdown-body-inline' : 'markdown-body'}>
+    <div className={className}>
       <ReactMarkdown remarkPlugins={[remarkGfm]} rehypePlugins={[rehypeHighlight]}>
         {content}
       </ReactMarkdown>
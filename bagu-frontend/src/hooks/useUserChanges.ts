@@ -0,0 +1,65 @@
+import { useEffect, useRef } from 'react'
+import { getUserChanges } from '../api'
+
+// 单次等待秒数（服务端另有上限 CHANGE_FEED_MAX_WAIT；等待名额已满时立即返回）
+const LONG_POLL_WAIT = 2
+// 两次检查的最短间隔：服务端没有等待就返回时，按这个间隔再问，不会连续打请求
+const MIN_INTERVAL_MS = 3000
+const RETRY_DELAY_MS = 3000
+const HIDDEN_CHECK_MS = 1000
+
+const sleep = (ms: number) => new Promise(resolve => window.setTimeout(resolve, ms))
+
+/**
+ * 用户数据变化时调用 onChange：对 /users/<id>/changes/ 做短时长轮询（每次只查一个版本号），
+ * 数据不变时不再反复拉取整页内容。
+ * 页面隐藏时暂停，回到页面后的第一次请求会立即带回期间发生的变化。
+ */
+export default function useUserChanges(
+  userId: number | null | undefined,
+  onChange: () => void | Promise<void>,
+) {
+  const changeRef = useRef(onChange)
+
+  useEffect(() => {
+    changeRef.current = onChange
+  }, [onChange])
+
+  useEffect(() => {
+    if (!userId) return
+    const controller = new AbortController()
+    let version: number | undefined
+
+    const run = async () => {
+      while (!controller.signal.aborted) {
+        if (document.hidden) {
+          await sleep(HIDDEN_CHECK_MS)
+          continue
+        }
+        const startedAt = Date.now()
+        try {
+          // 第一次只取当前版本作为基线
+          const res = await getUserChanges(
+            userId,
+            { since: version, wait: version === undefined ? 0 : LONG_POLL_WAIT },
+            controller.signal,
+          )
+          if (controller.signal.aborted) return
+          const changed = version !== undefined && res.data.version !== version
+          version = res.data.version
+          if (changed) {
+            await changeRef.current()
+            continue
+          }
+          await sleep(Math.max(0, MIN_INTERVAL_MS - (Date.now() - startedAt)))
+        } catch {
+          if (controller.signal.aborted) return
+          await sleep(RETRY_DELAY_MS)
+        }
+      }
+    }
+
+    void run()
+    return () => controller.abort()
+  }, [userId])
+}
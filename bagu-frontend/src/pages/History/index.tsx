@@ -1,15 +1,35 @@
 import { useState, useEffect, useCallback } from 'react'
-import { Table, Tag, Typography, Spin, Empty, Select, Space } from 'antd'
+import { Button, Table, Tag, Typography, Spin, Empty, Select, Space } from 'antd'
 import { useNavigate } from 'react-router-dom'
-import { getAnswerHistory, getUsers, type AnswerResult, type BaguUser } from '../../api'
-import useAutoRefresh from '../../hooks/useAutoRefresh'
+import {
+  cursorFromUrl, getAnswerHistory, getAnswerRecord, getUsers,
+  type AnswerResult, type AnswerRecordListItem, type BaguUser,
+} from '../../api'
+import useUserChanges from '../../hooks/useUserChanges'
 
 const { Title, Text, Paragraph } = Typography
 
+// 展开行时才按需取正文，列表本身只下载短字段
+const DETAIL_FIELDS: (keyof AnswerResult)[] = [
+  'id', 'user_answer', 'ai_highlights', 'ai_missing_points', 'ai_suggestion', 'ai_improved_answer',
+]
+const PAGE_SIZE = 50
+
+// 数据变化后只重新拉第一页：新记录合并到最前面，已加载的更早记录保留
+const mergeRecords = (latest: AnswerRecordListItem[], loaded: AnswerRecordListItem[]) => {
+  const latestIds = new Set(latest.map(item => item.id))
+  return [...latest, ...loaded.filter(item => !latestIds.has(item.id))]
+}
+
+type RecordDetail = Pick<AnswerResult, 'user_answer' | 'ai_highlights' | 'ai_missing_points' | 'ai_suggestion' | 'ai_improved_answer'>
+
 export default function History() {
   const [users, setUsers] = useState<BaguUser[]>([])
   const [selectedUserId, setSelectedUserId] = useState<number | null>(null)
-  const [records, setRecords] = useState<AnswerResult[]>([])
+  const [records, setRecords] = useState<AnswerRecordListItem[]>([])
+  const [details, setDetails] = useState<Record<number, RecordDetail>>({})
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(false)
   const navigate = useNavigate()
 
@@ -30,32 +50,119 @@ export default function History() {
     if (!selectedUserId) return
     if (showLoading) setLoading(true)
     try {
-      const res = await getAnswerHistory(selectedUserId)
-      const data = Array.isArray(res.data) ? res.data : (res.data as any).results || []
-      setRecords(data)
+      const res = await getAnswerHistory(selectedUserId, { page_size: PAGE_SIZE })
+      if (showLoading) {
+        setRecords(res.data.results)
+        setNextCursor(cursorFromUrl(res.data.next))
+      } else {
+        setRecords(prev => mergeRecords(res.data.results, prev))
+      }
     } finally {
       if (showLoading) setLoading(false)
     }
   }, [selectedUserId])
 
+  const loadMore = async () => {
+    if (!selectedUserId || !nextCursor) return
+    setLoadingMore(true)
+    try {
+      const res = await getAnswerHistory(selectedUserId, { cursor: nextCursor, page_size: PAGE_SIZE })
+      setRecords(prev => mergeRecords(prev, res.data.results))
+      setNextCursor(cursorFromUrl(res.data.next))
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   useEffect(() => {
     if (!selectedUserId) return
     void loadHistory(true)
   }, [selectedUserId, loadHistory])
 
-  useAutoRefresh(
-    async () => {
-      await Promise.all([loadUsers(), loadHistory(false)])
-    },
-    { enabled: Boolean(selectedUserId), intervalMs: 3000 },
-  )
+  const loadDetail = useCallback(async (recordId: number) => {
+    if (details[recordId]) return
+    const res = await getAnswerRecord(recordId, DETAIL_FIELDS)
+    setDetails(prev => ({ ...prev, [recordId]: res.data as RecordDetail }))
+  }, [details])
+
+  const renderDetail = (record: AnswerRecordListItem) => {
+    const detail = details[record.id]
+    if (!detail) {
+      return <Spin size="small" style={{ display: 'block', padding: 12 }} />
+    }
+    if (!detail.user_answer && !detail.ai_suggestion && !(detail.ai_highlights?.length ?? 0)) {
+      return <Text type="secondary" style={{ padding: '8px 16px', display: 'block' }}>暂无详情</Text>
+    }
+    return (
+      <div style={{ padding: '8px 16px' }}>
+        {detail.user_answer && (
+          <div style={{ marginBottom: 12 }}>
+            <Text strong>我的答案</Text>
+            <Paragraph
+              ellipsis={{ rows: 3, expandable: true, symbol: '展开' }}
+              style={{ marginTop: 4, marginBottom: 0, color: '#555' }}
+            >
+              {detail.user_answer}
+            </Paragraph>
+          </div>
+        )}
+        {(detail.ai_highlights?.length ?? 0) > 0 && (
+          <div style={{ marginBottom: 10 }}>
+            <Text strong style={{ color: '#389e0d' }}>亮点</Text>
+            <div style={{ marginTop: 4, display: 'flex', flexWrap: 'wrap', gap: 6 }}>
+              {detail.ai_highlights.map((h, i) => (
+                <Tag key={i} color="green">{h}</Tag>
+              ))}
+            </div>
+          </div>
+        )}
+        {(detail.ai_missing_points?.length ?? 0) > 0 && (
+          <div style={{ marginBottom: 10 }}>
+            <Text strong style={{ color: '#d46b08' }}>遗漏要点</Text>
+            <div style={{ marginTop: 4, display: 'flex', flexWrap: 'wrap', gap: 6 }}>
+              {detail.ai_missing_points.map((p, i) => (
+                <Tag key={i} color="orange">{p}</Tag>
+              ))}
+            </div>
+          </div>
+        )}
+        {detail.ai_suggestion && (
+          <div style={{ marginBottom: detail.ai_improved_answer ? 10 : 0 }}>
+            <Text strong>AI 建议</Text>
+            <Paragraph style={{ marginTop: 4, marginBottom: 0 }}>{detail.ai_suggestion}</Paragraph>
+          </div>
+        )}
+        {detail.ai_improved_answer && (
+          <div>
+            <Text strong>AI 改进版答案</Text>
+            <pre style={{
+              marginTop: 4,
+              padding: '8px 12px',
+              background: '#f6ffed',
+              border: '1px solid #b7eb8f',
+              borderRadius: 4,
+              whiteSpace: 'pre-wrap',
+              fontSize: 13,
+            }}>
+              {detail.ai_improved_answer}
+            </pre>
+          </div>
+        )}
+      </div>
+    )
+  }
+
+  // 有新的答题 / 追问时才重新拉取（接口带 ETag，未变化的部分服务端直接返回 304）
+  useUserChanges(selectedUserId, async () => {
+    await Promise.all([loadUsers(), loadHistory(false)])
+  })
 
   const columns = [
     {
       title: '题目',
       dataIndex: 'question_title',
       key: 'title',
-      render: (text: string, record: AnswerResult) => (
+      render: (text: string, record: AnswerRecordListItem) => (
         <a onClick={() => navigate(`/practice/${record.question}`)}>{text}</a>
       ),
     },
@@ -73,7 +180,7 @@ export default function History() {
         const color = score >= 80 ? 'green' : score >= 60 ? 'orange' : 'red'
         return <Tag color={color}>{score}分</Tag>
       },
-      sorter: (a: AnswerResult, b: AnswerResult) => a.ai_score - b.ai_score,
+      sorter: (a: AnswerRecordListItem, b: AnswerRecordListItem) => a.ai_score - b.ai_score,
     },
     {
       title: 'AI 模型',
@@ -108,73 +215,25 @@ export default function History() {
       ) : loading ? (
         <Spin size="large" style={{ display: 'block', marginTop: 100 }} />
       ) : (
-        <Table
-          dataSource={records}
-          columns={columns}
-          rowKey="id"
-          pagination={{ pageSize: 15 }}
-          expandable={{
-            rowExpandable: (record) =>
-              !!record.ai_suggestion || (record.ai_highlights?.length ?? 0) > 0,
-            expandedRowRender: (record) => (
-              <div style={{ padding: '8px 16px' }}>
-                {record.user_answer && (
-                  <div style={{ marginBottom: 12 }}>
-                    <Text strong>我的答案</Text>
-                    <Paragraph
-                      ellipsis={{ rows: 3, expandable: true, symbol: '展开' }}
-                      style={{ marginTop: 4, marginBottom: 0, color: '#555' }}
-                    >
-                      {record.user_answer}
-                    </Paragraph>
-                  </div>
-                )}
-                {(record.ai_highlights?.length ?? 0) > 0 && (
-                  <div style={{ marginBottom: 10 }}>
-                    <Text strong style={{ color: '#389e0d' }}>亮点</Text>
-                    <div style={{ marginTop: 4, display: 'flex', flexWrap: 'wrap', gap: 6 }}>
-                      {record.ai_highlights!.map((h, i) => (
-                        <Tag key={i} color="green">{h}</Tag>
-                      ))}
-                    </div>
-                  </div>
-                )}
-                {(record.ai_missing_points?.length ?? 0) > 0 && (
-                  <div style={{ marginBottom: 10 }}>
-                    <Text strong style={{ color: '#d46b08' }}>遗漏要点</Text>
-                    <div style={{ marginTop: 4, display: 'flex', flexWrap: 'wrap', gap: 6 }}>
-                      {record.ai_missing_points!.map((p, i) => (
-                        <Tag key={i} color="orange">{p}</Tag>
-                      ))}
-                    </div>
-                  </div>
-                )}
-                {record.ai_suggestion && (
-                  <div style={{ marginBottom: record.ai_improved_answer ? 10 : 0 }}>
-                    <Text strong>AI 建议</Text>
-                    <Paragraph style={{ marginTop: 4, marginBottom: 0 }}>{record.ai_suggestion}</Paragraph>
-                  </div>
-                )}
-                {record.ai_improved_answer && (
-                  <div>
-                    <Text strong>AI 改进版答案</Text>
-                    <pre style={{
-                      marginTop: 4,
-                      padding: '8px 12px',
-                      background: '#f6ffed',
-                      border: '1px solid #b7eb8f',
-                      borderRadius: 4,
-                      whiteSpace: 'pre-wrap',
-                      fontSize: 13,
-                    }}>
-                      {record.ai_improved_answer}
-                    </pre>
-                  </div>
-                )}
-              </div>
-            ),
-          }}
-        />
+        <>
+          <Table
+            dataSource={records}
+            columns={columns}
+            rowKey="id"
+            pagination={{ pageSize: 15 }}
+            expandable={{
+              onExpand: (expanded, record) => {
+                if (expanded) void loadDetail(record.id)
+              },
+              expandedRowRender: renderDetail,
+            }}
+          />
+          {nextCursor && (
+            <div style={{ textAlign: 'center', marginTop: 12 }}>
+              <Button onClick={() => void loadMore()} loading={loadingMore}>加载更早的记录</Button>
+            </div>
+          )}
+        </>
       )}
     </div>
   )
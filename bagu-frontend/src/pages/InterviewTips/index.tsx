@@ -2,11 +2,15 @@ import { useEffect, useMemo, useState } from 'react'
 import { Alert, Card, Collapse, Empty, Input, List, Space, Spin, Tag, Typography } from 'antd'
 import { HomeOutlined, SearchOutlined } from '@ant-design/icons'
 import { Link } from 'react-router-dom'
-import { getCategories, getQuestion, getQuestions, type Category, type Question } from '../../api'
+import { getCategories, getQuestionsBatch, type Category, type Question } from '../../api'
 import MarkdownRender from '../../components/MarkdownRender'
 
 const { Title, Text, Paragraph } = Typography
 
+const TIP_FIELDS: (keyof Question)[] = ['id', 'title', 'source_url', 'brief_html', 'detailed_html']
+
+const htmlToText = (html?: string) => (html || '').replace(/<[^>]+>/g, ' ')
+
 export default function InterviewTips() {
   const [loading, setLoading] = useState(true)
   const [tips, setTips] = useState<Question[]>([])
@@ -34,10 +38,8 @@ export default function InterviewTips() {
 
         if (!cancelled) setCategory(target)
 
-        const listRes = await getQuestions({ category: target.id })
-        const list = Array.isArray(listRes.data) ? listRes.data : (listRes.data as any).results || []
-        const detailResponses = await Promise.all(list.map((item: Question) => getQuestion(item.id)))
-        const details = detailResponses.map(resp => resp.data as Question)
+        const batchRes = await getQuestionsBatch({ category: target.id, fields: TIP_FIELDS })
+        const details = [...batchRes.data.results]
         details.sort((a, b) => a.id - b.id)
 
         if (!cancelled) setTips(details)
@@ -59,7 +61,7 @@ export default function InterviewTips() {
     const trimmed = keyword.trim().toLowerCase()
     if (!trimmed) return tips
     return tips.filter(item => {
-      const text = `${item.title} ${item.brief_answer || ''} ${item.detailed_answer || ''}`.toLowerCase()
+      const text = `${item.title} ${htmlToText(item.brief_html)} ${htmlToText(item.detailed_html)}`.toLowerCase()
       return text.includes(trimmed)
     })
   }, [tips, keyword])
@@ -121,12 +123,12 @@ export default function InterviewTips() {
                       {
                         key: 'brief',
                         label: '核心话术',
-                        children: <MarkdownRender content={item.brief_answer || '暂无'} />,
+                        children: <MarkdownRender html={item.brief_html} content="暂无" />,
                       },
                       {
                         key: 'detail',
                         label: '经验详解',
-                        children: <MarkdownRender content={item.detailed_answer || item.brief_answer || '暂无'} />,
+                        children: <MarkdownRender html={item.detailed_html || item.brief_html} content="暂无" />,
                       },
                     ]}
                   />
@@ -6,6 +6,7 @@ import type { StreamStatus } from '../../hooks/useStreamAnswer'
 import type { SlotData } from './AnswerSlot'
 import ResultCell from './ResultCell'
 import StreamingCell from './StreamingCell'
+import type { ProvisionalScore, StreamRetry } from '../../api/stream'
 import FollowUpBox from './FollowUpBox'
 import MarkdownRender from '../../components/MarkdownRender'
 
@@ -23,6 +24,8 @@ interface CellState {
   result: AnswerResult | null
   error: string | null
   correction?: CorrectionData
+  provisional?: ProvisionalScore
+  retry?: StreamRetry
 }
 
 interface Props {
@@ -323,6 +326,8 @@ function BattleLayout({
                   thinkingText={cell.thinkingText}
                   contentText={cell.contentText}
                   error={cell.error}
+                  provisional={cell.provisional}
+                  retry={cell.retry}
                   compact
                 />
               )}
@@ -692,6 +697,8 @@ export default function ComparisonGrid({ slots, models, cellStates, users, quest
                   thinkingText={cell.thinkingText}
                   contentText={cell.contentText}
                   error={cell.error}
+                  provisional={cell.provisional}
+                  retry={cell.retry}
                 />
               )}
 
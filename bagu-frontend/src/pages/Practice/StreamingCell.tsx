@@ -1,7 +1,8 @@
-import { Spin, Typography, Collapse, Space } from 'antd'
+import { Spin, Typography, Collapse, Space, Tag } from 'antd'
 import { LoadingOutlined } from '@ant-design/icons'
 import type { StreamStatus } from '../../hooks/useStreamAnswer'
 import MarkdownRender from '../../components/MarkdownRender'
+import type { ProvisionalScore, StreamRetry } from '../../api/stream'
 
 const { Text } = Typography
 
@@ -10,10 +11,12 @@ interface Props {
   thinkingText: string
   contentText: string
   error: string | null
+  provisional?: ProvisionalScore
+  retry?: StreamRetry
   compact?: boolean
 }
 
-export default function StreamingCell({ status, thinkingText, contentText, error, compact }: Props) {
+export default function StreamingCell({ status, thinkingText, contentText, error, provisional, retry, compact }: Props) {
   if (status === 'error') {
     return (
       <div style={{ padding: compact ? 8 : 16, color: '#ff4d4f' }}>
@@ -28,6 +31,29 @@ export default function StreamingCell({ status, thinkingText, contentText, error
 
   return (
     <div style={{ padding: compact ? 8 : 16 }}>
+      {provisional && (
+        <div style={{ marginBottom: 8, padding: compact ? 6 : 10, background: '#f0f5ff', borderRadius: 6 }}>
+          <Space wrap size={4}>
+            <Text type="secondary" style={{ fontSize }}>本地预估</Text>
+            <Tag color="blue">{provisional.score}分</Tag>
+            {provisional.matched_points.map((point, i) => (
+              <Tag key={`hit-${i}`} color="green">{point}</Tag>
+            ))}
+            {provisional.missing_points.map((point, i) => (
+              <Tag key={`miss-${i}`} color="orange">{point}</Tag>
+            ))}
+          </Space>
+        </div>
+      )}
+
+      {retry && (
+        <div style={{ marginBottom: 8 }}>
+          <Text type="warning" style={{ fontSize }}>
+            上游中断，已保留 {retry.resumed_chars} 字输出并由 {retry.model_name} 继续生成（第 {retry.attempt} 次续写）
+          </Text>
+        </div>
+      )}
+
       {thinkingText && (
         <Collapse
           defaultActiveKey={compact ? [] : ['thinking']}
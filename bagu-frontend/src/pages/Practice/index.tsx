@@ -4,7 +4,7 @@ import { SendOutlined, HomeOutlined, EyeOutlined, EyeInvisibleOutlined, PlusOutl
 import { useParams, Link, useNavigate } from 'react-router-dom'
 import { getQuestion, getQuestions, getRandomQuestion, getUsers, getAiModels, getAiRoles, createEvaluationRound, finalizeRound, setQuestionCompletion, type Question, type AnswerResult, type BaguUser, type AiModel, type AiRole, type EvaluationRound, type BattleResult } from '../../api'
 import { useUserStore } from '../../stores/userStore'
-import { fetchSSE } from '../../api/stream'
+import { fetchSSE, type ProvisionalScore, type StreamRetry } from '../../api/stream'
 import type { StreamStatus } from '../../hooks/useStreamAnswer'
 import useAutoRefresh from '../../hooks/useAutoRefresh'
 import AnswerSlot, { type SlotData } from './AnswerSlot'
@@ -25,6 +25,8 @@ interface CellState {
   result: AnswerResult | null
   error: string | null
   correction?: CorrectionData
+  provisional?: ProvisionalScore
+  retry?: StreamRetry
 }
 const DIFFICULTY_LABEL: Record<'easy' | 'medium' | 'hard', string> = {
   easy: '简单',
@@ -266,6 +268,15 @@ export default function Practice() {
                 },
               }))
             },
+            onProvisional(data) {
+              setCellStates(prev => ({
+                ...prev,
+                [key]: {
+                  ...prev[key],
+                  provisional: data,
+                },
+              }))
+            },
             onCorrection(data) {
               setCellStates(prev => ({
                 ...prev,
@@ -275,6 +286,15 @@ export default function Practice() {
                 },
               }))
             },
+            onRetry(data) {
+              setCellStates(prev => ({
+                ...prev,
+                [key]: {
+                  ...prev[key],
+                  retry: data,
+                },
+              }))
+            },
             onResult(data) {
               completedResults[key] = data
               setCellStates(prev => ({
@@ -2,7 +2,7 @@ import { useState, useEffect, useCallback } from 'react'
 import { Card, Typography, Spin, Empty, Tag, List, Button, message, Select, Space, Progress, Statistic } from 'antd'
 import { ThunderboltOutlined } from '@ant-design/icons'
 import { getUsers, getUserProfile, generateUserProfile, type UserProfile as UserProfileType, type BaguUser } from '../../api'
-import useAutoRefresh from '../../hooks/useAutoRefresh'
+import useUserChanges from '../../hooks/useUserChanges'
 
 const { Title, Text } = Typography
 
@@ -63,13 +63,10 @@ export default function Profile() {
 
   const selectedUser = users.find(u => u.id === selectedUserId)
 
-  useAutoRefresh(
-    async () => {
-      if (generating) return
-      await Promise.all([loadUsers(), loadProfile(false)])
-    },
-    { enabled: Boolean(selectedUserId), intervalMs: 3000 },
-  )
+  useUserChanges(selectedUserId, async () => {
+    if (generating) return
+    await Promise.all([loadUsers(), loadProfile(false)])
+  })
 
   const handleGenerate = async () => {
     if (!selectedUserId) return
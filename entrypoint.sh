@@ -7,5 +7,11 @@ python /app/manage.py migrate --noinput
 echo "==> Bootstrapping built-in data..."
 python /app/manage.py bootstrap_seed_data
 
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    echo "==> Resetting Prometheus multiprocess dir..."
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "==> Starting services..."
 exec supervisord -c /etc/supervisor/conf.d/supervisord.conf